@@ -1,9 +1,11 @@
 package kubestatus
 
 import (
+	"bufio"
 	"context"
 	"encoding/json"
 	"fmt"
+	"io"
 	"log"
 	"os"
 	"strings"
@@ -16,9 +18,9 @@ import (
 
 func Main(ctx context.Context, version string, args ...string) error {
 	var st = &cobra.Command{
-		Use:           "kubestatus <kind> [<name>]",
+		Use:           "kubestatus <kind> [<name>] | kubestatus --stream",
 		Short:         "get and set status of kubernetes resources",
-		Args:          cobra.RangeArgs(1, 2),
+		Args:          cobra.RangeArgs(0, 2),
 		SilenceErrors: true,
 		SilenceUsage:  true,
 	}
@@ -27,8 +29,22 @@ func Main(ctx context.Context, version string, args ...string) error {
 	fields := st.Flags().StringP("field-selector", "f", "", "field selector")
 	labels := st.Flags().StringP("label-selector", "l", "", "label selector")
 	statusFile := st.Flags().StringP("update", "u", "", "update with new status from file (must be json)")
+	stream := st.Flags().Bool("stream", false, "read status updates from stdin, one JSON object per line, and write one JSON result per line to stdout")
 
 	st.RunE = func(cmd *cobra.Command, args []string) error {
+		if *stream {
+			client, err := kates.NewClientFromConfigFlags(info.GetConfigFlags())
+			if err != nil {
+				return err
+			}
+
+			return streamUpdates(cmd.Context(), client, os.Stdin, os.Stdout)
+		}
+
+		if len(args) < 1 {
+			return fmt.Errorf("kubestatus: a kind is required unless --stream is given")
+		}
+
 		var status map[string]interface{}
 
 		if *statusFile != "" {
@@ -145,3 +161,79 @@ func Main(ctx context.Context, version string, args ...string) error {
 	st.SetArgs(args)
 	return st.ExecuteContext(ctx)
 }
+
+// streamUpdate is one line of input in --stream mode.
+type streamUpdate struct {
+	Kind      string                 `json:"kind"`
+	Name      string                 `json:"name"`
+	Namespace string                 `json:"namespace"`
+	Status    map[string]interface{} `json:"status"`
+}
+
+// streamResult is one line of output in --stream mode: there's exactly one for
+// each line of input, in the same order.
+type streamResult struct {
+	Kind      string `json:"kind"`
+	Name      string `json:"name"`
+	Namespace string `json:"namespace"`
+	OK        bool   `json:"ok"`
+	Error     string `json:"error,omitempty"`
+}
+
+// streamUpdates applies status updates read from input until it's closed. This
+// lets a caller with many updates to make use one long-lived process (and one
+// client, with its discovery cache) instead of one process per update.
+func streamUpdates(ctx context.Context, client *kates.Client, input io.Reader, output io.Writer) error {
+	scanner := bufio.NewScanner(input)
+	scanner.Buffer(make([]byte, 0, 64*1024), 16*1024*1024)
+
+	writer := bufio.NewWriter(output)
+	enc := json.NewEncoder(writer)
+
+	for scanner.Scan() {
+		line := scanner.Bytes()
+
+		if len(strings.TrimSpace(string(line))) == 0 {
+			continue
+		}
+
+		var update streamUpdate
+		result := streamResult{}
+
+		if err := json.Unmarshal(line, &update); err != nil {
+			result.Error = err.Error()
+		} else {
+			result.Kind = update.Kind
+			result.Name = update.Name
+			result.Namespace = update.Namespace
+
+			obj := kates.NewUnstructured(update.Kind, "")
+			obj.SetName(update.Name)
+			if update.Namespace != "" {
+				obj.SetNamespace(update.Namespace)
+			}
+
+			if err := client.Get(ctx, obj, obj); err != nil {
+				result.Error = err.Error()
+			} else {
+				obj.Object["status"] = update.Status
+
+				if err := client.UpdateStatus(ctx, obj, obj); err != nil {
+					result.Error = err.Error()
+				} else {
+					result.OK = true
+				}
+			}
+		}
+
+		if err := enc.Encode(result); err != nil {
+			return err
+		}
+
+		if err := writer.Flush(); err != nil {
+			return err
+		}
+	}
+
+	return scanner.Err()
+}
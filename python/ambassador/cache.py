@@ -1,13 +1,22 @@
-from typing import Any, Dict, Callable, Optional, Set, Tuple, TYPE_CHECKING
+from typing import Any, ClassVar, Deque, Dict, Callable, List, Optional, Set, Tuple, TYPE_CHECKING
 
+import collections
 import logging
+import sys
 
 class Cacheable(dict):
     """
     A dictionary that is specifically cacheable, by way of its added 
     cache_key property.
+
+    Cacheables are some of the most numerous objects we have, so they use
+    __slots__ rather than a per-instance __dict__ for anything that isn't
+    part of the dictionary itself. Subclasses that want the same savings need
+    to declare __slots__ too.
     """
 
+    __slots__ = ( '_cache_key', )
+
     _cache_key: Optional[str]
 
     @property
@@ -27,29 +36,177 @@ CacheEntry = Tuple[Cacheable, Optional[DeletionHandler]]
 CacheLink = Set[str]
 
 
+def approx_size(rsrc: Cacheable) -> int:
+    """
+    Roughly estimate how many bytes a Cacheable is holding on to: itself, plus
+    any dicts, lists, tuples, sets, and scalars it contains. Other Cacheables
+    it refers to are cached (and counted) separately, so we don't descend into
+    them, and we don't descend into anything that isn't a plain container
+    either (e.g. the IR pointer in every IRResource).
+    """
+
+    size = 0
+    seen: Set[int] = set()
+    worklist: List[Any] = [ rsrc ]
+
+    while worklist:
+        node = worklist.pop()
+
+        if id(node) in seen:
+            continue
+
+        seen.add(id(node))
+        size += sys.getsizeof(node)
+
+        if isinstance(node, dict):
+            for k, v in node.items():
+                worklist.append(k)
+
+                if not isinstance(v, Cacheable):
+                    worklist.append(v)
+        elif isinstance(node, (list, tuple, set)):
+            for v in node:
+                if not isinstance(v, Cacheable):
+                    worklist.append(v)
+
+    return size
+
+
+class CachePrefixStats:
+    """
+    Statistics for all the cache keys with a given prefix (see Cache.key_prefix).
+    hits, misses, invalidations, and evictions are cumulative; entries and bytes
+    describe what's in the cache right now.
+    """
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+        self.entries = 0
+        self.bytes = 0
+
+
 class Cache():
     """
     A cache of Cacheables, supporting add/delete/fetch and also linking
     an owning Cacheable to an owned Cacheable. Deletion is cascaded: if you
-    delete something, everything it owns is recursively deleted too. THIS ONLY
-    HAPPENS IN ONE DIRECTION at present, so deleting a Cacheable in the middle
-    of the ownership tree can leave dangling pointers.
+    delete something, everything it owns is recursively deleted too. Links
+    are tracked in both directions, so deleting a Cacheable in the middle of
+    the ownership tree also removes it from the links of its owners.
+
+    The cache also tracks dependencies on things that are never cached
+    themselves (Secrets, Services, TLSContexts, etc.): see depend() and
+    dependency_key(). Invalidating a dependency key invalidates everything
+    that depends on it.
+
+    The cache is bounded. Every reconfigure is a new generation (see
+    advance_generation()), and entries remember the last generation in which
+    they (or anything they own) were added or fetched. At the end of each generation, entries not
+    used in the last max_age generations are evicted, and then, if the cache
+    holds more than max_entries entries or (approximately) max_bytes bytes,
+    the least recently used entries are evicted until it doesn't. Eviction
+    cascades just like invalidation. Zero means "no limit" for all three.
     """
-    
-    def __init__(self, logger: logging.Logger) -> None:
-        self.cache: Dict[str, CacheEntry] = {}
-        self.links: Dict[str, CacheLink] = {}
+
+    # Cache keys are grouped by their first dash-separated component for
+    # statistics. Anything not in here is counted as "other".
+    KeyPrefixes: ClassVar[Dict[str, str]] = {
+        'Route': 'Route',
+        'V2': 'V2',
+        'V3': 'V3',
+        'IRHTTPMappingGroup': 'group',
+        'IRTCPMappingGroup': 'group',
+        'Cluster': 'cluster',
+        'Mapping': 'mapping',
+        'TCPMapping': 'mapping',
+        'IRHTTPMapping': 'mapping',
+        'IRTCPMapping': 'mapping',
+    }
+
+    def __init__(self, logger: logging.Logger, max_entries: int=0, max_bytes: int=0,
+                 max_age: int=0) -> None:
         self.logger = logger
 
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+
+        self.generation = 0
+
         self.reset_stats()
+        self.reset()
 
         self.logger.debug("Cache initialized")
 
+    def reset(self) -> None:
+        """
+        Drop everything in the cache, but keep the statistics and the generation.
+        """
+
+        self.cache: Dict[str, CacheEntry] = {}
+
+        # links maps owner -> owned, backlinks maps owned -> owner.
+        self.links: Dict[str, CacheLink] = {}
+        self.backlinks: Dict[str, CacheLink] = {}
+
+        # key -> generation in which the entry was last added or fetched
+        self.last_used: Dict[str, int] = {}
+
+        # key -> approximate size of the entry in bytes. Sizing an entry means
+        # walking all of it, so we don't do that in add(): new keys wait in
+        # unmeasured until something needs to know (see measure()), and then
+        # each one is measured exactly once. total_bytes is the running sum of
+        # sizes.
+        self.sizes: Dict[str, int] = {}
+        self.unmeasured: Set[str] = set()
+        self._total_bytes = 0
+
+        for stats in self.prefix_stats.values():
+            stats.entries = 0
+            stats.bytes = 0
+
     def reset_stats(self) -> None:
         self.hits = 0
         self.misses = 0
         self.invalidate_calls = 0
         self.invalidated_objects = 0
+        self.evicted_objects = 0
+        self.prefix_stats: Dict[str, CachePrefixStats] = {}
+
+    @classmethod
+    def key_prefix(cls, key: str) -> str:
+        return cls.KeyPrefixes.get(key.split('-', 1)[0], 'other')
+
+    def stats_for(self, key: str) -> CachePrefixStats:
+        prefix = self.key_prefix(key)
+        stats = self.prefix_stats.get(prefix, None)
+
+        if stats is None:
+            stats = CachePrefixStats()
+            self.prefix_stats[prefix] = stats
+
+        return stats
+
+    def measure(self) -> None:
+        """
+        Work out the approximate size of every entry added since the last call,
+        so that total_bytes and the per-prefix byte counts are up to date.
+        """
+
+        for key in self.unmeasured:
+            size = approx_size(self.cache[key][0])
+            self.sizes[key] = size
+            self._total_bytes += size
+            self.stats_for(key).bytes += size
+
+        self.unmeasured.clear()
+
+    @property
+    def total_bytes(self) -> int:
+        self.measure()
+        return self._total_bytes
 
     @staticmethod
     def fn_name(fn: Optional[Callable]) -> str:
@@ -69,11 +226,21 @@ class Cache():
             self.logger.info(f"CACHE: ignore, no cache_key: {rsrc}")
         elif key in self.cache:
             # self.logger.info(f"CACHE: ignore, already present: {rsrc}")
-            pass
+
+            # It's still in use, though.
+            self.last_used[key] = self.generation
         else:
             self.logger.debug(f"CACHE: adding {key}: {rsrc}, on_delete {self.fn_name(on_delete)}")
 
             self.cache[key] = (rsrc, on_delete)
+            self.last_used[key] = self.generation
+            self.unmeasured.add(key)
+
+            self.stats_for(key).entries += 1
+
+    def _add_link(self, owner_key: str, owned_key: str) -> None:
+        self.links.setdefault(owner_key, set()).add(owned_key)
+        self.backlinks.setdefault(owned_key, set()).add(owner_key)
 
     def link(self, owner: Cacheable, owned: Cacheable) -> None:
         """
@@ -104,13 +271,70 @@ class Cache():
 
         # self.logger.info(f"CACHE: linking {owner_key} -> {owned_key}")
 
-        links = self.links.setdefault(owner_key, set())
-        links.update([ owned_key ])
+        self._add_link(owner_key, owned_key)
 
-    def invalidate(self, key: str) -> None:
+    @staticmethod
+    def dependency_key(kind: str, name: Optional[str]=None, namespace: Optional[str]=None) -> str:
         """
-        Recursively invalidate the entry named by 'key' and everything to which it
-        is linked.
+        Build the key for a dependency on something that isn't itself cached.
+        Namespaced things (e.g. Secrets) should pass their namespace; things
+        the IR indexes only by name (e.g. TLSContexts) should not.
+        """
+
+        key = f"Dep-{kind}"
+
+        if name:
+            key += f"-{name}"
+
+            if namespace:
+                key += f".{namespace}"
+
+        return key
+
+    def depend(self, dependency: str, owned_key: str) -> None:
+        """
+        Note that the entry (or dependency) named by owned_key depends on the
+        dependency key 'dependency', so that invalidating 'dependency' will
+        invalidate owned_key too. Unlike link(), neither key needs to be in
+        the cache: dependencies are never cached themselves, and the owned
+        entry is often registered before it's added to the cache.
+        """
+
+        if not dependency or not owned_key:
+            return
+
+        # self.logger.info(f"CACHE: depend {dependency} -> {owned_key}")
+
+        self._add_link(dependency, owned_key)
+
+    def _unlink(self, key: str) -> None:
+        """
+        Remove key from the link graph entirely, in both directions.
+        """
+
+        for owned in self.links.pop(key, ()):
+            owners = self.backlinks.get(owned)
+
+            if owners is not None:
+                owners.discard(key)
+
+                if not owners:
+                    del(self.backlinks[owned])
+
+        for owner in self.backlinks.pop(key, ()):
+            owned_keys = self.links.get(owner)
+
+            if owned_keys is not None:
+                owned_keys.discard(key)
+
+                if not owned_keys:
+                    del(self.links[owner])
+
+    def _collect(self, key: str) -> Tuple[Dict[str, CacheEntry], List[str]]:
+        """
+        Find everything that has to go if the entry (or dependency) named by
+        'key' goes. Returns the entries to delete, and the dependency keys we
+        went through.
         """
 
         # We use worklist to keep track of things to consider: for starters, 
@@ -119,14 +343,10 @@ class Cache():
         #
         # Note that word "consider". If you want to invalidate something from 
         # the cache that isn't in the cache, that's not an error -- it'll be
-        # silently ignored. That helps with dangling links (e.g. if two Mappings
-        # both link to the same Group, and you invalidate the first Mapping, the 
-        # second will have a dangling link to the now-invalidated Group, and that
-        # needs to not break anything).
-
-        self.invalidate_calls += 1
-
-        worklist = [ key ]
+        # silently ignored. That helps with dependencies on things that never
+        # made it into the cache.
+        worklist: Deque[str] = collections.deque([ key ])
+        seen: Set[str] = set()
 
         # Under the hood, "invalidating" something from this cache is really
         # deleting it, so we'll use "to_delete" for the set of things we're going
@@ -134,43 +354,78 @@ class Cache():
         # before deleting any of them, because I get paranoid about modifying a
         # data structure while I'm trying to traverse it.
         to_delete: Dict[str, CacheEntry] = {}
+        dependencies: List[str] = []
 
         # Keep going until we have nothing else to do.
         while worklist:
             # Pop off the first thing...
-            key = worklist.pop(0)
-
-            # ...and check if it's in the cache.
-            if key in self.cache:
-                # It is, good. We can append it to our set of things to delete...
-                rsrc, on_delete = self.cache[key]
-
-                self.logger.debug(f"CACHE: DEL {key}: will delete {rsrc}")
-
-                if key not in to_delete:
-                    # We haven't seen this key, so remember to delete it...
-                    to_delete[key] = (rsrc, on_delete)
-
-                    # ...and then toss all of its linked objects on our list to
-                    # consider.
-                    if key in self.links:
-                        for owned in sorted(self.links[key]):
-                            self.logger.debug(f"CACHE: DEL {key}: will check owned {owned}")
-                            worklist.append(owned)
+            key = worklist.popleft()
+
+            # ...and skip it if we've already been here. This is important to not
+            # get stuck if we somehow get a circular link list.
+            if key in seen:
+                continue
+
+            seen.add(key)
+
+            # Is it in the cache?
+            entry = self.cache.get(key, None)
+
+            if entry is not None:
+                # It is, good. We can append it to our set of things to delete.
+                self.logger.debug(f"CACHE: DEL {key}: will delete {entry[0]}")
+                to_delete[key] = entry
+            elif key in self.links:
+                # It's not in the cache, but it does have links: this is a
+                # dependency key (see depend()). It has nothing to delete
+                # itself, but everything that depends on it needs to be
+                # considered. Its links get dropped too, since whatever gets
+                # rebuilt will register its dependencies again.
+                self.logger.debug(f"CACHE: DEL {key}: dependency")
+                dependencies.append(key)
+            else:
+                continue
+
+            # Toss all of its linked objects on our list to consider.
+            for owned in self.links.get(key, ()):
+                self.logger.debug(f"CACHE: DEL {key}: will check owned {owned}")
+                worklist.append(owned)
+
+        return to_delete, dependencies
+
+    def _delete(self, key: str, evicting: bool) -> int:
+        """
+        Delete the entry (or dependency) named by 'key' and everything linked to
+        it. Returns the number of entries deleted.
+        """
 
-                    # (If we have seen the key already, just ignore it and go to the next
-                    # key in the worklist. This is important to not get stuck if we somehow
-                    # get a circular link list.)
+        to_delete, dependencies = self._collect(key)
 
         # OK, we have a set of things to delete. Get to it.
         for key, rdh in to_delete.items():
             self.logger.debug(f"CACHE: DEL {key}: smiting!")
 
-            self.invalidated_objects += 1
             del(self.cache[key])
+            del(self.last_used[key])
 
-            if key in self.links:
-                del(self.links[key])
+            stats = self.stats_for(key)
+            stats.entries -= 1
+
+            if key in self.unmeasured:
+                self.unmeasured.discard(key)
+            else:
+                size = self.sizes.pop(key)
+                self._total_bytes -= size
+                stats.bytes -= size
+
+            if evicting:
+                self.evicted_objects += 1
+                stats.evictions += 1
+            else:
+                self.invalidated_objects += 1
+                stats.invalidations += 1
+
+            self._unlink(key)
 
             rsrc, on_delete = rdh
 
@@ -178,6 +433,99 @@ class Cache():
                 self.logger.debug(f"CACHE: DEL {key}: calling {self.fn_name(on_delete)}")
                 on_delete(rsrc)
 
+        for key in dependencies:
+            self._unlink(key)
+
+        return len(to_delete)
+
+    def invalidate(self, key: str) -> None:
+        """
+        Recursively invalidate the entry named by 'key' and everything to which it
+        is linked.
+        """
+
+        self.invalidate_calls += 1
+        self._delete(key, evicting=False)
+
+    def evict(self, key: str) -> int:
+        """
+        Evict the entry named by 'key', and everything to which it is linked,
+        to save space. Returns the number of entries evicted.
+        """
+
+        return self._delete(key, evicting=True)
+
+    def advance_generation(self) -> int:
+        """
+        Finish the current generation: evict anything too old, then anything over
+        budget, then start a new generation. Call this once per reconfigure,
+        after the Envoy config has been generated. Returns the number of entries
+        evicted.
+        """
+
+        if self.max_bytes:
+            self.measure()
+
+        evicted = 0
+        generations = self._effective_generations()
+
+        if self.max_age > 0:
+            cutoff = self.generation - self.max_age
+
+            for key in [ k for k, gen in generations.items() if gen <= cutoff ]:
+                # An earlier eviction could've cascaded to this one already.
+                if key in self.cache:
+                    evicted += self.evict(key)
+
+        if self._over_budget():
+            # Least recently used first. Python's sort is stable, so within a
+            # generation, older entries go first.
+            for key, _ in sorted(generations.items(), key=lambda kv: kv[1]):
+                if not self._over_budget():
+                    break
+
+                if key in self.cache:
+                    evicted += self.evict(key)
+
+        if evicted:
+            self.logger.debug(f"CACHE: generation {self.generation}: evicted {evicted} entries")
+
+        self.generation += 1
+
+        return evicted
+
+    def _effective_generations(self) -> Dict[str, int]:
+        """
+        Work out when each entry was last used, counting an entry as used
+        whenever anything it owns is used. Some entries are never fetched at
+        all -- they're only there to own other entries, so that invalidating
+        them does the right thing -- and they need to live exactly as long as
+        what they own.
+        """
+
+        generations = dict(self.last_used)
+        worklist: Deque[str] = collections.deque(generations.keys())
+
+        while worklist:
+            key = worklist.popleft()
+            gen = generations[key]
+
+            for owner in self.backlinks.get(key, ()):
+                if generations.get(owner, gen) < gen:
+                    generations[owner] = gen
+                    worklist.append(owner)
+
+        return generations
+
+    def _over_budget(self) -> bool:
+        if self.max_entries and (len(self.cache) > self.max_entries):
+            return True
+
+        if self.max_bytes and (self._total_bytes > self.max_bytes):
+            return True
+
+        return False
+
     def __getitem__(self, key: str) -> Optional[Cacheable]:
         """
         Fetches only the _resource_ for a given key from the cache. If the
@@ -192,10 +540,13 @@ class Cache():
         if item is not None:
             self.logger.debug(f"CACHE: fetch {key}")
             self.hits += 1
+            self.stats_for(key).hits += 1
+            self.last_used[key] = self.generation
             return item[0]
         else:
             self.logger.debug(f"CACHE: missing {key}")
             self.misses += 1
+            self.stats_for(key).misses += 1
             return None
 
     def dump(self) -> None:
@@ -224,6 +575,15 @@ class Cache():
         self.logger.info("CACHE: Hit ratio:      %s" % ratio)
         self.logger.info("CACHE: Invalidations:  %d calls" % self.invalidate_calls)
         self.logger.info("CACHE:                 %d objects" % self.invalidated_objects)
+        self.logger.info("CACHE: Evictions:      %d objects" % self.evicted_objects)
+        self.logger.info("CACHE: Entries:        %d (~%d bytes)" % (len(self.cache), self.total_bytes))
+
+        for prefix in sorted(self.prefix_stats.keys()):
+            stats = self.prefix_stats[prefix]
+
+            self.logger.info("CACHE:   %-8s %d entries, ~%d bytes, %d hits, %d misses, %d invalidated, %d evicted" %
+                             (prefix, stats.entries, stats.bytes, stats.hits, stats.misses,
+                              stats.invalidations, stats.evictions))
 
 
 class NullCache(Cache):
@@ -239,8 +599,14 @@ class NullCache(Cache):
     def __init__(self, logger: logging.Logger) -> None:
         self.logger = logger
         self.logger.debug("NullCache: INIT")
+
+        self.max_entries = 0
+        self.max_bytes = 0
+        self.max_age = 0
+        self.generation = 0
+
         self.reset_stats()
-        pass
+        self.reset()
 
     def add(self, rsrc: Cacheable, 
             on_delete: Optional[DeletionHandler]=None) -> None:
@@ -249,10 +615,23 @@ class NullCache(Cache):
     def link(self, owner: Cacheable, owned: Cacheable) -> None:
         pass
 
+    def depend(self, dependency: str, owned_key: str) -> None:
+        pass
+
     def invalidate(self, key: str) -> None:
         self.invalidate_calls += 1
         pass
 
+    def evict(self, key: str) -> int:
+        return 0
+
+    def advance_generation(self) -> int:
+        self.generation += 1
+        return 0
+
+    def measure(self) -> None:
+        pass
+
     def __getitem__(self, key: str) -> Any:
         self.misses += 1
         return None
@@ -0,0 +1,120 @@
+# Copyright 2021 Datawire. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License
+
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import logging
+import pickle
+
+import orjson
+
+from .cache import Cache
+from .config import Config
+from .envoy import EnvoyConfig
+from .ir import IR
+from .ir.irclusternames import ClusterNameMap
+from .utils import SecretHandler, dump_json
+
+# A difference between two JSON-like structures: where it is (as a JSON
+# pointer), what the first one has there, and what the second one has there.
+# Missing is used for a side that has nothing there at all.
+Difference = Tuple[str, Any, Any]
+
+
+class _Missing:
+    def __repr__(self) -> str:
+        return "<missing>"
+
+Missing = _Missing()
+
+
+def _escape(key: Any) -> str:
+    return str(key).replace("~", "~0").replace("/", "~1")
+
+
+def structural_diff(a: Any, b: Any, path: str="") -> Iterator[Difference]:
+    """
+    Walk two JSON-like structures together, yielding a Difference for every
+    place they don't match. Dicts are compared key by key and lists element by
+    element, so a single changed value shows up as one Difference, no matter
+    how big the structures around it are.
+    """
+
+    if isinstance(a, dict) and isinstance(b, dict):
+        for key in sorted(set(a.keys()) | set(b.keys()), key=str):
+            yield from structural_diff(a.get(key, Missing), b.get(key, Missing), f"{path}/{_escape(key)}")
+    elif isinstance(a, list) and isinstance(b, list):
+        for i in range(max(len(a), len(b))):
+            yield from structural_diff(a[i] if i < len(a) else Missing,
+                                       b[i] if i < len(b) else Missing,
+                                       f"{path}/{i}")
+    elif (type(a) != type(b)) or (a != b):
+        yield (path or "/", a, b)
+
+
+def format_diff(what: str, differences: List[Difference]) -> str:
+    output = f"\n-------- {what}: {len(differences)} difference{'' if len(differences) == 1 else 's'}\n"
+
+    for path, a, b in differences:
+        output += f"{path}:\n"
+        output += f"  - incremental:    {a if a is Missing else dump_json(a)}\n"
+        output += f"  + nonincremental: {b if b is Missing else dump_json(b)}\n"
+
+    return output
+
+
+def check_config(aconf_pickle: bytes, ir_json: str, econf_json: str, envoy_api_version: str,
+                 secret_handler: SecretHandler,
+                 cluster_name_overrides: Optional[Dict[str, str]]=None) -> Tuple[bool, str]:
+    """
+    Rebuild the IR and Envoy config from a pickled Config, without a cache, and
+    compare them with the IR and Envoy config (serialized as JSON) that were
+    built incrementally from it. This is a module-level function so that it can
+    run in a worker process: nothing here touches diagd's own state.
+
+    :return: whether everything matched, and a description of any differences
+    """
+
+    logger = logging.getLogger("ambassador")
+
+    aconf: Config = pickle.loads(aconf_pickle)
+
+    # Use a new empty cache: it saves having to strip cache keys out of anything.
+    cache = Cache(logger)
+
+    # Cluster names have to come out the same, too, so start with the same overrides
+    # (but don't save anything).
+    cluster_names = ClusterNameMap(logger)
+    cluster_names.overrides = dict(cluster_name_overrides or {})
+
+    ir = IR(aconf, secret_handler=secret_handler, cache=cache, cluster_names=cluster_names)
+    econf = EnvoyConfig.generate(ir, envoy_api_version, cache=cache)
+
+    # Round-trip our own dicts through JSON so that both sides look the same (tuples
+    # vs lists, and so on).
+    result = True
+    errors = ""
+
+    for what, incremental, nonincremental in [
+        ( "IR", ir_json, dump_json(ir.as_dict()) ),
+        ( "econf", econf_json, dump_json(econf.as_dict()) ),
+    ]:
+        differences = list(structural_diff(orjson.loads(incremental), orjson.loads(nonincremental)))
+
+        if differences:
+            result = False
+            logger.error(f"CACHE: {what} MISMATCH")
+            errors += format_diff(what, differences)
+
+    return result, errors
@@ -17,8 +17,6 @@ from typing import Any, Callable, ClassVar, Dict, Iterable, List, Optional, Tupl
 from typing import cast as typecast
 
 import collections
-import importlib
-import json
 import logging
 import os
 
@@ -28,11 +26,12 @@ from multi import multi
 from pkg_resources import Requirement, resource_filename
 from google.protobuf import json_format
 
-from ..utils import RichStatus, dump_json, parse_bool
+from ..utils import Lazy, RichStatus, dump_json, parse_bool
 
 from ..resource import Resource
 from .acresource import ACResource
 from .acmapping import ACMapping
+from .validators import ValidatorRegistry
 
 
 #############################################################################
@@ -109,6 +108,10 @@ class Config:
         'kubernetesserviceresolver'
     }
 
+    # Compiled validators and recent validation results, shared by every Config
+    # in this process.
+    validator_registry: ClassVar[ValidatorRegistry] = ValidatorRegistry()
+
     # INSTANCE VARIABLES
     ambassador_nodename: str = "ambassador"     # overridden in Config.reset
 
@@ -163,7 +166,7 @@ class Config:
 
         self.schema_dir_path = schema_dir_path
 
-        self.logger.debug("SCHEMA DIR    %s" % os.path.abspath(self.schema_dir_path))
+        self.logger.debug("SCHEMA DIR    %s", os.path.abspath(self.schema_dir_path))
         self.k8s_status_updates: Dict[str, Tuple[str, str, Optional[Dict[str, Any]]]] = {}  # Tuple is (name, namespace, status_json)
         self.pod_labels: Dict[str, str] = {}
         self._reset()
@@ -184,7 +187,7 @@ class Config:
         self.breakers = {}
         self.outliers = {}
 
-        self.counters = collections.defaultdict(lambda: 0)
+        self.counters = collections.defaultdict(int)
 
         self.sources = {}
 
@@ -205,6 +208,14 @@ class Config:
         self.ambassador_nodename = "%s-%s" % (os.environ.get('AMBASSADOR_ID', 'ambassador'),
                                               Config.ambassador_namespace)
 
+    def __getstate__(self) -> Dict[str, Any]:
+        # The validators are cached closures, so they can't be pickled -- but they're
+        # only a cache, so just leave them out.
+        state = self.__dict__.copy()
+        state['validators'] = {}
+
+        return state
+
     def __str__(self) -> str:
         s = [ "<Config:" ]
 
@@ -218,7 +229,14 @@ class Config:
 
         return "\n".join(s)
 
-    def as_dict(self) -> Dict[str, Any]:
+    def as_dict(self, serializations: bool=True) -> Dict[str, Any]:
+        """
+        Return a dictionary representation of this Config.
+
+        :param serializations: if False, leave out the original input serializations
+                               of our sources (which can be expensive to generate)
+        """
+
         od: Dict[str, Any] = {
             '_errors': self.errors,
             '_notices': self.notices,
@@ -232,6 +250,12 @@ class Config:
         for k, v in self.sources.items():
             sd = dict(v)    # Shallow copy
 
+            if serializations:
+                if v.serialization:
+                    sd['serialization'] = v.serialization
+            else:
+                sd.pop('serialization', None)
+
             if '_errors' in v:
                 sd['_errors'] = [ x.as_dict() for x in v._errors ]
 
@@ -245,8 +269,8 @@ class Config:
 
         return od
 
-    def as_json(self):
-        return dump_json(self.as_dict(), pretty=True)
+    def as_json(self, serializations: bool=True):
+        return dump_json(self.as_dict(serializations=serializations), pretty=True)
 
     # Often good_ambassador_id will be passed an ACResource, but sometimes
     # just a plain old dict.
@@ -268,7 +292,7 @@ class Config:
         # other things, too.
 
         if allowed_ids == [ "_automatic_" ]:
-            self.logger.debug(f"ambassador_id {allowed_ids} always accepted")
+            self.logger.debug("ambassador_id %s always accepted", allowed_ids)
             return True
 
         if allowed_ids:
@@ -284,7 +308,7 @@ class Config:
                 rkey = resource.get('rkey', '-anonymous-yaml-')
                 name = resource.get('name', '-no-name-')
 
-                self.logger.debug(f"{rkey}: {resource_kind} {name} has IDs {allowed_ids}, no match with {Config.ambassador_id}")
+                self.logger.debug("%s: %s %s has IDs %s, no match with %s", rkey, resource_kind, name, allowed_ids, Config.ambassador_id)
                 return False
 
     def incr_count(self, key: str) -> None:
@@ -305,19 +329,19 @@ class Config:
         the set of ACResources to be sorted in some way that makes sense.
         """
 
-        self.logger.debug(f"Loading config; legacy mode is {'enabled' if Config.legacy_mode else 'disabled'}")
+        self.logger.debug("Loading config; legacy mode is %s", 'enabled' if Config.legacy_mode else 'disabled')
 
         rcount = 0
 
         for resource in resources:
-            self.logger.debug(f"Trying to parse resource: {resource}")
+            self.logger.debug("Trying to parse resource: %s", resource)
 
             rcount += 1
 
             if not self.good_ambassador_id(resource):
                 continue
 
-            self.logger.debug("LOAD_ALL: %s @ %s" % (resource, resource.location))
+            self.logger.debug("LOAD_ALL: %s @ %s", resource, resource.location)
 
             rc = self.process(resource)
 
@@ -325,7 +349,7 @@ class Config:
                 # Object error. Not good but we'll allow the system to start.
                 self.post_error(rc, resource=resource)
 
-        self.logger.debug("LOAD_ALL: processed %d resource%s" % (rcount, "" if (rcount == 1) else "s"))
+        self.logger.debug("LOAD_ALL: processed %d resource%s", rcount, "" if (rcount == 1) else "s")
 
         if self.fatal_errors:
             # Kaboom.
@@ -550,7 +574,16 @@ class Config:
             validator = self.get_validator(apiVersion, resource.kind)
 
             if validator:
-                rc = validator(resource)
+                # We've seen this exact resource before, we already know the answer.
+                key = Config.validator_registry.result_key(self.schema_dir_path, apiVersion,
+                                                           resource.kind, resource.as_dict())
+                cached_rc = Config.validator_registry.check_result(key)
+
+                if cached_rc is not None:
+                    rc = cached_rc
+                else:
+                    rc = validator(resource)
+                    Config.validator_registry.store_result(key, rc)
             else:
                 # No validator, so, uh, call it good.
                 rc = RichStatus.OK(msg=f"no validator for {apiVersion} {resource.kind} {name} so calling it good")
@@ -562,7 +595,7 @@ class Config:
                     # We did not. Post this into fast_validation_disagreements
                     fvd = self.fast_validation_disagreements.setdefault(resource.rkey, [])
                     fvd.append(watt_errors)
-                    self.logger.debug(f"validation disagreement: good {resource.kind} {name} has watt errors {watt_errors}")
+                    self.logger.debug("validation disagreement: good %s %s has watt errors %s", resource.kind, name, watt_errors)
 
                     # Note that we override entrypoint.go here by returning the successful
                     # result from our validator. That's intentional for now.
@@ -573,7 +606,7 @@ class Config:
                     rc = RichStatus.fromError(watt_errors)
 
         # One way or the other, we're done here. Finally.
-        self.logger.debug(f"validation {rc}")
+        self.logger.debug("validation %s", rc)
         return rc
 
     def get_validator(self, apiVersion: str, kind: str) -> Validator:
@@ -598,29 +631,18 @@ class Config:
         return validator
 
     def cannot_validate(self, apiVersion: str, kind: str) -> RichStatus:
-        self.logger.debug(f"Cannot validate getambassador.io/{apiVersion} {kind}")
+        self.logger.debug("Cannot validate getambassador.io/%s %s", apiVersion, kind)
 
         return RichStatus.OK(msg="Not validating getambassador.io/{apiVersion} {kind}")
 
     def get_proto_validator(self, apiVersion, kind) -> Optional[Validator]:
-        # See if we can import a protoclass...
-        proto_modname = f"ambassador.proto.{apiVersion}.{kind}_pb2"
-        proto_classname = f"{kind}Spec"
-        m = None
-
-        try:
-            m = importlib.import_module(proto_modname)
-        except ModuleNotFoundError:
-            self.logger.debug(f"no proto in {proto_modname}")
-            return None
-
-        protoclass = getattr(m, proto_classname, None)
+        # See if we have a protoclass...
+        protoclass = Config.validator_registry.proto_class(apiVersion, kind)
 
         if not protoclass:
-            self.logger.debug(f"no class {proto_classname} in {proto_modname}")
             return None
 
-        self.logger.debug(f"using validate_with_proto for getambassador.io/{apiVersion} {kind}")
+        self.logger.debug("using validate_with_proto for getambassador.io/%s %s", apiVersion, kind)
 
         # Ew. Early binding for Python lambdas is kinda weird.
         return typecast(Validator,
@@ -633,8 +655,7 @@ class Config:
         # the metadata has been folded in, and our *Spec protos (HostSpec, etc) don't include
         # the metadata (by design).
         #
-        # So. We make a copy, strip the metadata fields, serialize, and _then_ see if  we can
-        # parse it. Yuck.
+        # So. We make a copy, strip the metadata fields, and _then_ see if we can parse it.
 
         rdict = resource.as_dict()
         rdict.pop('apiVersion', None)
@@ -645,10 +666,8 @@ class Config:
         metadata_labels = rdict.pop('metadata_labels', None)
         generation = rdict.pop('generation', None)
 
-        serialized = dump_json(rdict)
-
         try:
-            json_format.Parse(serialized, protoclass())
+            json_format.ParseDict(rdict, protoclass())
         except json_format.ParseError as e:
             return RichStatus.fromError(str(e))
 
@@ -656,35 +675,24 @@ class Config:
 
     def get_jsonschema_validator(self, apiVersion, kind) -> Optional[Validator]:
         # Do we have a JSONSchema on disk for this?
-        schema_path = os.path.join(self.schema_dir_path, apiVersion, f"{kind}.schema")
+        schema_validator = Config.validator_registry.schema_validator(self.schema_dir_path, apiVersion, kind)
 
-        try:
-            schema = json.load(open(schema_path, "r"))
+        if not schema_validator:
+            return None
 
-            # Note that we'll never get here if the schema doesn't parse.
-            if schema:
-                self.logger.debug(f"using validate_with_jsonschema for getambassador.io/{apiVersion} {kind}")
+        self.logger.debug("using validate_with_jsonschema for getambassador.io/%s %s", apiVersion, kind)
 
-                # Ew. Early binding for Python lambdas is kinda weird.
-                return typecast(Validator,
-                                lambda resource, schema=schema: self.validate_with_jsonschema(resource, schema))
-        except OSError:
-            self.logger.debug(f"no schema at {schema_path}, not validating")
-            return None
-        except json.decoder.JSONDecodeError as e:
-            self.logger.warning(f"corrupt schema at {schema_path}, skipping ({e})")
-            return None
+        # Ew. Early binding for Python lambdas is kinda weird.
+        return typecast(Validator,
+                        lambda resource, schema_validator=schema_validator: self.validate_with_jsonschema(resource, schema_validator))
 
-        # This can't actually happen -- the only way to get here is to have an uncaught
-        # exception. But it shuts up mypy so WTF.
-        return None
+    def validate_with_jsonschema(self, resource: ACResource, schema_validator: Any) -> RichStatus:
+        # This is jsonschema.validate, minus compiling the schema every time.
+        error = jsonschema.exceptions.best_match(schema_validator.iter_errors(resource.as_dict()))
 
-    def validate_with_jsonschema(self, resource: ACResource, schema: dict) -> RichStatus:
-        try:
-            jsonschema.validate(resource.as_dict(), schema)
-        except jsonschema.exceptions.ValidationError as e:
+        if error is not None:
             # Nope. Bzzzzt.
-            return RichStatus.fromError(f"not a valid {resource.kind}: {e}")
+            return RichStatus.fromError(f"not a valid {resource.kind}: {error}")
 
         # All good. Return an OK.
         return RichStatus.OK(msg=f"good {resource.kind}")
@@ -717,8 +725,8 @@ class Config:
                 resource.name = f'{resource.name}.{resource.namespace}'
 
         if allow_log:
-            self.logger.debug("%s: saving %s %s" %
-                              (resource, resource.kind, resource.name))
+            self.logger.debug("%s: saving %s %s",
+                              resource, resource.kind, resource.name)
 
         storage[resource.name] = resource
 
@@ -788,7 +796,7 @@ class Config:
         the rkey, not the name.
         """
 
-        self.logger.debug(f"Handling secret resource {resource.as_dict()}")
+        self.logger.debug("Handling secret resource %s", Lazy(resource.as_dict))
 
         storage = self.config.setdefault('secrets', {})
         key = resource.rkey
@@ -825,8 +833,8 @@ class Config:
                             (resource, resource.kind, key, storage[key].location),
                             resource=resource)
 
-        self.logger.debug("%s: saving %s %s" %
-                          (resource, resource.kind, key))
+        self.logger.debug("%s: saving %s %s",
+                          resource, resource.kind, key)
 
         storage[key] = resource
 
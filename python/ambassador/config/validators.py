@@ -0,0 +1,172 @@
+# Copyright 2021 Datawire. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License
+
+from typing import Any, Dict, Optional, Tuple
+
+import collections
+import hashlib
+import importlib
+import json
+import logging
+import os
+
+import jsonschema
+import orjson
+
+from ..utils import RichStatus
+
+# (schema_dir_path, apiVersion, kind, generation, content hash)
+ResultKey = Tuple[str, str, str, int, str]
+
+
+class ValidatorRegistry:
+    """
+    A process-wide registry of compiled validators, shared by every Config.
+
+    A new Config gets built for every reconfigure, so anything a Config caches
+    for itself gets thrown away almost immediately. The registry remembers, for
+    the life of the process:
+
+    - the proto class for each apiVersion and kind (or the fact that there
+      isn't one), so we import each module once;
+    - the compiled jsonschema validator for each schema file (or the fact that
+      there isn't one), so we read and parse each schema once; and
+    - the results of recent validations, keyed by the resource's generation and
+      a hash of its contents, so an unchanged resource isn't validated again.
+    """
+
+    def __init__(self, max_results: int=4096) -> None:
+        self.logger = logging.getLogger("ambassador.config")
+        self.max_results = max_results
+
+        self.proto_classes: Dict[Tuple[str, str], Optional[Any]] = {}
+        self.schema_validators: Dict[Tuple[str, str, str], Optional[Any]] = {}
+        self.results: collections.OrderedDict[ResultKey, RichStatus] = collections.OrderedDict()
+
+        self.result_hits = 0
+        self.result_misses = 0
+
+    def proto_class(self, apiVersion: str, kind: str) -> Optional[Any]:
+        """
+        Return the proto class used to validate this apiVersion and kind, or None
+        if there isn't one.
+        """
+
+        key = (apiVersion, kind)
+
+        if key not in self.proto_classes:
+            self.proto_classes[key] = self._load_proto_class(apiVersion, kind)
+
+        return self.proto_classes[key]
+
+    def _load_proto_class(self, apiVersion: str, kind: str) -> Optional[Any]:
+        proto_modname = f"ambassador.proto.{apiVersion}.{kind}_pb2"
+        proto_classname = f"{kind}Spec"
+
+        try:
+            m = importlib.import_module(proto_modname)
+        except ModuleNotFoundError:
+            self.logger.debug(f"no proto in {proto_modname}")
+            return None
+
+        protoclass = getattr(m, proto_classname, None)
+
+        if not protoclass:
+            self.logger.debug(f"no class {proto_classname} in {proto_modname}")
+            return None
+
+        return protoclass
+
+    def schema_validator(self, schema_dir_path: str, apiVersion: str, kind: str) -> Optional[Any]:
+        """
+        Return a compiled jsonschema validator for this apiVersion and kind, or
+        None if there's no usable schema for it in schema_dir_path.
+        """
+
+        key = (schema_dir_path, apiVersion, kind)
+
+        if key not in self.schema_validators:
+            self.schema_validators[key] = self._load_schema_validator(schema_dir_path, apiVersion, kind)
+
+        return self.schema_validators[key]
+
+    def _load_schema_validator(self, schema_dir_path: str, apiVersion: str, kind: str) -> Optional[Any]:
+        schema_path = os.path.join(schema_dir_path, apiVersion, f"{kind}.schema")
+
+        try:
+            with open(schema_path, "r") as schema_file:
+                schema = json.load(schema_file)
+        except OSError:
+            self.logger.debug(f"no schema at {schema_path}, not validating")
+            return None
+        except json.decoder.JSONDecodeError as e:
+            self.logger.warning(f"corrupt schema at {schema_path}, skipping ({e})")
+            return None
+
+        if not schema:
+            return None
+
+        # This is what jsonschema.validate does on every single call.
+        cls = jsonschema.validators.validator_for(schema)
+
+        try:
+            cls.check_schema(schema)
+        except jsonschema.exceptions.SchemaError as e:
+            self.logger.warning(f"invalid schema at {schema_path}, skipping ({e})")
+            return None
+
+        return cls(schema)
+
+    @staticmethod
+    def result_key(schema_dir_path: str, apiVersion: str, kind: str, rdict: Dict[str, Any]) -> ResultKey:
+        """
+        Compute the key under which the validation result for rdict is remembered.
+        """
+
+        content = orjson.dumps(rdict, option=orjson.OPT_NON_STR_KEYS|orjson.OPT_SORT_KEYS)
+        generation = rdict.get('generation') or 0
+
+        return (schema_dir_path, apiVersion, kind, generation, hashlib.sha256(content).hexdigest())
+
+    def check_result(self, key: ResultKey) -> Optional[RichStatus]:
+        """
+        Return a copy of the remembered validation result for key, or None.
+        """
+
+        rc = self.results.get(key, None)
+
+        if rc is None:
+            self.result_misses += 1
+            return None
+
+        self.result_hits += 1
+        self.results.move_to_end(key)
+
+        # Callers are free to mess with what we give them, so hand out a copy.
+        return RichStatus(rc.ok, **rc.info)
+
+    def store_result(self, key: ResultKey, rc: RichStatus) -> None:
+        self.results[key] = RichStatus(rc.ok, **rc.info)
+        self.results.move_to_end(key)
+
+        while len(self.results) > self.max_results:
+            self.results.popitem(last=False)
+
+    def reset(self) -> None:
+        self.proto_classes.clear()
+        self.schema_validators.clear()
+        self.results.clear()
+
+        self.result_hits = 0
+        self.result_misses = 0
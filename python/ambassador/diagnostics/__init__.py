@@ -1,2 +1,4 @@
-from .diagnostics import Diagnostics
-from .envoy_stats import EnvoyStatsMgr, EnvoyStats
+from .diagnostics import Diagnostics, DiagConfig
+from .diag_patches import DiagPatches
+from .envoy_stats import EnvoyStatsMgr, EnvoyStats, EnvoyCounters
+from .diag_snapshot import DiagSnapshot
@@ -0,0 +1,197 @@
+# Copyright 2021 Datawire. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License
+
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import collections
+import concurrent.futures
+import threading
+import time
+
+import jsonpatch
+
+from expiringdict import ExpiringDict
+
+
+class DiagVersion:
+    def __init__(self, version: int, key: Hashable, content: Any) -> None:
+        self.version = version
+        self.key = key
+        self.content = content
+        self.created = time.monotonic()
+
+
+class DiagPatches:
+    """
+    Serve the diagnostics overview to polling clients (like the Admin UI) as
+    JSON patches against whatever each client saw last.
+
+    Rather than keeping a full copy of the overview per client and diffing it
+    on every poll, we keep a bounded history of numbered versions of the
+    overview, shared by all clients. A new version is only built when its key
+    changes (e.g. a new Diagnostics generation or new Envoy stats) or the latest
+    one is older than max_age seconds, and the patch between any two versions
+    is only computed once, however many clients need it. All we remember per
+    client is the number of the last version it got.
+
+    A client that we've never seen, or whose last version has fallen out of the
+    history, gets a patch against an empty object -- that is, everything.
+
+    Building a version can be slow (the overview can make network requests),
+    so it happens outside the lock. Clients asking for a key that's already
+    being built wait for that build instead of starting another one.
+    """
+
+    def __init__(self, max_versions: int=10, max_clients: int=10, client_ttl: float=60,
+                 max_age: float=1.0) -> None:
+        self.max_versions = max(1, max_versions)
+        self.max_age = max_age
+
+        self.lock = threading.Lock()
+        self.versions: 'collections.OrderedDict[int, DiagVersion]' = collections.OrderedDict()
+        self.patches: 'collections.OrderedDict[Tuple[int, int], str]' = collections.OrderedDict()
+        self.clients = ExpiringDict(max_len=max_clients, max_age_seconds=client_ttl)
+
+        # key -> the future for a version of key that's being built right now
+        self.building: Dict[Hashable, 'concurrent.futures.Future[DiagVersion]'] = {}
+
+        self.version = 0
+
+        # Statistics.
+        self.built = 0
+        self.patches_computed = 0
+        self.patches_shared = 0
+
+    def latest(self) -> Optional[DiagVersion]:
+        if not self.versions:
+            return None
+
+        return next(reversed(self.versions.values()))
+
+    def _fresh(self, key: Hashable) -> Optional[DiagVersion]:
+        """
+        Return the latest version if it's for key and not too old to reuse, else
+        None. You must hold the lock.
+        """
+
+        latest = self.latest()
+
+        if latest and (latest.key == key) and ((time.monotonic() - latest.created) < self.max_age):
+            return latest
+
+        return None
+
+    def _add(self, key: Hashable, content: Any) -> DiagVersion:
+        """
+        Add a new version for key to the history. You must hold the lock.
+        """
+
+        self.version += 1
+        self.built += 1
+
+        version = DiagVersion(self.version, key, content)
+        self.versions[version.version] = version
+
+        while len(self.versions) > self.max_versions:
+            oldest, _ = self.versions.popitem(last=False)
+
+            for pkey in [ pkey for pkey in self.patches.keys() if oldest in pkey ]:
+                del self.patches[pkey]
+
+        return version
+
+    def _current(self, key: Hashable, build: Callable[[], Any]) -> DiagVersion:
+        """
+        Return the current version for key, calling build to make a new one if
+        need be. You must NOT hold the lock.
+        """
+
+        with self.lock:
+            version = self._fresh(key)
+
+            if version:
+                return version
+
+            future = self.building.get(key, None)
+
+            if future:
+                # Someone else is already building this one, so just wait for them.
+                building = False
+            else:
+                future = concurrent.futures.Future()
+                self.building[key] = future
+                building = True
+
+        if not building:
+            return future.result()
+
+        try:
+            content = build()
+        except BaseException as e:
+            with self.lock:
+                del self.building[key]
+
+            future.set_exception(e)
+            raise
+
+        with self.lock:
+            version = self._add(key, content)
+            del self.building[key]
+
+        future.set_result(version)
+
+        return version
+
+    def patch(self, client: str, key: Hashable, build: Callable[[], Any]) -> str:
+        """
+        Return the JSON patch (as a string) that takes client from the last version
+        it saw to the current version for key.
+        """
+
+        version = self._current(key, build)
+
+        with self.lock:
+            previous = self.clients.get(client, 0)
+
+            if previous not in self.versions:
+                previous = 0
+
+            pkey = (previous, version.version)
+            patch = self.patches.get(pkey, None)
+
+            if patch is not None:
+                self.patches_shared += 1
+            else:
+                base = self.versions[previous].content if previous else {}
+                patch = jsonpatch.make_patch(base, version.content).to_string()
+                self.patches_computed += 1
+
+                # Another build could have pushed this version out of the history
+                # already, and then there's no point remembering patches to it.
+                if version.version in self.versions:
+                    self.patches[pkey] = patch
+
+            self.clients[client] = version.version
+
+            return patch
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'version': self.version,
+            'versions': len(self.versions),
+            'patches': len(self.patches),
+            'built': self.built,
+            'patches_computed': self.patches_computed,
+            'patches_shared': self.patches_shared,
+        }
@@ -0,0 +1,119 @@
+# Copyright 2021 Datawire. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License
+
+from typing import Callable, Dict, Optional
+
+import threading
+import time
+
+import orjson
+
+from .diagnostics import Diagnostics, DiagConfig
+
+# Builds the Diagnostics for a snapshot: (config, previous, generation) -> Diagnostics.
+DiagBuilder = Callable[[DiagConfig, Optional[Diagnostics], int], Diagnostics]
+
+
+class DiagSnapshot:
+    """
+    One configuration as the diagnostics service sees it: a DiagConfig copied
+    out of the IR and Envoy config from a single reconfigure, and the
+    Diagnostics for it once somebody asks.
+
+    diagd publishes a new DiagSnapshot after every reconfigure by swapping a
+    single reference, and the DiagConfig is copied at that point, so nothing
+    ever changes a snapshot's configuration after that, not even later
+    reconfigures that reuse the same cached IR objects. Request handlers just
+    grab the current snapshot and work with it, without any locking and
+    without caring whether a reconfigure happens meanwhile: they'll finish
+    with a consistent view of the configuration they started with.
+
+    Everything derived from the snapshot (the Diagnostics, and pre-serialized
+    JSON for parts of them) is built at most once, by whichever request needs
+    it first. Only requests for the same snapshot ever wait for each other;
+    a reconfigure never does.
+    """
+
+    __slots__ = ('generation', 'config', 'created',
+                 '_builder', '_previous', '_lock', '_diag', '_blobs')
+
+    def __init__(self, generation: int, config: DiagConfig,
+                 previous: Optional['DiagSnapshot']=None, builder: Optional[DiagBuilder]=None) -> None:
+        self.generation = generation
+        self.config = config
+        self.created = time.time()
+
+        self._builder: DiagBuilder = builder or (lambda config, previous, generation:
+                                                 Diagnostics(config, previous=previous, generation=generation))
+
+        # The newest Diagnostics that anyone built for an earlier snapshot, so that
+        # ours can reuse whatever hasn't changed. We only hang onto the Diagnostics,
+        # not the snapshot, so that a chain of snapshots nobody looked at doesn't
+        # keep every configuration alive.
+        self._previous = previous.latest_diagnostics() if previous else None
+
+        self._lock = threading.Lock()
+        self._diag: Optional[Diagnostics] = None
+        self._blobs: Dict[str, bytes] = {}
+
+    def latest_diagnostics(self) -> Optional[Diagnostics]:
+        """
+        The Diagnostics for this snapshot if they've been built, otherwise the
+        newest ones from before it (if any).
+        """
+        return self._diag or self._previous
+
+    def diagnostics(self) -> Diagnostics:
+        """
+        The Diagnostics for this snapshot, built the first time anyone asks.
+        """
+
+        # Reading a reference is atomic, so once they're built, there's no locking.
+        diag = self._diag
+
+        if diag is not None:
+            return diag
+
+        with self._lock:
+            # Did someone else build them while we waited for the lock?
+            if self._diag is None:
+                self._diag = self._builder(self.config, self._previous, self.generation)
+
+                # That's all we needed the previous generation for.
+                self._previous = None
+
+            return self._diag
+
+    def json(self, key: str) -> Optional[bytes]:
+        """
+        One element of the Diagnostics' as_dict(), serialized as JSON, or None
+        if there's no such element. Since the snapshot never changes, this is
+        serialized only once, however many times it's served.
+        """
+
+        blob = self._blobs.get(key)
+
+        if blob is None:
+            ddict = self.diagnostics().as_dict()
+
+            if key not in ddict:
+                return None
+
+            blob = orjson.dumps(ddict[key], option=orjson.OPT_NON_STR_KEYS)
+
+            # Two requests could race to get here, but they'll produce the same
+            # thing, so it doesn't matter which one wins.
+            self._blobs[key] = blob
+
+        return blob
@@ -12,23 +12,145 @@
 # See the License for the specific language governing permissions and
 # limitations under the License
 
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple, Union
 from typing import cast as typecast
 
 import json
 import logging
 import re
 
+from ..resource import Resource
 from ..ir import IR
 from ..ir.irbasemappinggroup import IRBaseMappingGroup
+from ..ir.ircluster import IRCluster
+from ..ir.irfilter import IRFilter
 from ..ir.irhttpmappinggroup import IRHTTPMappingGroup
+from ..ir.irserviceresolver import IRServiceResolver
+from ..ir.irtlscontext import IRTLSContext
+from ..ir.irtracing import IRTracing
 from ..envoy import EnvoyConfig
 from .envoy_stats import EnvoyStats
-from ..utils import dump_json
+from ..utils import dump_json, dump_yaml, parse_json
 
 
 class DiagSource (dict):
-    pass
+    """
+    A DiagSource is what Diagnostics needs to know about one input resource
+    (from Config.sources): its rkey, location, and kind, and either its
+    serialization or the original input object to generate that from.
+    """
+
+    def __str__(self) -> str:
+        return "<%s %s>" % (self['kind'], self['rkey'])
+
+
+class DiagConfig:
+    """
+    Everything that Diagnostics needs from an IR and an EnvoyConfig, copied
+    out of them so that it never changes afterward.
+
+    The IR shares cached objects with later reconfigures, which reuse and
+    update them, so Diagnostics can't just hang onto the IR: build a
+    DiagConfig at the same point the IR and EnvoyConfig are built (diagd does
+    it when it publishes them), and give that to Diagnostics instead.
+
+    The IR resources in here are copies, of the same classes, that nothing
+    else ever sees, so calling their as_dict() later gives the same thing it
+    would have given when the DiagConfig was built.
+    """
+
+    edge_stack_allowed: bool
+
+    immutable_types = frozenset([ str, int, float, bool, type(None) ])
+
+    def __init__(self, ir: IR, econf: EnvoyConfig) -> None:
+        self.edge_stack_allowed = ir.edge_stack_allowed
+
+        # Don't generate any serializations here: they're expensive, and Diagnostics
+        # will generate them if anyone actually wants them. (The original input
+        # objects never change.)
+        self.sources: Dict[str, DiagSource] = {
+            key: DiagSource(rkey=rsrc.rkey, location=rsrc.get('location', key), kind=rsrc.kind,
+                            serialization=rsrc.get('serialization', None),
+                            serialization_source=rsrc.serialization_source())
+            for key, rsrc in ir.aconf.sources.items()
+        }
+
+        self.errors = { k: list(v) for k, v in ir.aconf.errors.items() }
+        self.notices = { k: list(v) for k, v in ir.aconf.notices.items() }
+        self.fast_validation_disagreements = { k: list(v) for k, v in ir.aconf.fast_validation_disagreements.items() }
+
+        # id() of everything copied so far -> its copy, so that things shared in
+        # the IR are shared (and copied only once) here too.
+        self._memo: Dict[int, Any] = {}
+
+        self.groups: Dict[str, IRBaseMappingGroup] = self.detach(ir.groups)
+        self._ordered_groups: List[IRBaseMappingGroup] = self.detach(list(ir.ordered_groups()))
+        self.clusters: Dict[str, IRCluster] = self.detach(ir.clusters)
+        self.filters: List[IRFilter] = self.detach(ir.filters)
+        self.tracing: Optional[IRTracing] = self.detach(ir.tracing)
+        self.resolvers: Dict[str, IRServiceResolver] = self.detach(ir.resolvers)
+        self.tls_contexts: List[IRTLSContext] = self.detach(list(ir.tls_contexts.values()))
+
+        # That's all we need this for.
+        del self._memo
+
+        # Leave out the keys that start with '_', like Diagnostics always has.
+        self.elements: Dict[str, Dict[str, Dict[str, Any]]] = parse_json(dump_json({
+            kind: { fqkey: { k: v for k, v in element.items() if k[0] != '_' }
+                    for fqkey, element in elements.items() }
+            for kind, elements in econf.elements.items()
+        }))
+
+    def ordered_groups(self) -> List[IRBaseMappingGroup]:
+        return self._ordered_groups
+
+    def detach(self, value: Any) -> Any:
+        """
+        Copy value, recursively. Resources are copied as the same class, but
+        only their keys: not the IR or logger that an IRResource also holds.
+        """
+
+        value_type = type(value)
+
+        # Strings, numbers, and the like never change, and they're most of what's
+        # in there, so get them out of the way first.
+        immutable_types = DiagConfig.immutable_types
+
+        if value_type in immutable_types:
+            return value
+
+        memo_key = id(value)
+        copy = self._memo.get(memo_key)
+
+        if copy is not None:
+            return copy
+
+        if (value_type is dict) or isinstance(value, Resource):
+            copy = dict() if (value_type is dict) else dict.__new__(value_type)
+            self._memo[memo_key] = copy
+
+            for k, v in value.items():
+                if k == '_referenced_by':
+                    # Only the keys get used, and the Resources behind them lead
+                    # back into the rest of the IR (and older ones).
+                    copy[k] = { ref_key: True for ref_key in v }
+                else:
+                    copy[k] = v if type(v) in immutable_types else self.detach(v)
+        elif value_type is list:
+            copy = []
+            self._memo[memo_key] = copy
+            copy.extend([ self.detach(v) for v in value ])
+        elif isinstance(value, dict):
+            copy = { k: self.detach(v) for k, v in value.items() }
+            self._memo[memo_key] = copy
+        elif isinstance(value, (list, tuple, set, frozenset)):
+            copy = type(value)(self.detach(v) for v in value)
+            self._memo[memo_key] = copy
+        else:
+            copy = value
+
+        return copy
 
 
 class DiagCluster (dict):
@@ -325,7 +447,8 @@ class DiagResult:
 class Diagnostics:
     """
     Information needed by the Diagnostics UI. This has to be instantiated
-    from an IR and an EnvoyConfig (it doesn't matter which version).
+    from an IR and an EnvoyConfig (it doesn't matter which version), or from
+    a DiagConfig copied out of them.
 
     The flow here is:
 
@@ -334,10 +457,14 @@ class Diagnostics:
       the whole Ambassador setup, or
     - call the .lookup method to get a DiagResult that zeroes in on a particular
       chunk of the world (like a group, or a particular rkey, etc.)
+
+    Diagnostics are versioned by generation (every reconfigure publishes a
+    new DiagSnapshot, with a new generation). Pass the previous generation's Diagnostics as previous, and
+    the serializations of input resources that haven't changed since then are
+    reused rather than generated again.
     """
 
-    ir: IR
-    econf: EnvoyConfig
+    config: DiagConfig
     estats: Optional[EnvoyStats]
 
     source_map: Dict[str, Dict[str, bool]]
@@ -349,13 +476,31 @@ class Diagnostics:
         'IRRateLimit': 'RateLimitService'
     }
 
-    def __init__(self, ir: IR, econf: EnvoyConfig) -> None:
+    def __init__(self, ir: Union[IR, DiagConfig], econf: Optional[EnvoyConfig]=None,
+                 previous: Optional['Diagnostics']=None, generation: int=0) -> None:
         self.logger = logging.getLogger("ambassador.diagnostics")
         self.logger.debug("---- building diagnostics")
 
-        self.ir = ir
-        self.econf = econf
+        if isinstance(ir, DiagConfig):
+            self.config = ir
+        else:
+            self.config = DiagConfig(ir, typecast(EnvoyConfig, econf))
+
         self.estats = None
+        self.generation = generation
+
+        # as_dict() is the same every time, so it's only built once.
+        self._dict: Optional[dict] = None
+
+        # fqkey -> (original input object, serialization) for every input resource
+        # with a deferred serialization, so that the next generation can reuse the
+        # serializations of anything that hasn't changed. Note that we don't hang
+        # onto previous itself: that would keep every generation alive.
+        self._serializations: Dict[str, Tuple[Dict[str, Any], str]] = {}
+        previous_serializations = previous._serializations if previous else {}
+
+        # How many serializations we reused from the previous generation.
+        self.reused_serializations = 0
 
         # A fully-qualified key is e.g. "ambassador.yaml.1" -- source location plus
         # object index. An unqualified key is something like "ambassador.yaml" -- no
@@ -382,7 +527,7 @@ class Diagnostics:
         warn_auth = False
         warn_ratelimit = False
 
-        for filter in self.ir.filters:
+        for filter in self.config.filters:
             if filter.kind == 'IRAuth':
                 proto = filter.get('proto') or 'http'
 
@@ -400,8 +545,17 @@ class Diagnostics:
         if warn_ratelimit:
             things_to_warn.append('RateLimitServices')
 
+        # Copy in the toplevel error, notice, and fast_validation_disagreements sets.
+        # (The DiagConfig made its own copies, and nobody else uses them, so we can
+        # add to them.)
+        self.errors = self.config.errors
+        self.notices = self.config.notices
+        self.fast_validation_disagreements = self.config.fast_validation_disagreements
+
         if things_to_warn:
-            self.ir.aconf.post_notice(f'A future Ambassador version will change the GRPC protocol version for {" and ".join(things_to_warn)}. See the CHANGELOG for details.')
+            msg = f'A future Ambassador version will change the GRPC protocol version for {" and ".join(things_to_warn)}. See the CHANGELOG for details.'
+            self.notices.setdefault('-global-', []).append(msg)
+            self.logger.debug("-global-: NOTICE: %s", msg)
 
         # # Warn people about the default port change.
         # if self.ir.ambassador_module.service_port < 1024:
@@ -437,77 +591,89 @@ class Diagnostics:
         #
         #         self.ir.aconf.post_notice(f'{m1} {m2}')
 
-        # Copy in the toplevel error, notice, and fast_validation_disagreements sets.
-        self.errors = self.ir.aconf.errors
-        self.notices = self.ir.aconf.notices
-        self.fast_validation_disagreements = self.ir.aconf.fast_validation_disagreements
-
         # Next up, walk the list of Ambassador sources.
-        for key, rsrc in self.ir.aconf.sources.items():
+        for key, rsrc in self.config.sources.items():
             uqkey = key     # Unqualified key, e.g. ambassador.yaml
             fqkey = uqkey   # Fully-qualified key, e.g. ambassador.yaml.1
 
             key_index = None
 
-            if 'rkey' in rsrc:
-                uqkey, key_index = self.split_key(rsrc.rkey)
+            if rsrc['rkey']:
+                uqkey, key_index = self.split_key(rsrc['rkey'])
 
             if key_index is not None:
                 fqkey = "%s.%s" % (uqkey, key_index)
 
-            location, _ = self.split_key(rsrc.get('location', key))
+            location, _ = self.split_key(rsrc['location'])
 
             self.logger.debug("  %s (%s): UQ %s, FQ %s, LOC %s" % (key, rsrc, uqkey, fqkey, location))
 
-            self.remember_source(uqkey, fqkey, location, rsrc.rkey)
+            self.remember_source(uqkey, fqkey, location, rsrc['rkey'])
 
             ambassador_element: dict = self.ambassador_elements.setdefault(
                 fqkey,
                 {
                     'location': location,
-                    'kind': rsrc.kind
+                    'kind': rsrc['kind']
                 }
             )
 
             if uqkey and (uqkey != fqkey):
                 ambassador_element['parent'] = uqkey
 
-            serialization = rsrc.get('serialization', None)
+            # This is where the (lazy) serialization actually gets generated, unless
+            # the previous generation already did it for the same input.
+            source = rsrc['serialization_source']
+            serialization = rsrc['serialization']
+
+            if source is not None:
+                saved = previous_serializations.get(fqkey, None)
+
+                if saved and (saved[0] == source):
+                    serialization = saved[1]
+                    self.reused_serializations += 1
+                else:
+                    serialization = dump_yaml(source, default_flow_style=False)
+
+            if (source is not None) and serialization:
+                self._serializations[fqkey] = (source, serialization)
+
             if serialization:
                 if ambassador_element["kind"] == "Secret":
                     serialization = "kind: Secret\ndata: (elided by Ambassador)\n"
                 ambassador_element['serialization'] = serialization
 
         # Next up, the Envoy elements.
-        for kind, elements in self.econf.elements.items():
+        # (The DiagConfig already dropped the keys starting with '_'.)
+        for kind, elements in self.config.elements.items():
             for fqkey, envoy_element in elements.items():
                 # The key here should already be fully qualified.
                 uqkey, _ = self.split_key(fqkey)
 
                 element_dict = self.envoy_elements.setdefault(fqkey, {})
                 element_list = element_dict.setdefault(kind, [])
-                element_list.append({ k: v for k, v in envoy_element.items() if k[0] != '_' })
+                element_list.append(envoy_element)
 
         # Always generate the full group set so that we can look up groups.
-        self.groups = { 'grp-%s' % group.group_id: group for group in self.ir.groups.values()
+        self.groups = { 'grp-%s' % group.group_id: group for group in self.config.groups.values()
                         if group.location != "--diagnostics--" }
 
         # Always generate the full cluster set so that we can look up clusters.
-        self.clusters = { cluster.name: cluster for cluster in self.ir.clusters.values()
+        self.clusters = { cluster.name: cluster for cluster in self.config.clusters.values()
                           if cluster.location != "--diagnostics--" }
 
         # Build up our Ambassador services too (auth, ratelimit, tracing).
         self.ambassador_services = []
 
-        for filt in self.ir.filters:
+        for filt in self.config.filters:
             # self.logger.debug("FILTER %s" % filter.as_json())
 
             if filt.kind in Diagnostics.filter_map:
                 type_name = Diagnostics.filter_map[filt.kind]
                 self.add_ambassador_service(filt, type_name)
 
-        if self.ir.tracing:
-            self.add_ambassador_service(self.ir.tracing, 'TracingService (%s)' % self.ir.tracing.driver)
+        if self.config.tracing:
+            self.add_ambassador_service(self.config.tracing, 'TracingService (%s)' % self.config.tracing.driver)
 
         self.ambassador_resolvers = []
         used_resolvers: Dict[str, List[str]] = {}
@@ -518,7 +684,7 @@ class Diagnostics:
                 group_list = used_resolvers.setdefault(resolver_name, [])
                 group_list.append(group.rkey)
 
-        for name, resolver in sorted(self.ir.resolvers.items()):
+        for name, resolver in sorted(self.config.resolvers.items()):
             if name in used_resolvers:
                 self.add_ambassador_resolver(resolver, used_resolvers[name])
 
@@ -580,6 +746,14 @@ class Diagnostics:
         return key_base, key_index
 
     def as_dict(self) -> dict:
+        # Callers are allowed to pop things out of what we return, so hand back a
+        # shallow copy.
+        if self._dict is None:
+            self._dict = self._as_dict()
+
+        return dict(self._dict)
+
+    def _as_dict(self) -> dict:
         return {
             'source_map': self.source_map,
             'ambassador_services': self.ambassador_services,
@@ -591,7 +765,7 @@ class Diagnostics:
             'fast_validation_disagreements': self.fast_validation_disagreements,
             'groups': { key: self.flattened(value) for key, value in self.groups.items() },
             # 'clusters': { key: value.as_dict() for key, value in self.clusters.items() },
-            'tlscontexts': [ x.as_dict() for x in self.ir.tls_contexts.values() ]
+            'tlscontexts': [ x.as_dict() for x in self.config.tls_contexts ]
         }
 
     def flattened(self, group: IRBaseMappingGroup) -> dict:
@@ -676,7 +850,7 @@ class Diagnostics:
 
         result = DiagResult(self, estat, request)
 
-        for group in self.ir.ordered_groups():
+        for group in self.config.ordered_groups():
             # TCPMappings are currently handled elsewhere.
             if isinstance(group, IRHTTPMappingGroup):
                 result.include_httpgroup(group)
@@ -12,9 +12,13 @@
 # See the License for the specific language governing permissions and
 # limitations under the License
 
-from typing import Any, Callable, Dict, List, Optional, Union
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple, Union
 
+import array
+import dataclasses
+import io
 import logging
+import re
 import requests
 import threading
 import time
@@ -28,6 +32,256 @@ def percentage(x: float, y: float) -> int:
     else:
         return int(((x * 100) / y) + 0.5)
 
+
+def parse_envoy_stats(lines: Iterable[str]) -> Dict[str, Any]:
+    """
+    Parse Envoy's /stats output into a hierarchy of dicts. This is expensive
+    (Envoy has a _lot_ of stats), so only do it when someone really wants the
+    whole thing.
+    """
+
+    envoy_stats: Dict[str, Any] = {}    # Ew.
+
+    for line in lines:
+        line = line.rstrip("\n")
+
+        if not line:
+            continue
+
+        key, value = line.split(":", 1)
+        keypath = key.split('.')
+
+        node = envoy_stats
+
+        for key in keypath[:-1]:
+            if key not in node:
+                node[key] = {}
+
+            node = node[key]
+
+        value = value.strip()
+
+        # Skip histograms (and anything else that isn't a plain number).
+        try:
+            node[keypath[-1]] = int(value)
+        except:
+            continue
+
+    return envoy_stats
+
+
+class EnvoyCounters:
+    """
+    The handful of Envoy counters and gauges that we actually use, from a single
+    read of Envoy's /stats.
+
+    Envoy has a _lot_ of stats, and we only care about a few of them, so rather
+    than parsing everything we match each line against a single precompiled
+    regex and keep only the values that match. Those live in flat arrays: one
+    for the ingress request stats, and one for the clusters, with ClusterStats
+    values per cluster (the cluster's offset is in cluster_index).
+    """
+
+    RequestStats: Tuple[str, ...] = ( 'downstream_rq_total', 'downstream_rq_4xx', 'downstream_rq_5xx' )
+
+    ClusterStats: Tuple[str, ...] = (
+        'membership_healthy', 'membership_total',
+        'update_attempt', 'update_success',
+        'upstream_rq_completed', 'upstream_rq_4xx', 'upstream_rq_5xx',
+    )
+
+    RequestIndex = { name: idx for idx, name in enumerate(RequestStats) }
+    ClusterIndex = { name: idx for idx, name in enumerate(ClusterStats) }
+
+    # Group 1 is a request stat, or groups 2 and 3 are a cluster name and a
+    # cluster stat. Group 4 is the value either way. Histograms don't match.
+    # Cluster names can have dots in them, so the name is everything between
+    # "cluster." and the stat name.
+    Matcher = re.compile(r'(?:http\.ingress_http\.(%s)|cluster\.(.+)\.(%s)): (\d+)\s*$' %
+                         ('|'.join(RequestStats), '|'.join(ClusterStats)))
+
+    # Envoy also repeats some upstream stats in sub-scopes of a cluster (e.g.
+    # cluster.foo.internal.upstream_rq_5xx), which aren't clusters of their own.
+    SubScope = re.compile(r'\.(?:internal|external|canary|zone\.[^.]+\.[^.]+)$')
+
+    def __init__(self, timestamp: float) -> None:
+        self.timestamp = timestamp
+        self.requests = array.array('Q', bytes(8 * len(self.RequestStats)))
+        self.has_requests = False
+        self.clusters = array.array('Q')
+        self.cluster_index: Dict[str, int] = {}
+
+    @classmethod
+    def from_lines(cls, lines: Iterable[str], timestamp: Optional[float]=None) -> Tuple['EnvoyCounters', int]:
+        """
+        Build an EnvoyCounters from lines of Envoy's /stats output. Returns the
+        new EnvoyCounters and the number of lines read.
+        """
+
+        counters = cls(timestamp or time.time())
+        match = cls.Matcher.match
+        request_index = cls.RequestIndex
+        cluster_index = cls.ClusterIndex
+        sub_scope = cls.SubScope.search
+        count = 0
+
+        for line in lines:
+            count += 1
+            m = match(line)
+
+            if not m:
+                continue
+
+            req_stat, cluster_name, cluster_stat, value = m.groups()
+
+            if req_stat:
+                counters.requests[request_index[req_stat]] = int(value)
+                counters.has_requests = True
+            elif not sub_scope(cluster_name):
+                counters.clusters[counters.offset(cluster_name, create=True) + cluster_index[cluster_stat]] = int(value)
+
+        return counters, count
+
+    def offset(self, cluster_name: str, create: bool=False) -> int:
+        """
+        Return the offset of cluster_name's stats in self.clusters, or -1 if we
+        have no stats for it (unless create is set, in which case make room).
+        """
+
+        offset = self.cluster_index.get(cluster_name, -1)
+
+        if (offset < 0) and create:
+            offset = len(self.clusters)
+            self.cluster_index[cluster_name] = offset
+            self.clusters.extend(bytes(8 * len(self.ClusterStats)))
+
+        return offset
+
+    def get(self, stat: str, cluster: Optional[str]=None) -> Optional[int]:
+        """
+        Return the value of a request stat, or (if cluster is given) of a cluster
+        stat. Returns None if we don't have it.
+        """
+
+        if cluster is None:
+            idx = self.RequestIndex.get(stat, -1)
+            return self.requests[idx] if (idx >= 0) else None
+
+        offset = self.offset(cluster)
+        idx = self.ClusterIndex.get(stat, -1)
+
+        if (offset < 0) or (idx < 0):
+            return None
+
+        return self.clusters[offset + idx]
+
+    def delta(self, previous: 'EnvoyCounters', stat: str, cluster: Optional[str]=None) -> Optional[int]:
+        """
+        Return how much a stat has changed since the previous EnvoyCounters. A stat
+        that went _down_ means Envoy restarted (or the cluster was recreated), so
+        in that case the whole current value is the change.
+        """
+
+        current = self.get(stat, cluster)
+
+        if current is None:
+            return None
+
+        before = previous.get(stat, cluster) or 0
+
+        return (current - before) if (current >= before) else current
+
+    def cluster_info(self, cluster_name: str) -> Optional[Dict[str, Any]]:
+        """
+        Summarize the stats for a single cluster, or return None if we have no
+        stats for it.
+        """
+
+        offset = self.offset(cluster_name)
+
+        if offset < 0:
+            return None
+
+        healthy_members, total_members, update_attempts, update_successes, \
+            upstream_total, upstream_4xx, upstream_5xx = self.clusters[offset:offset + len(self.ClusterStats)]
+
+        healthy_percent: Optional[int]
+
+        update_percent = percentage(update_successes, update_attempts)
+
+        upstream_bad = upstream_5xx # used to include 4XX here, but that seems wrong.
+        upstream_ok = upstream_total - upstream_bad
+
+        if upstream_total > 0:
+            healthy_percent = percentage(upstream_ok, upstream_total)
+        else:
+            healthy_percent = None
+
+        return {
+            'healthy_members': healthy_members,
+            'total_members': total_members,
+            'healthy_percent': healthy_percent,
+
+            'update_attempts': update_attempts,
+            'update_successes': update_successes,
+            'update_percent': update_percent,
+
+            'upstream_ok': upstream_ok,
+            'upstream_4xx': upstream_4xx,
+            'upstream_5xx': upstream_5xx,
+            'upstream_bad': upstream_bad
+        }
+
+    def requests_info(self) -> Dict[str, int]:
+        """
+        Summarize the ingress request stats, or return an empty dict if Envoy
+        hasn't told us about any. (Stats that are all zero still count.)
+        """
+
+        if not self.has_requests:
+            return {}
+
+        requests_total, requests_4xx, requests_5xx = self.requests
+        requests_bad = requests_4xx + requests_5xx
+
+        return {
+            "total": requests_total,
+            "4xx": requests_4xx,
+            "5xx": requests_5xx,
+            "bad": requests_bad,
+            "ok": requests_total - requests_bad,
+        }
+
+
+class ClusterStatsView(Mapping[str, Dict[str, Any]]):
+    """
+    A read-only mapping from cluster name to the summary of that cluster's stats,
+    built on demand from an EnvoyCounters.
+    """
+
+    def __init__(self, counters: EnvoyCounters) -> None:
+        self.counters = counters
+
+    def __getitem__(self, cluster_name: str) -> Dict[str, Any]:
+        info = self.counters.cluster_info(cluster_name)
+
+        if info is None:
+            raise KeyError(cluster_name)
+
+        return info
+
+    def __contains__(self, cluster_name: object) -> bool:
+        return cluster_name in self.counters.cluster_index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.counters.cluster_index)
+
+    def __len__(self) -> int:
+        return len(self.counters.cluster_index)
+
+
+EnvoyTreeLoader = Callable[[], Dict[str, Any]]
+
 @dataclass(frozen=True)
 class EnvoyStats:
     max_live_age: int = 120
@@ -37,12 +291,65 @@ class EnvoyStats:
     last_attempt: Optional[float] = None
     update_errors: int = 0
 
-    # Yes yes yes I know -- the contents of these dicts are not immutable.
+    # Yes yes yes I know -- the contents of these are not immutable.
     # That's OK for now, but realize that you mustn't go munging around altering
     # things in here once they're assigned!
     requests: Dict[str, Any] = dc_field(default_factory=dict)
-    clusters: Dict[str, Any] = dc_field(default_factory=dict)
-    envoy: Dict[str, Any] = dc_field(default_factory=dict)
+    clusters: Mapping[str, Any] = dc_field(default_factory=dict)
+
+    # The counters from this update and the one before it, for deltas and rates.
+    counters: Optional[EnvoyCounters] = dc_field(default=None, repr=False, compare=False)
+    last_counters: Optional[EnvoyCounters] = dc_field(default=None, repr=False, compare=False)
+
+    # How to get the full tree of Envoy stats, if anyone asks for it (see the
+    # envoy property).
+    envoy_loader: Optional[EnvoyTreeLoader] = dc_field(default=None, repr=False, compare=False)
+
+    @property
+    def envoy(self) -> Dict[str, Any]:
+        """
+        The full hierarchy of Envoy stats. This is expensive, so it's only built
+        the first time someone asks for it -- and since it's fetched fresh from
+        Envoy at that point, it can be a bit newer than the rest of this object.
+        """
+
+        tree = self.__dict__.get('_envoy', None)
+
+        if tree is None:
+            tree = self.envoy_loader() if self.envoy_loader else {}
+
+            # We're frozen, so we have to go around the dataclass to remember this.
+            object.__setattr__(self, '_envoy', tree)
+
+        return tree
+
+    def delta(self, stat: str, cluster: Optional[str]=None) -> Optional[int]:
+        """
+        Return how much a stat changed between the last two updates, or None if
+        we don't have two updates (or the stat) to compare. stat is one of
+        EnvoyCounters.RequestStats or, if cluster is given, EnvoyCounters.ClusterStats.
+        """
+
+        if not self.counters or not self.last_counters:
+            return None
+
+        return self.counters.delta(self.last_counters, stat, cluster)
+
+    def rate(self, stat: str, cluster: Optional[str]=None) -> Optional[float]:
+        """
+        Return the per-second rate of change of a stat between the last two
+        updates, or None if we can't compute it (see delta).
+        """
+
+        delta = self.delta(stat, cluster)
+
+        if delta is None:
+            return None
+
+        # If we have a delta, we have both sets of counters.
+        elapsed = self.counters.timestamp - self.last_counters.timestamp  # type: ignore
+
+        return (delta / elapsed) if (elapsed > 0) else None
 
     def is_alive(self) -> bool:
         """
@@ -147,7 +454,10 @@ class EnvoyStats:
 
 
 LogLevelFetcher = Callable[[Optional[str]], Optional[str]]
-EnvoyStatsFetcher = Callable[[], Optional[str]]
+
+# An EnvoyStatsFetcher can hand back the whole text of Envoy's /stats, or something
+# that yields it a line at a time.
+EnvoyStatsFetcher = Callable[[], Optional[Union[str, Iterable[str]]]]
 
 class EnvoyStatsMgr:
     # fetch_log_levels and fetch_envoy_stats are debugging hooks
@@ -188,19 +498,55 @@ class EnvoyStatsMgr:
             self.logger.warning("EnvoyStats.update_log_levels failed: %s" % e)
             return None
 
-    def _fetch_envoy_stats(self) -> Optional[str]:
+    def _fetch_envoy_stats(self) -> Optional[Iterable[str]]:
         try:
-            r = requests.get("http://127.0.0.1:8001/stats")
+            r = requests.get("http://127.0.0.1:8001/stats", stream=True)
 
             if r.status_code != 200:
                 self.logger.warning("EnvoyStats.update failed: %s" % r.text)
+                r.close()
                 return None
 
-            return r.text
+            return self._stream_lines(r)
         except OSError as e:
             self.logger.warning("EnvoyStats.update failed: %s" % e)
             return None
 
+    @staticmethod
+    def _stream_lines(r: requests.Response) -> Iterator[str]:
+        # Hand back the response a line at a time, so that we never need the whole
+        # thing in memory at once.
+        try:
+            if not r.encoding:
+                r.encoding = 'utf-8'
+
+            yield from r.iter_lines(chunk_size=65536, decode_unicode=True)
+        finally:
+            r.close()
+
+    def _stats_lines(self) -> Optional[Iterable[str]]:
+        stats = self.fetch_envoy_stats()
+
+        if isinstance(stats, str):
+            return io.StringIO(stats) if stats else None
+
+        return stats
+
+    def get_envoy_tree(self) -> Dict[str, Any]:
+        """
+        Fetch and parse _all_ of Envoy's stats into a hierarchy of dicts. This is
+        expensive: update_envoy_stats doesn't do it, but EnvoyStats.envoy will
+        call this the first time anyone looks at it.
+        """
+
+        try:
+            lines = self._stats_lines()
+
+            return parse_envoy_stats(lines) if lines else {}
+        except (OSError, requests.RequestException) as e:
+            self.logger.warning("EnvoyStats.get_envoy_tree failed: %s" % e)
+            return {}
+
     def update_log_levels(self, last_attempt: float, level: Optional[str]=None) -> bool:
         """
         Heavy lifting around updating the Envoy log levels.
@@ -220,16 +566,10 @@ class EnvoyStatsMgr:
             # Ew.
             with self.access_lock:
                 # EnvoyStats is immutable, so...
-                new_stats = EnvoyStats(
-                    max_live_age=self.stats.max_live_age,
-                    max_ready_age=self.stats.max_ready_age,
-                    created=self.stats.created,
-                    last_update=self.stats.last_update,
+                new_stats = dataclasses.replace(
+                    self.stats,
                     last_attempt=last_attempt,                      # THIS IS A CHANGE
                     update_errors=self.stats.update_errors + 1,     # THIS IS A CHANGE
-                    requests=self.stats.requests,
-                    clusters=self.stats.clusters,
-                    envoy=self.stats.envoy
                 )
 
                 self.stats = new_stats
@@ -297,140 +637,31 @@ class EnvoyStatsMgr:
         structures for others to look at.
         """
 
-        text = self.fetch_envoy_stats()
+        counters: Optional[EnvoyCounters] = None
 
-        if not text:
+        try:
+            lines = self._stats_lines()
+
+            if lines:
+                counters, count = EnvoyCounters.from_lines(lines)
+
+                if not count:
+                    counters = None
+        except (OSError, requests.RequestException) as e:
+            self.logger.warning("EnvoyStats.update failed: %s" % e)
+
+        if not counters:
             # EnvoyStats is immutable, so...
-            new_stats = EnvoyStats(
-                max_live_age=self.stats.max_live_age,
-                max_ready_age=self.stats.max_ready_age,
-                created=self.stats.created,
-                last_update=self.stats.last_update,
+            new_stats = dataclasses.replace(
+                self.stats,
                 last_attempt=last_attempt,                    # THIS IS A CHANGE
                 update_errors=self.stats.update_errors + 1,   # THIS IS A CHANGE
-                requests=self.stats.requests,
-                clusters=self.stats.clusters,
-                envoy=self.stats.envoy
             )
 
             with self.access_lock:
                 self.stats = new_stats
                 return
 
-        # Parse stats into a hierarchy.
-        envoy_stats: Dict[str, Any] = {}    # Ew.
-
-        for line in text.split("\n"):
-            if not line:
-                continue
-
-            # self.logger.info('line: %s' % line)
-            key, value = line.split(":")
-            keypath = key.split('.')
-
-            node = envoy_stats
-
-            for key in keypath[:-1]:
-                if key not in node:
-                    node[key] = {}
-
-                node = node[key]
-
-            value = value.strip()
-
-            # Skip histograms for the moment.
-            # if value.startswith("P0("):
-            #     continue
-            #     # for field in value.split(' '):
-            #     #     if field.startswith('P95('):
-            #     #         value = field.split(',')
-
-            try:
-                node[keypath[-1]] = int(value)
-            except:
-                continue
-
-        # Now dig into clusters a bit more.
-
-        requests_info = {}
-        active_clusters = {}
-
-        if ("http" in envoy_stats) and ("ingress_http" in envoy_stats["http"]):
-            ingress_stats = envoy_stats["http"]["ingress_http"]
-
-            requests_total = ingress_stats.get("downstream_rq_total", 0)
-
-            requests_4xx = ingress_stats.get('downstream_rq_4xx', 0)
-            requests_5xx = ingress_stats.get('downstream_rq_5xx', 0)
-            requests_bad = requests_4xx + requests_5xx
-
-            requests_ok = requests_total - requests_bad
-
-            requests_info = {
-                "total": requests_total,
-                "4xx": requests_4xx,
-                "5xx": requests_5xx,
-                "bad": requests_bad,
-                "ok": requests_ok,
-            }
-
-        if "cluster" in envoy_stats:
-            for cluster_name in envoy_stats['cluster']:
-                cluster = envoy_stats['cluster'][cluster_name]
-
-                # # Toss any _%d -- that's madness with our Istio code at the moment.
-                # cluster_name = re.sub('_\d+$', '', cluster_name)
-
-                # mapping_name = active_cluster_map[cluster_name]
-                # active_mappings[mapping_name] = {}
-
-                # self.logger.info("cluster %s stats: %s" % (cluster_name, cluster))
-
-                healthy_percent: Optional[int]
-                
-                healthy_members = cluster['membership_healthy']
-                total_members = cluster['membership_total']
-                healthy_percent = percentage(healthy_members, total_members)
-
-                update_attempts = cluster['update_attempt']
-                update_successes = cluster['update_success']
-                update_percent = percentage(update_successes, update_attempts)
-
-                # Weird.
-                # upstream_ok = cluster.get('upstream_rq_2xx', 0)
-                # upstream_total = cluster.get('upstream_rq_pending_total', 0)
-                upstream_total = cluster.get('upstream_rq_completed', 0)
-
-                upstream_4xx = cluster.get('upstream_rq_4xx', 0)
-                upstream_5xx = cluster.get('upstream_rq_5xx', 0)
-                upstream_bad = upstream_5xx # used to include 4XX here, but that seems wrong.
-
-                upstream_ok = upstream_total - upstream_bad
-
-                # self.logger.info("%s total %s bad %s ok %s" % (cluster_name, upstream_total, upstream_bad, upstream_ok))
-
-                if upstream_total > 0:
-                    healthy_percent = percentage(upstream_ok, upstream_total)
-                    # self.logger.debug("cluster %s is %d%% healthy" % (cluster_name, healthy_percent))
-                else:
-                    healthy_percent = None
-                    # self.logger.debug("cluster %s has had no requests" % cluster_name)
-
-                active_clusters[cluster_name] = {
-                    'healthy_members': healthy_members,
-                    'total_members': total_members,
-                    'healthy_percent': healthy_percent,
-
-                    'update_attempts': update_attempts,
-                    'update_successes': update_successes,
-                    'update_percent': update_percent,
-
-                    'upstream_ok': upstream_ok,
-                    'upstream_4xx': upstream_4xx,
-                    'upstream_5xx': upstream_5xx,
-                    'upstream_bad': upstream_bad
-                }
-
         # OK, we're now officially finished with all the hard stuff.
         last_update = time.time()
 
@@ -442,9 +673,11 @@ class EnvoyStatsMgr:
             last_update=last_update,                    # THIS IS A CHANGE
             last_attempt=last_attempt,                  # THIS IS A CHANGE
             update_errors=self.stats.update_errors,
-            requests=requests_info,                     # THIS IS A CHANGE
-            clusters=active_clusters,                   # THIS IS A CHANGE
-            envoy=envoy_stats                           # THIS IS A CHANGE
+            requests=counters.requests_info(),          # THIS IS A CHANGE
+            clusters=ClusterStatsView(counters),        # THIS IS A CHANGE
+            counters=counters,                          # THIS IS A CHANGE
+            last_counters=self.stats.counters,          # THIS IS A CHANGE
+            envoy_loader=self.get_envoy_tree
         )
 
         # Make sure we hold the access_lock while messing with self.stats!
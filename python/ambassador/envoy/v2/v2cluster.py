@@ -43,8 +43,7 @@ class V2Cluster(Cacheable):
         #
         # Instead, we must have generated an appropriate envoy_name during IR finalize.
         # In practice, the envoy_name is a short-form of cluster.name with the first
-        # 40 characters followed by `-n` where `n` is an incremental value, one for
-        # every cluster whose name contains the same first 40 characters.
+        # 40 characters followed by a digest of the whole name (see ClusterNameMap).
         assert(cluster.envoy_name)
         assert(len(cluster.envoy_name) <= 60)
 
@@ -41,7 +41,7 @@ class V2RateLimitAction(dict):
         # if rate_limit == {}:
         #     rate_limit = []
 
-        config.ir.logger.debug("V2RateLimitAction translating %s" % rate_limit)
+        config.ir.logger.debug("V2RateLimitAction translating %s", rate_limit)
 
         lkeys = rate_limit.keys()
         if len(lkeys) > 1:
@@ -53,7 +53,7 @@ class V2RateLimitAction(dict):
         actions = rate_limit[lkey]
 
         for action in actions:
-            config.ir.logger.debug("V2RateLimitAction working on '%s'" % action)
+            config.ir.logger.debug("V2RateLimitAction working on '%s'", action)
 
             if ((action == "source_cluster") or
                 (action == "destination_cluster") or
@@ -15,8 +15,10 @@
 from typing import Any, Dict, List, Optional, Set, Tuple, Union, TYPE_CHECKING
 from typing import cast as typecast
 
+import logging
+
 from ..common import EnvoyRoute
-from ...cache import Cacheable
+from ...cache import Cache, Cacheable
 from ...ir.irhttpmappinggroup import IRHTTPMappingGroup
 from ...ir.irbasemapping import IRBaseMapping
 from ...ir.irutils import hostglob_matches
@@ -101,7 +103,7 @@ def regex_matcher(config: 'V2Config', regex: str, key="regex", safe_key=None, re
     if re_type is None:
         re_type = config.ir.ambassador_module.get('regex_type', 'safe').lower()
 
-    config.ir.logger.debug(f"re_type {re_type}")
+    config.ir.logger.debug("re_type %s", re_type)
 
     # 'safe' is the default. You must explicitly say "unsafe" to get the unsafe
     # regex matcher.
@@ -588,22 +590,23 @@ class V2Route(Cacheable):
     def matches_domains(self, domains: List[str]) -> bool:
         route_hosts = self["_host_constraints"]
 
-        self.logger.debug(f"    - matches_domains: route_hosts {', '.join(sorted(route_hosts))}")
-        self.logger.debug(f"    - matches_domains: domains {', '.join(sorted(domains))}")
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("    - matches_domains: route_hosts %s", ', '.join(sorted(route_hosts)))
+            self.logger.debug("    - matches_domains: domains %s", ', '.join(sorted(domains)))
 
         if (not route_hosts) or ("*" in route_hosts):
-            self.logger.debug(f"    - matches_domains: nonspecific route_hosts")
+            self.logger.debug("    - matches_domains: nonspecific route_hosts")
             return True
 
         if "*" in domains:
-            self.logger.debug(f"    - matches_domains: nonspecific domains")
+            self.logger.debug("    - matches_domains: nonspecific domains")
             return True
 
         if any([ self.matches_domain(domain) for domain in domains ]):
-            self.logger.debug(f"    - matches_domains: domain match")
+            self.logger.debug("    - matches_domains: domain match")
             return True
 
-        self.logger.debug(f"    - matches_domains: nothing matches")
+        self.logger.debug("    - matches_domains: nothing matches")
         return False
 
     @classmethod
@@ -622,6 +625,12 @@ class V2Route(Cacheable):
             # Cheat a bit and force the route's cache_key.
             route.cache_key = cache_key
 
+            # Rate-limit actions depend on the RateLimitService's domain, so if this
+            # group has labels at all, we need to rebuild when the RateLimitService
+            # changes.
+            if 'labels' in irgroup:
+                config.cache.depend(Cache.dependency_key('RateLimitService'), cache_key)
+
             # config.ir.logger.info("V2Route: synthesized %s" % v2prettyroute(route))
 
             config.cache.add(route)
@@ -14,3 +14,4 @@
 
 from .v3config import V3Config
 
+from .v3shards import V3ShardWriter
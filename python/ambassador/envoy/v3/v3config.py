@@ -15,8 +15,10 @@
 from typing import Any, Dict, List, Optional, Tuple, Union, TYPE_CHECKING
 
 import json
+import os
 
 from ...cache import Cache, NullCache
+from ...utils import parse_bool
 
 from ..common import EnvoyConfig, sanitize_pre_json
 from .v3admin import V3Admin
@@ -45,9 +47,11 @@ class V3Config (EnvoyConfig):
     routes: List[V3Route]
     route_variants: List[V3RouteVariants]
     listeners: List[V3Listener]
+    route_configs: List[Dict[str, Any]]
     clusters: List[V3Cluster]
     static_resources: V3StaticResources
     clustermap: Dict[str, Any]
+    rds: bool
 
     def __init__(self, ir: 'IR', cache: Optional[Cache]=None) -> None:
         ir.logger.info("EnvoyConfig: Generating V3")
@@ -58,6 +62,12 @@ class V3Config (EnvoyConfig):
         # ...then make sure we have a cache (which might be a NullCache).
         self.cache = cache or NullCache(self.ir.logger)
 
+        # In RDS mode, the listeners refer to their route configurations by name,
+        # instead of including them inline, and the route configurations go into
+        # route_configs. That way, changing nothing but routes changes no listeners,
+        # so Envoy needn't drain and rebuild them.
+        self.rds = self.rds_enabled()
+
         V3Admin.generate(self)
         V3Tracing.generate(self)
 
@@ -77,28 +87,179 @@ class V3Config (EnvoyConfig):
             **ads_config
         }
 
+        if self.rds:
+            d['route_configs'] = self.route_configs
+
         return d
 
+    @staticmethod
+    def rds_enabled() -> bool:
+        return parse_bool(os.environ.get("AMBASSADOR_RDS", "false"))
+
+    # The '@type's for the resources that split_resources hands back.
+    ResourceTypes: Dict[str, str] = {
+        'cluster': '/envoy.config.cluster.v3.Cluster',
+        'route_config': '/envoy.config.route.v3.RouteConfiguration',
+        'listener': '/envoy.config.listener.v3.Listener',
+    }
+
+    def _layered_runtime(self) -> Dict[str, Any]:
+        return {
+            'layers': [
+                {
+                    'name': 'static_layer',
+                    'static_layer': {
+                        # Envoy 1.14.1 disabled the use of lowercase string matcher for headers matching in HTTP-based.
+                        # Following setting toggled it to be consistent with old behavior.
+                        # AuthenticationTest (v0) is a good example that expects the old behavior.
+                        'envoy.reloadable_features.ext_authz_http_service_enable_case_sensitive_string_matcher': False,
+                        're2.max_program_size.error_level': 200,
+                    }
+                }
+            ]
+        }
+
     def split_config(self) -> Tuple[Dict[str, Any], Dict[str, Any], Dict[str, 'ClustermapEntry']]:
         ads_config = {
             '@type': '/envoy.config.bootstrap.v3.Bootstrap',
             'static_resources': self.static_resources,
-            'layered_runtime': {
-                'layers': [
-                    {
-                        'name': 'static_layer',
-                        'static_layer': {
-                            # Envoy 1.14.1 disabled the use of lowercase string matcher for headers matching in HTTP-based.
-                            # Following setting toggled it to be consistent with old behavior.
-                            # AuthenticationTest (v0) is a good example that expects the old behavior.
-                            'envoy.reloadable_features.ext_authz_http_service_enable_case_sensitive_string_matcher': False,
-                            're2.max_program_size.error_level': 200,
-                        }
-                    }
-                ]
-            }
+            'layered_runtime': self._layered_runtime()
         }
 
         bootstrap_config = dict(self.bootstrap)
 
         return bootstrap_config, ads_config, self.clustermap
+
+    def split_resources(self) -> Tuple[Dict[str, Any], List[Tuple[str, str, Dict[str, Any]]]]:
+        """
+        Split the ADS config into a base config with no listeners or clusters, and
+        a list of (kind, name, resource) tuples for the individual clusters, route
+        configurations, and listeners, in that order. kind is a key of
+        ResourceTypes.
+
+        The listeners come back using RDS, with their route configurations split
+        out, just as ambex does with the listeners in a single-file ADS config.
+        (In RDS mode, that's already how they are.)
+        The clusters are the V3Clusters themselves, which may well have come from
+        the cache: don't modify them!
+        """
+
+        ads_config = {
+            '@type': '/envoy.config.bootstrap.v3.Bootstrap',
+            'static_resources': {},
+            'layered_runtime': self._layered_runtime()
+        }
+
+        resources: List[Tuple[str, str, Dict[str, Any]]] = []
+        listeners: List[Tuple[str, str, Dict[str, Any]]] = []
+
+        for cluster in self.clusters:
+            resources.append(('cluster', cluster['name'], cluster))
+
+        resources.extend(self.route_config_resources())
+
+        for ldict in self.static_resources['listeners']:
+            listener, route_configs = self._rds_listener(ldict)
+
+            for route_config in route_configs:
+                resources.append(('route_config', route_config['name'], route_config))
+
+            listeners.append(('listener', listener['name'], listener))
+
+        return ads_config, resources + listeners
+
+    def route_config_resources(self) -> List[Tuple[str, str, Dict[str, Any]]]:
+        """
+        Return the (kind, name, resource) tuples, as split_resources would, for the
+        route configurations that our listeners refer to in RDS mode. (Without RDS
+        mode, there aren't any.)
+        """
+
+        return [ ('route_config', route_config['name'], route_config) for route_config in self.route_configs ]
+
+    def inline_routes(self, ads_config: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Given the ADS config from split_config, return it with the route configurations
+        that RDS-mode listeners refer to put back inline, for the things that need the
+        whole configuration at once: hashing it, and validating it with Envoy. Without
+        RDS mode, that's just the ADS config itself.
+
+        This doesn't modify the ADS config.
+        """
+
+        if not self.route_configs:
+            return ads_config
+
+        route_configs = { route_config['name']: route_config for route_config in self.route_configs }
+        listeners: List[Dict[str, Any]] = []
+
+        for ldict in ads_config['static_resources']['listeners']:
+            filter_chains: List[Dict[str, Any]] = []
+
+            for chain in ldict.get('filter_chains', []):
+                filters: List[Dict[str, Any]] = []
+
+                for f in chain.get('filters', []):
+                    typed_config = f.get('typed_config', {})
+                    route_config_name = typed_config.get('rds', {}).get('route_config_name', None)
+
+                    if route_config_name in route_configs:
+                        typed_config = dict(typed_config)
+                        del(typed_config['rds'])
+                        typed_config['route_config'] = route_configs[route_config_name]
+
+                        f = dict(f)
+                        f['typed_config'] = typed_config
+
+                    filters.append(f)
+
+                filter_chains.append(dict(chain, filters=filters))
+
+            listeners.append(dict(ldict, filter_chains=filter_chains))
+
+        return dict(ads_config, static_resources=dict(ads_config['static_resources'], listeners=listeners))
+
+    @staticmethod
+    def _rds_listener(ldict: Dict[str, Any]) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        # This is the same transformation as ambex's V3ListenerToRdsListener, including
+        # the names of the route configurations. We mustn't modify ldict, so we copy
+        # everything on the way down to the route_config.
+        route_configs: List[Dict[str, Any]] = []
+        filter_chains: List[Dict[str, Any]] = []
+
+        for chain in ldict.get('filter_chains', []):
+            filters: List[Dict[str, Any]] = []
+
+            for f in chain.get('filters', []):
+                typed_config = f.get('typed_config', {})
+
+                if (f.get('name') == 'envoy.filters.network.http_connection_manager') and ('route_config' in typed_config):
+                    typed_config = dict(typed_config)
+                    route_config = dict(typed_config.pop('route_config'))
+
+                    if not route_config.get('name'):
+                        route_config['name'] = "%s-routeconfig-%d" % (ldict['name'], len(route_configs))
+
+                    route_configs.append(route_config)
+
+                    typed_config['rds'] = {
+                        'config_source': {
+                            'ads': {},
+                            'resource_api_version': 'V3'
+                        },
+                        'route_config_name': route_config['name']
+                    }
+
+                    f = dict(f)
+                    f['typed_config'] = typed_config
+
+                filters.append(f)
+
+            chain = dict(chain)
+            chain['filters'] = filters
+            filter_chains.append(chain)
+
+        listener = dict(ldict)
+        listener['filter_chains'] = filter_chains
+
+        return listener, route_configs
@@ -172,8 +172,8 @@ def auth_cluster_uri(auth: IRAuth, cluster: IRCluster) -> str:
 
     server_uri = "%s://%s" % (scheme, prefix)
 
-    if auth.ir.logger.isEnabledFor(logging.DEBUG):
-        auth.ir.logger.debug("%s: server_uri %s" % (auth.name, server_uri))
+    if auth.ir.log_debug:
+        auth.ir.logger.debug("%s: server_uri %s", auth.name, server_uri)
 
     return server_uri
 
@@ -20,6 +20,7 @@ import logging
 import sys
 
 from ...ir.irhost import IRHost
+from ...ir.irhostindex import HostMatchIndex
 from ...ir.irlistener import IRListener
 from ...ir.irtcpmappinggroup import IRTCPMappingGroup
 
@@ -54,6 +55,9 @@ if TYPE_CHECKING:
 # on the same port. Possible near-future feature.)
 
 class V3Chain(dict):
+    __slots__ = ( '_config', '_logger', '_log_debug', 'type', 'context', 'hosts', 'routes',
+                  'tcpmappings', '_host_index' )
+
     def __init__(self, config: 'V3Config', type: str, host: Optional[IRHost]) -> None:
         self._config = config
         self._logger = self._config.ir.logger
@@ -74,8 +78,13 @@ class V3Chain(dict):
         self.routes: List[DictifiedV3Route] = []
         self.tcpmappings: List[IRTCPMappingGroup] = []
 
+        # The HostMatchIndex for our hosts is built lazily, the first time we need
+        # to match a route, and thrown away whenever the hosts change.
+        self._host_index: Optional[HostMatchIndex] = None
+
     def add_host(self, host: IRHost) -> None:
         self.hosts[host.hostname] = host
+        self._host_index = None
 
         # Don't mess with the context if we're an HTTP chain...
         if self.type.lower() == "http":
@@ -94,10 +103,14 @@ class V3Chain(dict):
         return list(self.hosts.keys())
 
     def matching_hosts(self, route: V3Route) -> List[IRHost]:
-        # Get a list of _IRHosts_ that the given route should be matched with.
-        rv: List[IRHost] = [ host for host in self.hosts.values() if host.matches_httpgroup(route._group) ]
+        # Get a list of _IRHosts_ that the given route should be matched with. This
+        # is exactly the hosts for which host.matches_httpgroup(route._group) would
+        # be True, but we use the index so that we needn't check every host for
+        # every route.
+        if self._host_index is None:
+            self._host_index = HostMatchIndex(self._logger, self.hosts.values())
 
-        return rv
+        return self._host_index.matching_hosts(route._group)
 
     def add_route(self, route: DictifiedV3Route) -> None:
         self.routes.append(route)
@@ -121,6 +134,11 @@ class V3Chain(dict):
 # here is all about constructing the Envoy configuration implied by the IRListener.
 
 class V3Listener(dict):
+    __slots__ = ( 'config', 'bind_address', 'port', 'bind_to', 'name', 'use_proxy_proto',
+                  'listener_filters', 'traffic_direction', 'address', '_irlistener',
+                  '_security_model', '_l7_depth', '_insecure_only', '_filter_chains',
+                  '_base_http_config', '_chains', '_tls_ok', '_log_debug' )
+
     def __init__(self, config: 'V3Config', irlistener: IRListener) -> None:
         super().__init__()
 
@@ -149,7 +167,7 @@ class V3Listener(dict):
         # representations) that won't get logged anyway.
         self._log_debug = self.config.ir.logger.isEnabledFor(logging.DEBUG)
         if self._log_debug:
-            self.config.ir.logger.debug(f"V3Listener {self.name} created -- {self._security_model}, l7Depth {self._l7_depth}")
+            self.config.ir.logger.debug("V3Listener %s created -- %s, l7Depth %s", self.name, self._security_model, self._l7_depth)
 
         # If the IRListener is marked insecure-only, so are we.
         self._insecure_only = irlistener.insecure_only
@@ -353,7 +371,7 @@ class V3Listener(dict):
                 log_format = 'ACCESS [%START_TIME%] \"%REQ(:METHOD)% %REQ(X-ENVOY-ORIGINAL-PATH?:PATH)% %PROTOCOL%\" %RESPONSE_CODE% %RESPONSE_FLAGS% %BYTES_RECEIVED% %BYTES_SENT% %DURATION% %RESP(X-ENVOY-UPSTREAM-SERVICE-TIME)% \"%REQ(X-FORWARDED-FOR)%\" \"%REQ(USER-AGENT)%\" \"%REQ(X-REQUEST-ID)%\" \"%REQ(:AUTHORITY)%\" \"%UPSTREAM_HOST%\"'
 
             if self._log_debug:
-                self.config.ir.logger.debug("V3Listener: Using log_format '%s'" % log_format)
+                self.config.ir.logger.debug("V3Listener: Using log_format '%s'", log_format)
             access_log.append({
                 'name': 'envoy.access_loggers.file',
                 'typed_config': {
@@ -529,7 +547,7 @@ class V3Listener(dict):
 
     def finalize(self) -> None:
         if self._log_debug:
-            self.config.ir.logger.debug(f"V3Listener: ==== finalize {self}")
+            self.config.ir.logger.debug("V3Listener: ==== finalize %s", self)
 
         # OK. Assemble the high-level stuff for Envoy.
         self.address = {
@@ -687,7 +705,10 @@ class V3Listener(dict):
         # Note that a route using XFP can match _any_ chain, whether HTTP or HTTPS.
 
         logger = self.config.ir.logger
-        
+
+        # The ACME hole-puncher route, if we need one, shared by all the chains that need it.
+        acme_route: Optional[DictifiedV3Route] = None
+
         for chain_key, chain in self._chains.items():
             # Only look at HTTP(S) chains.
             if (chain.type != "http") and (chain.type != "https"):
@@ -713,7 +734,7 @@ class V3Listener(dict):
 
                 if not matching_hosts:
                     if self._log_debug:
-                        logger.debug(f"    drop outright: no hosts match {sorted(rv.route['_host_constraints'])}")
+                        logger.debug("    drop outright: no hosts match %s", sorted(rv.route['_host_constraints']))
                     continue
 
                 for host in matching_hosts:
@@ -765,9 +786,10 @@ class V3Listener(dict):
                                 logger.debug("      %s - %s: accept on %s %s%s",
                                              matcher, action, self.name, hostname, extra_info)
 
-                            variant = dict(rv.get_variant(matcher, action.lower()))
-                            variant["_host_constraints"] = set([ hostname ])
-                            chain.add_route(variant)
+                            # Chains share the cached variants themselves, rather than copies of them:
+                            # finalize_http relies on that to find hosts with identical routes, so
+                            # nothing may modify a chain's routes.
+                            chain.add_route(rv.get_variant(matcher, action.lower()))
                         else:
                             if self._log_debug:
                                 logger.debug("      %s - %s: drop from %s %s%s",
@@ -790,22 +812,59 @@ class V3Listener(dict):
                 #
                 # XXX This is needed only because we're dictifying the V3Route too early.
 
-                chain.routes.insert(0, {
-                    "_host_constraints": set(),
-                    "match": {
-                        "case_sensitive": True,
-                        "prefix": "/.well-known/acme-challenge/"
-                    },
-                    "route": {
-                        "cluster": self.config.ir.sidecar_cluster_name,
-                        "prefix_rewrite": "/.well-known/acme-challenge/",
-                        "timeout": "3.000s"
+                if acme_route is None:
+                    acme_route = {
+                        "_host_constraints": set(),
+                        "match": {
+                            "case_sensitive": True,
+                            "prefix": "/.well-known/acme-challenge/"
+                        },
+                        "route": {
+                            "cluster": self.config.ir.sidecar_cluster_name,
+                            "prefix_rewrite": "/.well-known/acme-challenge/",
+                            "timeout": "3.000s"
+                        }
                     }
-                })
+
+                chain.routes.insert(0, acme_route)
 
             if self._log_debug:
                 for route in chain.routes:
-                    logger.debug("  CHAIN ROUTE: %s" % v3prettyroute(route))
+                    logger.debug("  CHAIN ROUTE: %s", v3prettyroute(route))
+
+    def virtual_hosts(self, vhosts: Dict[str, List[List[Dict[str, Any]]]]) -> List[Dict[str, Any]]:
+        """
+        Given the lists of routes for each hostname on a filter chain, build the
+        filter chain's virtual hosts. Hostnames with exactly the same routes (which
+        is all of them, usually) share one virtual host with multiple domains:
+        Envoy picks the virtual host by domain, so that routes requests just the
+        same, without repeating every route for every host.
+        """
+
+        # Hostnames that share routes share the very same lists, so we can group them
+        # by the identities of their lists, keeping the hostnames in order.
+        groups: Dict[Tuple[int, ...], List[str]] = {}
+
+        for hostname, route_lists in vhosts.items():
+            groups.setdefault(tuple(id(routes) for routes in route_lists), []).append(hostname)
+
+        virtual_hosts: List[Dict[str, Any]] = []
+
+        for hostnames in groups.values():
+            route_lists = vhosts[hostnames[0]]
+
+            if len(route_lists) == 1:
+                routes = route_lists[0]
+            else:
+                routes = [ route for routes in route_lists for route in routes ]
+
+            virtual_hosts.append({
+                "name": f"{self.name}-{hostnames[0]}",
+                "domains": hostnames,
+                "routes": routes
+            })
+
+        return virtual_hosts
 
     def finalize_http(self) -> None:
         # Finalize everything HTTP. Like the TCP side of the world, this is about walking
@@ -816,6 +875,11 @@ class V3Listener(dict):
 
         filter_chains: Dict[str, Dict[str, Any]] = {}
 
+        # Envoy routes for each chain route, and lists of them for each list of chain
+        # routes, both keyed by identity.
+        stripped: Dict[int, Dict[str, Any]] = {}
+        route_lists: Dict[Tuple[int, ...], List[Dict[str, Any]]] = {}
+
         for chain_key, chain in self._chains.items():
             if self._log_debug:
                 self._irlistener.logger.debug("FHTTP %s / %s / %s", self, chain_key, chain)
@@ -896,42 +960,68 @@ class V3Listener(dict):
                 # The chain type is neither HTTP nor HTTPS -- must be a TCP chain. Skip it.
                 continue
 
-            # OK, we have the filter_chain variable set -- build the Envoy virtual_hosts for it.
+            # OK, we have the filter_chain variable set -- work out the routes for each of
+            # its hosts. Every host on this chain gets the same routes, and chains share
+            # route variants (see compute_routes), so we only need to make certain that no
+            # internal keys make it into the Envoy configuration once per variant, and
+            # chains with the same variants can share one list of routes.
+            if not chain.hosts:
+                continue
+
+            route_key = tuple(id(r) for r in chain.routes)
+            routes = route_lists.get(route_key, None)
 
-            for host in chain.hosts.values():
-                # Make certain that no internal keys from the route make it into the Envoy 
-                # configuration.
+            if routes is None:
                 routes = []
-                
+
                 for r in chain.routes:
-                    routes.append({ k: v for k, v in r.items() if k[0] != '_' })
+                    envoy_route = stripped.get(id(r), None)
 
-                # Do we - somehow - already have a vhost for this hostname? (This should
-                # be "impossible".)
+                    if envoy_route is None:
+                        envoy_route = { k: v for k, v in r.items() if k[0] != '_' }
+                        stripped[id(r)] = envoy_route
 
-                vhost: Dict[str, Any] = filter_chain["_vhosts"].get(host.hostname, None)
+                    routes.append(envoy_route)
 
-                if not vhost:
-                    vhost = {
-                        "name": f"{self.name}-{host.hostname}",
-                        "domains": [ host.hostname ],
-                        "routes": []
-                    }
+                route_lists[route_key] = routes
 
-                    filter_chain["_vhosts"][host.hostname] = vhost
+            for host in chain.hosts.values():
+                # Do we - somehow - already have routes for this hostname? (This should
+                # be "impossible".) If so, the new ones go after them.
+                filter_chain["_vhosts"].setdefault(host.hostname, []).append(routes)
 
-                vhost["routes"] += routes
+        # How many route configurations this listener has (for RDS mode).
+        route_config_count = 0
 
         # Once that's all done, walk the filter_chains dict...
         for fc_key, filter_chain in filter_chains.items():
             # ...set up our HTTP config...
             http_config = dict(typecast(dict, self._base_http_config))
 
-            # ...and unfold our vhosts dict into a list for Envoy.
-            http_config["route_config"] = {
-                "virtual_hosts": list(filter_chain["_vhosts"].values())
+            # ...and turn our vhosts dict into virtual_hosts for Envoy.
+            route_config: Dict[str, Any] = {
+                "virtual_hosts": self.virtual_hosts(filter_chain["_vhosts"])
             }
 
+            if self.config.rds:
+                # In RDS mode, the route configuration goes to the V3Config, and the
+                # HttpConnectionManager just names it. We name it just as ambex would if
+                # it converted the listener to RDS itself.
+                route_config["name"] = f"{self.name}-routeconfig-{route_config_count}"
+                route_config_count += 1
+
+                self.config.route_configs.append(route_config)
+
+                http_config["rds"] = {
+                    "config_source": {
+                        "ads": {},
+                        "resource_api_version": "V3"
+                    },
+                    "route_config_name": route_config["name"]
+                }
+            else:
+                http_config["route_config"] = route_config
+
             # Now that we've saved our vhosts as a list, drop the dict version.
             del(filter_chain["_vhosts"])
 
@@ -988,6 +1078,7 @@ class V3Listener(dict):
     @classmethod
     def generate(cls, config: 'V3Config') -> None:
         config.listeners = []
+        config.route_configs = []
         logger = config.ir.logger
 
         for key in config.ir.listeners.keys():
@@ -996,7 +1087,7 @@ class V3Listener(dict):
             v3listener.finalize()
 
             config.listeners.append(v3listener)
-            config.ir.logger.info(f"V3Listener: ==== GENERATED {v3listener}")
+            config.ir.logger.info("V3Listener: ==== GENERATED %s", v3listener)
             
             if v3listener._log_debug:
                 for k in sorted(v3listener._chains.keys()):
@@ -15,8 +15,10 @@
 from typing import Any, Dict, List, Optional, Set, Tuple, Union, TYPE_CHECKING
 from typing import cast as typecast
 
+import logging
+
 from ..common import EnvoyRoute
-from ...cache import Cacheable
+from ...cache import Cache, Cacheable
 from ...ir.irhttpmappinggroup import IRHTTPMappingGroup
 from ...ir.irbasemapping import IRBaseMapping
 from ...ir.irutils import hostglob_matches
@@ -269,6 +271,10 @@ class V3RouteVariants:
 # mess with the one host glob at this point.
 
 class V3Route(Cacheable):
+    # There's a V3Route for every Mapping on every chain, so don't give each one a
+    # __dict__ just for these.
+    __slots__ = ( 'logger', '_group' )
+
     def __init__(self, config: 'V3Config', group: IRHTTPMappingGroup, mapping: IRBaseMapping) -> None:
         super().__init__()
 
@@ -578,22 +584,23 @@ class V3Route(Cacheable):
     def matches_domains(self, domains: List[str]) -> bool:
         route_hosts = self["_host_constraints"]
 
-        self.logger.debug(f"    - matches_domains: route_hosts {', '.join(sorted(route_hosts))}")
-        self.logger.debug(f"    - matches_domains: domains {', '.join(sorted(domains))}")
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("    - matches_domains: route_hosts %s", ', '.join(sorted(route_hosts)))
+            self.logger.debug("    - matches_domains: domains %s", ', '.join(sorted(domains)))
 
         if (not route_hosts) or ("*" in route_hosts):
-            self.logger.debug(f"    - matches_domains: nonspecific route_hosts")
+            self.logger.debug("    - matches_domains: nonspecific route_hosts")
             return True
 
         if "*" in domains:
-            self.logger.debug(f"    - matches_domains: nonspecific domains")
+            self.logger.debug("    - matches_domains: nonspecific domains")
             return True
 
         if any([ self.matches_domain(domain) for domain in domains ]):
-            self.logger.debug(f"    - matches_domains: domain match")
+            self.logger.debug("    - matches_domains: domain match")
             return True
 
-        self.logger.debug(f"    - matches_domains: nothing matches")
+        self.logger.debug("    - matches_domains: nothing matches")
         return False
 
     @classmethod
@@ -612,6 +619,12 @@ class V3Route(Cacheable):
             # Cheat a bit and force the route's cache_key.
             route.cache_key = cache_key
 
+            # Rate-limit actions depend on the RateLimitService's domain, so if this
+            # group has labels at all, we need to rebuild when the RateLimitService
+            # changes.
+            if 'labels' in irgroup:
+                config.cache.depend(Cache.dependency_key('RateLimitService'), cache_key)
+
             # config.ir.logger.info("V3Route: synthesized %s" % v3prettyroute(route))
 
             config.cache.add(route)
@@ -0,0 +1,192 @@
+# Copyright 2021 Datawire. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License
+
+from typing import Any, Dict, List, Optional, Tuple
+
+import hashlib
+import logging
+import os
+import re
+
+import orjson
+
+from .v3config import V3Config
+
+
+class V3ShardWriter:
+    """
+    Write an ADS config as a directory of files, one per cluster, route
+    configuration, and listener, instead of one big file.
+
+    Each file is named by a hash of its contents, so a file that's already on
+    disk never needs to be written again. Better still, if a resource is the
+    very same object that we wrote last time (because it came out of the cache),
+    we don't even need to serialize it to know its name.
+
+    Ambex reads every .json file in its directory, so the shards go in the same
+    directory as the single ADS file would, and that file itself holds just the
+    base config (no listeners or clusters). We also keep a manifest, whose name
+    starts with a '.' so that ambex ignores it, listing which file holds which
+    resource and what changed since the last generation.
+
+    Files are written in dependency order (clusters, then route configurations,
+    then listeners) and stale files are only removed after everything new is in
+    place, so anything reading the directory in the middle of a write sees a
+    usable config.
+    """
+
+    ManifestName = ".ads-manifest.json"
+    ShardPattern = re.compile(r'^(cluster|route_config|listener)-[0-9a-f]{24}\.json$')
+
+    def __init__(self, logger: logging.Logger, ads_path: str) -> None:
+        self.logger = logger
+        self.ads_path = ads_path
+        self.path = os.path.dirname(ads_path) or "."
+
+        self.generation = 0
+        self.base_hash: Optional[str] = None
+
+        # (kind, name) => (resource, filename) for everything we wrote last time.
+        self.shards: Dict[Tuple[str, str], Tuple[Dict[str, Any], str]] = {}
+
+        # Stats for the last write.
+        self.bytes_written = 0
+        self.files_written = 0
+        self.serialized = 0
+
+    @staticmethod
+    def serialize(resource: Dict[str, Any]) -> bytes:
+        return orjson.dumps(resource, option=orjson.OPT_SORT_KEYS|orjson.OPT_NON_STR_KEYS)
+
+    def _write(self, name: str, content: bytes) -> None:
+        # Write to a dotfile (which ambex ignores) and rename it into place, so
+        # nobody ever sees half a file.
+        tmp_path = os.path.join(self.path, f".{name}.tmp")
+
+        with open(tmp_path, "wb") as output:
+            output.write(content)
+
+        os.replace(tmp_path, os.path.join(self.path, name))
+
+        self.bytes_written += len(content)
+        self.files_written += 1
+
+    @classmethod
+    def remove_shards(cls, path: str) -> int:
+        """
+        Remove any shard files (and the manifest) from path, e.g. when we're not
+        writing shards and don't want ambex to pick up old ones. Returns the
+        number of files removed.
+        """
+
+        removed = 0
+
+        try:
+            names = os.listdir(path)
+        except OSError:
+            return 0
+
+        for name in names:
+            if cls.ShardPattern.match(name) or (name == cls.ManifestName):
+                os.unlink(os.path.join(path, name))
+                removed += 1
+
+        return removed
+
+    def write(self, base_config: Dict[str, Any], resources: List[Tuple[str, str, Dict[str, Any]]]) -> Dict[str, Any]:
+        """
+        Write base_config and resources (as returned by V3Config.split_resources)
+        and return the manifest.
+        """
+
+        self.bytes_written = 0
+        self.files_written = 0
+        self.serialized = 0
+
+        if self.generation == 0:
+            # We don't know what's in there, so make sure nothing stale is left over
+            # from before we started.
+            self.remove_shards(self.path)
+
+        self.generation += 1
+
+        shards: Dict[Tuple[str, str], Tuple[Dict[str, Any], str]] = {}
+        added: Dict[str, List[str]] = {}
+        changed: Dict[str, List[str]] = {}
+
+        for kind, name, resource in resources:
+            key = (kind, name)
+            previous = self.shards.get(key, None)
+
+            if previous and (previous[0] is resource):
+                # Same object as last time, so it's already on disk.
+                shards[key] = previous
+                continue
+
+            content = self.serialize({ '@type': V3Config.ResourceTypes[kind], **resource })
+            self.serialized += 1
+
+            filename = f"{kind}-{hashlib.sha256(content).hexdigest()[0:24]}.json"
+
+            if not previous or (previous[1] != filename):
+                self._write(filename, content)
+
+                (changed if previous else added).setdefault(kind, []).append(name)
+
+            shards[key] = (resource, filename)
+
+        # The base config next, if it's changed...
+        base_content = self.serialize(base_config)
+        base_hash = hashlib.sha256(base_content).hexdigest()
+
+        if base_hash != self.base_hash:
+            self._write(os.path.basename(self.ads_path), base_content)
+            self.base_hash = base_hash
+
+        # ...then clean up whatever's no longer needed.
+        removed: Dict[str, List[str]] = {}
+        current_files = set(filename for _, filename in shards.values())
+
+        for key, (_, filename) in self.shards.items():
+            if key not in shards:
+                removed.setdefault(key[0], []).append(key[1])
+
+            if filename not in current_files:
+                try:
+                    os.unlink(os.path.join(self.path, filename))
+                except OSError as e:
+                    self.logger.debug("could not remove ADS shard %s: %s", filename, e)
+
+        self.shards = shards
+
+        files: Dict[str, Dict[str, str]] = {}
+
+        for (kind, name), (_, filename) in shards.items():
+            files.setdefault(kind, {})[name] = filename
+
+        manifest = {
+            'generation': self.generation,
+            'base': os.path.basename(self.ads_path),
+            'files': files,
+            'added': added,
+            'changed': changed,
+            'removed': removed,
+            'serialized': self.serialized,
+            'files_written': self.files_written,
+            'bytes_written': self.bytes_written,
+        }
+
+        self._write(self.ManifestName, orjson.dumps(manifest, option=orjson.OPT_INDENT_2))
+
+        return manifest
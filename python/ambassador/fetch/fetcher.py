@@ -10,7 +10,7 @@ from ..config import ACResource, Config
 from ..utils import parse_yaml, parse_json, dump_json, parse_bool
 
 from .dependency import DependencyManager, IngressClassesDependency, SecretDependency, ServiceDependency
-from .resource import NormalizedResource, ResourceManager
+from .resource import NormalizedResource, ResourceIdentity, ResourceManager
 from .k8sobject import KubernetesGVK, KubernetesObject
 from .k8sprocessor import (
     KubernetesProcessor,
@@ -54,6 +54,32 @@ AnyDict = Dict[str, Any]
 k8sLabelMatcher = re.compile(r'([\w\-_./]+)=\"(.+)\"')
 
 
+def expandvars_in_place(obj: Any) -> None:
+    """
+    Run os.path.expandvars over every string leaf in a parsed JSON structure
+    that contains a '$', modifying the structure in place. Keys are left alone.
+    """
+
+    worklist = [ obj ]
+
+    while worklist:
+        node = worklist.pop()
+
+        if isinstance(node, dict):
+            items: Any = node.items()
+        elif isinstance(node, list):
+            items = enumerate(node)
+        else:
+            continue
+
+        for k, v in items:
+            if isinstance(v, str):
+                if '$' in v:
+                    node[k] = os.path.expandvars(v)
+            elif isinstance(v, (dict, list)):
+                worklist.append(v)
+
+
 class ResourceFetcher:
     manager: ResourceManager
     k8s_processor: KubernetesProcessor
@@ -136,6 +162,10 @@ spec:
     def location(self) -> str:
         return str(self.manager.locations.current)
 
+    @property
+    def provenance(self) -> Dict[ResourceIdentity, List[ResourceIdentity]]:
+        return self.manager.provenance
+
     def load_from_filesystem(self, config_dir_path, recurse: bool=False,
                              k8s: bool=False, finalize: bool=True,
                              automatic_manifests: List[str]=[]):
@@ -173,10 +203,10 @@ spec:
         elif len(automatic_manifests) == 0:
             # The config_dir_path wasn't a directory nor a file, and there are
             # no automatic manifests. Nothing to do.
-            self.logger.debug("no init directory/file at path %s and no automatic manifests, doing nothing" % config_dir_path)
+            self.logger.debug("no init directory/file at path %s and no automatic manifests, doing nothing", config_dir_path)
 
         for filepath, filename in inputs:
-            self.logger.debug("reading %s (%s)" % (filename, filepath))
+            self.logger.debug("reading %s (%s)", filename, filepath)
 
             try:
                 serialization = open(filepath, "r").read()
@@ -185,7 +215,7 @@ spec:
                 self.aconf.post_error("could not read YAML from %s: %s" % (filepath, e))
 
         for manifest in automatic_manifests:
-            self.logger.debug("reading automatic manifest: %s" % manifest)
+            self.logger.debug("reading automatic manifest: %s", manifest)
             try:
                 self.parse_yaml(manifest, k8s=k8s, filename="_automatic_", finalize=False)
             except IOError as e:
@@ -245,14 +275,17 @@ spec:
         if os.path.isfile(os.path.join(basedir, '.ambassador_ignore_ingress')):
             self.aconf.post_error("Ambassador is not permitted to read Ingress resources. Please visit https://www.getambassador.io/docs/edge-stack/latest/topics/running/ingress-controller/#ambassador-as-an-ingress-controller for more information. You can continue using Ambassador, but Ingress resources will be ignored...")
 
-        # Expand environment variables allowing interpolation in manifests.
-        serialization = os.path.expandvars(serialization)
-
         self.load_pod_labels()
 
         try:
             watt_dict = parse_json(serialization)
 
+            # Expand environment variables allowing interpolation in manifests.
+            # Running expandvars over the whole snapshot means copying all of it,
+            # and watt snapshots can be tens of megabytes, so we only touch the
+            # strings that actually contain a '$'.
+            expandvars_in_place(watt_dict)
+
             # Grab deltas if they're present...
             self.deltas = watt_dict.get('Deltas', [])
 
@@ -327,14 +360,14 @@ spec:
         with open(pod_labels_path) as pod_labels_file:
             pod_labels = pod_labels_file.readlines()
 
-        self.logger.debug(f"Found pod labels: {pod_labels}")
+        self.logger.debug("Found pod labels: %s", pod_labels)
         for pod_label in pod_labels:
             pod_label_kv = k8sLabelMatcher.findall(pod_label)
             if len(pod_label_kv) != 1 or len(pod_label_kv[0]) != 2:
                 self.aconf.post_notice(f"Dropping pod label {pod_label}")
             else:
                 self.aconf.pod_labels[pod_label_kv[0][0]] = pod_label_kv[0][1]
-        self.logger.debug(f"Parsed pod labels: {self.aconf.pod_labels}")
+        self.logger.debug("Parsed pod labels: %s", self.aconf.pod_labels)
 
     def sorted(self, key=lambda x: x.rkey):  # returns an iterator, probably
         return sorted(self.elements, key=key)
@@ -349,9 +382,9 @@ spec:
             # can't process it.
             return
 
-        with self.manager.locations.push_reset():
+        with self.manager.locations.push_reset(), self.manager.source(obj):
             if not self.k8s_processor.try_process(obj):
-                self.logger.debug(f"{self.location}: skipping K8s {obj.gvk}")
+                self.logger.debug("%s: skipping K8s %s", self.location, obj.gvk)
 
     # Handler for Consul services
     def handle_consul_service(self,
@@ -363,7 +396,7 @@ spec:
 
         if len(endpoints) < 1:
             # Bzzt.
-            self.logger.debug(f"ignoring Consul service {name} with no Endpoints")
+            self.logger.debug("ignoring Consul service %s with no Endpoints", name)
             return
 
         # We can turn this directly into an Ambassador Service resource, since Consul keeps
@@ -379,7 +412,7 @@ spec:
             ep_port = ep.get('Port')
 
             if not ep_addr or not ep_port:
-                self.logger.debug(f"ignoring Consul service {name} endpoint {ep['ID']} missing address info")
+                self.logger.debug("ignoring Consul service %s endpoint %s missing address info", name, ep['ID'])
                 continue
 
             # Consul services don't have the weird indirections that Kube services do, so just
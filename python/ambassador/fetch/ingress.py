@@ -28,11 +28,11 @@ class IngressClassProcessor (ManagedKubernetesProcessor):
     def _process(self, obj: KubernetesObject) -> None:
         # We only want to deal with IngressClasses that belong to "spec.controller: getambassador.io/ingress-controller"
         if obj.spec.get('controller', '').lower() != self.CONTROLLER:
-            self.logger.debug(f'ignoring IngressClass {obj.name} without controller - getambassador.io/ingress-controller')
+            self.logger.debug('ignoring IngressClass %s without controller - getambassador.io/ingress-controller', obj.name)
             return
 
         if obj.ambassador_id != Config.ambassador_id:
-            self.logger.debug(f'IngressClass {obj.name} does not have Ambassador ID {Config.ambassador_id}, ignoring...')
+            self.logger.debug('IngressClass %s does not have Ambassador ID %s, ignoring...', obj.name, Config.ambassador_id)
             return
 
         # TODO: Do we intend to use this parameter in any way?
@@ -47,7 +47,7 @@ class IngressClassProcessor (ManagedKubernetesProcessor):
         # implementation... although usage is optional and not prescribed.
         ingress_parameters = obj.spec.get('parameters', {})
 
-        self.logger.debug(f'Handling IngressClass {obj.name} with parameters {ingress_parameters}...')
+        self.logger.debug('Handling IngressClass %s with parameters %s...', obj.name, ingress_parameters)
         self.aconf.incr_count('k8s_ingress_class')
 
         # Don't emit this directly. We use it when we handle ingresses below. If
@@ -86,10 +86,10 @@ class IngressProcessor (ManagedKubernetesProcessor):
         if obj.status != service_status:
             if service_status:
                 status_update = (obj.gvk.kind, obj.namespace, service_status)
-                self.logger.debug(f"Updating Ingress {obj.name} status to {status_update}")
+                self.logger.debug("Updating Ingress %s status to %s", obj.name, status_update)
                 self.aconf.k8s_status_updates[f'{obj.name}.{obj.namespace}'] = status_update
         else:
-            self.logger.debug(f"Not reconciling Ingress {obj.name}: observed and current statuses are in sync")
+            self.logger.debug("Not reconciling Ingress %s: observed and current statuses are in sync", obj.name)
 
     def _process(self, obj: KubernetesObject) -> None:
         ingress_class_name = obj.spec.get('ingressClassName', '')
@@ -107,15 +107,15 @@ class IngressProcessor (ManagedKubernetesProcessor):
         #   annotations:
         #     ingressclass.kubernetes.io/is-default-class: "true"
         if not (has_ingress_class or has_ambassador_ingress_class_annotation):
-            self.logger.debug(f'ignoring Ingress {obj.name} without annotation (kubernetes.io/ingress.class: "ambassador") or IngressClass controller (getambassador.io/ingress-controller)')
+            self.logger.debug('ignoring Ingress %s without annotation (kubernetes.io/ingress.class: "ambassador") or IngressClass controller (getambassador.io/ingress-controller)', obj.name)
             return
 
         # We don't want to deal with non-matching Ambassador IDs
         if obj.ambassador_id != Config.ambassador_id:
-            self.logger.debug(f"Ingress {obj.name} does not have Ambassador ID {Config.ambassador_id}, ignoring...")
+            self.logger.debug("Ingress %s does not have Ambassador ID %s, ignoring...", obj.name, Config.ambassador_id)
             return
 
-        self.logger.debug(f"Handling Ingress {obj.name}...")
+        self.logger.debug("Handling Ingress %s...", obj.name)
         self.aconf.incr_count('k8s_ingress')
 
         # We'll generate an ingress_id to match up this Ingress with its Mappings, but
@@ -164,7 +164,7 @@ class IngressProcessor (ManagedKubernetesProcessor):
                         spec=spec,
                     )
 
-                    self.logger.debug(f"Generated Host from ingress {obj.name}: {ingress_host}")
+                    self.logger.debug("Generated Host from ingress %s: %s", obj.name, ingress_host)
                     self.manager.emit(ingress_host)
 
         # parse ingress.spec.defaultBackend
@@ -192,7 +192,7 @@ class IngressProcessor (ManagedKubernetesProcessor):
                 },
             )
 
-            self.logger.debug(f"Generated mapping from Ingress {obj.name}: {default_backend_mapping}")
+            self.logger.debug("Generated mapping from Ingress %s: %s", obj.name, default_backend_mapping)
             self.manager.emit(default_backend_mapping)
 
         # parse ingress.spec.rules
@@ -260,7 +260,7 @@ class IngressProcessor (ManagedKubernetesProcessor):
                     spec=spec,
                 )
 
-                self.logger.debug(f"Generated mapping from Ingress {obj.name}: {path_mapping}")
+                self.logger.debug("Generated mapping from Ingress %s: %s", obj.name, path_mapping)
                 self.manager.emit(path_mapping)
 
         # let's make arrangements to update Ingress' status now
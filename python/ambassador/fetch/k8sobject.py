@@ -83,8 +83,13 @@ class KubernetesObject (collections.abc.Mapping):
     def __init__(self, delegate: Dict[str, Any]) -> None:
         self.delegate = delegate
 
+        # The GVK and key get checked by every processor that sees this object,
+        # so we only want to build them once. The delegate's identity doesn't
+        # change once we have it.
+        self._key: Optional[KubernetesObjectKey] = None
+
         try:
-            self.gvk
+            self._gvk = KubernetesGVK(self['apiVersion'], self['kind'])
             self.name
         except KeyError:
             raise ValueError('delegate is not a valid Kubernetes object')
@@ -100,7 +105,7 @@ class KubernetesObject (collections.abc.Mapping):
 
     @property
     def gvk(self) -> KubernetesGVK:
-        return KubernetesGVK(self['apiVersion'], self['kind'])
+        return self._gvk
 
     @property
     def kind(self) -> str:
@@ -126,12 +131,15 @@ class KubernetesObject (collections.abc.Mapping):
 
     @property
     def key(self) -> KubernetesObjectKey:
-        try:
-            namespace: Optional[str] = self.namespace
-        except AttributeError:
-            namespace = None
+        if self._key is None:
+            try:
+                namespace: Optional[str] = self.namespace
+            except AttributeError:
+                namespace = None
+
+            self._key = KubernetesObjectKey(self.gvk, namespace, self.name)
 
-        return KubernetesObjectKey(self.gvk, namespace, self.name)
+        return self._key
 
     @property
     def scope(self) -> KubernetesObjectScope:
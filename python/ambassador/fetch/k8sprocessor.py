@@ -1,4 +1,4 @@
-from typing import FrozenSet, List, Mapping, Set
+from typing import FrozenSet, List, Mapping, Optional, Set
 
 import collections
 import logging
@@ -16,6 +16,8 @@ class KubernetesProcessor:
     resources.
     """
 
+    _kinds: Optional[FrozenSet[KubernetesGVK]] = None
+
     def kinds(self) -> FrozenSet[KubernetesGVK]:
         # Override kinds to describe the types of resources this processor wants
         # to process.
@@ -42,7 +44,13 @@ class KubernetesProcessor:
         return True
 
     def try_process(self, obj: KubernetesObject) -> bool:
-        if obj.gvk not in self.kinds() or not self._admit(obj):
+        # kinds() is fixed for the life of a processor, but it's not free to
+        # build, and try_process gets called for every object in the snapshot.
+        # Remember it the first time around.
+        if self._kinds is None:
+            self._kinds = self.kinds()
+
+        if obj.gvk not in self._kinds or not self._admit(obj):
             return False
 
         self._process(obj)
@@ -40,13 +40,13 @@ class KnativeIngressProcessor (ManagedKubernetesProcessor):
         # classes.
         ingress_class = annotations.get('networking.knative.dev/ingress.class', self.INGRESS_CLASS)
         if ingress_class.lower() != self.INGRESS_CLASS:
-            self.logger.debug(f'Ignoring Knative {obj.kind} {obj.name}; set networking.knative.dev/ingress.class '
-                              f'annotation to {self.INGRESS_CLASS} for ambassador to parse it.')
+            self.logger.debug('Ignoring Knative %s %s; set networking.knative.dev/ingress.class '
+                              'annotation to %s for ambassador to parse it.', obj.kind, obj.name, self.INGRESS_CLASS)
             return False
 
         # We don't want to deal with non-matching Ambassador IDs
         if obj.ambassador_id != Config.ambassador_id:
-            self.logger.info(f"Knative {obj.kind} {obj.name} does not have Ambassador ID {Config.ambassador_id}, ignoring...")
+            self.logger.info("Knative %s %s does not have Ambassador ID %s, ignoring...", obj.kind, obj.name, Config.ambassador_id)
             return False
 
         return True
@@ -98,7 +98,7 @@ class KnativeIngressProcessor (ManagedKubernetesProcessor):
                 spec=spec,
             )
 
-            self.logger.debug(f"Generated mapping from Knative {obj.kind}: {mapping}")
+            self.logger.debug("Generated mapping from Knative %s: %s", obj.kind, mapping)
             self.manager.emit(mapping)
 
     def _make_status(self, generation: int = 1, lb_domain: Optional[str] = None) -> Dict[str, Any]:
@@ -168,10 +168,10 @@ class KnativeIngressProcessor (ManagedKubernetesProcessor):
 
             if status:
                 status_update = (obj.gvk.domain, obj.namespace, status)
-                self.logger.info(f"Updating Knative {obj.kind} {obj.name} status to {status_update}")
+                self.logger.info("Updating Knative %s %s status to %s", obj.kind, obj.name, status_update)
                 self.aconf.k8s_status_updates[f"{obj.name}.{obj.namespace}"] = status_update
         else:
-            self.logger.debug(f"Not reconciling Knative {obj.kind} {obj.name}: observed and current generations are in sync")
+            self.logger.debug("Not reconciling Knative %s %s: observed and current generations are in sync", obj.kind, obj.name)
 
     def _process(self, obj: KubernetesObject) -> None:
         if not self._has_required_annotations(obj):
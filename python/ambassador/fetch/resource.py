@@ -1,18 +1,25 @@
 from __future__ import annotations
-from typing import Any, Dict, List, Optional
+from typing import Any, ContextManager, Dict, List, Optional, Tuple
 
+import contextlib
 import dataclasses
 import json
 import logging
 
 from ..config import ACResource, Config
-from ..utils import dump_yaml, parse_yaml, dump_json
+from ..utils import Lazy, dump_yaml, parse_yaml, dump_json
 
 from .dependency import DependencyManager
 from .k8sobject import KubernetesObjectScope, KubernetesObject
 from .location import LocationManager
 
 
+# A ResourceIdentity is the (kind, name, namespace) triple that identifies
+# either a Kubernetes object or an Ambassador resource. Namespace is None for
+# cluster-scoped objects.
+ResourceIdentity = Tuple[str, str, Optional[str]]
+
+
 @dataclasses.dataclass
 class NormalizedResource:
     """
@@ -107,6 +114,8 @@ class ResourceManager:
     deps: DependencyManager
     locations: LocationManager
     elements: List[ACResource]
+    provenance: Dict[ResourceIdentity, List[ResourceIdentity]]
+    current_source: Optional[ResourceIdentity]
 
     def __init__(self, logger: logging.Logger, aconf: Config, deps: DependencyManager):
         self.logger = logger
@@ -115,10 +124,37 @@ class ResourceManager:
         self.locations = LocationManager()
         self.elements = []
 
+        # provenance maps each Kubernetes object we've processed to the
+        # Ambassador resources it emitted -- a CRD emits itself, but a Service
+        # or Ingress can emit any number of resources. That's what lets a
+        # watt Delta for one Kubernetes object be turned into cache
+        # invalidations for the resources it produced.
+        self.provenance = {}
+        self.current_source = None
+
     @property
     def location(self) -> str:
         return str(self.locations.current)
 
+    def source(self, obj: KubernetesObject) -> ContextManager[ResourceIdentity]:
+        """
+        Note that everything emitted within this context manager was produced
+        by the Kubernetes object obj.
+        """
+
+        identity: ResourceIdentity = (obj.kind, obj.name, obj.key.namespace)
+        previous = self.current_source
+        self.current_source = identity
+
+        @contextlib.contextmanager
+        def restorer():
+            try:
+                yield identity
+            finally:
+                self.current_source = previous
+
+        return restorer()
+
     def _emit(self, resource: NormalizedResource) -> bool:
         obj = resource.object
         rkey = resource.rkey
@@ -133,7 +169,7 @@ class ResourceManager:
             return True
 
         if not self.aconf.good_ambassador_id(obj):
-            self.logger.debug("%s ignoring object with mismatched ambassador_id" % self.location)
+            self.logger.debug("%s ignoring object with mismatched ambassador_id", self.location)
             return True
 
         if 'kind' not in obj:
@@ -163,15 +199,21 @@ class ResourceManager:
             # them.
             rkey = "%s.%d" % (rkey, self.locations.current.ocount)
 
-        serialization = dump_yaml(obj, default_flow_style=False)
-
         try:
-            r = ACResource.from_dict(rkey, rkey, serialization, obj)
+            # Don't serialize obj here: that's expensive, and it's only needed for
+            # diagnostics. Let the ACResource do it on demand.
+            r = ACResource.from_dict(rkey, rkey, None, obj)
+            r.defer_serialization(obj)
             self.elements.append(r)
+
+            if self.current_source:
+                emitted = self.provenance.setdefault(self.current_source, [])
+                emitted.append((obj['kind'], obj.get('name', ''), obj.get('namespace')))
         except Exception as e:
             self.aconf.post_error(e.args[0])
 
-        self.logger.debug("%s PROCESS %s save %s: %s" % (self.location, obj['kind'], rkey, serialization))
+        self.logger.debug("%s PROCESS %s save %s: %s", self.location, obj['kind'], rkey,
+                          Lazy(dump_yaml, obj, default_flow_style=False))
 
         return True
 
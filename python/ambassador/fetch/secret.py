@@ -45,7 +45,7 @@ class SecretProcessor (ManagedKubernetesProcessor):
     def _process(self, obj: KubernetesObject) -> None:
         secret_type = obj.get('type')
         if secret_type not in self.KNOWN_TYPES:
-            self.logger.debug("ignoring K8s Secret with unknown type %s" % secret_type)
+            self.logger.debug("ignoring K8s Secret with unknown type %s", secret_type)
             return
 
         data = obj.get('data')
@@ -55,7 +55,7 @@ class SecretProcessor (ManagedKubernetesProcessor):
 
         if not any(key in data for key in self.KNOWN_DATA_KEYS):
             # Uh. WTFO?
-            self.logger.debug(f'ignoring K8s Secret {obj.name}.{obj.namespace} with no keys')
+            self.logger.debug('ignoring K8s Secret %s.%s with no keys', obj.name, obj.namespace)
             return
 
         spec = {
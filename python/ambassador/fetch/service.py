@@ -93,12 +93,12 @@ class InternalServiceProcessor (ManagedKubernetesProcessor):
             self.helm_chart = chart_version
 
         if not obj.spec.get('ports'):
-            self.logger.debug(f"not saving Kubernetes Service {obj.name}.{obj.namespace} with no ports")
+            self.logger.debug("not saving Kubernetes Service %s.%s with no ports", obj.name, obj.namespace)
         else:
             self.discovered_services[obj.key] = obj
 
             if self._is_ambassador_service(obj):
-                self.logger.debug(f"Found Ambassador service: {obj.name}")
+                self.logger.debug("Found Ambassador service: %s", obj.name)
                 self.service_dep.ambassador_service = obj
 
         # Although we can't emit this resource immediately, we can handle
@@ -125,7 +125,7 @@ class InternalEndpointsProcessor (ManagedKubernetesProcessor):
     def _process(self, obj: KubernetesObject) -> None:
         resource_subsets = obj.get('subsets')
         if not resource_subsets:
-            self.logger.debug(f"ignoring Kubernetes Endpoints {obj.name}.{obj.namespace} with no subsets")
+            self.logger.debug("ignoring Kubernetes Endpoints %s.%s with no subsets", obj.name, obj.namespace)
             return
 
         # K8s Endpoints resources are _stupid_ in that they give you a vector of
@@ -190,7 +190,7 @@ class InternalEndpointsProcessor (ManagedKubernetesProcessor):
                     port_dict[port_name] = port_number
 
             if not port_dict:
-                self.logger.debug(f"ignoring K8s Endpoints {obj.name}.{obj.namespace} with no routable ports")
+                self.logger.debug("ignoring K8s Endpoints %s.%s with no routable ports", obj.name, obj.namespace)
                 continue
 
             self.discovered_endpoints[obj.key] = Endpoints(addresses, port_dict, obj.labels)
@@ -298,7 +298,7 @@ class ServiceProcessor (ManagedKubernetesProcessor):
 
                 if not k8s_ep:
                     # No endpoints at all, so we're done with this service.
-                    self.logger.debug(f'{key}: no endpoints at all')
+                    self.logger.debug('%s: no endpoints at all', key)
                 else:
                     idx = -1
 
@@ -319,7 +319,7 @@ class ServiceProcessor (ManagedKubernetesProcessor):
                             k8s_target = next(iter(k8s_ep.ports.values()))
                             target_ports[src_port] = k8s_target
 
-                            self.logger.debug(f'{key} port {src_port}: single endpoint port {k8s_target}')
+                            self.logger.debug('%s port %s: single endpoint port %s', key, src_port, k8s_target)
                             continue
 
                         # Hmmm, we need to try to actually map whatever ports are listed for
@@ -342,10 +342,10 @@ class ServiceProcessor (ManagedKubernetesProcessor):
                                 k8s_target = k8s_ep.ports.get(str(port_key), None)
 
                                 if k8s_target:
-                                    self.logger.debug(f'{key} port {src_port} #{idx}: {attr} {port_key} -> {k8s_target}')
+                                    self.logger.debug('%s port %s #%s: %s %s -> %s', key, src_port, idx, attr, port_key, k8s_target)
                                     break
                                 else:
-                                    self.logger.debug(f'{key} port {src_port} #{idx}: {attr} {port_key} -> miss')
+                                    self.logger.debug('%s port %s #%s: %s %s -> miss', key, src_port, idx, attr, port_key)
 
                         if not found_key:
                             # WTFO. This is impossible.
@@ -359,7 +359,7 @@ class ServiceProcessor (ManagedKubernetesProcessor):
                             # It's actually impossible for fallback to be unset, but WTF.
                             k8s_target = fallback or src_port
 
-                            self.logger.debug(f'{key} port {src_port} #{idx}: falling back to {k8s_target}')
+                            self.logger.debug('%s port %s #%s: falling back to %s', key, src_port, idx, k8s_target)
 
                         target_ports[src_port] = k8s_target
 
@@ -376,7 +376,7 @@ class ServiceProcessor (ManagedKubernetesProcessor):
             # OK! If we have no target addresses, just use service routing.
             if not target_addrs:
                 if not self.watch_only:
-                    self.logger.debug(f'{key} falling back to service routing')
+                    self.logger.debug('%s falling back to service routing', key)
                 target_addrs = [key]
 
             for src_port, target_port in target_ports.items():
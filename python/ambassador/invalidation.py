@@ -0,0 +1,201 @@
+# Copyright 2020 Datawire. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License
+
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Set
+
+import logging
+
+from .cache import Cache
+from .fetch.resource import ResourceIdentity
+from .ir.irbasemapping import IRBaseMapping
+
+Provenance = Mapping[ResourceIdentity, List[ResourceIdentity]]
+
+
+class InvalidationPlan:
+    """
+    The result of turning a set of watt Deltas into cache invalidations: either
+    a list of keys to invalidate, or a reason we have to reset the whole cache.
+    """
+
+    def __init__(self) -> None:
+        # Cache keys and dependency keys to invalidate, in order, without duplicates.
+        self.keys: List[str] = []
+
+        # The kinds of all the Deltas we looked at, for ReconfigStats.
+        self.kinds: Set[str] = set()
+
+        # Why we can't do an incremental reconfigure, if we can't.
+        self.reset_reasons: List[str] = []
+
+        self.errors = 0
+
+    @property
+    def reset(self) -> bool:
+        return bool(self.reset_reasons or self.errors)
+
+    def add_key(self, key: str) -> None:
+        if key not in self.keys:
+            self.keys.append(key)
+
+    def force_reset(self, reason: str) -> None:
+        self.reset_reasons.append(reason)
+
+
+class DeltaInvalidator:
+    """
+    DeltaInvalidator turns watt Deltas into cache invalidations, for every kind
+    the ResourceFetcher knows how to handle.
+
+    A Delta names a Kubernetes object. The ResourceFetcher's provenance tells us
+    which Ambassador resources that object emitted (both in the previous snapshot
+    and in the current one, so that deletions and edits are covered), and each of
+    those resources then maps to the cache keys -- or dependency keys, see
+    Cache.depend() -- that have to go.
+
+    Some kinds are never cached and nothing cached depends on them (they're rebuilt
+    for every IR), so they need no invalidation at all. Some kinds (Modules, for
+    example) feed defaults into everything, so they force a reset of the whole cache.
+    """
+
+    # Kinds whose resources are rebuilt for every IR, and which nothing in the cache
+    # depends on.
+    RebuiltKinds = frozenset([
+        'AuthService',
+        'DevPortal',
+        'Listener',
+        'LogService',
+        'TracingService',
+    ])
+
+    # Kinds whose changes could affect anything in the cache.
+    ResetKinds = {
+        'Module': 'Modules set defaults for everything',
+        'IngressClass': 'IngressClasses change which Ingresses are accepted',
+    }
+
+    # Kinds that only matter for what they emit (so the provenance covers them).
+    SourceKinds = frozenset([
+        'Ingress',
+    ])
+
+    # Resolver kinds.
+    ResolverKinds = frozenset([
+        'ConsulResolver',
+        'KubernetesEndpointResolver',
+        'KubernetesServiceResolver',
+    ])
+
+    def __init__(self, logger: logging.Logger) -> None:
+        self.logger = logger
+
+    def known_kind(self, kind: str) -> bool:
+        return ((kind in ('Mapping', 'TCPMapping', 'Host', 'TLSContext', 'Secret',
+                          'Service', 'Endpoints', 'RateLimitService')) or
+                (kind in self.RebuiltKinds) or
+                (kind in self.ResetKinds) or
+                (kind in self.SourceKinds) or
+                (kind in self.ResolverKinds))
+
+    def plan(self, deltas: Iterable[Dict[str, Any]],
+             previous: Provenance, current: Provenance) -> InvalidationPlan:
+        """
+        Build an InvalidationPlan for a set of Deltas.
+
+        :param deltas: the Deltas from the watt snapshot
+        :param previous: the provenance from the ResourceFetcher for the previous snapshot
+        :param current: the provenance from the ResourceFetcher for this snapshot
+        :return: an InvalidationPlan
+        """
+
+        plan = InvalidationPlan()
+
+        for delta in deltas:
+            self.logger.debug(f"Delta: {delta}")
+
+            kind = delta.get('kind')
+            metadata = delta.get('metadata') or {}
+            name = metadata.get('name')
+            namespace = metadata.get('namespace') or None
+
+            if not kind or not isinstance(kind, str) or not name:
+                # This is an error.
+                plan.errors += 1
+                self.logger.error(f"Delta object needs kind and name: {delta}")
+                continue
+
+            plan.kinds.add(kind)
+
+            if not self.known_kind(kind):
+                plan.force_reset(f"unknown kind {kind}")
+                continue
+
+            self.plan_object(plan, kind, name, namespace)
+
+            # Finally, handle everything that this object emitted, in either snapshot.
+            identity: ResourceIdentity = (kind, name, namespace)
+            emitted = list(previous.get(identity, [])) + list(current.get(identity, []))
+
+            for e_kind, e_name, e_namespace in emitted:
+                if (e_kind, e_name, e_namespace) == identity:
+                    # A CRD emits itself, and we've already handled that above.
+                    continue
+
+                self.plan_resource(plan, e_kind, e_name, e_namespace)
+
+        return plan
+
+    def plan_object(self, plan: InvalidationPlan, kind: str, name: str, namespace: Optional[str]) -> None:
+        """
+        Handle the Kubernetes object named by a Delta.
+        """
+
+        if kind in ('Service', 'Endpoints'):
+            # Changing a Service or its Endpoints changes the targets of every cluster
+            # that resolved to it.
+            plan.add_key(Cache.dependency_key('Service', name, namespace))
+        elif kind in self.SourceKinds:
+            # Only what's emitted matters.
+            pass
+        else:
+            self.plan_resource(plan, kind, name, namespace)
+
+    def plan_resource(self, plan: InvalidationPlan, kind: str, name: str, namespace: Optional[str]) -> None:
+        """
+        Handle a single Ambassador resource.
+        """
+
+        if (kind == 'Mapping') or (kind == 'TCPMapping'):
+            if not namespace:
+                plan.errors += 1
+                self.logger.error(f"Delta: {kind} {name} needs a namespace")
+            else:
+                plan.add_key(IRBaseMapping.make_cache_key(kind, name, namespace))
+        elif kind == 'Secret':
+            plan.add_key(Cache.dependency_key('Secret', name, namespace))
+        elif kind == 'TLSContext':
+            plan.add_key(Cache.dependency_key('TLSContext', name))
+        elif kind == 'Host':
+            plan.add_key(Cache.dependency_key('Host', name))
+        elif kind in self.ResolverKinds:
+            plan.add_key(Cache.dependency_key('Resolver', name))
+        elif kind == 'RateLimitService':
+            plan.add_key(Cache.dependency_key('RateLimitService'))
+        elif kind in self.ResetKinds:
+            plan.force_reset(f"{kind} {name}: {self.ResetKinds[kind]}")
+        elif kind in self.RebuiltKinds:
+            # Rebuilt for every IR; nothing to do.
+            pass
+        else:
+            plan.force_reset(f"{kind} {name}: unknown kind")
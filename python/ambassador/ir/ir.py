@@ -11,9 +11,10 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License
-from typing import Any, Callable, Dict, Iterable, List, Optional, Union, ValuesView
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union, ValuesView
 from typing import cast as typecast
 
+import bisect
 import json
 import logging
 import os
@@ -31,6 +32,7 @@ from .irambassador import IRAmbassador
 from .irauth import IRAuth
 from .irfilter import IRFilter
 from .ircluster import IRCluster
+from .irclusternames import ClusterNameMap
 from .irbasemappinggroup import IRBaseMappingGroup
 from .irbasemapping import IRBaseMapping
 from .irhttpmapping import IRHTTPMapping
@@ -78,6 +80,7 @@ class IR:
     ambassador_nodename: str
     aconf: Config
     cache: Cache
+    cluster_names: ClusterNameMap
     clusters: Dict[str, IRCluster]
     agent_active: bool
     agent_service: Optional[str]
@@ -86,10 +89,16 @@ class IR:
     file_checker: IRFileChecker
     filters: List[IRFilter]
     groups: Dict[str, IRBaseMappingGroup]
+    # (group_weight, sequence number, group_id) for every group, in ascending order
+    # of weight -- see ordered_groups().
+    _group_order: List[Tuple[Any, int, str]]
+    _group_order_keys: Dict[str, Tuple[Any, int]]
+    _ordered_groups: Optional[List[IRBaseMappingGroup]]
     grpc_services: Dict[str, IRCluster]
     hosts: Dict[str, IRHost]
     # The key for listeners is "{bindaddr}-{port}" (see IRListener.bind_to())
     listeners: Dict[str, IRListener]
+    log_debug: bool
     log_services: Dict[str, IRLogService]
     ratelimit: Optional[IRRateLimit]
     redirect_cleartext_from: Optional[int]
@@ -109,6 +118,7 @@ class IR:
                  file_checker: Optional[IRFileChecker]=None,
                  logger: Optional[logging.Logger]=None,
                  cache: Optional[Cache]=None,
+                 cluster_names: Optional[ClusterNameMap]=None,
                  watch_only=False) -> None:
         # Initialize the basics...
         self.ambassador_id = Config.ambassador_id
@@ -119,9 +129,18 @@ class IR:
         # ...then make sure we have a logger...
         self.logger = logger or logging.getLogger("ambassador.ir")
 
-        # ...then make sure we have a cache (which might be a NullCache).
+        # Checking the log level for every Mapping adds up, and it can't change partway
+        # through building an IR anyway, so check it once here. Use it to skip work that
+        # exists only to be logged; plain logger.debug calls should just pass their
+        # arguments through (wrapped in utils.Lazy if they're expensive) instead.
+        self.log_debug = self.logger.isEnabledFor(logging.DEBUG)
+
+        # ...then make sure we have a cache (which might be a NullCache)...
         self.cache = cache or NullCache(self.logger)
 
+        # ...and a map of Envoy cluster names (which might not be saved anywhere).
+        self.cluster_names = cluster_names or ClusterNameMap(self.logger)
+
         # We're using setattr since since mypy complains about assigning directly to a method.
         secret_root = os.environ.get('AMBASSADOR_CONFIG_BASE_DIR', "/ambassador")
 
@@ -135,14 +154,14 @@ class IR:
         assert self.secret_handler, "Ambassador.IR requires a SecretHandler at initialization"
 
         self.logger.debug("IR __init__:")
-        self.logger.debug("IR: Version         %s built from %s on %s" % (Version, Build.git.commit, Build.git.branch))
-        self.logger.debug("IR: AMBASSADOR_ID   %s" % self.ambassador_id)
-        self.logger.debug("IR: Namespace       %s" % self.ambassador_namespace)
-        self.logger.debug("IR: Nodename        %s" % self.ambassador_nodename)
-        self.logger.debug("IR: Endpoints       %s" % "enabled" if Config.enable_endpoints else "disabled")
+        self.logger.debug("IR: Version         %s built from %s on %s", Version, Build.git.commit, Build.git.branch)
+        self.logger.debug("IR: AMBASSADOR_ID   %s", self.ambassador_id)
+        self.logger.debug("IR: Namespace       %s", self.ambassador_namespace)
+        self.logger.debug("IR: Nodename        %s", self.ambassador_nodename)
+        self.logger.debug("IR: Endpoints       %s", "enabled" if Config.enable_endpoints else "disabled")
 
-        self.logger.debug("IR: file checker:   %s" % getattr(self, 'file_checker').__name__)
-        self.logger.debug("IR: secret handler: %s" % type(self.secret_handler).__name__)
+        self.logger.debug("IR: file checker:   %s", getattr(self, 'file_checker').__name__)
+        self.logger.debug("IR: secret handler: %s", type(self.secret_handler).__name__)
 
         # First up: save the Config object. Its source map may be necessary later.
         self.aconf = aconf
@@ -165,6 +184,9 @@ class IR:
         self.clusters = {}
         self.filters = []
         self.groups = {}
+        self._group_order = []
+        self._group_order_keys = {}
+        self._ordered_groups = None
         self.grpc_services = {}
         self.hosts = {}
         # self.k8s_status_updates is handled below.
@@ -246,7 +268,7 @@ class IR:
         elif self.edge_stack_allowed:
             _mode_str = 'Edge Stack'
 
-        self.logger.debug(f"IR: {_activity_str} {_mode_str}")
+        self.logger.debug("IR: %s %s", _activity_str, _mode_str)
 
         # Next up, initialize our IRServiceResolvers...
         IRServiceResolverFactory.load_all(self, aconf)
@@ -315,72 +337,30 @@ class IR:
         ListenerFactory.finalize(self, aconf)
 
         # At this point we should know the full set of clusters, so we can generate
-        # appropriate envoy names.
+        # appropriate envoy names. Names that are short enough are used as-is; longer
+        # ones are mangled to a prefix plus a digest of the full name (see
+        # ClusterNameMap). Either way, a cluster's envoy_name doesn't depend on what
+        # other clusters exist, so it's stable across reconfigures, and cached V2 and
+        # V3 clusters built with it stay valid.
         #
-        # Envoy cluster name generation happens in two steps. First, we check every
-        # cluster and set the envoy name to the cluster name if it is short enough.
-        # If it isn't, we group all of the long cluster names by a common prefix
-        # and normalize them later.
+        # We must not modify a cluster's name (nor its rkey, for that matter)
+        # because our object caching implementation depends on stable object
+        # names and keys. If we were to update it, we could lose track of an
+        # existing object and accidentally create a duplicate (tested in
+        # python/tests/test_cache.py test_long_cluster_1).
         #
-        # This ensures that:
-        # - All IRCluster objects have an envoy_name
-        # - All envoy_name fields are valid cluster names, ie: they are short enough
-        collisions: Dict[str, List[str]] = {}
-
-        for name in sorted(self.clusters.keys()):
-            if len(name) > 60:
-                # Too long. Gather this cluster by name prefix and normalize
-                # its name below.
-                short_name = name[0:40]
-
-                cluster = self.clusters[name]
-                self.logger.debug(f"COLLISION: compress {name} to {short_name}")
-
-                collision_list = collisions.setdefault(short_name, [])
-                collision_list.append(name)
-            else:
-                # Short enough, set the envoy name to the cluster name.
-                self.clusters[name]['envoy_name'] = name
-
-        for short_name in sorted(collisions.keys()):
-            name_list = collisions[short_name]
-
-            i = 0
-
-            for name in sorted(name_list):
-                mangled_name = "%s-%d" % (short_name, i)
-                i += 1
-
-                cluster = self.clusters[name]
-                self.logger.debug("COLLISION: mangle %s => %s" % (name, mangled_name))
-
-                # We must not modify a cluster's name (nor its rkey, for that matter)
-                # because our object caching implementation depends on stable object
-                # names and keys. If we were to update it, we could lose track of an
-                # existing object and accidentally create a duplicate (tested in
-                # python/tests/test_cache.py test_long_cluster_1).
-                #
-                # Instead, the resulting IR must set envoy_name to the mangled name, which
-                # is guaranteed to be valid in envoy configuration.
-                #
-                # An important consequence of this choice is that we must never read back
-                # envoy config to create IRCluster config, since the cluster names are
-                # not necessarily the same. This is currently fine, since we never use
-                # envoy config as a source of truth - we leave that to the cluster annotations
-                # and CRDs.
-                #
-                # Another important consideration is that when the cache is active, we need
-                # to shred any cached cluster with this mangled_name, because the mangled_name
-                # can change as new clusters appear! This is obviously not ideal.
-                #
-                # XXX This is doubly a hack because it's duplicating this magic format from
-                # v2cluster.py and v3cluster.py.
-                self.cache.invalidate(f"V2-{cluster.cache_key}")
-                self.cache.invalidate(f"V3-{cluster.cache_key}")
-
-                # OK. Finally, we can update the envoy_name.
-                cluster['envoy_name'] = mangled_name
-                self.logger.debug("COLLISION: envoy_name %s" % cluster['envoy_name'])
+        # Instead, the resulting IR must set envoy_name to the mangled name, which
+        # is guaranteed to be valid in envoy configuration.
+        #
+        # An important consequence of this choice is that we must never read back
+        # envoy config to create IRCluster config, since the cluster names are
+        # not necessarily the same. This is currently fine, since we never use
+        # envoy config as a source of truth - we leave that to the cluster annotations
+        # and CRDs.
+        envoy_names = self.cluster_names.assign(self.clusters.keys())
+
+        for name, cluster in self.clusters.items():
+            cluster['envoy_name'] = envoy_names[name]
 
         # After we have the cluster names fixed up, go finalize filters.
         if self.tracing:
@@ -421,7 +401,7 @@ class IR:
             self.agent_active = False
             return
 
-        self.logger.debug(f"Intercept agent active for {self.agent_service}, initializing")
+        self.logger.debug("Intercept agent active for %s, initializing", self.agent_service)
 
         # We're going to either create a Host to terminate TLS, or to do cleartext. In neither
         # case will we do ACME. Set additionalPort to -1 so we don't grab 8080 in the TLS case.
@@ -460,11 +440,11 @@ class IR:
             host.referenced_by(self.ambassador_module)
             host.sourced_by(self.ambassador_module)
 
-            self.logger.debug(f"Intercept agent: saving host {host}")
+            self.logger.debug("Intercept agent: saving host %s", host)
             # self.logger.debug(host.as_json())
             self.save_host(host)
         else:
-            self.logger.debug(f"Intercept agent: not saving inactive host {host}")
+            self.logger.debug("Intercept agent: not saving inactive host %s", host)
 
         # How about originating TLS?
         agent_origination_secret = os.environ.get("AGENT_TLS_ORIG_SECRET", None)
@@ -480,14 +460,14 @@ class IR:
             ctx.referenced_by(self.ambassador_module)
             self.save_tls_context(ctx)
 
-            self.logger.debug(f"Intercept agent: saving origination TLSContext {ctx.name}")
+            self.logger.debug("Intercept agent: saving origination TLSContext %s", ctx.name)
             # self.logger.debug(ctx.as_json())
 
             self.agent_origination_ctx = ctx
 
     def agent_finalize(self, aconf) -> None:
         if not (self.edge_stack_allowed and self.agent_active):
-            self.logger.debug(f"Intercept agent not active, skipping finalization")
+            self.logger.debug("Intercept agent not active, skipping finalization")
             return
 
         # self.logger.info(f"Intercept agent active for {self.agent_service}, finalizing")
@@ -615,7 +595,7 @@ class IR:
     # Save secrets from our aconf.
     def save_secret_info(self, aconf):
         aconf_secrets = aconf.get_config("secrets") or {}
-        self.logger.debug(f"IR: aconf has secrets: {aconf_secrets.keys()}")
+        self.logger.debug("IR: aconf has secrets: %s", aconf_secrets.keys())
 
         for secret_key, aconf_secret in aconf_secrets.items():
             # Ignore anything that doesn't at least have a public half.
@@ -624,7 +604,7 @@ class IR:
                 secret_name = secret_info.name
                 secret_namespace = secret_info.namespace
 
-                self.logger.debug(f'saving {secret_name}.{secret_namespace} (from {secret_key}) in secret_info')
+                self.logger.debug('saving %s.%s (from %s) in secret_info', secret_name, secret_namespace, secret_key)
                 self.secret_info[f'{secret_name}.{secret_namespace}'] = secret_info
 
     def save_tls_context(self, ctx: IRTLSContext) -> None:
@@ -662,6 +642,13 @@ class IR:
         return self.tls_contexts.values()
 
     def resolve_secret(self, resource: IRResource, secret_name: str, namespace: str):
+        # Whatever we find (or don't find) here, make sure that the resource
+        # asking is invalidated if the secret changes.
+        dependent_key = self.dependency_key_for(resource)
+
+        if dependent_key:
+            self.cache.depend(Cache.dependency_key('Secret', secret_name, namespace), dependent_key)
+
         # OK. Do we already have a SavedSecret for this?
         ss_key = f'{secret_name}.{namespace}'
 
@@ -669,7 +656,7 @@ class IR:
 
         if ss:
             # Done. Return it.
-            self.logger.debug(f"resolve_secret {ss_key}: using cached SavedSecret")
+            self.logger.debug("resolve_secret %s: using cached SavedSecret", ss_key)
             self.secret_handler.still_needed(resource, secret_name, namespace)
             return ss
 
@@ -679,11 +666,11 @@ class IR:
         secret_info = self.secret_info.get(ss_key, None)
 
         if secret_info:
-            self.logger.debug(f"resolve_secret {ss_key}: found secret_info")
+            self.logger.debug("resolve_secret %s: found secret_info", ss_key)
             self.secret_handler.still_needed(resource, secret_name, namespace)
         else:
             # No secret_info, so ask the secret_handler to find us one.
-            self.logger.debug(f"resolve_secret {ss_key}: no secret_info, asking handler to load")
+            self.logger.debug("resolve_secret %s: no secret_info, asking handler to load", ss_key)
             secret_info = self.secret_handler.load_secret(resource, secret_name, namespace)
 
         if not secret_info:
@@ -691,15 +678,30 @@ class IR:
 
             ss = SavedSecret(secret_name, namespace, None, None, None, None, None)
         else:
-            self.logger.debug(f"resolve_secret {ss_key}: found secret, asking handler to cache")
+            self.logger.debug("resolve_secret %s: found secret, asking handler to cache", ss_key)
 
             # OK, we got a secret_info. Cache that using the secret handler.
             ss = self.secret_handler.cache_secret(resource, secret_info)
 
             # Save this for next time.
-            self.saved_secrets[secret_name] = ss
+            self.saved_secrets[ss_key] = ss
         return ss
 
+    @staticmethod
+    def dependency_key_for(resource: IRResource) -> Optional[str]:
+        """
+        Return the cache dependency key for a resource that is rebuilt for
+        every IR (so it's never cached itself) but that cached resources can
+        depend on. Returns None for resources that nothing cached depends on.
+        """
+
+        if isinstance(resource, IRTLSContext):
+            return Cache.dependency_key('TLSContext', resource.name)
+        elif isinstance(resource, IRHost):
+            return Cache.dependency_key('Host', resource.name)
+
+        return None
+
     def resolve_resolver(self, cluster: IRCluster, resolver_name: Optional[str]) -> IRServiceResolver:
         # Which resolver should we use?
         if not resolver_name:
@@ -725,7 +727,7 @@ class IR:
 
         if is_ip_address:
             # Already an IP address, great.
-            self.logger.debug(f'cluster {cluster.name}: {hostname} is already an IP address')
+            self.logger.debug('cluster %s: %s is already an IP address', cluster.name, hostname)
 
             return [
                 {
@@ -742,6 +744,9 @@ class IR:
             self.post_error(f"cluster {cluster.name} has invalid resolver {resolver_name}?", rkey=cluster.rkey)
             return None
 
+        # If the resolver changes, this cluster's targets have to be resolved again.
+        self.cache.depend(Cache.dependency_key('Resolver', resolver.name), cluster.cache_key)
+
         # OK, ask the resolver for the target list. Understanding the mechanics of resolution
         # and the load balancer policy and all that is up to the resolver.
         return resolver.resolve(self, cluster, hostname, namespace, port)
@@ -781,9 +786,9 @@ class IR:
                 group = self.cache_fetch(group_key)
 
                 if group is not None:
-                    self.logger.debug(f"IR: got group from cache for {mapping.name}")
+                    self.logger.debug("IR: got group from cache for %s", mapping.name)
                 else:
-                    self.logger.debug(f"IR: synthesizing group for {mapping.name}")
+                    self.logger.debug("IR: synthesizing group for %s", mapping.name)
                     group_name = "GROUP: %s" % mapping.name
                     group_class = mapping.group_class()
                     group = group_class(ir=self, aconf=aconf,
@@ -800,16 +805,55 @@ class IR:
                 assert(isinstance(group, IRBaseMappingGroup))   # for mypy
                 self.groups[group.group_id] = group
             else:
-                self.logger.debug(f"IR: already have group for {mapping.name}")
+                self.logger.debug("IR: already have group for %s", mapping.name)
                 group = self.groups[mapping.group_id]
                 group.add_mapping(aconf, mapping)
 
+            # Either way, the group might have a new weight.
+            self._order_group(group)
+
             return group
         else:
             return None
 
+    def _order_group(self, group: IRBaseMappingGroup) -> None:
+        """
+        Keep _group_order sorted as groups arrive and their weights change, so that
+        ordered_groups() never has to sort everything. Ties between equal weights
+        go to whichever group arrived first, same as a stable sort of self.groups
+        would do.
+        """
+
+        group_id = group.group_id
+        weight = group.get('group_weight')
+        old_key = self._group_order_keys.get(group_id, None)
+
+        if old_key is not None:
+            if old_key[0] is weight:
+                # Nothing changed.
+                return
+
+            seq = old_key[1]
+            del self._group_order[bisect.bisect_left(self._group_order, old_key)]
+        else:
+            seq = len(self._group_order_keys)
+
+        self._group_order_keys[group_id] = (weight, seq)
+        bisect.insort(self._group_order, (weight, seq, group_id))
+        self._ordered_groups = None
+
     def ordered_groups(self) -> Iterable[IRBaseMappingGroup]:
-        return reversed(sorted(self.groups.values(), key=lambda x: x['group_weight']))
+        """
+        All our groups, heaviest group_weight first. This is called for every
+        listener, route table, and diagnostics pass, so it's kept up to date as
+        groups are added rather than sorted every time; don't modify what it
+        returns.
+        """
+
+        if self._ordered_groups is None:
+            self._ordered_groups = [ self.groups[group_id] for _, _, group_id in reversed(self._group_order) ]
+
+        return self._ordered_groups
 
     def has_cluster(self, name: str) -> bool:
         return name in self.clusters
@@ -819,14 +863,14 @@ class IR:
 
     def add_cluster(self, cluster: IRCluster) -> IRCluster:
         if not self.has_cluster(cluster.name):
-            self.logger.debug("IR: add_cluster: new cluster %s" % cluster.name)
+            self.logger.debug("IR: add_cluster: new cluster %s", cluster.name)
             self.clusters[cluster.name] = cluster
 
             if cluster.is_edge_stack_sidecar():
                 # self.logger.debug(f"IR: cluster {cluster.name} is the sidecar")
                 self.sidecar_cluster_name = cluster.name
 
-        self.logger.debug("IR: add_cluster: extant cluster %s (%s)" % (cluster.name, cluster.get("envoy_name", "-")))
+        self.logger.debug("IR: add_cluster: extant cluster %s (%s)", cluster.name, cluster.get("envoy_name", "-"))
         return self.clusters[cluster.name]
 
     def merge_cluster(self, cluster: IRCluster) -> bool:
@@ -176,12 +176,12 @@ class IRAmbassador (IRResource):
                 to_delete.append(ctx_name)
             elif ctx.get('hosts', None):
                 # This is a termination context
-                self.logger.debug("TLSContext %s is a termination context, enabling TLS termination" % ctx.name)
+                self.logger.debug("TLSContext %s is a termination context, enabling TLS termination", ctx.name)
                 self.service_port = Constants.SERVICE_PORT_HTTPS
 
                 if ctx.get('ca_cert', None):
                     # Client-side TLS is enabled.
-                    self.logger.debug("TLSContext %s enables client certs!" % ctx.name)
+                    self.logger.debug("TLSContext %s enables client certs!", ctx.name)
 
         for ctx_name in to_delete:
             del(ir.tls_contexts[ctx_name])
@@ -455,7 +455,7 @@ class IRAmbassador (IRResource):
 
         domain_info = self.default_labels.get(domain, {})
 
-        self.logger.debug("default_labels info for %s: %s" % (domain, domain_info))
+        self.logger.debug("default_labels info for %s: %s", domain, domain_info)
 
         return domain_info.get('defaults')
 
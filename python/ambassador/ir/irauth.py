@@ -68,8 +68,8 @@ class IRAuth (IRFilter):
         for service, params in cluster_hosts.items():
             weight, grpc, ctx_name, location = params
 
-            self.logger.debug("IRAuth: svc %s, weight %s, grpc %s, ctx_name %s, location %s" %
-                              (service, weight, grpc, ctx_name, location))
+            self.logger.debug("IRAuth: svc %s, weight %s, grpc %s, ctx_name %s, location %s",
+                              service, weight, grpc, ctx_name, location)
 
             cluster = IRCluster(
                 ir=ir, aconf=aconf, parent_ir_resource=self, location=location,
@@ -5,7 +5,7 @@ from typing import Any, ClassVar, Dict, List, Optional, Tuple, Union, TYPE_CHECK
 from urllib.parse import scheme_chars, urlparse
 
 from ..config import Config
-from ..utils import dump_json
+from ..utils import dump_json, lazy_json
 
 from .irresource import IRResource
 from .irutils import hostglob_matches
@@ -66,12 +66,12 @@ def normalize_service_name(ir: 'IR', in_service: str, mapping_namespace: Optiona
     if port:
         out_service += f":{port}"
 
-    ir.logger.debug("%s use_ambassador_namespace_for_service_resolution %s, fully qualified %s, upstream hostname %s" % (
+    ir.logger.debug("%s use_ambassador_namespace_for_service_resolution %s, fully qualified %s, upstream hostname %s",
         resolver_kind,
         ir.ambassador_module.use_ambassador_namespace_for_service_resolution,
         is_qualified,
         out_service
-    ))
+    )
     
     return out_service
 
@@ -138,8 +138,8 @@ class IRBaseMapping (IRResource):
             self.post_error(f'resolver {self.resolver} is unknown!')
             return False
 
-        self.ir.logger.debug("%s: GID %s route_weight %s, resolver %s" %
-                             (self, self.group_id, self.route_weight, resolver))
+        self.ir.logger.debug("%s: GID %s route_weight %s, resolver %s",
+                             self, self.group_id, self.route_weight, resolver)
 
         # And, of course, we can make sure that the resolver thinks that this Mapping is OK.
         if not resolver.valid_mapping(ir, self):
@@ -164,10 +164,10 @@ class IRBaseMapping (IRResource):
         for circuit_breaker in circuit_breakers:
             if '_name' in circuit_breaker:
                 # Already reconciled.
-                ir.logger.debug(f'Breaker validation: good breaker {circuit_breaker["_name"]}')
+                ir.logger.debug('Breaker validation: good breaker %s', circuit_breaker['_name'])
                 continue
 
-            ir.logger.debug(f'Breaker validation: {dump_json(circuit_breakers, pretty=True)}')
+            ir.logger.debug('Breaker validation: %s', lazy_json(circuit_breakers, pretty=True))
 
             name_fields = [ 'cb' ]
 
@@ -194,7 +194,7 @@ class IRBaseMapping (IRResource):
                         return False
 
             circuit_breaker['_name'] = ''.join(name_fields)
-            ir.logger.debug(f'Breaker valid: {circuit_breaker["_name"]}')
+            ir.logger.debug('Breaker valid: %s', circuit_breaker['_name'])
 
         return True
 
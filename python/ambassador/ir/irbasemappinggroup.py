@@ -70,7 +70,7 @@ class IRBaseMappingGroup (IRResource):
                 current_weight += round(mapping.weight)
 
                 # set mapping's new weight to current weight
-                self.logger.debug(f"Assigning weight {current_weight} to mapping {mapping.name}")
+                self.logger.debug("Assigning weight %s to mapping %s", current_weight, mapping.name)
                 mapping.weight = current_weight
 
                 # add this mapping to normalized mappings
@@ -87,7 +87,7 @@ class IRBaseMappingGroup (IRResource):
             remaining_weight = 100 - current_weight
             weight_per_weightless_mapping = round(remaining_weight/num_weightless_mappings)
 
-            self.logger.debug(f"Assigning weight {weight_per_weightless_mapping} of remaining weight {remaining_weight} to each of {num_weightless_mappings} weightless mappings")
+            self.logger.debug("Assigning weight %s of remaining weight %s to each of %s weightless mappings", weight_per_weightless_mapping, remaining_weight, num_weightless_mappings)
 
             # Now, let's add weight to every weightless mapping and push to normalized_mappings
             for i, weightless_mapping in enumerate(weightless_mappings):
@@ -98,7 +98,7 @@ class IRBaseMappingGroup (IRResource):
                 else:
                     current_weight += weight_per_weightless_mapping
 
-                self.logger.debug(f"Assigning weight {current_weight} to weightless mapping {weightless_mapping.name}")
+                self.logger.debug("Assigning weight %s to weightless mapping %s", current_weight, weightless_mapping.name)
                 weightless_mapping['weight'] = current_weight
                 normalized_mappings.append(weightless_mapping)
 
@@ -19,6 +19,7 @@ import json
 import re
 import urllib.parse
 
+from ..cache import Cache
 from ..config import Config
 from ..utils import RichStatus
 
@@ -108,14 +109,14 @@ class IRCluster (IRResource):
                 ir.logger.debug("using null context")
                 ctx = IRTLSContext.null_context(ir=ir)
             else:
-                ir.logger.debug("seeking named context %s" % ctx_name)
+                ir.logger.debug("seeking named context %s", ctx_name)
                 ctx = ir.get_tls_context(typecast(str, ctx_name))
 
             if not ctx:
-                ir.logger.debug("no named context %s" % ctx_name)
+                ir.logger.debug("no named context %s", ctx_name)
                 errors.append("Originate-TLS context %s is not defined" % ctx_name)
             else:
-                ir.logger.debug("found context %s" % ctx)
+                ir.logger.debug("found context %s", ctx)
 
         # TODO: lots of duplication of here, need to replace with broken down functions
 
@@ -163,7 +164,7 @@ class IRCluster (IRResource):
         # Parse the service as a URL. Note that we have to supply a scheme to urllib's
         # parser, because it's kind of stupid.
 
-        ir.logger.debug("cluster setup: service %s otls %s ctx %s" % (service, originate_tls, ctx))
+        ir.logger.debug("cluster setup: service %s otls %s ctx %s", service, originate_tls, ctx)
         p = urllib.parse.urlparse('random://' + service)
 
         # Is there any junk after the host?
@@ -220,7 +221,7 @@ class IRCluster (IRResource):
         if not load_balancer:
             load_balancer = global_load_balancer
 
-        self.logger.debug(f"Load balancer for {url} is {load_balancer}")
+        self.logger.debug("Load balancer for %s is %s", url, load_balancer)
 
         enable_endpoints = False
 
@@ -264,11 +265,11 @@ class IRCluster (IRResource):
 
         if enable_ipv4 is None:
             enable_ipv4 = ir.ambassador_module.enable_ipv4
-            ir.logger.debug("%s: copying enable_ipv4 %s from Ambassador Module" % (name, enable_ipv4))
+            ir.logger.debug("%s: copying enable_ipv4 %s from Ambassador Module", name, enable_ipv4)
 
         if enable_ipv6 is None:
             enable_ipv6 = ir.ambassador_module.enable_ipv6
-            ir.logger.debug("%s: copying enable_ipv6 %s from Ambassador Module" % (name, enable_ipv6))
+            ir.logger.debug("%s: copying enable_ipv6 %s from Ambassador Module", name, enable_ipv6)
 
         new_args: Dict[str, Any] = {
             "type": dns_type,
@@ -301,8 +302,9 @@ class IRCluster (IRResource):
         if rkey == '-override-':
             rkey = name
 
-        # Stash the resolver, hostname, and port for setup.
+        # Stash the resolver, hostname, port, and originating context name for setup.
         self._resolver = resolver
+        self._ctx_name = ctx_name if isinstance(ctx_name, str) else None
         self._hostname = hostname
         self._namespace = namespace
         self._port = port
@@ -327,6 +329,11 @@ class IRCluster (IRResource):
     def setup(self, ir: 'IR', aconf: Config) -> bool:
         self._cache_key = f"Cluster-{self.name}"
 
+        # If we originate TLS with a named context, we need to be rebuilt if that
+        # context changes (whether or not it exists right now).
+        if self._ctx_name:
+            ir.cache.depend(Cache.dependency_key('TLSContext', self._ctx_name), self._cache_key)
+
         if self.ignore_cluster:
             return False
 
@@ -338,7 +345,7 @@ class IRCluster (IRResource):
             self.targets = targets
 
             if not targets:
-                self.ir.logger.debug("accepting cluster with no endpoints: %s" % self.name)
+                self.ir.logger.debug("accepting cluster with no endpoints: %s", self.name)
         else:
             self.post_error("no endpoints found, disabling cluster")
 
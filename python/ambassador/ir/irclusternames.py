@@ -0,0 +1,157 @@
+# Copyright 2021 Datawire. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License
+
+from typing import Dict, Iterable, Optional, Set
+
+import hashlib
+import json
+import logging
+import os
+import threading
+
+
+class ClusterNameMap:
+    """
+    Map IR cluster names to Envoy cluster names.
+
+    Envoy cluster names can be at most MaxLength characters long. Shorter names
+    are used as-is; longer ones are mangled to the first PrefixLength characters
+    of the name, a dash, and a DigestLength-character digest of the whole name.
+    That depends only on the name itself, so adding or removing other clusters
+    never renames a cluster (which would both make Envoy drain its connections
+    and invalidate every cached Envoy cluster that uses it).
+
+    With a 64-bit digest, the chance of two of n long names with the same prefix
+    colliding is about n^2 / 2^65 -- for a million clusters, less than one in ten
+    million. If it does happen (or a mangled name collides with a short name),
+    the later name in sorted order gets a numeric suffix instead. Since that
+    depends on which other names are around, those overrides are remembered,
+    and if we have a path, saved to disk, so that they stay stable across
+    reconfigures and restarts.
+    """
+
+    MaxLength = 60
+    PrefixLength = 40
+    DigestLength = 16
+
+    def __init__(self, logger: logging.Logger, path: Optional[str]=None) -> None:
+        self.logger = logger
+        self.path = path
+        self.lock = threading.Lock()
+
+        # Cluster name -> Envoy name, for every name that couldn't use its default
+        # mangled name.
+        self.overrides: Dict[str, str] = {}
+
+        if self.path:
+            self.load()
+
+    @classmethod
+    def mangle(cls, name: str) -> str:
+        """
+        Return the default Envoy name for a cluster name.
+        """
+
+        if len(name) <= cls.MaxLength:
+            return name
+
+        digest = hashlib.sha256(name.encode("utf-8")).hexdigest()[0:cls.DigestLength]
+
+        return f"{name[0:cls.PrefixLength]}-{digest}"
+
+    def load(self) -> None:
+        if not self.path:
+            return
+
+        try:
+            with open(self.path, "r") as f:
+                overrides = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"ignoring unreadable cluster name map {self.path}: {e}")
+            return
+
+        if isinstance(overrides, dict):
+            self.overrides = { str(k): str(v) for k, v in overrides.items()
+                               if len(str(v)) <= self.MaxLength }
+
+    def save(self) -> None:
+        if not self.path:
+            return
+
+        tmp_path = f"{self.path}.tmp"
+
+        try:
+            with open(tmp_path, "w") as output:
+                json.dump(self.overrides, output, sort_keys=True, indent=2)
+
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            self.logger.warning(f"could not save cluster name map {self.path}: {e}")
+
+    def assign(self, names: Iterable[str]) -> Dict[str, str]:
+        """
+        Return a map from each cluster name in names to its Envoy name. Envoy
+        names are unique, and at most MaxLength characters long.
+        """
+
+        with self.lock:
+            envoy_names: Dict[str, str] = {}
+            taken: Set[str] = set()
+            long_names = []
+
+            # Short names are never changed, so they get first claim on their names.
+            for name in sorted(names):
+                if len(name) <= self.MaxLength:
+                    envoy_names[name] = name
+                    taken.add(name)
+                else:
+                    long_names.append(name)
+
+            changed = False
+
+            # Names that already had to be moved get the next claim, so that they
+            # keep their names; then everything else, in sorted order.
+            long_names.sort(key=lambda name: name not in self.overrides)
+
+            for name in long_names:
+                default_name = self.mangle(name)
+                envoy_name = self.overrides.get(name, default_name)
+
+                if envoy_name in taken:
+                    # Collision! Find the first free suffix.
+                    i = 1
+
+                    while f"{default_name}-{i}" in taken:
+                        i += 1
+
+                    envoy_name = f"{default_name}-{i}"
+
+                    self.logger.warning(f"cluster name {name} collides with another cluster, using {envoy_name}")
+
+                if envoy_name != default_name:
+                    if self.overrides.get(name) != envoy_name:
+                        self.overrides[name] = envoy_name
+                        changed = True
+
+                self.logger.debug("COLLISION: mangle %s => %s", name, envoy_name)
+
+                envoy_names[name] = envoy_name
+                taken.add(envoy_name)
+
+            if changed:
+                self.save()
+
+            return envoy_names
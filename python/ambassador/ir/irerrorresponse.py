@@ -85,7 +85,7 @@ class IRErrorResponse (IRFilter):
         # loaded once on startup, but ideally we'll move away from that limitation.
         self._mappers = self._generate_mappers()
         if self._mappers is not None:
-            ir.logger.debug("IRErrorResponse: loaded mappers %s" % repr(self._mappers))
+            ir.logger.debug("IRErrorResponse: loaded mappers %r", self._mappers)
             if self._referenced_by_obj is not None:
                 self.referenced_by(self._referenced_by_obj)
 
@@ -3,7 +3,8 @@ from typing import Dict, List, Optional, TYPE_CHECKING
 
 import os
 
-from ..utils import SavedSecret, dump_json
+from ..cache import Cache
+from ..utils import Lazy, SavedSecret, dump_json
 from ..config import Config
 from .irresource import IRResource
 from .irtlscontext import IRTLSContext
@@ -54,7 +55,7 @@ class IRHost(IRResource):
         )
 
     def setup(self, ir: 'IR', aconf: Config) -> bool:
-        ir.logger.debug(f"Host {self.name} setting up")
+        ir.logger.debug("Host %s setting up", self.name)
 
         if not self.get('hostname', None):
             self.hostname = '*'
@@ -77,7 +78,7 @@ class IRHost(IRResource):
             tls_name = tls_secret.get('name', None)
 
             if tls_name:
-                ir.logger.debug(f"Host {self.name}: resolving spec.tlsSecret.name: {tls_name}")
+                ir.logger.debug("Host %s: resolving spec.tlsSecret.name: %s", self.name, tls_name)
 
                 tls_ss = self.resolve(ir, tls_name)
 
@@ -88,19 +89,20 @@ class IRHost(IRResource):
                     ctx_name = f"{self.name}-context"
 
                     implicit_tls_exists = ir.has_tls_context(ctx_name)
-                    self.logger.debug(f"Host {self.name}: implicit TLSContext {ctx_name} {'exists' if implicit_tls_exists else 'missing'}")
+                    self.logger.debug("Host %s: implicit TLSContext %s %s", self.name, ctx_name, 'exists' if implicit_tls_exists else 'missing')
 
                     host_tls_context_obj = self.get('tlsContext', {})
                     host_tls_context_name = host_tls_context_obj.get('name', None)
-                    self.logger.debug(f"Host {self.name}: spec.tlsContext: {host_tls_context_name}")
+                    self.logger.debug("Host %s: spec.tlsContext: %s", self.name, host_tls_context_name)
 
                     host_tls_config = self.get('tls', None)
-                    self.logger.debug(f"Host {self.name}: spec.tls: {host_tls_config}")
+                    self.logger.debug("Host %s: spec.tls: %s", self.name, host_tls_config)
 
                     # Choose explicit TLS configuration over implicit TLSContext name
                     if implicit_tls_exists and (host_tls_context_name or host_tls_config):
-                        self.logger.info(f"Host {self.name}: even though TLSContext {ctx_name} exists in the cluster,"
-                                         f"it will be ignored in favor of 'tls'/'tlsConfig' specified in the Host.")
+                        self.logger.info("Host %s: even though TLSContext %s exists in the cluster,"
+                                         "it will be ignored in favor of 'tls'/'tlsConfig' specified in the Host.",
+                                         self.name, ctx_name)
 
                     # Even though this is unlikely because we have a oneOf is proto definitions, but just in case the
                     # objects have a different source :shrug:
@@ -112,14 +114,14 @@ class IRHost(IRResource):
                     if host_tls_context_name:
                         # They named a TLSContext, so try to use that. self.save_context will check the
                         # context to make sure it works for us, and save it if so.
-                        ir.logger.debug(f"Host {self.name}: resolving spec.tlsContext: {host_tls_context_name}")
+                        ir.logger.debug("Host %s: resolving spec.tlsContext: %s", self.name, host_tls_context_name)
 
                         if not self.save_context(ir, host_tls_context_name, tls_ss, tls_name):
                             return False
 
                     elif host_tls_config:
                         # They defined a TLSContext inline, so go set that up if we can.
-                        ir.logger.debug(f"Host {self.name}: examining spec.tls {host_tls_config}")
+                        ir.logger.debug("Host %s: examining spec.tls %s", self.name, host_tls_config)
 
                         camel_snake_map = {
                             'alpnProtocols': 'alpn_protocols',
@@ -185,12 +187,12 @@ class IRHost(IRResource):
                     elif implicit_tls_exists:
                         # They didn't say anything explicitly, but it happens that a context with the
                         # correct name for this Host already exists. Save that, if it works out for us.
-                        ir.logger.debug(f"Host {self.name}: TLSContext {ctx_name} already exists")
+                        ir.logger.debug("Host %s: TLSContext %s already exists", self.name, ctx_name)
 
                         if not self.save_context(ir, ctx_name, tls_ss, tls_name):
                             return False
                     else:
-                        ir.logger.debug(f"Host {self.name}: creating TLSContext {ctx_name}")
+                        ir.logger.debug("Host %s: creating TLSContext %s", self.name, ctx_name)
 
                         new_ctx = dict(
                             rkey=self.rkey,
@@ -266,14 +268,20 @@ class IRHost(IRResource):
                 pkey_name = pkey_secret.get('name', None)
 
                 if pkey_name:
-                    ir.logger.debug(f"Host {self.name}: ACME private key name is {pkey_name}")
+                    ir.logger.debug("Host %s: ACME private key name is %s", self.name, pkey_name)
 
                     pkey_ss = self.resolve(ir, pkey_name)
 
                     if not pkey_ss:
                         ir.logger.error(f"Host {self.name}: continuing with invalid private key secret {pkey_name}")
 
-        ir.logger.debug(f"Host setup OK: {self}")
+        # Anything cached that depends on our TLSContext also depends on us, since
+        # changing the Host can change the context (or replace it outright).
+        if self.context:
+            ir.cache.depend(Cache.dependency_key('Host', self.name),
+                            Cache.dependency_key('TLSContext', self.context.name))
+
+        ir.logger.debug("Host setup OK: %s", self)
         return True
 
     # Check a TLSContext name, and save the linked TLSContext if it'll work for us.
@@ -298,7 +306,7 @@ class IRHost(IRResource):
             # compare the configurations.
             context_ss = self.resolve(ir, secret_name)
 
-            self.logger.debug(f"Host {self.name}, ctx {ctx.name}, secret {secret_name}, resolved {context_ss}")
+            self.logger.debug("Host %s, ctx %s, secret %s, resolved %s", self.name, ctx.name, secret_name, context_ss)
 
             if str(context_ss) != str(tls_ss):
                 self.post_error("Secret info mismatch between Host %s (secret: %s) and TLSContext %s: (secret: %s)" % 
@@ -334,7 +342,7 @@ class IRHost(IRResource):
             # XXX WTF? self.name is not OK as a hostname!
             ctx['hosts'] = [self.hostname or self.name]
 
-        self.logger.debug(f"Host {self.name}, final ctx {ctx.name}: {ctx.as_json()}")
+        self.logger.debug("Host %s, final ctx %s: %s", self.name, ctx.name, Lazy(ctx.as_json))
 
         # All seems good, this context belongs to self now!
         self.context = ctx
@@ -361,20 +369,22 @@ class IRHost(IRResource):
         if group_regex:
             # It matches.
             host_match = True
-            self.logger.info("-- hostname %s group regex => %s", self.hostname, host_match)
+            self.logger.debug("-- hostname %s group regex => %s", self.hostname, host_match)
         else:
             group_glob = group.get('host') or None
 
             if group_glob:
                 host_match = hostglob_matches(self.hostname, group_glob)
-                self.logger.info("-- hostname %s group glob %s => %s", self.hostname, group_glob, host_match)
+                self.logger.debug("-- hostname %s group glob %s => %s", self.hostname, group_glob, host_match)
 
         selector = self.get('selector')
 
         if selector:
             sel_match = selector_matches(self.logger, selector, group.get('metadata_labels', {}))
-            self.logger.info("-- host sel %s group labels %s => %s", 
-                             dump_json(selector), dump_json(group.get('metadata_labels')), sel_match)
+
+            if self.ir.log_debug:
+                self.logger.debug("-- host sel %s group labels %s => %s",
+                                  dump_json(selector), dump_json(group.get('metadata_labels')), sel_match)
 
         return host_match or sel_match
 
@@ -407,7 +417,7 @@ class HostFactory:
 
         if hosts:
             for config in hosts.values():
-                ir.logger.debug("HostFactory: creating host for %s" % repr(config.as_dict()))
+                ir.logger.debug("HostFactory: creating host for %r", Lazy(config.as_dict))
 
                 host = IRHost(ir, aconf, **config)
 
@@ -415,10 +425,10 @@ class HostFactory:
                     host.referenced_by(config)
                     host.sourced_by(config)
 
-                    ir.logger.debug(f"HostFactory: saving host {host}")
+                    ir.logger.debug("HostFactory: saving host %s", host)
                     ir.save_host(host)
                 else:
-                    ir.logger.debug(f"HostFactory: not saving inactive host {host}")
+                    ir.logger.debug("HostFactory: not saving inactive host %s", host)
 
     @classmethod
     def finalize(cls, ir: 'IR', aconf: Config) -> None:
@@ -439,8 +449,8 @@ class HostFactory:
                 found_termination_context = True
                 break
 
-        ir.logger.debug(f"HostFactory: Host count %d, %s TLS termination contexts" %
-                        (host_count, "with" if found_termination_context else "no"))
+        ir.logger.debug("HostFactory: Host count %d, %s TLS termination contexts",
+                        host_count, "with" if found_termination_context else "no")
 
         # OK, do we have any Hosts?
         if host_count == 0:
@@ -468,7 +478,7 @@ class HostFactory:
                     requestPolicy={ "insecure": { "action": "Route" }},
                 )
             else:
-                ir.logger.debug(f"HostFactory: creating TLS-enabled default Host")
+                ir.logger.debug("HostFactory: creating TLS-enabled default Host")
 
                 host = IRHost(ir, aconf,
                     rkey="-internal",
@@ -484,5 +494,5 @@ class HostFactory:
                 host.referenced_by(ir.ambassador_module)
                 host.sourced_by(ir.ambassador_module)
 
-                ir.logger.debug(f"HostFactory: saving host {host}")
+                ir.logger.debug("HostFactory: saving host %s", host)
                 ir.save_host(host)
@@ -0,0 +1,244 @@
+# Copyright 2021 Datawire. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License
+
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, TYPE_CHECKING
+
+import logging
+
+from .irutils import selector_matches
+
+if TYPE_CHECKING:
+    from .irhost import IRHost                          # pragma: no cover
+    from .irhttpmappinggroup import IRHTTPMappingGroup  # pragma: no cover
+
+
+class HostGlobTrie:
+    """
+    A character trie mapping strings to the hosts that registered them. It can
+    answer both "which keys are prefixes of this string?" and "which keys start
+    with this prefix?" in time proportional to the string plus the results.
+
+    Build it over reversed strings to do the same thing for suffixes.
+    """
+
+    def __init__(self) -> None:
+        self.root: Dict[str, Any] = {}
+
+    # Hosts are stored under this key at each node. It can't collide with a
+    # character, since all the other keys have length 1.
+    HOSTS = ''
+
+    def add(self, key: str, host_index: int) -> None:
+        node = self.root
+
+        for c in key:
+            node = node.setdefault(c, {})
+
+        node.setdefault(self.HOSTS, []).append(host_index)
+
+    def prefixes_of(self, value: str) -> List[int]:
+        """
+        Return every host whose key is a prefix of value (including value itself).
+        """
+
+        node = self.root
+        rc: List[int] = list(node.get(self.HOSTS, []))
+
+        for c in value:
+            child = node.get(c)
+
+            if child is None:
+                break
+
+            node = child
+            rc.extend(node.get(self.HOSTS, []))
+
+        return rc
+
+    def extensions_of(self, prefix: str) -> List[int]:
+        """
+        Return every host whose key starts with prefix (including prefix itself).
+        """
+
+        node = self.root
+
+        for c in prefix:
+            child = node.get(c)
+
+            if child is None:
+                return []
+
+            node = child
+
+        rc: List[int] = []
+        worklist = [ node ]
+
+        while worklist:
+            node = worklist.pop()
+
+            for c, child in node.items():
+                if c == self.HOSTS:
+                    rc.extend(child)
+                else:
+                    worklist.append(child)
+
+        return rc
+
+
+class HostMatchIndex:
+    """
+    HostMatchIndex precomputes what IRHost.matches_httpgroup needs, so that the
+    hosts matching a given IRHTTPMappingGroup can be found without checking every
+    host in turn:
+
+    - hostnames without globs are indexed by exact name;
+    - prefix globs ("foo.*") and suffix globs ("*.example.com") go into tries;
+    - hostnames are also indexed in tries, for groups whose own host is a glob;
+    - host selectors go into an inverted index over (label, value) pairs.
+
+    The results are exactly the hosts for which IRHost.matches_httpgroup would
+    return True, in the order the hosts were given. Build a new index whenever
+    the set of hosts changes.
+    """
+
+    def __init__(self, logger: logging.Logger, hosts: Iterable['IRHost']) -> None:
+        self.logger = logger
+        self.hosts: List['IRHost'] = list(hosts)
+
+        # Hosts that match every group with a host glob ("*"), and hosts that
+        # match every group by selector (a selector without matchLabels).
+        self.glob_always: List[int] = []
+        self.selector_always: List[int] = []
+
+        # Exact hostnames. This includes hostnames with a '*' in the middle, which
+        # hostglob_matches treats literally.
+        self.exact: Dict[str, List[int]] = {}
+
+        # Host globs, stored without the '*': "foo.*" becomes "foo." in glob_prefixes,
+        # and "*.example.com" becomes "moc.elpmaxe." in glob_suffixes.
+        self.glob_prefixes = HostGlobTrie()
+        self.glob_suffixes = HostGlobTrie()
+
+        # Non-glob hostnames, for matching groups whose host is a glob. These are
+        # stored forward in plain_names and reversed in plain_names_reversed.
+        self.plain_names = HostGlobTrie()
+        self.plain_names_reversed = HostGlobTrie()
+
+        # Selectors: (label, value) -> hosts whose matchLabels include that pair.
+        self.labels: Dict[Tuple[str, str], List[int]] = {}
+
+        # Selectors we can't index (which should never happen, since labels are
+        # always strings) get checked the slow way.
+        self.selector_fallback: List[int] = []
+
+        for idx, host in enumerate(self.hosts):
+            self._index_hostname(idx, host.hostname)
+            self._index_selector(idx, host.get('selector'))
+
+    def _index_hostname(self, idx: int, hostname: Optional[str]) -> None:
+        # This mirrors the order of the checks in hostglob_matches.
+        if not hostname:
+            return
+
+        if '*' in hostname:
+            if hostname == '*':
+                self.glob_always.append(idx)
+            elif hostname.endswith('*'):
+                self.glob_prefixes.add(hostname[:-1], idx)
+            elif hostname.startswith('*'):
+                self.glob_suffixes.add(hostname[1:][::-1], idx)
+            else:
+                self.exact.setdefault(hostname, []).append(idx)
+        else:
+            self.exact.setdefault(hostname, []).append(idx)
+            self.plain_names.add(hostname, idx)
+            self.plain_names_reversed.add(hostname[::-1], idx)
+
+    def _index_selector(self, idx: int, selector: Optional[Dict[str, Any]]) -> None:
+        if not selector:
+            return
+
+        match = selector.get('matchLabels') or {}
+
+        if not match:
+            # A selector with no matchLabels matches everything.
+            self.selector_always.append(idx)
+            return
+
+        if not all(isinstance(k, str) and isinstance(v, str) for k, v in match.items()):
+            self.selector_fallback.append(idx)
+            return
+
+        for k, v in match.items():
+            self.labels.setdefault((k, v), []).append(idx)
+
+    def _glob_matches(self, group_glob: str) -> Set[int]:
+        matches: Set[int] = set(self.glob_always)
+
+        # Hosts that are globs themselves always compare against the group's glob
+        # literally.
+        matches.update(self.exact.get(group_glob, []))
+        matches.update(self.glob_prefixes.prefixes_of(group_glob))
+        matches.update(self.glob_suffixes.prefixes_of(group_glob[::-1]))
+
+        # Hosts that aren't globs get matched using the group's glob, if it is one.
+        if '*' in group_glob:
+            if group_glob == '*':
+                matches.update(self.plain_names.extensions_of(''))
+            elif group_glob.endswith('*'):
+                matches.update(self.plain_names.extensions_of(group_glob[:-1]))
+            elif group_glob.startswith('*'):
+                matches.update(self.plain_names_reversed.extensions_of(group_glob[1:][::-1]))
+
+        return matches
+
+    def _selector_matches(self, labels: Dict[str, Any]) -> Set[int]:
+        matches: Set[int] = set(self.selector_always)
+
+        if labels:
+            for k, v in labels.items():
+                try:
+                    matches.update(self.labels.get((k, v), []))
+                except TypeError:
+                    # Unhashable label value. It can't match anything in the index.
+                    pass
+
+            for idx in self.selector_fallback:
+                selector: Optional[Dict[str, Any]] = self.hosts[idx].get('selector')
+
+                # Only hosts with a selector end up in the fallback list, but check anyway.
+                if selector is not None and selector_matches(self.logger, selector, labels):
+                    matches.add(idx)
+
+        return matches
+
+    def matching_hosts(self, group: 'IRHTTPMappingGroup') -> List['IRHost']:
+        """
+        Return the hosts that match the given group, in the order they were
+        given to the index.
+        """
+
+        if group.get('host_regex') or False:
+            # A host regex matches every host.
+            return list(self.hosts)
+
+        matches: Set[int] = set()
+        group_glob = group.get('host') or None
+
+        if group_glob:
+            matches.update(self._glob_matches(group_glob))
+
+        matches.update(self._selector_matches(group.get('metadata_labels') or {}))
+
+        return [ self.hosts[idx] for idx in sorted(matches) ]
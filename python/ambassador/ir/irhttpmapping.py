@@ -311,7 +311,7 @@ class IRHTTPMapping (IRBaseMapping):
             resolver_kind = 'KubernetesBogusResolver'
 
         service = normalize_service_name(ir, service, namespace, resolver_kind, rkey=rkey)
-        self.ir.logger.debug(f"Mapping {name} service qualified to {repr(service)}")
+        self.ir.logger.debug("Mapping %s service qualified to %r", name, service)
 
         svc = Service(ir.logger, service)
 
@@ -322,7 +322,7 @@ class IRHTTPMapping (IRBaseMapping):
         # If we _don't_ have an origination context, but our IR has an agent_origination_ctx,
         # force TLS origination because it's the agent. I know, I know. It's a hack.
         if ('tls' not in new_args) and ir.agent_origination_ctx:
-            ir.logger.debug(f"Mapping {name}: Agent forcing origination TLS context to {ir.agent_origination_ctx.name}")
+            ir.logger.debug("Mapping %s: Agent forcing origination TLS context to %s", name, ir.agent_origination_ctx.name)
             new_args['tls'] = ir.agent_origination_ctx.name
 
         if 'query_parameters' in kwargs:
@@ -227,11 +227,15 @@ class IRHTTPMappingGroup (IRBaseMappingGroup):
                 assert(isinstance(cached_cluster, IRCluster))
                 cluster = cached_cluster
 
-                self.ir.logger.debug(f"IRHTTPMappingGroup: got Cluster from cache for {mapping.cluster_key}")
+                self.ir.logger.debug("IRHTTPMappingGroup: got Cluster from cache for %s", mapping.cluster_key)
+
+        synthesized = False
 
         if not cluster:
+            synthesized = True
+
             # OK, we have to actually do some work.
-            self.ir.logger.debug(f"IRHTTPMappingGroup: synthesizing Cluster for {mapping.name}")
+            self.ir.logger.debug("IRHTTPMappingGroup: synthesizing Cluster for %s", mapping.name)
             cluster = IRCluster(ir=self.ir, aconf=self.ir.aconf,
                                 parent_ir_resource=mapping,
                                 location=mapping.location,
@@ -254,8 +258,10 @@ class IRHTTPMappingGroup (IRBaseMappingGroup):
         stored = self.ir.add_cluster(cluster)
         stored.referenced_by(mapping)
 
-        # ...and then check if we just synthesized this cluster.
-        if not mapping.cluster_key:
+        # ...and then check if we just synthesized this cluster. Note that the Mapping
+        # can already have a cluster_key here, if the cluster was invalidated (e.g. by
+        # a dependency changing) while the Mapping itself stayed cached.
+        if synthesized:
             # Yes. The mapping is already in the cache, but we need to cache the cluster...
             self.ir.cache_add(stored)
 
@@ -369,13 +375,13 @@ class IRHTTPMappingGroup (IRBaseMappingGroup):
 
             for domain in labels.keys():
                 defaults = ir.ambassador_module.get_default_labels(domain)
-                ir.logger.debug("%s: defaults %s" % (domain, defaults))
+                ir.logger.debug("%s: defaults %s", domain, defaults)
 
                 if defaults:
-                    ir.logger.debug("%s: labels %s" % (domain, labels[domain]))
+                    ir.logger.debug("%s: labels %s", domain, labels[domain])
 
                     for label in labels[domain]:
-                        ir.logger.debug("%s: label %s" % (domain, label))
+                        ir.logger.debug("%s: label %s", domain, label)
 
                         lkeys = label.keys()
                         if len(lkeys) > 1:
@@ -406,7 +412,7 @@ class IRHTTPMappingGroup (IRBaseMappingGroup):
             for mapping in self.mappings:
                 mapping.cluster = self.add_cluster_for_mapping(mapping, mapping.cluster_tag)
 
-            self.logger.debug(f"Normalizing weights in mappings now...")
+            self.logger.debug("Normalizing weights in mappings now...")
             if not self.normalize_weights_in_mappings():
                 self.post_error(f"Could not normalize mapping weights, ignoring...")
                 return []
@@ -76,7 +76,7 @@ class IRIPAllowDeny(IRFilter):
         self.action = action
         self.principals = []
 
-        ir.logger.debug(f"PRINCIPALS: {principals}")
+        ir.logger.debug("PRINCIPALS: %s", principals)
 
         # principals looks like
         #
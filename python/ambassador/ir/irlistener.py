@@ -4,7 +4,7 @@ import copy
 import json
 
 from ..config import Config
-from ..utils import dump_json
+from ..utils import Lazy, dump_json
 
 from .irhost import IRHost
 from .irresource import IRResource
@@ -73,7 +73,7 @@ class IRListener (IRResource):
                  apiVersion: str="getambassador.io/v2",
                  insecure_only: bool=False,
                  **kwargs) -> None:
-        ir.logger.debug("IRListener __init__ (%s %s %s)" % (kind, name, kwargs))
+        ir.logger.debug("IRListener __init__ (%s %s %s)", kind, name, kwargs)
 
         # A note: we copy hostBinding from kwargs in this loop, but we end up processing
         # and deleting it in setup(). This is arranged this way because __init__ can't
@@ -104,14 +104,14 @@ class IRListener (IRResource):
             # Nope, use the default.
             self.bind_address = Config.envoy_bind_address            
 
-        ir.logger.debug(f"Listener {self.name} setting up on {self.bind_address}:{self.port}")
+        ir.logger.debug("Listener %s setting up on %s:%s", self.name, self.bind_address, self.port)
 
         pstack = self.get("protocolStack", None)
         protocol = self.get("protocol", None)
         securityModel = self.get("securityModel", None)
 
         if pstack:
-            ir.logger.debug(f"Listener {self.name} has pstack {pstack}")
+            ir.logger.debug("Listener %s has pstack %s", self.name, pstack)
             # It's an error to specify both protocol and protocolStack.
             if protocol:
                 self.post_error("protocol and protocolStack may not both be specified; using protocolStack and ignoring protocol")
@@ -129,7 +129,7 @@ class IRListener (IRResource):
                 self.post_error(f"protocol %s is not valid", protocol)
                 return False
             
-            ir.logger.debug(f"Listener {self.name} forcing pstack {';'.join(pstack)}")
+            ir.logger.debug("Listener %s forcing pstack %s", self.name, ';'.join(pstack))
             self.protocolStack = pstack
         
         if not securityModel:
@@ -265,7 +265,7 @@ class ListenerFactory:
 
         if listeners:
             for config in listeners.values():
-                ir.logger.debug("ListenerFactory: creating Listener for %s" % repr(config.as_dict()))
+                ir.logger.debug("ListenerFactory: creating Listener for %r", Lazy(config.as_dict))
 
                 listener = IRListener(ir, aconf, **config)
 
@@ -273,10 +273,10 @@ class ListenerFactory:
                     listener.referenced_by(config)
                     listener.sourced_by(config)
 
-                    ir.logger.debug(f"ListenerFactory: saving Listener {listener}")
+                    ir.logger.debug("ListenerFactory: saving Listener %s", listener)
                     ir.save_listener(listener)
                 else:
-                    ir.logger.debug(f"ListenerFactory: not saving inactive Listener {listener}")
+                    ir.logger.debug("ListenerFactory: not saving inactive Listener %s", listener)
 
     @classmethod
     def finalize(cls, ir: 'IR', aconf: Config) -> None:
@@ -388,8 +388,8 @@ class ListenerFactory:
                 bind_address = group.get('address') or Config.envoy_bind_address
                 name = f"listener-{bind_address}-{group.port}"
 
-                ir.logger.debug("ListenerFactory: synthesizing %s listener for TCPMappingGroup on %s:%d" %
-                                (protocol, bind_address, group.port))
+                ir.logger.debug("ListenerFactory: synthesizing %s listener for TCPMappingGroup on %s:%d",
+                                protocol, bind_address, group.port)
 
                 # The securityModel of a TCP listener is kind of a no-op at this point. We'll set it
                 # to SECURE because that seems more rational than anything else. I guess.
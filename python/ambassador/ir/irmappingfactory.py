@@ -51,7 +51,7 @@ class MappingFactory:
 
             if cached_mapping is None:
                 # Cache miss: synthesize a new Mapping.
-                ir.logger.debug(f"IR: synthesizing Mapping for {config.name}")
+                ir.logger.debug("IR: synthesizing Mapping for %s", config.name)
                 mapping = mapping_class(ir, aconf, **config)
             else:
                 # Cache hit. We know a priori that anything in the cache under a Mapping
@@ -59,7 +59,7 @@ class MappingFactory:
                 assert(isinstance(cached_mapping, IRBaseMapping))
                 mapping = cached_mapping
                
-            ir.logger.debug(f"IR: adding Mapping for {config.name}")
+            ir.logger.debug("IR: adding Mapping for %s", config.name)
             ir.add_mapping(aconf, mapping)
 
     @classmethod
@@ -46,7 +46,7 @@ class IRRateLimit (IRFilter):
                                                  module=config))
             return False
 
-        ir.logger.debug("IRRateLimit: ratelimit using service %s" % service)
+        ir.logger.debug("IRRateLimit: ratelimit using service %s", service)
 
         # OK, we have a valid config.
 
@@ -14,8 +14,18 @@ if TYPE_CHECKING:
 class IRResource (Resource):
     """
     A resource within the IR.
+
+    Every IRResource needs its IR and its logger, but neither is part of the
+    resource itself, so they're kept in slots rather than as dictionary
+    elements: that keeps them out of every copy of the dictionary, and reading
+    them doesn't have to go through __getattr__.
     """
 
+    __slots__ = ( 'ir', 'logger' )
+
+    ir: 'IR'
+    logger: logging.Logger
+
     @staticmethod
     def helper_sort_keys(res: 'IRResource', k: str) -> Tuple[str, List[str]]:
         return k, list(sorted(res[k].keys()))
@@ -62,7 +72,6 @@ class IRResource (Resource):
 
         self._errored = False
 
-        self.__as_dict_helpers = IRResource.__as_dict_helpers
         self.add_dict_helper("_errors", IRResource.helper_list)
         self.add_dict_helper("_referenced_by", IRResource.helper_sort_keys)
         self.add_dict_helper("rkey", IRResource.helper_rkey)
@@ -76,6 +85,12 @@ class IRResource (Resource):
         # ...before we override it with the setup results.
         self.set_active(self.setup(ir, aconf))
 
+    def __setattr__(self, key: str, value: Any) -> None:
+        if (key == 'ir') or (key == 'logger'):
+            object.__setattr__(self, key, value)
+        else:
+            self[key] = value
+
     # XXX WTFO, I hear you cry. Why is this "type: ignore here?" So here's the deal:
     # mypy doesn't like it if you override just the getter of a property that has a
     # setter, too, and I cannot figure out how else to shut it up.
@@ -9,8 +9,9 @@ from ipaddress import ip_address
 
 from multi import multi
 
+from ..cache import Cache
 from ..config import Config
-from ..utils import RichStatus
+from ..utils import Lazy, RichStatus
 
 from .irresource import IRResource
 from .irtlscontext import IRTLSContext
@@ -131,6 +132,11 @@ class IRServiceResolver(IRResource):
     @resolve.when("KubernetesEndpointResolver")
     def _k8s_resolver(self, ir: 'IR', cluster: 'IRCluster', svc_name: str, svc_namespace: str, port: int) -> Optional[SvcEndpointSet]:
         svc, namespace = self.parse_service(ir, svc_name, svc_namespace)
+
+        # The targets we find here come from the Service and its Endpoints, so
+        # if either of those changes, this cluster needs to be resolved again.
+        ir.cache.depend(Cache.dependency_key('Service', svc, namespace), cluster.cache_key)
+
         # Find endpoints, and try for a port match!
         return self.get_endpoints(ir, f'k8s-{svc}-{namespace}', port)
 
@@ -149,7 +155,7 @@ class IRServiceResolver(IRResource):
             (svc, namespace) = svc.split(".", 2)[0:2]
         elif not ir.ambassador_module.use_ambassador_namespace_for_service_resolution and svc_namespace:
             namespace = svc_namespace
-            ir.logger.debug("KubernetesEndpointResolver use_ambassador_namespace_for_service_resolution %s, upstream key %s" % (ir.ambassador_module.use_ambassador_namespace_for_service_resolution, f'{svc}-{namespace}'))
+            ir.logger.debug("KubernetesEndpointResolver use_ambassador_namespace_for_service_resolution %s, upstream key %s", ir.ambassador_module.use_ambassador_namespace_for_service_resolution, f'{svc}-{namespace}')
 
         return svc, namespace
 
@@ -166,15 +172,15 @@ class IRServiceResolver(IRResource):
         service = ir.services.get(key)
 
         if not service:
-            self.logger.debug(f'Resolver {self.name}: {key} matches no Service for endpoints')
+            self.logger.debug('Resolver %s: %s matches no Service for endpoints', self.name, key)
             return None
 
-        self.logger.debug(f'Resolver {self.name}: {key} matches %s' % service.as_json())
+        self.logger.debug('Resolver %s: %s matches %s', self.name, key, Lazy(service.as_json))
 
         endpoints = service.get('endpoints')
 
         if not endpoints:
-            self.logger.debug(f'Resolver {self.name}: {key} has no endpoints')
+            self.logger.debug('Resolver %s: %s has no endpoints', self.name, key)
             return None
 
         # Do we have a match for the port they're asking for (y'know, if they're asking for one)?
@@ -185,7 +191,7 @@ class IRServiceResolver(IRResource):
             # Yes!
             tstr = ", ".join([ f'{x["ip"]}:{x["port"]}' for x in targets ])
 
-            self.logger.debug(f'Resolver {self.name}: {key}:{port} matches {tstr}')
+            self.logger.debug('Resolver %s: %s:%s matches %s', self.name, key, port, tstr)
 
             return targets
         else:
@@ -71,7 +71,7 @@ class IRTCPMapping (IRBaseMapping):
             resolver_kind = 'KubernetesBogusResolver'
 
         service = normalize_service_name(ir, service, namespace, resolver_kind, rkey=rkey)
-        ir.logger.debug(f"TCPMapping {name} service normalized to {repr(service)}")
+        ir.logger.debug("TCPMapping %s service normalized to %r", name, service)
 
         # ...and then init the superclass.
         super().__init__(
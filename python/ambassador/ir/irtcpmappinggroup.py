@@ -1,4 +1,4 @@
-from ambassador.utils import RichStatus
+from ambassador.utils import Lazy, RichStatus
 from typing import Any, ClassVar, Dict, List, Optional, Tuple, Union, TYPE_CHECKING
 from typing import cast as typecast
 
@@ -98,7 +98,7 @@ class IRTCPMappingGroup (IRBaseMappingGroup):
         self.mappings.append(mapping)
 
         if mapping.route_weight > self.group_weight:
-            self.group_weight = mapping.group_weight
+            self.group_weight = mapping.route_weight
 
         self.referenced_by(mapping)
 
@@ -123,9 +123,13 @@ class IRTCPMappingGroup (IRBaseMappingGroup):
                 assert(isinstance(cached_cluster, IRCluster))
                 cluster = cached_cluster
 
-                self.ir.logger.debug(f"IRTCPMappingGroup: got Cluster from cache for {mapping.cluster_key}")
+                self.ir.logger.debug("IRTCPMappingGroup: got Cluster from cache for %s", mapping.cluster_key)
+
+        synthesized = False
 
         if not cluster:
+            synthesized = True
+
             # Find or create the cluster for this Mapping...
             cluster = IRCluster(ir=self.ir, aconf=self.ir.aconf, parent_ir_resource=mapping,
                                 location=mapping.location,
@@ -143,8 +147,10 @@ class IRTCPMappingGroup (IRBaseMappingGroup):
         stored = self.ir.add_cluster(cluster)
         stored.referenced_by(mapping)
 
-        # ...and then check if we just synthesized this cluster.
-        if not mapping.cluster_key:
+        # ...and then check if we just synthesized this cluster. Note that the Mapping
+        # can already have a cluster_key here, if the cluster was invalidated (e.g. by
+        # a dependency changing) while the Mapping itself stayed cached.
+        if synthesized:
             # Yes. The mapping is already in the cache, but we need to cache the cluster...
             self.ir.cache_add(stored)
 
@@ -180,7 +186,7 @@ class IRTCPMappingGroup (IRBaseMappingGroup):
         metadata_labels: Dict[str, str] = {}
 
         for mapping in sorted(self.mappings, key=lambda m: m.route_weight):
-            self.ir.logger.debug("%s mapping %s" % (self, mapping.as_json()))
+            self.ir.logger.debug("%s mapping %s", self, Lazy(mapping.as_json))
 
             for k in mapping.keys():
                 if k.startswith('_') or mapping.skip_key(k) or (k in IRTCPMappingGroup.DoNotFlattenKeys):
@@ -251,7 +257,7 @@ class IRTCPMappingGroup (IRBaseMappingGroup):
         for mapping in self.mappings:
             mapping.cluster = self.add_cluster_for_mapping(mapping, mapping.cluster_tag)
 
-        self.logger.debug(f"Normalizing weights in mappings now...")
+        self.logger.debug("Normalizing weights in mappings now...")
         if not self.normalize_weights_in_mappings():
             self.post_error(f"Could not normalize mapping weights, ignoring...")
             return []
@@ -17,7 +17,7 @@ from typing import ClassVar, TYPE_CHECKING
 from ..config import Config
 from .irresource import IRResource as IRResource
 from .irtlscontext import IRTLSContext
-from ambassador.utils import RichStatus
+from ambassador.utils import Lazy, RichStatus
 
 if TYPE_CHECKING:
     from .ir import IR # pragma: no cover
@@ -49,7 +49,7 @@ class IRAmbassadorTLS (IRResource):
         Initialize an IRAmbassadorTLS from the raw fields of its Resource.
         """
 
-        ir.logger.debug("IRAmbassadorTLS __init__ (%s %s %s)" % (kind, name, kwargs))
+        ir.logger.debug("IRAmbassadorTLS __init__ (%s %s %s)", kind, name, kwargs)
 
         super().__init__(
             ir=ir, aconf=aconf, rkey=rkey, kind=kind, name=name,
@@ -83,7 +83,7 @@ class TLSModuleFactory:
                                             location=new_location,
                                             **new_args)
 
-            ir.logger.debug("TLSModuleFactory saved TLS module: %s" % ir.tls_module.as_json())
+            ir.logger.debug("TLSModuleFactory saved TLS module: %s", Lazy(ir.tls_module.as_json))
 
         # Next, a TLS module in the Ambassador module overrides any other TLS Module.
         amod = aconf.get_module("ambassador")
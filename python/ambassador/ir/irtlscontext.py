@@ -4,7 +4,7 @@ import base64
 import logging
 import os
 
-from ..utils import SavedSecret
+from ..utils import Lazy, SavedSecret
 from ..config import Config
 from .irresource import IRResource
 
@@ -138,7 +138,7 @@ class IRTLSContext(IRResource):
             if key in self:
                 self.secret_info[key] = self.pop(key)
 
-        ir.logger.debug(f"IRTLSContext setup good: {self.pretty()}")
+        ir.logger.debug("IRTLSContext setup good: %s", Lazy(self.pretty))
 
         return True
 
@@ -156,7 +156,7 @@ class IRTLSContext(IRResource):
         secret_namespacing = self.lookup('secret_namespacing', True,
                                          default_key='tls_secret_namespacing')
 
-        self.ir.logger.debug(f"TLSContext.resolve_secret {secret_name}, namespace {namespace}: namespacing is {secret_namespacing}")
+        self.ir.logger.debug("TLSContext.resolve_secret %s, namespace %s: namespacing is %s", secret_name, namespace, secret_namespacing)
 
         if "." in secret_name and secret_namespacing:
             secret_name, namespace = secret_name.rsplit('.', 1)
@@ -180,7 +180,7 @@ class IRTLSContext(IRResource):
         if not self.secret_info:
             self.post_error("TLSContext %s has no certificate information at all?" % self.name, log_level=logging.DEBUG)
 
-        self.ir.logger.debug("resolve_secrets working on: %s" % self.as_json())
+        self.ir.logger.debug("resolve_secrets working on: %s", Lazy(self.as_json))
 
         # OK. Do we have a secret name?
         secret_name = self.secret_info.get('secret')
@@ -192,7 +192,7 @@ class IRTLSContext(IRResource):
             # if we found no cert though.
             ss = self.resolve_secret(secret_name)
 
-            self.ir.logger.debug("resolve_secrets: IR returned secret %s as %s" % (secret_name, ss))
+            self.ir.logger.debug("resolve_secrets: IR returned secret %s as %s", secret_name, ss)
 
             if not ss:
                 # This is definitively an error: they mentioned a secret, it can't be loaded,
@@ -207,7 +207,7 @@ class IRTLSContext(IRResource):
                     return False
 
                 # So far, so good.
-                self.ir.logger.debug("TLSContext %s saved secret %s" % (self.name, ss.name))
+                self.ir.logger.debug("TLSContext %s saved secret %s", self.name, ss.name)
 
                 # Update paths for this cert.
                 self.secret_info['cert_chain_file'] = ss.cert_path
@@ -216,7 +216,7 @@ class IRTLSContext(IRResource):
                 if ss.root_cert_path:
                     self.secret_info['cacert_chain_file'] = ss.root_cert_path
 
-        self.ir.logger.debug("TLSContext - successfully processed the cert_chain_file, private_key_file, and cacert_chain_file: %s" % self.secret_info)
+        self.ir.logger.debug("TLSContext - successfully processed the cert_chain_file, private_key_file, and cacert_chain_file: %s", self.secret_info)
 
         # OK. Repeat for the ca_secret_name.
         ca_secret_name = self.secret_info.get('ca_secret')
@@ -232,7 +232,7 @@ class IRTLSContext(IRResource):
             # They gave a secret name for the validation cert. Try loading it.
             ss = self.resolve_secret(ca_secret_name)
 
-            self.ir.logger.debug("resolve_secrets: IR returned secret %s as %s" % (ca_secret_name, ss))
+            self.ir.logger.debug("resolve_secrets: IR returned secret %s as %s", ca_secret_name, ss)
 
             if not ss:
                 # This is definitively an error: they mentioned a secret, it can't be loaded,
@@ -242,7 +242,7 @@ class IRTLSContext(IRResource):
             else:
                 # Validation certs don't need the private key, but it's not an error if they gave
                 # one. We're good to go here.
-                self.ir.logger.debug("TLSContext %s saved CA secret %s" % (self.name, ss.name))
+                self.ir.logger.debug("TLSContext %s saved CA secret %s", self.name, ss.name)
                 self.secret_info['cacert_chain_file'] = ss.cert_path
 
                 # While we're here, did they set cert_required _in the secret_?
@@ -117,5 +117,5 @@ class IRTracing(IRResource):
         self.cluster = cluster
 
     def finalize(self):
-        self.ir.logger.debug("tracing cluster envoy name: %s" % self.cluster.envoy_name)
+        self.ir.logger.debug("tracing cluster envoy name: %s", self.cluster.envoy_name)
         self.driver_config['collector_cluster'] = self.cluster.envoy_name
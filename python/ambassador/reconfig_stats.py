@@ -14,7 +14,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License
 
-from typing import List, Optional, Tuple
+from typing import Dict, Iterable, List, Optional, Tuple
 
 import datetime
 import logging
@@ -60,6 +60,11 @@ class ReconfigStats:
             "complete": 0
         }
 
+        # self.kind_counts tracks the same thing per resource kind: every kind
+        # that showed up in the deltas for a reconfigure gets counted, so that we
+        # can see which kinds are (or aren't) being handled incrementally.
+        self.kind_counts: Dict[str, Dict[str, int]] = {}
+
         # In many cases, the previous complete reconfigure will have fallen out
         # of self.reconfigures, so we remember its timestamp separately.
         self.last_complete: Optional[PerfCounter] = None
@@ -84,7 +89,15 @@ class ReconfigStats:
         self.checks = 0
         self.errors = 0
 
-    def mark(self, what: str, when: Optional[PerfCounter]=None) -> None:
+        # self.validation_hits and self.validation_misses count how many times
+        # the Envoy validation cache let us skip validation (or didn't), and
+        # self.validation_time_saved is how many seconds of validation we skipped.
+        self.validation_hits = 0
+        self.validation_misses = 0
+        self.validation_time_saved = 0.0
+
+    def mark(self, what: str, when: Optional[PerfCounter]=None,
+             kinds: Optional[Iterable[str]]=None) -> None:
         """
         Mark that a reconfigure has occurred. The 'what' parameter is one of
         "complete" for a complete reconfigure, "incremental" for an incremental,
@@ -93,6 +106,7 @@ class ReconfigStats:
 
         :param what: "complete", "incremental", or "diag".
         :param when: The time at which this occurred. Can be None, meaning "now".
+        :param kinds: The resource kinds that changed for this reconfigure, if known.
         """
 
         if not when:
@@ -139,10 +153,35 @@ class ReconfigStats:
             if len(self.reconfigures) > 10:
                 self.reconfigures.pop(0)
 
+            for kind in (kinds or []):
+                kind_count = self.kind_counts.setdefault(kind, { "incremental": 0, "complete": 0 })
+                kind_count[what] += 1
+
         # In all cases, update the number of outstanding configurations. This will
         # trigger timer logging for diagnostics updates.
         self.configs_outstanding += 1
 
+    def incremental_ratio(self, kind: Optional[str]=None) -> Optional[float]:
+        """
+        Return the fraction of reconfigures that were incremental, either overall
+        or for reconfigures where the given kind changed.
+
+        :param kind: The resource kind to look at. None means all reconfigures.
+        :return: The ratio, or None if there have been no reconfigures to look at.
+        """
+
+        counts = self.counts if kind is None else self.kind_counts.get(kind)
+
+        if not counts:
+            return None
+
+        total = counts["incremental"] + counts["complete"]
+
+        if total == 0:
+            return None
+
+        return counts["incremental"] / total
+
     def needs_check(self, when: Optional[PerfCounter]=None) -> bool:
         """
         Determine if we need to do a complete reconfigure to doublecheck our
@@ -250,18 +289,26 @@ class ReconfigStats:
         # self.logger.debug(f"NEEDS_TIMERS @ {when}: delta {delta}, skip")
         return False
 
-    def mark_checked(self, result: bool, when: Optional[PerfCounter]=None) -> None:
+    def mark_checked(self, result: bool, when: Optional[PerfCounter]=None,
+                     covered: Optional[int]=None) -> None:
         """
         Mark that we have done a check, and note the results. This resets our
         outstanding incrementals to 0, and also resets our last check time.
 
         :param result: True if the check was good, False if not
         :param when: Override the effective time. Primarily useful for testing.
+        :param covered: How many outstanding incrementals the check covered, if the
+                        check ran in the background and more may have happened since
+                        it started. Those stay outstanding.
         """
 
         self.logger.debug(f"MARK_CHECKED @ {when}: {result}")
 
-        self.incrementals_outstanding = 0
+        if covered is None:
+            self.incrementals_outstanding = 0
+        else:
+            self.incrementals_outstanding = max(0, self.incrementals_outstanding - covered)
+
         self.checks += 1
 
         if not result:
@@ -282,6 +329,34 @@ class ReconfigStats:
         self.configs_outstanding = 0
         self.last_timer_log = when or time.perf_counter()
 
+    def mark_validation(self, hit: bool, duration: float) -> None:
+        """
+        Mark that we've looked up an Envoy configuration in the validation cache.
+
+        :param hit: True if the configuration was already validated, False if not
+        :param duration: On a hit, the time the original validation took (which is
+                         the time we saved); on a miss, the time the validation took
+        """
+
+        if hit:
+            self.validation_hits += 1
+            self.validation_time_saved += duration
+        else:
+            self.validation_misses += 1
+
+    def validation_hit_rate(self) -> Optional[float]:
+        """
+        Return the fraction of validation-cache lookups that were hits, or None
+        if there haven't been any lookups.
+        """
+
+        total = self.validation_hits + self.validation_misses
+
+        if total == 0:
+            return None
+
+        return self.validation_hits / total
+
     @staticmethod
     def isofmt(when: Optional[PerfCounter], now_pc: PerfCounter, now_dt: datetime.datetime) -> str:
         if not when:
@@ -302,8 +377,13 @@ class ReconfigStats:
         for what in [ "incremental", "complete" ]:
             self.logger.info(f"CACHE: {what} count: {self.counts[what]}")
         
+        for kind in sorted(self.kind_counts.keys()):
+            kind_count = self.kind_counts[kind]
+            self.logger.info(f"CACHE: {kind} incremental {kind_count['incremental']}, complete {kind_count['complete']}, ratio {self.incremental_ratio(kind):.2f}")
+
         self.logger.info(f"CACHE: incrementals outstanding: {self.incrementals_outstanding}")
         self.logger.info(f"CACHE: incremental checks: {self.checks}, errors {self.errors}")
+        self.logger.info(f"CACHE: validation hits {self.validation_hits}, misses {self.validation_misses}, saved {self.validation_time_saved:.3f}s")
         self.logger.info(f"CACHE: last_complete {self.isofmt(self.last_complete, now_pc, now_dt)}")
         self.logger.info(f"CACHE: last_check {self.isofmt(self.last_check, now_pc, now_dt)}")
 
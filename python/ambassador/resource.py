@@ -4,7 +4,7 @@ from typing import Any, Dict, List, Optional, Type, TypeVar
 
 import json
 
-from .utils import parse_yaml, dump_json
+from .utils import parse_yaml, dump_json, dump_yaml
 from .cache import Cacheable
 
 
@@ -31,7 +31,8 @@ class Resource (Cacheable):
 
     - serialization (keyword-only) is the _original input serialization_, if we have
     it, of the object. If we don't have it, this should be None -- don't just serialize
-    the object to no purpose.
+    the object to no purpose. If all we have is the original input _object_, use
+    defer_serialization() to have it serialized only if someone asks for it.
 
     - any additional keyword arguments are saved in the Resource.
 
@@ -45,7 +46,6 @@ class Resource (Cacheable):
     rkey: str
     location: str
     kind: str
-    serialization: Optional[str]
 
     # _errors: List[RichStatus]
     _errored: bool
@@ -64,12 +64,62 @@ class Resource (Cacheable):
 
         # print("Resource __init__ (%s %s)" % (kind, name))
 
+        # Note that _referenced_by is only created when something actually references
+        # this Resource: most never are, and an empty dict per Resource adds up.
         super().__init__(rkey=rkey, location=location,
                          kind=kind, serialization=serialization,
                          # _errors=[],
-                         _referenced_by={},
                          **kwargs)
 
+    @property
+    def serialization(self) -> Optional[str]:
+        """
+        The original input serialization of this Resource, if we have one. If
+        defer_serialization() was used, the serialization is generated from the
+        original input object the first time anyone asks for it, and remembered.
+        """
+
+        serialization = self.get('serialization', None)
+
+        if serialization is None:
+            source = self.__dict__.pop('_serialization_source', None)
+
+            if source is not None:
+                serialization = dump_yaml(source, default_flow_style=False)
+                self['serialization'] = serialization
+
+        return serialization
+
+    def defer_serialization(self, source: Dict[str, Any]) -> None:
+        """
+        Remember the original input object for this Resource, so that its
+        serialization can be generated lazily. Serializing every input object up
+        front is surprisingly expensive, and only Diagnostics and the CLI dumps
+        ever look at it.
+
+        The source object must not be modified after this call.
+        """
+
+        # This is deliberately an instance attribute rather than a dict element
+        # (which is what __setattr__ would give us), so that it never shows up in
+        # as_dict() or gets copied around with the rest of the Resource.
+        self.__dict__['_serialization_source'] = source
+
+    def has_serialization(self) -> bool:
+        """
+        Check whether this Resource has a serialization, without generating it.
+        """
+
+        return bool(self.get('serialization', None)) or ('_serialization_source' in self.__dict__)
+
+    def serialization_source(self) -> Optional[Dict[str, Any]]:
+        """
+        Return the original input object given to defer_serialization(), if the
+        serialization hasn't been generated from it yet.
+        """
+
+        return self.__dict__.get('_serialization_source', None)
+
     def sourced_by(self, other: 'Resource'):
         self.rkey = other.rkey
         self.location = other.location
@@ -77,10 +127,10 @@ class Resource (Cacheable):
 
     def referenced_by(self, other: 'Resource') -> None:
         # print("%s %s REF BY %s %s" % (self.kind, self.name, other.kind, other.rkey))
-        self._referenced_by[other.location] = other
+        self.setdefault('_referenced_by', {})[other.location] = other
 
     def is_referenced_by(self, other_location) -> Optional['Resource']:
-        return self._referenced_by.get(other_location, None)
+        return self.get('_referenced_by', {}).get(other_location, None)
 
     def __getattr__(self, key: str) -> Any:
         try:
@@ -143,11 +193,17 @@ class Resource (Cacheable):
         else:
             new_attrs.pop('kind', None)
 
-        # Don't include serialization at all if we don't have one.
+        # Don't include serialization at all if we don't have one, and don't
+        # generate it just to copy it.
+        deferred_source = None
+
         if serialization:
             new_attrs['serialization'] = serialization
-        elif other.serialization:
-            new_attrs['serialization'] = other.serialization
+        elif other.get('serialization', None):
+            new_attrs['serialization'] = other['serialization']
+        else:
+            new_attrs.pop('serialization', None)
+            deferred_source = other.__dict__.get('_serialization_source', None)
 
         # Make sure that things that shouldn't propagate are gone...
         new_attrs.pop('rkey', None)
@@ -158,7 +214,12 @@ class Resource (Cacheable):
 
         # ...and finally, use new_attrs for all the keyword args when we set up
         # the new instance.
-        return cls(new_rkey, new_location, **new_attrs)
+        new_resource = cls(new_rkey, new_location, **new_attrs)
+
+        if deferred_source is not None:
+            new_resource.defer_serialization(deferred_source)
+
+        return new_resource
 
     @classmethod
     def from_dict(cls: Type[R], rkey: str, location: str, serialization: Optional[str], attrs: Dict) -> R:
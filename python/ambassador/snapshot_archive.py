@@ -0,0 +1,294 @@
+# Copyright 2021 Datawire. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License
+
+from typing import Any, Callable, Deque, Dict, IO, Optional
+
+import collections
+import gzip
+import hashlib
+import logging
+import os
+import threading
+
+import orjson
+
+from .utils import Timer
+
+
+def open_snapshot(path: str) -> IO[str]:
+    """
+    Open a file from the snapshot archive for reading as text, whether or not
+    it's been compressed.
+    """
+
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt")
+
+    return open(path, "r")
+
+
+class ArchiveFile:
+    """
+    An archive source that's already a file on disk (like the watt snapshot,
+    which is streamed to disk while we fetch it). The SnapshotArchiver takes
+    ownership of the file, and removes it once it's archived it.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+    def __call__(self) -> bytes:
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    def discard(self) -> None:
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+
+# An archive source is something to call to get the contents of a file in the
+# archive: it can return bytes, a str, or anything orjson can serialize.
+ArchiveSource = Callable[[], Any]
+
+
+def archive_json(obj: Any) -> bytes:
+    """
+    Serialize obj the way the archive writes JSON: compactly, with sorted keys.
+    Use this to serialize anything that could change after it's submitted.
+    """
+
+    return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS|orjson.OPT_SORT_KEYS)
+
+
+class ArchiveJob:
+    def __init__(self, items: Dict[str, ArchiveSource], rotate: bool) -> None:
+        self.items = items
+        self.rotate = rotate
+
+    def discard(self) -> None:
+        for source in self.items.values():
+            if isinstance(source, ArchiveFile):
+                source.discard()
+
+
+class SnapshotArchiver:
+    """
+    Keep an archive of recent configuration snapshots for debugging: the watt
+    snapshot, the aconf, the IR, and the Envoy config for each of the last few
+    generations.
+
+    None of this is needed to actually configure Envoy, so it all happens in a
+    background thread: submit() just queues up what to archive (as callables)
+    and returns. The callables run in the background, without any locking, so
+    they must only return things that nobody will change: anything that's
+    still in use, like an IR whose objects the cache shares with the next
+    reconfigure, has to be serialized (see archive_json) before it's
+    submitted. Only
+    max_pending generations are ever queued; if we fall further behind than
+    that, we drop the oldest ones, since the newest generation is the one that
+    matters.
+
+    For each file, e.g. "ir.json":
+
+    - the current generation is written uncompressed as ir.json, so that tools
+      that just want the latest config can read it as always;
+    - older generations are gzipped as ir-1.json.gz, ir-2.json.gz, etc., up to
+      count of them.
+
+    All the files of a generation are rotated together, so that e.g. ir-1 and
+    econf-1 always come from the same generation. If every file in the new
+    generation is identical to the current one, nothing is rotated or written
+    at all.
+
+    JSON is written compactly, with sorted keys (so that identical configs are
+    byte-for-byte identical). Use open_snapshot to read a file from the archive
+    without caring whether it's compressed.
+    """
+
+    def __init__(self, logger: logging.Logger, path: str, count: int, timer: Optional[Timer]=None,
+                 max_pending: int=2) -> None:
+        self.logger = logger
+        self.path = path
+        self.count = count
+        self.timer = timer
+        self.max_pending = max(1, max_pending)
+
+        self.pending: Deque[ArchiveJob] = collections.deque()
+        self.cond = threading.Condition()
+        self.busy = False
+        self.thread: Optional[threading.Thread] = None
+
+        # The hash of the current generation of each file, so we can skip writing
+        # identical generations.
+        self.hashes: Dict[str, str] = {}
+
+        self.archived = 0
+        self.dropped = 0
+        self.skipped = 0
+
+    def start(self) -> None:
+        with self.cond:
+            if not self.thread:
+                self.thread = threading.Thread(target=self._run, name="SnapshotArchiver", daemon=True)
+                self.thread.start()
+
+    def submit(self, items: Dict[str, ArchiveSource], rotate: bool=True) -> None:
+        """
+        Queue up a generation to archive. items maps filenames (e.g. "ir.json")
+        to ArchiveSources. If rotate is False, the files are written as -tmp
+        files (e.g. "ir-tmp.json") and the archive isn't touched: that's for
+        configurations that we rejected.
+        """
+
+        self.start()
+
+        with self.cond:
+            while len(self.pending) >= self.max_pending:
+                self.pending.popleft().discard()
+                self.dropped += 1
+
+            self.pending.append(ArchiveJob(items, rotate))
+            self.cond.notify_all()
+
+    def flush(self, timeout: Optional[float]=None) -> bool:
+        """
+        Wait for everything queued so far to be archived. Returns False if that
+        didn't happen within timeout seconds.
+        """
+
+        with self.cond:
+            return self.cond.wait_for(lambda: not self.pending and not self.busy, timeout=timeout)
+
+    def _run(self) -> None:
+        while True:
+            with self.cond:
+                self.cond.wait_for(lambda: bool(self.pending))
+                job = self.pending.popleft()
+                self.busy = True
+
+            try:
+                self.archive(job)
+            except Exception as e:
+                # The archive is a debugging aid, so don't let it take anything down.
+                self.logger.exception("could not archive snapshot: %s" % e)
+            finally:
+                with self.cond:
+                    self.busy = False
+                    self.cond.notify_all()
+
+    def archive(self, job: ArchiveJob) -> None:
+        if self.timer:
+            self.timer.start()
+
+        try:
+            contents: Dict[str, Optional[bytes]] = {}
+
+            for name, source in job.items.items():
+                try:
+                    contents[name] = self._content(source)
+                except OSError as e:
+                    self.logger.debug("nothing to archive for %s: %s" % (name, e))
+                    contents[name] = None
+
+            if not job.rotate:
+                for name, content in contents.items():
+                    if content is not None:
+                        base, ext = os.path.splitext(name)
+                        self._write(f"{base}-tmp{ext}", content)
+            else:
+                self._archive_generation(contents)
+
+            self.archived += 1
+        finally:
+            job.discard()
+
+            if self.timer:
+                self.timer.stop()
+
+    def _archive_generation(self, contents: Dict[str, Optional[bytes]]) -> None:
+        digests = { name: hashlib.sha256(content).hexdigest() if (content is not None) else None
+                    for name, content in contents.items() }
+
+        if all(self.hashes.get(name) == digest for name, digest in digests.items()):
+            self.skipped += 1
+            return
+
+        # Something changed, so this is a new generation: rotate everything, even the
+        # files that didn't change.
+        for name, content in contents.items():
+            self._rotate(name)
+            digest = digests[name]
+
+            if (content is not None) and (digest is not None):
+                self._write(name, content)
+                self.hashes[name] = digest
+            else:
+                # There's nothing for this file in this generation, and the current
+                # generation shouldn't show the last one's.
+                self._remove(name)
+                self.hashes.pop(name, None)
+
+    @staticmethod
+    def _content(source: ArchiveSource) -> bytes:
+        content = source()
+
+        if isinstance(content, bytes):
+            return content
+
+        if isinstance(content, str):
+            return content.encode("utf-8")
+
+        return archive_json(content)
+
+    def _write(self, name: str, content: bytes, compress: bool=False) -> None:
+        path = os.path.join(self.path, name)
+        tmp_path = os.path.join(self.path, f".{name}.tmp")
+
+        with open(tmp_path, "wb") as output:
+            output.write(gzip.compress(content) if compress else content)
+
+        os.replace(tmp_path, path)
+
+    def _remove(self, name: str) -> None:
+        try:
+            os.unlink(os.path.join(self.path, name))
+        except OSError:
+            pass
+
+    def _rotate(self, name: str) -> None:
+        if self.count <= 0:
+            return
+
+        base, ext = os.path.splitext(name)
+
+        def generation(n: int) -> str:
+            return os.path.join(self.path, f"{base}-{n}{ext}.gz")
+
+        # Shift the compressed generations down, dropping the oldest...
+        for n in range(self.count - 1, 0, -1):
+            try:
+                os.replace(generation(n), generation(n + 1))
+            except OSError:
+                pass
+
+        # ...then compress the current generation into the first slot.
+        try:
+            with open(os.path.join(self.path, name), "rb") as f:
+                current = f.read()
+        except OSError:
+            return
+
+        self._write(os.path.basename(generation(1)), current, compress=True)
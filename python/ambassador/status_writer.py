@@ -0,0 +1,351 @@
+# Copyright 2021 Datawire. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License
+
+from typing import Any, Callable, Dict, List, Optional
+
+import collections
+import json
+import logging
+import queue
+import subprocess
+import threading
+import time
+
+
+class StatusUpdate:
+    def __init__(self, kind: str, name: str, namespace: str, text: str) -> None:
+        self.kind = kind
+        self.name = name
+        self.namespace = namespace
+        self.text = text
+        self.attempts = 0
+
+    @property
+    def key(self) -> str:
+        return f"{self.kind}/{self.name}.{self.namespace}"
+
+    def as_line(self) -> bytes:
+        # The text is already JSON, so there's no need to parse it just to
+        # serialize it again. It must be on a single line, though.
+        status = self.text.replace("\n", " ")
+
+        return (f'{{"kind":{json.dumps(self.kind)},"name":{json.dumps(self.name)},'
+                f'"namespace":{json.dumps(self.namespace)},"status":{status}}}\n').encode("utf-8")
+
+
+class StatusWriter:
+    """
+    Write Kubernetes status updates in the background, through one long-lived
+    helper process (`kubestatus --stream`) rather than one process per update.
+
+    The helper reads one JSON object per line on its stdin --
+
+        {"kind": "Mapping", "name": "foo", "namespace": "default", "status": {...}}
+
+    -- and writes one JSON result per line, in order, on its stdout:
+
+        {"kind": "Mapping", "name": "foo", "namespace": "default", "ok": true}
+
+    Updates are coalesced per object: if a newer status for an object is posted
+    while an older one is still queued, only the newer one is ever sent. The
+    queue is bounded (max_pending objects; the oldest are dropped) and updates
+    are sent in batches of at most max_batch, no faster than rate updates per
+    second (zero means no limit).
+
+    If the helper dies or stops answering, it's restarted, and any update that
+    wasn't acknowledged and hasn't been superseded is queued again (up to
+    max_attempts times).
+
+    Every update that's given up on -- dropped because the queue is full, dropped
+    after max_attempts, or answered but not OK -- is handed to on_failed, if set, so
+    that whoever posted it knows it wasn't written. (It's called from whichever
+    thread gave up on the update, without any of the writer's locks held.)
+    """
+
+    def __init__(self, logger: logging.Logger, command: List[str], max_pending: int=10000,
+                 max_batch: int=100, rate: float=0, batch_delay: float=0.05,
+                 timeout: float=10, max_attempts: int=3,
+                 on_failed: Optional[Callable[[StatusUpdate], None]]=None) -> None:
+        self.logger = logger
+        self.command = command
+        self.max_pending = max(1, max_pending)
+        self.max_batch = max(1, max_batch)
+        self.rate = rate
+        self.batch_delay = batch_delay
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.on_failed = on_failed
+
+        self.pending: 'collections.OrderedDict[str, StatusUpdate]' = collections.OrderedDict()
+        self.cond = threading.Condition()
+        self.busy = False
+        self.thread: Optional[threading.Thread] = None
+
+        self.process: Optional[subprocess.Popen] = None
+        self.results: 'queue.Queue[Optional[Dict[str, Any]]]' = queue.Queue()
+
+        # Token bucket for the rate limit.
+        self.tokens = float(self.max_batch)
+        self.last_refill = time.monotonic()
+
+        # Statistics.
+        self.posted = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.sent = 0
+        self.errors = 0
+        self.batches = 0
+        self.restarts = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self.pending)
+
+    def start(self) -> None:
+        with self.cond:
+            if not self.thread:
+                self.thread = threading.Thread(target=self._run, name="StatusWriter", daemon=True)
+                self.thread.start()
+
+    def post(self, kind: str, name: str, namespace: str, text: str) -> None:
+        """
+        Queue a status update for an object, replacing any update for the same
+        object that hasn't been sent yet.
+        """
+
+        update = StatusUpdate(kind, name, namespace, text)
+        dropped: List[StatusUpdate] = []
+
+        self.start()
+
+        with self.cond:
+            self.posted += 1
+
+            if update.key in self.pending:
+                self.coalesced += 1
+                del self.pending[update.key]
+
+            self.pending[update.key] = update
+
+            while len(self.pending) > self.max_pending:
+                key, oldest = self.pending.popitem(last=False)
+                self.dropped += 1
+                dropped.append(oldest)
+                self.logger.debug(f"StatusWriter: queue full, dropping status update for {key}")
+
+            self.cond.notify_all()
+
+        self._failed(dropped)
+
+    def flush(self, timeout: Optional[float]=None) -> bool:
+        """
+        Wait for everything queued so far to be sent. Returns False if that
+        didn't happen within timeout seconds.
+        """
+
+        with self.cond:
+            return self.cond.wait_for(lambda: not self.pending and not self.busy, timeout=timeout)
+
+    def stop(self) -> None:
+        """
+        Shut down the helper process. (The writer thread itself is a daemon, and
+        will start a new helper if anything else is posted.)
+        """
+
+        with self.cond:
+            self._stop_helper()
+
+    def stats(self) -> Dict[str, int]:
+        with self.cond:
+            return {
+                'queue_depth': len(self.pending),
+                'posted': self.posted,
+                'coalesced': self.coalesced,
+                'dropped': self.dropped,
+                'sent': self.sent,
+                'errors': self.errors,
+                'batches': self.batches,
+                'restarts': self.restarts,
+            }
+
+    def _failed(self, updates: List[StatusUpdate]) -> None:
+        if self.on_failed:
+            for update in updates:
+                try:
+                    self.on_failed(update)
+                except Exception as e:
+                    self.logger.exception(f"StatusWriter: on_failed for {update.key} failed: {e}")
+
+    def _run(self) -> None:
+        while True:
+            with self.cond:
+                self.cond.wait_for(lambda: bool(self.pending))
+
+            # Give whoever's posting a moment to post the rest of the batch.
+            if self.batch_delay > 0:
+                time.sleep(self.batch_delay)
+
+            batch_size = self._wait_for_tokens()
+
+            with self.cond:
+                batch: List[StatusUpdate] = []
+
+                while self.pending and (len(batch) < batch_size):
+                    _, update = self.pending.popitem(last=False)
+                    batch.append(update)
+
+                # Don't charge the rate limit for anything we aren't sending.
+                if self.rate > 0:
+                    self.tokens += batch_size - len(batch)
+
+                self.busy = bool(batch)
+
+            try:
+                if batch:
+                    self._send(batch)
+            except Exception as e:
+                self.logger.exception(f"StatusWriter: could not send status updates: {e}")
+            finally:
+                with self.cond:
+                    self.busy = False
+                    self.cond.notify_all()
+
+    def _wait_for_tokens(self) -> int:
+        """
+        Wait until the rate limit allows sending something, and return how many
+        updates we're allowed to send.
+        """
+
+        if self.rate <= 0:
+            return self.max_batch
+
+        while True:
+            now = time.monotonic()
+            self.tokens = min(float(self.max_batch), self.tokens + (now - self.last_refill) * self.rate)
+            self.last_refill = now
+
+            if self.tokens >= 1:
+                allowed = int(self.tokens)
+                self.tokens -= allowed
+                return allowed
+
+            time.sleep((1 - self.tokens) / self.rate)
+
+    def _start_helper(self) -> subprocess.Popen:
+        if self.process and (self.process.poll() is None):
+            return self.process
+
+        if self.process:
+            self.restarts += 1
+
+        self.logger.debug(f"StatusWriter: starting {self.command}")
+
+        process = subprocess.Popen(self.command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                   stderr=subprocess.DEVNULL)
+        results: 'queue.Queue[Optional[Dict[str, Any]]]' = queue.Queue()
+
+        def read_results() -> None:
+            assert process.stdout
+
+            for line in process.stdout:
+                try:
+                    results.put(json.loads(line))
+                except ValueError:
+                    results.put({ 'ok': False, 'error': f"bad response: {line!r}" })
+
+            # EOF: the helper has exited.
+            results.put(None)
+
+        threading.Thread(target=read_results, name="StatusWriterReader", daemon=True).start()
+
+        self.process = process
+        self.results = results
+
+        return process
+
+    def _stop_helper(self) -> None:
+        process = self.process
+
+        if process and (process.poll() is None):
+            try:
+                if process.stdin:
+                    process.stdin.close()
+
+                process.wait(timeout=self.timeout)
+            except Exception:
+                process.kill()
+
+    def _send(self, batch: List[StatusUpdate]) -> None:
+        self.batches += 1
+        failed: List[StatusUpdate] = []
+
+        try:
+            self._send_batch(batch, failed)
+        except Exception:
+            # We can't tell what did get written, so report all of it: posting
+            # something again is harmless, but forgetting to is not.
+            failed = batch
+            raise
+        finally:
+            self._failed(failed)
+
+    def _send_batch(self, batch: List[StatusUpdate], failed: List[StatusUpdate]) -> None:
+        acked = 0
+
+        try:
+            process = self._start_helper()
+            assert process.stdin
+
+            process.stdin.write(b"".join(update.as_line() for update in batch))
+            process.stdin.flush()
+
+            deadline = time.monotonic() + self.timeout
+
+            while acked < len(batch):
+                result = self.results.get(timeout=max(0.0, deadline - time.monotonic()))
+
+                if result is None:
+                    raise EOFError("helper exited")
+
+                update = batch[acked]
+                acked += 1
+
+                if result.get('ok', False):
+                    self.sent += 1
+                else:
+                    self.errors += 1
+                    failed.append(update)
+                    self.logger.debug(f"StatusWriter: {update.key}: {result.get('error', 'unknown error')}")
+        except (OSError, EOFError, queue.Empty) as e:
+            self.logger.warning(f"StatusWriter: helper failed after {acked} of {len(batch)} updates: {e or type(e).__name__}")
+
+            if self.process and (self.process.poll() is None):
+                self.process.kill()
+
+            # Requeue whatever didn't get acknowledged, unless it's been superseded or
+            # we've already tried it too many times.
+            with self.cond:
+                for update in reversed(batch[acked:]):
+                    update.attempts += 1
+
+                    if update.key in self.pending:
+                        continue
+
+                    if update.attempts >= self.max_attempts:
+                        self.dropped += 1
+                        failed.append(update)
+                        continue
+
+                    self.pending[update.key] = update
+                    self.pending.move_to_end(update.key, last=False)
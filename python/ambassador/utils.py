@@ -15,7 +15,7 @@
 # limitations under the License
 
 from builtins import bytes
-from typing import Any, Dict, List, Optional, Union, TextIO, TYPE_CHECKING
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple, Union, TextIO, TYPE_CHECKING
 
 import binascii
 import hashlib
@@ -100,6 +100,42 @@ def dump_json(obj: Any, pretty=False) -> str:
         return bytes.decode(orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS))
 
 
+class Lazy:
+    """
+    A logging argument that doesn't get worked out unless the record actually gets
+    formatted. The logging module only applies %-formatting to a message when some
+    handler is going to emit it, so
+
+        logger.debug("IR: %s", Lazy(ir.as_json))
+
+    never serializes the IR unless DEBUG logging is on. (%r works too: it uses the
+    repr of whatever the function returns.)
+
+    Note that this only helps if the Lazy is passed as an argument to the logger, not
+    formatted into the message beforehand!
+    """
+
+    __slots__ = ( 'func', 'args', 'kwargs' )
+
+    def __init__(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> None:
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+
+    def __str__(self) -> str:
+        return str(self.func(*self.args, **self.kwargs))
+
+    def __repr__(self) -> str:
+        return repr(self.func(*self.args, **self.kwargs))
+
+
+def lazy_json(obj: Any, pretty=False) -> Lazy:
+    """
+    Serialize obj with dump_json, but only if a log record actually needs it.
+    """
+    return Lazy(dump_json, obj, pretty=pretty)
+
+
 def _load_url_contents(logger: logging.Logger, url: str, stream1: TextIO, stream2: Optional[TextIO]=None) -> bool:
     saved = False
 
@@ -726,6 +762,205 @@ class SavedSecret:
                 )
 
 
+class StoredSecret:
+    """
+    StoredSecret is a SecretStore's record of one version of a secret on disk: the paths
+    of its elements (None for elements it doesn't have), and the last generation in which
+    anything used it.
+    """
+    def __init__(self, paths: Tuple[Optional[str], Optional[str], Optional[str], Optional[str]],
+                 generation: int) -> None:
+        self.paths = paths
+        self.generation = generation
+
+
+class SecretStore:
+    """
+    SecretStore keeps decoded secrets on disk, where Envoy can read them, under
+
+        <cache_dir>/<namespace>/secrets-decoded/<name>/<digest>.<suffix>
+
+    where the digest is the SHA-1 of the secret's contents, so a given path always has
+    the same contents. That means that a secret we've already written never needs writing
+    again: the store keeps an index of name -> digest -> paths, so saving a secret it has
+    already saved does no I/O at all. Otherwise, it only writes files that aren't already
+    there, and writes them atomically.
+
+    Every time a new configuration goes live, call advance_generation(): any secret that
+    wasn't saved (or looked up) since the last time is no longer referenced by the live
+    configuration, so its files are removed. The first time around, any files from earlier
+    runs that nothing has used are removed, too.
+
+    SecretStores are meant to be shared by the SecretHandlers for successive reconfigures,
+    so they're thread-safe.
+    """
+
+    Suffixes = ( 'crt', 'key', 'user', 'root.crt' )
+    reSecretFile = re.compile(r'^\.?[0-9A-F]{40}\.(crt|key|user|root\.crt)(\.tmp)?$')
+
+    def __init__(self, logger: logging.Logger, cache_dir: str) -> None:
+        self.logger = logger
+        self.cache_dir = cache_dir
+        self.lock = threading.Lock()
+
+        self.generation = 0
+        self.index: Dict[Tuple[str, str], Dict[str, StoredSecret]] = {}
+        self.swept = False
+
+        # Statistics.
+        self.hits = 0
+        self.writes = 0
+        self.removed = 0
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        del state['lock']
+
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def digest(*elements: Optional[str]) -> str:
+        h = hashlib.new('sha1')
+
+        for el in elements:
+            if el:
+                h.update(el.encode('utf-8'))
+
+        return h.hexdigest().upper()
+
+    def secret_dir(self, name: str, namespace: str) -> str:
+        return os.path.join(self.cache_dir, namespace, "secrets-decoded", name)
+
+    def save(self, name: str, namespace: str,
+             tls_crt: Optional[str], tls_key: Optional[str],
+             user_key: Optional[str], root_crt: Optional[str]
+             ) -> Tuple[Optional[str], Optional[str], Optional[str], Optional[str]]:
+        """
+        Make sure a secret's elements are on disk, and return their paths (in the same
+        order as the elements).
+        """
+
+        elements = ( tls_crt, tls_key, user_key, root_crt )
+        digest = self.digest(*elements)
+
+        with self.lock:
+            versions = self.index.setdefault((namespace, name), {})
+            stored = versions.get(digest, None)
+
+            if stored:
+                self.hits += 1
+                stored.generation = self.generation
+                return stored.paths
+
+            secret_dir = self.secret_dir(name, namespace)
+            os.makedirs(secret_dir, exist_ok=True)
+
+            paths: List[Optional[str]] = []
+
+            for el, suffix in zip(elements, self.Suffixes):
+                path = None
+
+                if el:
+                    path = os.path.join(secret_dir, f'{digest}.{suffix}')
+
+                    if not os.path.exists(path):
+                        tmp_path = os.path.join(secret_dir, f'.{digest}.{suffix}.tmp')
+
+                        with open(tmp_path, "w") as output:
+                            output.write(el)
+
+                        os.replace(tmp_path, path)
+                        self.writes += 1
+
+                paths.append(path)
+
+            stored = StoredSecret(( paths[0], paths[1], paths[2], paths[3] ), self.generation)
+            versions[digest] = stored
+
+            return stored.paths
+
+    def advance_generation(self) -> None:
+        """
+        Note that a new configuration has gone live, and remove the files for every secret
+        it doesn't use.
+        """
+
+        with self.lock:
+            live: Set[str] = set()
+
+            for key, versions in list(self.index.items()):
+                for digest, stored in list(versions.items()):
+                    if stored.generation < self.generation:
+                        self._remove(stored.paths)
+                        del versions[digest]
+                    else:
+                        live.update(path for path in stored.paths if path)
+
+                if not versions:
+                    del self.index[key]
+
+                    try:
+                        os.rmdir(self.secret_dir(key[1], key[0]))
+                    except OSError:
+                        pass
+
+            if not self.swept:
+                self._sweep(live)
+                self.swept = True
+
+            self.generation += 1
+
+    def _remove(self, paths: Iterable[Optional[str]]) -> None:
+        for path in paths:
+            if path:
+                try:
+                    os.unlink(path)
+                    self.removed += 1
+                except OSError:
+                    pass
+
+    def _sweep(self, live: Set[str]) -> None:
+        # Remove anything left over from before we started keeping track.
+        try:
+            namespaces = os.listdir(self.cache_dir)
+        except OSError:
+            return
+
+        for namespace in namespaces:
+            decoded = os.path.join(self.cache_dir, namespace, "secrets-decoded")
+
+            if not os.path.isdir(decoded):
+                continue
+
+            for name in os.listdir(decoded):
+                secret_dir = os.path.join(decoded, name)
+
+                if not os.path.isdir(secret_dir):
+                    continue
+
+                self._remove(os.path.join(secret_dir, f) for f in os.listdir(secret_dir)
+                             if self.reSecretFile.match(f) and (os.path.join(secret_dir, f) not in live))
+
+                try:
+                    os.rmdir(secret_dir)
+                except OSError:
+                    pass
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            return {
+                'secrets': len(self.index),
+                'versions': sum(len(versions) for versions in self.index.values()),
+                'hits': self.hits,
+                'writes': self.writes,
+                'removed': self.removed,
+            }
+
+
 class SecretHandler:
     """
     SecretHandler: manage secrets for Ambassador. There are two fundamental rules at work here:
@@ -754,13 +989,19 @@ class SecretHandler:
     logger: logging.Logger
     source_root: str
     cache_dir: str
+    store: SecretStore
 
-    def __init__(self, logger: logging.Logger, source_root: str, cache_dir: str, version: str) -> None:
+    def __init__(self, logger: logging.Logger, source_root: str, cache_dir: str, version: str,
+                 store: Optional[SecretStore]=None) -> None:
         self.logger = logger
         self.source_root = source_root
         self.cache_dir = cache_dir
         self.version = version
 
+        # Share a store across reconfigures to avoid rewriting secrets that haven't changed,
+        # and to clean up the ones that aren't used any more.
+        self.store = store or SecretStore(logger, cache_dir)
+
     def load_secret(self, resource: 'IRResource', secret_name: str, namespace: str) -> Optional[SecretInfo]:
         """
         load_secret: given a secret’s name and namespace, pull it from wherever it really lives,
@@ -824,8 +1065,6 @@ class SecretHandler:
     def cache_internal(self, name: str, namespace: str,
                        tls_crt: Optional[str], tls_key: Optional[str],
                        user_key: Optional[str], root_crt: Optional[str]) -> SavedSecret:
-        h = hashlib.new('sha1')
-
         tls_crt_path = None
         tls_key_path = None
         user_key_path = None
@@ -834,34 +1073,8 @@ class SecretHandler:
 
         # Don't save if it has neither a tls_crt or a user_key or the root_crt
         if tls_crt or user_key or root_crt:
-            for el in [tls_crt, tls_key, user_key]:
-                if el:
-                    h.update(el.encode('utf-8'))
-
-            hd = h.hexdigest().upper()
-
-            secret_dir = os.path.join(self.cache_dir, namespace, "secrets-decoded", name)
-
-            try:
-                os.makedirs(secret_dir)
-            except FileExistsError:
-                pass
-
-            if tls_crt:
-                tls_crt_path = os.path.join(secret_dir, f'{hd}.crt')
-                open(tls_crt_path, "w").write(tls_crt)
-
-            if tls_key:
-                tls_key_path = os.path.join(secret_dir, f'{hd}.key')
-                open(tls_key_path, "w").write(tls_key)
-
-            if user_key:
-                user_key_path = os.path.join(secret_dir, f'{hd}.user')
-                open(user_key_path, "w").write(user_key)
-
-            if root_crt:
-                root_crt_path = os.path.join(secret_dir, f'{hd}.root.crt')
-                open(root_crt_path, "w").write(root_crt)
+            tls_crt_path, tls_key_path, user_key_path, root_crt_path = \
+                self.store.save(name, namespace, tls_crt, tls_key, user_key, root_crt)
 
             cert_data = {
                 'tls_crt': tls_crt,
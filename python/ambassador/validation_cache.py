@@ -0,0 +1,97 @@
+#!python
+
+# Copyright 2021 Datawire. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License
+
+from typing import Any, Dict, Optional
+
+import collections
+import hashlib
+import logging
+
+import orjson
+
+
+class ValidationCache:
+    """
+    Remember which Envoy configurations have already passed validation, keyed
+    by a stable hash of the configuration, so that a reconfigure that produces
+    a byte-identical configuration doesn't have to run `envoy --mode validate`
+    again. Only successful validations are remembered: a failure gets logged
+    and retried every time.
+
+    The cache is a small LRU: configurations tend to flip between a handful
+    of states, and there's no point holding on to old ones forever.
+    """
+
+    def __init__(self, logger: logging.Logger, max_entries: int=16) -> None:
+        self.logger = logger
+        self.max_entries = max_entries
+
+        # hash -> how long the validation took, in seconds.
+        self.entries: collections.OrderedDict[str, float] = collections.OrderedDict()
+
+    @staticmethod
+    def config_hash(config: Dict[str, Any], *extra: str) -> str:
+        """
+        Compute a stable hash for an Envoy configuration. Keys are sorted, so the
+        hash depends only on the content of the configuration. Anything else that
+        affects the validation (the node name, for example) can be passed in extra.
+        """
+
+        h = hashlib.sha256(orjson.dumps(config, option=orjson.OPT_NON_STR_KEYS|orjson.OPT_SORT_KEYS))
+
+        for e in extra:
+            h.update(b'\0')
+            h.update(e.encode('utf-8'))
+
+        return h.hexdigest()
+
+    def check(self, key: str) -> Optional[float]:
+        """
+        Check whether the configuration with this hash has already been validated.
+
+        :param key: the config_hash of the configuration
+        :return: None on a miss; on a hit, the time the original validation took
+        """
+
+        duration = self.entries.get(key, None)
+
+        if duration is not None:
+            self.entries.move_to_end(key)
+            self.logger.debug(f"ValidationCache: hit {key}")
+        else:
+            self.logger.debug(f"ValidationCache: miss {key}")
+
+        return duration
+
+    def store(self, key: str, duration: float) -> None:
+        """
+        Remember that the configuration with this hash passed validation.
+
+        :param key: the config_hash of the configuration
+        :param duration: how long the validation took, in seconds
+        """
+
+        self.entries[key] = duration
+        self.entries.move_to_end(key)
+
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def reset(self) -> None:
+        self.entries.clear()
+
+    def __len__(self) -> int:
+        return len(self.entries)
@@ -317,10 +317,16 @@ def dump(config_dir_path: Parameter.REQUIRED, *,
                     filter_chain_count += 1
                     for f in fc['filters']:
                         filter_count += 1
-                        for vh in f['typed_config']['route_config']['virtual_hosts']:
+                        for vh in f['typed_config'].get('route_config', {}).get('virtual_hosts', []):
                             vhost_count += 1
                             route_count += len(vh['routes'])
 
+            # In RDS mode, the route configurations aren't in the listeners.
+            for route_config in od[apiversion].get('route_configs', []):
+                for vh in route_config['virtual_hosts']:
+                    vhost_count += 1
+                    route_count += len(vh['routes'])
+
         if stats:
             sys.stderr.write("STATS:\n")
             sys.stderr.write("  config bytes:  %d\n" % jslen)
@@ -0,0 +1,454 @@
+#!python
+
+# Copyright 2021 Datawire. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License
+
+########
+# This is a benchmarking tool that replays a sequence of watt snapshots -- either
+# from disk, or generated synthetically -- through the whole reconfigure pipeline
+# (ResourceFetcher -> Config.load_all -> IR -> EnvoyConfig.generate), with and
+# without the Cache, and reports how long each stage took and how much memory it
+# used. Use --json to save the results for comparison between commits.
+########
+
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import functools
+import glob
+import json
+import logging
+import math
+import os
+import resource
+import time
+import tracemalloc
+
+import click
+
+from ambassador import Cache, Config, IR, EnvoyConfig
+from ambassador.fetch import ResourceFetcher
+from ambassador.fetch.resource import ResourceIdentity
+from ambassador.invalidation import DeltaInvalidator
+from ambassador.utils import NullSecretHandler, dump_json
+from ambassador.VERSION import Version
+
+# Use this instead of click.option
+click_option = functools.partial(click.option, show_default=True)
+click_option_no_default = functools.partial(click.option, show_default=False)
+
+Stages = [ "fetcher", "aconf", "ir", "econf", "total" ]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """
+    Nearest-rank percentile of a list of values.
+    """
+
+    if not values:
+        return 0.0
+
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100.0 * len(ordered)) - 1))
+
+    return ordered[rank]
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    return {
+        "count": len(values),
+        "mean": (sum(values) / len(values)) if values else 0.0,
+        "p50": percentile(values, 50),
+        "p90": percentile(values, 90),
+        "p99": percentile(values, 99),
+        "max": max(values) if values else 0.0,
+    }
+
+
+def max_rss_bytes() -> int:
+    # ru_maxrss is in kilobytes on Linux (and bytes on macOS, but we don't run there).
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+########
+# Snapshot sources
+
+def snapshot_files(paths: List[str]) -> Iterator[Tuple[str, str]]:
+    """
+    Yield (name, serialization) for every snapshot under paths. Directories are
+    searched for snapshot*.yaml and *.json, in name order. (Note that the '.yaml'
+    on watt snapshot files is a misnomer: they're actually JSON.)
+    """
+
+    for path in paths:
+        if os.path.isdir(path):
+            found = glob.glob(os.path.join(path, "snapshot*.yaml")) + glob.glob(os.path.join(path, "*.json"))
+            files = sorted(set(found))
+        else:
+            files = [ path ]
+
+        for filename in files:
+            yield (os.path.basename(filename), open(filename, "r").read())
+
+
+class SyntheticSnapshots:
+    """
+    Generate a sequence of watt snapshots for a cluster with a given number of
+    Mappings, Hosts, and TLSContexts, and Services whose Endpoints churn from
+    one snapshot to the next. Every snapshot after the first carries Deltas for
+    the Endpoints that changed, just like a snapshot from watt would.
+
+    The Mappings use a KubernetesEndpointResolver, so that the Endpoints changes
+    actually matter.
+    """
+
+    def __init__(self, mappings: int, hosts: int, tlscontexts: int, services: int,
+                 churn: int, steps: int) -> None:
+        self.mappings = mappings
+        self.hosts = hosts
+        self.tlscontexts = tlscontexts
+        self.services = max(1, services)
+        self.churn = min(churn, self.services)
+        self.steps = steps
+
+    def params(self) -> Dict[str, Any]:
+        return {
+            "mappings": self.mappings,
+            "hosts": self.hosts,
+            "tlscontexts": self.tlscontexts,
+            "services": self.services,
+            "churn": self.churn,
+            "steps": self.steps,
+        }
+
+    @staticmethod
+    def metadata(name: str, **kwargs) -> Dict[str, Any]:
+        md = { "name": name, "namespace": "default", "generation": 1 }
+        md.update(kwargs)
+
+        return md
+
+    def mapping(self, i: int) -> Dict[str, Any]:
+        return {
+            "apiVersion": "getambassador.io/v2",
+            "kind": "Mapping",
+            "metadata": self.metadata(f"mapping-{i}", labels={ "team": f"team-{i % 10}" }),
+            "spec": {
+                "hostname": f"host-{i % self.hosts}.example.com" if self.hosts else "*",
+                "prefix": f"/mapping-{i}/",
+                "service": f"svc-{i % self.services}:8080",
+                "resolver": "endpoint",
+                "load_balancer": { "policy": "round_robin" },
+            },
+        }
+
+    def host(self, i: int) -> Dict[str, Any]:
+        return {
+            "apiVersion": "getambassador.io/v2",
+            "kind": "Host",
+            "metadata": self.metadata(f"host-{i}"),
+            "spec": {
+                "hostname": f"host-{i}.example.com",
+                "acmeProvider": { "authority": "none" },
+                "selector": { "matchLabels": { "team": f"team-{i % 10}" } },
+            },
+        }
+
+    def tlscontext(self, i: int) -> Dict[str, Any]:
+        return {
+            "apiVersion": "getambassador.io/v2",
+            "kind": "TLSContext",
+            "metadata": self.metadata(f"tls-{i}"),
+            "spec": {
+                "hosts": [ f"tls-{i}.example.com" ],
+                "secret": f"tls-{i}-cert",
+            },
+        }
+
+    def service(self, i: int) -> Dict[str, Any]:
+        return {
+            "apiVersion": "v1",
+            "kind": "Service",
+            "metadata": self.metadata(f"svc-{i}"),
+            "spec": {
+                "type": "ClusterIP",
+                "ports": [ { "name": "http", "port": 8080, "protocol": "TCP", "targetPort": 8080 } ],
+                "selector": { "app": f"svc-{i}" },
+            },
+        }
+
+    def endpoints(self, i: int, step: int) -> Dict[str, Any]:
+        # Step s moves the Endpoints of services (s-1)*churn through s*churn - 1
+        # (mod services), so by this step, service i has moved once for every
+        # k < step*churn with k % services == i.
+        moves = 0
+
+        if self.churn:
+            moves = (step * self.churn + (self.services - i - 1)) // self.services
+
+        return {
+            "apiVersion": "v1",
+            "kind": "Endpoints",
+            "metadata": self.metadata(f"svc-{i}"),
+            "subsets": [ {
+                "addresses": [ { "ip": f"10.{moves % 256}.{(i // 256) % 256}.{i % 256}" } ],
+                "ports": [ { "name": "http", "port": 8080, "protocol": "TCP" } ],
+            } ],
+        }
+
+    def changed_endpoints(self, step: int) -> List[int]:
+        # The services whose Endpoints moved between step-1 and step.
+        start = ((step - 1) * self.churn) % self.services
+
+        return [ (start + j) % self.services for j in range(self.churn) ]
+
+    def snapshot(self, step: int) -> Dict[str, Any]:
+        snapshot: Dict[str, Any] = {
+            "Kubernetes": {
+                "KubernetesEndpointResolvers": [ {
+                    "apiVersion": "getambassador.io/v2",
+                    "kind": "KubernetesEndpointResolver",
+                    "metadata": self.metadata("endpoint"),
+                    "spec": {},
+                } ],
+                "Mappings": [ self.mapping(i) for i in range(self.mappings) ],
+                "Hosts": [ self.host(i) for i in range(self.hosts) ],
+                "TLSContexts": [ self.tlscontext(i) for i in range(self.tlscontexts) ],
+                "service": [ self.service(i) for i in range(self.services) ],
+                "Endpoints": [ self.endpoints(i, step) for i in range(self.services) ],
+            }
+        }
+
+        if step > 0:
+            snapshot["Deltas"] = [
+                {
+                    "kind": "Endpoints",
+                    "apiVersion": "v1",
+                    "metadata": self.metadata(f"svc-{i}"),
+                    "deltaType": "update",
+                } for i in self.changed_endpoints(step)
+            ]
+
+        return snapshot
+
+    def __iter__(self) -> Iterator[Tuple[str, str]]:
+        for step in range(self.steps):
+            yield (f"synthetic-{step}", dump_json(self.snapshot(step)))
+
+
+########
+# The pipeline
+
+class Run:
+    """
+    Replay snapshots through the reconfigure pipeline, recording the time (and,
+    optionally, the traced Python memory) for each stage. If cached is True,
+    the Cache is kept between snapshots and invalidated using the Deltas, the
+    same way diagd does it.
+    """
+
+    def __init__(self, logger: logging.Logger, cached: bool, trace_memory: bool) -> None:
+        self.logger = logger
+        self.cached = cached
+        self.trace_memory = trace_memory
+
+        self.cache: Optional[Cache] = Cache(logger) if cached else None
+        self.invalidator = DeltaInvalidator(logger)
+        self.last_provenance: Dict[ResourceIdentity, List[ResourceIdentity]] = {}
+        self.secret_handler = NullSecretHandler(logger, None, None, "0")
+
+        self.times: Dict[str, List[float]] = { stage: [] for stage in Stages }
+        self.memory: Dict[str, int] = { stage: 0 for stage in Stages }
+        self.incremental = 0
+
+    def stage(self, name: str, fn, *args, **kwargs) -> Any:
+        if self.trace_memory:
+            tracemalloc.start()
+
+        start = time.perf_counter()
+
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self.times[name].append(time.perf_counter() - start)
+
+            if self.trace_memory:
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+
+                self.memory[name] = max(self.memory[name], peak)
+
+    def reconfigure(self, serialization: str) -> EnvoyConfig:
+        start = time.perf_counter()
+
+        aconf = Config()
+        fetcher = ResourceFetcher(self.logger, aconf)
+
+        self.stage("fetcher", fetcher.parse_watt, serialization)
+        self.stage("aconf", aconf.load_all, fetcher.sorted())
+
+        if self.cache is not None:
+            reset_cache = True
+
+            if fetcher.deltas:
+                plan = self.invalidator.plan(fetcher.deltas, self.last_provenance, fetcher.provenance)
+
+                if not plan.reset:
+                    reset_cache = False
+
+                    for key in plan.keys:
+                        self.cache.invalidate(key)
+
+            if reset_cache:
+                self.cache.reset()
+            else:
+                self.incremental += 1
+
+        ir = self.stage("ir", IR, aconf, cache=self.cache, file_checker=lambda path: True,
+                        secret_handler=self.secret_handler)
+
+        self.last_provenance = fetcher.provenance
+
+        econf = self.stage("econf", EnvoyConfig.generate, ir, Config.envoy_api_version, cache=self.cache)
+
+        if self.cache is not None:
+            self.cache.advance_generation()
+
+        self.times["total"].append(time.perf_counter() - start)
+
+        return econf
+
+    def results(self) -> Dict[str, Any]:
+        rc: Dict[str, Any] = {
+            "cached": self.cached,
+            "snapshots": len(self.times["total"]),
+            "incremental": self.incremental,
+            "stages": { stage: summarize(self.times[stage]) for stage in Stages },
+            "max_rss_bytes": max_rss_bytes(),
+        }
+
+        if self.trace_memory:
+            rc["traced_peak_bytes"] = dict(self.memory)
+
+        if self.cache is not None:
+            rc["cache"] = {
+                "hits": self.cache.hits,
+                "misses": self.cache.misses,
+                "entries": len(self.cache.cache),
+                "bytes": self.cache.total_bytes,
+            }
+
+        return rc
+
+
+def report(name: str, results: Dict[str, Any]) -> None:
+    print(f"{name}: {results['snapshots']} snapshots, {results['incremental']} incremental, "
+          f"max RSS {results['max_rss_bytes'] / 1e6:.1f}MB")
+    print(f"  {'stage':<8} {'mean':>9} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9}  {'traced peak':>11}")
+
+    for stage in Stages:
+        s = results["stages"][stage]
+        peak = results.get("traced_peak_bytes", {}).get(stage, None)
+        peak_str = f"{peak / 1e6:>9.1f}MB" if peak is not None else ""
+
+        print(f"  {stage:<8} {s['mean']:>9.4f} {s['p50']:>9.4f} {s['p90']:>9.4f} {s['p99']:>9.4f} {s['max']:>9.4f}  {peak_str:>11}")
+
+
+@click.command(help="Replay watt snapshots through the reconfigure pipeline and time each stage")
+@click_option('--debug/--no-debug', default=False,
+              help="enable debug logging")
+@click_option('--cache/--no-cache', 'with_cache', default=True,
+              help="include runs with the Cache")
+@click_option('--nocache/--no-nocache', 'without_cache', default=True,
+              help="include runs without the Cache")
+@click_option('--rounds', type=int, default=1,
+              help="how many times to replay the whole sequence")
+@click_option('--tracemalloc/--no-tracemalloc', 'trace_memory', default=False,
+              help="record the traced Python memory peak for each stage (slow)")
+@click_option('--mappings', type=int, default=1000,
+              help="synthetic: number of Mappings")
+@click_option('--hosts', type=int, default=10,
+              help="synthetic: number of Hosts")
+@click_option('--tlscontexts', type=int, default=10,
+              help="synthetic: number of TLSContexts")
+@click_option('--services', type=int, default=100,
+              help="synthetic: number of Services (with Endpoints)")
+@click_option('--churn', type=int, default=5,
+              help="synthetic: number of Endpoints that change in each snapshot")
+@click_option('--steps', type=int, default=10,
+              help="synthetic: number of snapshots")
+@click_option_no_default('--json', 'json_path', type=click.Path(writable=True),
+              help="write results as JSON to this path ('-' for stdout)")
+@click.argument('snapshot-paths', nargs=-1)
+def main(snapshot_paths: List[str], debug: bool, with_cache: bool, without_cache: bool, rounds: int,
+         trace_memory: bool, mappings: int, hosts: int, tlscontexts: int, services: int, churn: int,
+         steps: int, json_path: Optional[str]=None) -> None:
+    logging.basicConfig(
+        level=logging.DEBUG if debug else logging.WARNING,
+        format="%(asctime)s bench %(levelname)s: %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S"
+    )
+
+    logger = logging.getLogger('ambassador')
+
+    # Read everything up front, so that reading files isn't part of the timing.
+    source: Dict[str, Any]
+
+    if snapshot_paths:
+        snapshots = list(snapshot_files(snapshot_paths))
+        source = { "paths": list(snapshot_paths) }
+    else:
+        synthetic = SyntheticSnapshots(mappings, hosts, tlscontexts, services, churn, steps)
+        snapshots = list(synthetic)
+        source = { "synthetic": synthetic.params() }
+
+    if not snapshots:
+        raise click.ClickException("no snapshots found")
+
+    output: Dict[str, Any] = {
+        "version": Version,
+        "envoy_api_version": Config.envoy_api_version,
+        "source": source,
+        "rounds": rounds,
+        "runs": {},
+    }
+
+    modes = []
+
+    if without_cache:
+        modes.append(("nocache", False))
+
+    if with_cache:
+        modes.append(("cache", True))
+
+    for name, cached in modes:
+        run = Run(logger, cached, trace_memory)
+
+        for _ in range(rounds):
+            for _, serialization in snapshots:
+                run.reconfigure(serialization)
+
+        output["runs"][name] = run.results()
+
+        if json_path != '-':
+            report(name, output["runs"][name])
+
+    if json_path == '-':
+        print(json.dumps(output, indent=4, sort_keys=True))
+    elif json_path:
+        with open(json_path, "w") as f:
+            json.dump(output, f, indent=4, sort_keys=True)
+
+
+if __name__ == "__main__":
+    main()
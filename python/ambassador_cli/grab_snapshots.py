@@ -30,6 +30,7 @@ import tarfile
 
 import click
 
+from ambassador.snapshot_archive import open_snapshot
 from ambassador.utils import dump_json
 
 # Use this instead of click.option
@@ -94,14 +95,14 @@ def sanitize_snapshot(snapshot: dict):
 
 # Helper to open a snapshot.yaml and sanitize it.
 def helper_snapshot(path: str) -> str:
-    snapshot = json.loads(open(path, "r"). read())
+    snapshot = json.loads(open_snapshot(path).read())
 
     return dump_json(sanitize_snapshot(snapshot))
 
 
 # Helper to open a problems.json and sanitize the snapshot it contains.
 def helper_problems(path: str) -> str:
-    bad_dict = json.loads(open(path, "r"). read())
+    bad_dict = json.loads(open_snapshot(path).read())
 
     bad_dict["snapshot"] = sanitize_snapshot(bad_dict["snapshot"])
 
@@ -110,7 +111,7 @@ def helper_problems(path: str) -> str:
 
 # Helper to just copy a file.
 def helper_copy(path: str) -> str:
-    return open(path, "r").read()
+    return open_snapshot(path).read()
 
 
 # Open a tarfile for output...
@@ -138,9 +139,12 @@ def main(snapshot_dir: str, debug: bool, output_path: str) -> None:
 
         interesting_things = [
             ( "snap*yaml", helper_snapshot ),
+            ( "snap*yaml.gz", helper_snapshot ),
             ( "problems*json", helper_problems ),
             ( "econf*json", helper_copy ),
-            ( "diff*txt", helper_copy )
+            ( "econf*json.gz", helper_copy ),
+            ( "diff*txt", helper_copy ),
+            ( "diff*txt.gz", helper_copy )
         ]
 
         for pattern, helper in interesting_things:
@@ -148,16 +152,20 @@ def main(snapshot_dir: str, debug: bool, output_path: str) -> None:
                 some_found = True
 
                 # The tarfile can be flat, rather than embedding everything
-                # in a directory with a fixed name.
+                # in a directory with a fixed name. Older snapshots are gzipped
+                # in the snapshot directory, but the tarfile is compressed anyway.
                 b = os.path.basename(path)
 
+                if b.endswith(".gz"):
+                    b = b[:-3]
+
                 if debug:
                     print(f"...{b}")
 
                 sanitized = helper(path)
 
                 if sanitized:
-                    _, ext = os.path.splitext(path)
+                    _, ext = os.path.splitext(b)
                     sanitized_name = f"sanitized{ext}"
 
                     with open(sanitized_name, 'w') as tmp:
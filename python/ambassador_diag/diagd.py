@@ -13,19 +13,20 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License
+import collections
 import copy
 import subprocess
-from typing import Any, Callable, Dict, List, Optional, Tuple, Type, Union, TYPE_CHECKING
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple, Type, Union, TYPE_CHECKING
 from typing import cast as typecast
 
 import datetime
-import difflib
 import functools
 import json
 import orjson
 import logging
 import multiprocessing
 import os
+import pickle
 import queue
 import re
 import signal
@@ -37,8 +38,8 @@ import uuid
 import requests
 import jsonpatch
 
-from expiringdict import ExpiringDict
-from prometheus_client import CollectorRegistry, ProcessCollector, generate_latest, Info, Gauge
+from prometheus_client import CollectorRegistry, ProcessCollector, generate_latest, Info, Gauge, Counter
+from prometheus_client.core import CounterMetricFamily
 from pythonjsonlogger import jsonlogger
 
 import concurrent.futures
@@ -52,14 +53,22 @@ from flask import json as flask_json
 import gunicorn.app.base
 
 from ambassador import Cache, Config, IR, EnvoyConfig, Diagnostics, Scout, Version
+from ambassador.cache_check import check_config
+from ambassador.invalidation import DeltaInvalidator
 from ambassador.reconfig_stats import ReconfigStats
+from ambassador.snapshot_archive import ArchiveFile, SnapshotArchiver, archive_json
+from ambassador.status_writer import StatusUpdate, StatusWriter
+from ambassador.validation_cache import ValidationCache
 from ambassador.ir.irambassador import IRAmbassador
 from ambassador.ir.irbasemapping import IRBaseMapping
+from ambassador.ir.irclusternames import ClusterNameMap
 from ambassador.utils import SystemInfo, Timer, PeriodicTrigger, SavedSecret, load_url_contents, parse_json, dump_json, parse_bool
-from ambassador.utils import SecretHandler, KubewatchSecretHandler, FSSecretHandler, parse_bool
+from ambassador.utils import SecretHandler, SecretStore, KubewatchSecretHandler, FSSecretHandler, parse_bool
 from ambassador.fetch import ResourceFetcher
+from ambassador.fetch.resource import ResourceIdentity
 
-from ambassador.diagnostics import EnvoyStatsMgr, EnvoyStats
+from ambassador.diagnostics import DiagConfig, DiagPatches, DiagSnapshot, EnvoyStatsMgr, EnvoyStats
+from ambassador.envoy.v3 import V3Config, V3ShardWriter
 
 from ambassador.constants import Constants
 
@@ -70,8 +79,13 @@ __version__ = Version
 
 boot_time = datetime.datetime.now()
 
-# allows 10 concurrent users, with a request timeout of 60 seconds
-tvars_cache = ExpiringDict(max_len=10, max_age_seconds=60)
+# Versions of the overview for patch_client requests, shared by up to 10 concurrent
+# users with a request timeout of 60 seconds. Every client polling within the same
+# second, with no reconfigure or Envoy stats update in between, shares one version.
+tvars_cache = DiagPatches(max_versions=10, max_clients=10, client_ttl=60)
+
+# How long the overview waits for the banner_endpoint before giving up on the banner.
+BANNER_TIMEOUT = 2.0
 
 logHandler = None
 if parse_bool(os.environ.get("AMBASSADOR_JSON_LOGGING", "false")):
@@ -120,6 +134,17 @@ def number_of_workers():
     return (multiprocessing.cpu_count() * 2) + 1
 
 
+def worker_pool() -> concurrent.futures.ProcessPoolExecutor:
+    """
+    A pool with a single worker process, for work we don't want to do in diagd
+    itself. diagd has lots of threads, and if we forked it while one of them
+    held a lock (the logging lock, say), the worker would hang the first time it
+    needed that lock. So the worker comes from a forkserver, which doesn't have
+    any of diagd's threads, rather than from forking diagd.
+    """
+    return concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("forkserver"))
+
+
 class DiagApp (Flask):
     cache: Optional[Cache]
     ambex_pid: int
@@ -129,7 +154,11 @@ class DiagApp (Flask):
     snapshot_path: str
     bootstrap_path: str
     ads_path: str
+    ads_shards: Optional[V3ShardWriter]
+    ads_sharded: bool
+    snapshot_archiver: SnapshotArchiver
     clustermap_path: str
+    cluster_names: ClusterNameMap
     health_checks: bool
     no_envoy: bool
     debugging: bool
@@ -141,8 +170,10 @@ class DiagApp (Flask):
     aconf: Config
     ir: Optional[IR]
     econf: Optional[EnvoyConfig]
-    # self.diag is actually a property
-    _diag: Optional[Diagnostics]
+    # The configuration the diag service is showing. self.diag is a property that
+    # reads it.
+    diag_snapshot: Optional[DiagSnapshot]
+    diag_generation: int
     notices: 'Notices'
     scout: Scout
     watcher: 'AmbassadorEventWatcher'
@@ -156,6 +187,7 @@ class DiagApp (Flask):
 
     # Reconfiguration stats
     reconf_stats: ReconfigStats
+    validation_cache: ValidationCache
 
     # Custom metrics registry to weed-out default metrics collectors because the
     # default collectors can't be prefixed/namespaced with ambassador_.
@@ -205,7 +237,16 @@ class DiagApp (Flask):
         # Initialize the cache if we're allowed to.
         if self.enable_fast_reconfigure:
             self.logger.info("AMBASSADOR_FAST_RECONFIGURE enabled, initializing cache")
-            self.cache = Cache(self.logger)
+
+            # Entries not used in this many reconfigures get evicted, and then the
+            # least recently used entries get evicted to stay under the entry and
+            # (approximate) memory budgets. Zero means no limit.
+            cache_max_age = int(os.environ.get("AMBASSADOR_FAST_RECONFIGURE_CACHE_MAX_AGE", "10"))
+            cache_max_entries = int(os.environ.get("AMBASSADOR_FAST_RECONFIGURE_CACHE_MAX_ENTRIES", "0"))
+            cache_max_bytes = int(os.environ.get("AMBASSADOR_FAST_RECONFIGURE_CACHE_MAX_BYTES", "0"))
+
+            self.cache = Cache(self.logger, max_entries=cache_max_entries, max_bytes=cache_max_bytes,
+                               max_age=cache_max_age)
         else:
             self.logger.info("AMBASSADOR_FAST_RECONFIGURE disabled, not initializing cache")
             self.cache = None
@@ -217,6 +258,7 @@ class DiagApp (Flask):
         self.ir_timer = Timer("IR", self.metrics_registry)
         self.econf_timer = Timer("EConf", self.metrics_registry)
         self.diag_timer = Timer("Diagnostics", self.metrics_registry)
+        self.archive_timer = Timer("Archive", self.metrics_registry)
 
         # Use gauges to keep some metrics on active config
         self.diag_errors = Gauge(f'diagnostics_errors', f'Number of configuration errors',
@@ -224,6 +266,59 @@ class DiagApp (Flask):
         self.diag_notices = Gauge(f'diagnostics_notices', f'Number of configuration notices',
                                  namespace='ambassador', registry=self.metrics_registry)
 
+        # Keep track of what the cache is doing, by key prefix (see Cache.key_prefix).
+        self.cache_hits = Counter(f'cache_hits', f'Number of cache hits',
+                                  ['prefix'], namespace='ambassador', registry=self.metrics_registry)
+        self.cache_misses = Counter(f'cache_misses', f'Number of cache misses',
+                                    ['prefix'], namespace='ambassador', registry=self.metrics_registry)
+        self.cache_invalidations = Counter(f'cache_invalidations', f'Number of cache entries invalidated',
+                                           ['prefix'], namespace='ambassador', registry=self.metrics_registry)
+        self.cache_evictions = Counter(f'cache_evictions', f'Number of cache entries evicted',
+                                       ['prefix'], namespace='ambassador', registry=self.metrics_registry)
+        self.cache_entries = Gauge(f'cache_entries', f'Number of entries in the cache',
+                                   ['prefix'], namespace='ambassador', registry=self.metrics_registry)
+        self.cache_bytes = Gauge(f'cache_bytes', f'Approximate memory used by entries in the cache',
+                                 ['prefix'], namespace='ambassador', registry=self.metrics_registry)
+
+        # (prefix, stat) -> the cache's total when we last updated the counters above
+        self.cache_stats_counted: Dict[Tuple[str, str], int] = {}
+
+        # Keep track of how far behind the event watcher is running.
+        self.event_queue_depth = Gauge(f'event_queue_depth', f'Number of events waiting for the event watcher',
+                                       namespace='ambassador', registry=self.metrics_registry)
+        self.config_coalesced = Counter(f'config_coalesced', f'Number of snapshots skipped because a newer one was already queued',
+                                        namespace='ambassador', registry=self.metrics_registry)
+        self.snapshot_latency = Gauge(f'snapshot_to_ambex_seconds', f'Seconds from a snapshot being posted to its configuration reaching ambex',
+                                      namespace='ambassador', registry=self.metrics_registry)
+
+        # Remember which Envoy configurations have already been validated...
+        self.validation_cache = ValidationCache(self.logger)
+
+        self.validation_cache_hits = Counter(f'envoy_validation_cache_hits', f'Number of Envoy validations skipped by the validation cache',
+                                             namespace='ambassador', registry=self.metrics_registry)
+        self.validation_cache_misses = Counter(f'envoy_validation_cache_misses', f'Number of Envoy validations not found in the validation cache',
+                                               namespace='ambassador', registry=self.metrics_registry)
+        self.validation_time_saved = Counter(f'envoy_validation_time_saved_seconds', f'Seconds of Envoy validation skipped by the validation cache',
+                                             namespace='ambassador', registry=self.metrics_registry)
+
+        # ...and, optionally, run validations from a small long-lived worker process rather
+        # than forking all of diagd for every one.
+        self.validation_pool: Optional[concurrent.futures.ProcessPoolExecutor] = None
+
+        if parse_bool(os.environ.get("AMBASSADOR_VALIDATION_WORKER", "false")):
+            self.logger.info("AMBASSADOR_VALIDATION_WORKER enabled, validating in a worker process")
+            self.validation_pool = worker_pool()
+
+        # Cache sanity checks always run in a worker process, started when it's first needed.
+        # If a check takes longer than cache_check_timeout seconds, we give up on it, and
+        # on its worker.
+        self.cache_check_pool: Optional[concurrent.futures.ProcessPoolExecutor] = None
+        self.cache_check_running = False
+        self.cache_check_future: Optional[concurrent.futures.Future] = None
+        self.cache_check_started = 0.0
+        self.cache_check_covered = 0
+        self.cache_check_timeout = float(os.environ.get("AMBASSADOR_CACHE_CHECK_TIMEOUT", "300"))
+
         if debug:
             self.logger.setLevel(logging.DEBUG)
             logging.getLogger('ambassador').setLevel(logging.DEBUG)
@@ -245,24 +340,65 @@ class DiagApp (Flask):
         self.snapshot_path = snapshot_path
         self.clustermap_path = clustermap_path or os.path.join(os.path.dirname(self.bootstrap_path), "clustermap.json")
 
-        # You must hold config_lock when updating config elements (including diag!).
+        # Decoded secrets live under the snapshot directory. Share one store across
+        # reconfigures, so that unchanged secrets aren't rewritten and stale ones get
+        # cleaned up.
+        self.secret_store = SecretStore(self.logger, self.snapshot_path)
+
+        # Envoy names for clusters whose names are too long need to stay stable across
+        # restarts, too.
+        self.cluster_names = ClusterNameMap(self.logger, os.path.join(os.path.dirname(self.bootstrap_path),
+                                                                      "cluster-names.json"))
+
+        # Optionally, write the ADS config as a directory of content-hashed files rather
+        # than as one big file (see V3ShardWriter). In RDS mode (see V3Config), the route
+        # configurations need files of their own even if nothing else gets them.
+        self.ads_shards = None
+        self.ads_sharded = parse_bool(os.environ.get("AMBASSADOR_SHARDED_ADS", "false"))
+        rds = V3Config.rds_enabled()
+
+        if self.ads_sharded or rds:
+            if Config.envoy_api_version == "V3":
+                if self.ads_sharded:
+                    self.logger.info("AMBASSADOR_SHARDED_ADS enabled, writing ADS config to %s" % os.path.dirname(self.ads_path))
+                else:
+                    self.logger.info("AMBASSADOR_RDS enabled, writing route configurations to %s" % os.path.dirname(self.ads_path))
+
+                self.ads_shards = V3ShardWriter(self.logger, self.ads_path)
+            else:
+                if self.ads_sharded:
+                    self.logger.warning("AMBASSADOR_SHARDED_ADS requires Envoy API V3, writing ADS config to %s" % self.ads_path)
+
+                if rds:
+                    self.logger.warning("AMBASSADOR_RDS requires Envoy API V3, ignoring")
+
+                self.ads_sharded = False
+        else:
+            # Make sure ambex doesn't pick up shards left over from an earlier run.
+            V3ShardWriter.remove_shards(os.path.dirname(self.ads_path) or ".")
+
+        # The snapshot archive (aconf, IR, econf, and watt snapshot for the last few
+        # reconfigures) is just a debugging aid, so it's written in the background.
+        snapshot_count = int(os.environ.get('AMBASSADOR_SNAPSHOT_COUNT', "4"))
+        self.snapshot_archiver = SnapshotArchiver(self.logger, self.snapshot_path, snapshot_count,
+                                                  timer=self.archive_timer)
+
+        # You must hold config_lock when updating config elements.
         self.config_lock = threading.Lock()
 
-        # When generating new diagnostics, there's a dance around config_lock and
-        # diag_lock -- see the diag() property.
+        # diag_lock makes sure that only one Diagnostics build happens at a time. Only
+        # request handlers ever take it: reconfigures never wait for diagnostics.
         self.diag_lock = threading.Lock()
 
-        # Why are we doing this? Aren't we sure we're singlethreaded here?
-        # Well, yes. But self.diag is actually a property, and it will raise an
-        # assertion failure if we're not holding self.config_lock... and once
-        # the lock is in play at all, we're gonna time it, in case my belief
-        # that grabbing the lock here is always effectively free turns out to
-        # be wrong.
+        self.ir = None      # don't update unless you hold config_lock
+        self.econf = None   # don't update unless you hold config_lock
 
-        with self.config_lock:
-            self.ir = None      # don't update unless you hold config_lock
-            self.econf = None   # don't update unless you hold config_lock
-            self.diag = None    # don't update unless you hold config_lock
+        # Every reconfigure publishes a new DiagSnapshot, with a new diagnostics
+        # generation. Request handlers read self.diag_snapshot once and use what they
+        # get, without locking, and no snapshot ever changes after it's published
+        # (each one has its own DiagConfig, copied out of the IR when it's published).
+        self.diag_snapshot = None
+        self.diag_generation = 0
 
         self.stats_updater = None
         self.scout_checker = None
@@ -287,96 +423,67 @@ class DiagApp (Flask):
     def diag(self) -> Optional[Diagnostics]:
         """
         It turns out to be expensive to generate the Diagnostics class, so
-        app.diag is a property that does it on demand, handling Timers and
-        the config lock for you.
-
-        You MUST NOT already hold the config_lock or the diag_lock when
-        trying to read app.diag.
+        app.diag is a property that builds them on demand for the current
+        DiagSnapshot (see publish_config).
 
-        You MUST already have loaded an IR.
+        If you need anything else from the same configuration, grab
+        app.diag_snapshot yourself and use its diagnostics() instead: app.ir
+        could be a newer configuration by the time this returns.
         """
 
-        # The config_lock is meant to make sure that we don't ever update
-        # self.diag in two places at once, so grab that first.
-        with self.config_lock:
-            # If we've already generated diagnostics...
-            if app._diag:
-                # ...then we're good to go.
-                return app._diag
-
-        # If here, we have _not_ generated diagnostics, and we've dropped the
-        # config lock so as not to block anyone else. Next up: grab the diag
-        # lock, because we'd rather not have two diag generations happening at
-        # once.
-        with self.diag_lock:
-            # Did someone else sneak in between releasing the config lock and
-            # grabbing the diag lock?
-            if app._diag:
-                # Yup. Use their work.
-                return app._diag
-
-            # OK, go generate diagnostics.
-            _diag = self._generate_diagnostics()
-
-            # If that didn't work, no point in messing with the config lock.
-            if not _diag:
-                return None
-
-            # Once here, we need to - once again - grab the config lock to update
-            # app._diag. This is safe because this is the only place we ever mess
-            # with the diag lock, so nowhere else will try to grab the diag lock
-            # while holding the config lock.
-            with app.config_lock:
-                app._diag = _diag
-
-            # Finally, we can return app._diag to our caller.
-            return app._diag
-
-    @diag.setter
-    def diag(self, diag: Optional[Diagnostics]) -> None:
+        snapshot = self.diag_snapshot
+
+        return snapshot.diagnostics() if snapshot else None
+
+    def publish_config(self, aconf: Config, ir: IR, econf: EnvoyConfig) -> None:
         """
-        It turns out to be expensive to generate the Diagnostics class, so
-        app.diag is a property that does it on demand, handling Timers and
-        the config lock for you.
+        Make a new configuration current, both for the watcher and for the diag
+        service. This is the only thing that ever changes app.diag_snapshot,
+        and it's a single reference swap: request handlers never wait for it,
+        and it never waits for them.
 
-        You MUST already hold the config_lock when trying to update app.diag.
-        You MUST NOT hold the diag_lock.
+        The snapshot gets a DiagConfig copied out of the IR and Envoy config
+        right here: later reconfigures reuse, and update, cached IR objects,
+        and copying them now means that the diag service never has to look at
+        the live ones (or lock anything to do it).
+
+        You MUST already hold the config_lock when calling this method.
         """
-        self._diag = diag
 
-    def _generate_diagnostics(self) -> Optional[Diagnostics]:
+        self.aconf = aconf
+        self.ir = ir
+        self.econf = econf
+
+        # DON'T generate the Diagnostics here, because that turns out to be expensive.
+        # Instead, the new snapshot will generate them if anyone actually wants them.
+        self.diag_generation += 1
+        self.diag_snapshot = DiagSnapshot(self.diag_generation, DiagConfig(ir, econf),
+                                          previous=self.diag_snapshot, builder=self._generate_diagnostics)
+
+    def _generate_diagnostics(self, config: DiagConfig, previous: Optional[Diagnostics],
+                              generation: int) -> Diagnostics:
         """
-        Do the heavy lifting of generating Diagnostics for our current configuration.
-        Really, only the diag() property should be calling this method, but if you
-        are convinced that you need to call it from elsewhere:
-
-        1. You're almost certainly wrong about needing to call it from elsewhere.
-        2. You MUST hold the diag_lock when calling this method.
-        3. You MUST NOT hold the config_lock when calling this method.
-        4. No, really, you're wrong. Don't call this method from anywhere but the
-           diag() property.
+        Do the heavy lifting of generating Diagnostics for a DiagSnapshot. Only
+        DiagSnapshot.diagnostics() should be calling this method.
         """
 
-        # Make sure we have an IR and econf to work with.
-        if not app.ir or not app.econf:
-            # Nope, bail.
-            return None
-
-        # OK, go ahead and generate diagnostics. Use the diag_timer to time
-        # this.
-        with self.diag_timer:
-            _diag = Diagnostics(app.ir, app.econf)
+        # Snapshots of different generations could be building at once, but the
+        # diag_timer can only time one thing at a time.
+        with self.diag_lock:
+            # OK, go ahead and generate diagnostics. Use the diag_timer to time
+            # this.
+            with self.diag_timer:
+                _diag = Diagnostics(config, previous=previous, generation=generation)
 
-            # Update some metrics data points given the new generated Diagnostics
-            diag_dict = _diag.as_dict()
-            self.diag_errors.set(len(diag_dict.get("errors", [])))
-            self.diag_notices.set(len(diag_dict.get("notices", [])))
+                # Update some metrics data points given the new generated Diagnostics
+                self.diag_errors.set(len(_diag.errors))
+                self.diag_notices.set(len(_diag.notices))
 
-            # Note that we've updated diagnostics, since that might trigger a
-            # timer log.
-            self.reconf_stats.mark("diag")
+                # Note that we've updated diagnostics, since that might trigger a
+                # timer log.
+                self.reconf_stats.mark("diag")
 
-            return _diag
+                return _diag
 
     def check_scout(self, what: str) -> None:
         self.watcher.post("SCOUT", (what, self.ir))
@@ -396,7 +503,8 @@ class DiagApp (Flask):
                     self.aconf_timer,
                     self.ir_timer,
                     self.econf_timer,
-                    self.diag_timer ]:
+                    self.diag_timer,
+                    self.archive_timer ]:
                 if t:
                     self.logger.info(t.summary())
 
@@ -411,120 +519,147 @@ class DiagApp (Flask):
             self.reconf_stats.mark_timers_logged()
 
         # In this case we need to check to see if it's time to do a configuration
-        # check, too.
-        if self.reconf_stats.needs_check():
-            result = False
+        # check, too. The check itself runs in the background, so don't start another
+        # while one is still running (unless it's been running for too long).
+        self.expire_cache_check()
 
+        if self.reconf_stats.needs_check() and not self.cache_check_running:
             try:
-                result = self.check_cache()
+                self.start_cache_check()
             except Exception as e:
                 tb = "\n".join(traceback.format_exception(*sys.exc_info()))
                 self.logger.error("CACHE: CHECK FAILED: %s\n%s" % (e, tb))
 
-            # Mark that the check has happened.
-            self.reconf_stats.mark_checked(result)
+                # Mark that the check has happened.
+                self.reconf_stats.mark_checked(False)
 
-    @staticmethod
-    def json_diff(what: str, j1: str, j2: str) -> str:
-        output = ""
-
-        l1 = j1.split("\n")
-        l2 = j2.split("\n")
+    def update_cache_metrics(self) -> None:
+        if not self.cache:
+            return
 
-        n1 = f"{what} incremental"
-        n2 = f"{what} nonincremental"
+        self.cache.measure()
 
-        output += "\n--------\n"
+        for prefix, stats in self.cache.prefix_stats.items():
+            # The cache keeps cumulative totals, so bump each counter by however
+            # much its total has grown since we last looked.
+            for what, counter in (('hits', self.cache_hits),
+                                  ('misses', self.cache_misses),
+                                  ('invalidations', self.cache_invalidations),
+                                  ('evictions', self.cache_evictions)):
+                value = getattr(stats, what)
+                delta = value - self.cache_stats_counted.get((prefix, what), 0)
 
-        for line in difflib.context_diff(l1, l2, fromfile=n1, tofile=n2):
-            line = line.rstrip()
-            output += line
-            output += "\n"
+                if delta > 0:
+                    counter.labels(prefix=prefix).inc(delta)
 
-        return output
+                self.cache_stats_counted[(prefix, what)] = value
 
+            self.cache_entries.labels(prefix=prefix).set(stats.entries)
+            self.cache_bytes.labels(prefix=prefix).set(stats.bytes)
 
-    def check_cache(self) -> bool:
+    def start_cache_check(self) -> None:
         # We're going to build a shiny new IR and econf from our existing aconf, and make
-        # sure everything matches. We will _not_ use the existing cache for this.
+        # sure everything matches. We will _not_ use the existing cache for this, and
+        # we'll do it in a worker process, so that reconfigures can carry on meanwhile:
+        # all we do here is snapshot what the worker needs. When it's done, it'll post
+        # a CACHE_CHECKED event, and finish_cache_check will take it from there.
         #
         # For this, make sure we have an IR already...
         assert(self.aconf)
         assert(self.ir)
         assert(self.econf)
 
-        # Compute this IR/econf with a new empty cache. It saves a lot of trouble with
-        # having to delete cache keys from the JSON.
-
         self.logger.debug("CACHE: starting check")
-        cache = Cache(self.logger)
+
+        # This is how many outstanding incrementals this check covers: anything that
+        # happens while it runs will need checking next time.
+        covered = self.reconf_stats.incrementals_outstanding
+
+        with self.config_lock:
+            aconf_pickle = pickle.dumps(self.aconf)
+            ir_json = dump_json(self.ir.as_dict())
+            econf_json = dump_json(self.econf.as_dict())
+
         scc = SecretHandler(app.logger, "check_cache", app.snapshot_path, "check")
-        ir = IR(self.aconf, secret_handler=scc, cache=cache)
-        econf = EnvoyConfig.generate(ir, Config.envoy_api_version, cache=cache)
 
-        # This is testing code.
-        # name = list(ir.clusters.keys())[0]
-        # del(ir.clusters[name])
+        if not self.cache_check_pool:
+            self.cache_check_pool = worker_pool()
 
-        i1 = self.ir.as_json()
-        i2 = ir.as_json()
+        future = self.cache_check_pool.submit(check_config, aconf_pickle, ir_json, econf_json,
+                                              Config.envoy_api_version, scc,
+                                              dict(self.cluster_names.overrides))
+        self.cache_check_running = True
+        self.cache_check_future = future
+        self.cache_check_started = time.monotonic()
+        self.cache_check_covered = covered
 
-        e1 = self.econf.as_json()
-        e2 = econf.as_json()
+        future.add_done_callback(lambda f: self.watcher.post_nowait("CACHE_CHECKED", (f, covered)))
 
-        result = True
-        errors = ""
+    def expire_cache_check(self) -> None:
+        """
+        If the running cache check has passed its deadline, give up on it: its
+        worker is presumably stuck, so get rid of it (the next check will start a
+        new one), and count the check as failed.
+        """
 
-        if i1 != i2:
-            result = False
-            self.logger.error("CACHE: IR MISMATCH")
-            errors += "IR diffs:\n"
-            errors += self.json_diff("IR", i1, i2)
+        if not self.cache_check_running:
+            return
 
-        if e1 != e2:
-            result = False
-            self.logger.error("CACHE: ENVOY CONFIG MISMATCH")
-            errors += "econf diffs:\n"
-            errors += self.json_diff("econf", i1, i2)
+        elapsed = time.monotonic() - self.cache_check_started
 
-        if not result:
-            err_path = os.path.join(self.snapshot_path, "diff-tmp.txt")
+        if elapsed < self.cache_check_timeout:
+            return
 
-            open(err_path, "w").write(errors)
+        self.logger.error("CACHE: check still running after %.1fs, giving up on it", elapsed)
 
-            snapcount = int(os.environ.get('AMBASSADOR_SNAPSHOT_COUNT', "4"))
-            snaplist: List[Tuple[str, str]] = []
+        pool = self.cache_check_pool
 
-            if snapcount > 0:
-                # If snapcount is 4, this range statement becomes range(-4, -1)
-                # which gives [ -4, -3, -2 ], which the list comprehension turns
-                # into [ ( "-3", "-4" ), ( "-2", "-3" ), ( "-1", "-2" ) ]...
-                # which is the list of suffixes to rename to rotate the snapshots.
+        self.cache_check_pool = None
+        self.cache_check_running = False
+        self.cache_check_future = None
 
-                snaplist += [ (str(x+1), str(x)) for x in range(-1 * snapcount, -1) ]
+        if pool:
+            # shutdown() won't stop a worker that's busy, so kill it first. (Killing it
+            # breaks the pool, so the abandoned check's CACHE_CHECKED event will still
+            # show up, and finish_cache_check will ignore it.)
+            processes = getattr(pool, '_processes', None) or {}
 
-                # After dealing with that, we need to rotate the current file into -1.
-                snaplist.append(( '', '-1' ))
+            for process in list(processes.values()):
+                process.kill()
 
-            # Whether or not we do any rotation, we need to cycle in the '-tmp' file.
-            snaplist.append(( '-tmp', '' ))
+            pool.shutdown(wait=False)
 
-            for from_suffix, to_suffix in snaplist:
-                from_path = os.path.join(app.snapshot_path, "diff{}.txt".format(from_suffix))
-                to_path = os.path.join(app.snapshot_path, "diff{}.txt".format(to_suffix))
+        self.reconf_stats.mark_checked(False, covered=self.cache_check_covered)
 
-                try:
-                    self.logger.debug("rotate: %s -> %s" % (from_path, to_path))
-                    os.rename(from_path, to_path)
-                except IOError as e:
-                    self.logger.debug("skip %s -> %s: %s" % (from_path, to_path, e))
-                    pass
-                except Exception as e:
-                    self.logger.debug("could not rename %s -> %s: %s" % (from_path, to_path, e))
+    def finish_cache_check(self, future: concurrent.futures.Future, covered: int) -> None:
+        if future is not self.cache_check_future:
+            # We already gave up on this check (see expire_cache_check).
+            self.logger.debug("CACHE: ignoring an abandoned check")
+            return
 
-        self.logger.info("CACHE: check %s" % ("succeeded" if result else "failed"))
+        self.cache_check_running = False
+        self.cache_check_future = None
+        result = False
 
-        return result
+        try:
+            result, errors = future.result()
+
+            if not result:
+                # Keep the differences around in the snapshot archive (as diff.txt, with
+                # older ones rotated to diff-1.txt.gz and so on).
+                self.snapshot_archiver.submit({ "diff.txt": lambda: errors })
+        except Exception as e:
+            tb = "\n".join(traceback.format_exception(*sys.exc_info()))
+            self.logger.error("CACHE: CHECK FAILED: %s\n%s" % (e, tb))
+
+            # If the worker died, start a new one next time.
+            if isinstance(e, concurrent.futures.BrokenExecutor):
+                self.cache_check_pool = None
+
+        # Mark that the check has happened.
+        self.reconf_stats.mark_checked(result, covered=covered)
+
+        self.logger.info("CACHE: check %s" % ("succeeded" if result else "failed"))
 
 
 # get the "templates" directory, or raise "FileNotFoundError" if not found
@@ -566,12 +701,6 @@ def standard_handler(f):
 
         app.logger.debug("%s handler %s" % (prefix, func_name))
 
-        # Getting elements in the `tvars_cache` will make sure eviction happens on `max_age_seconds` TTL
-        # for removed patch_client rather than waiting to fill `max_len`.
-        # Looping over a copied list of keys, to prevent mutating tvars_cache while iterating.
-        for k in list(tvars_cache.keys()):
-            tvars_cache.get(k)
-
         # Default to the exception case
         result_to_log = "server error"
         status_to_log = 500
@@ -903,7 +1032,7 @@ def check_alive():
 
 @app.route('/ambassador/v0/check_ready', methods=[ 'GET' ])
 def check_ready():
-    if not app.ir:
+    if not app.diag_snapshot:
         return "ambassador waiting for config\n", 503
 
     status = envoy_status(app.estatsmgr.get_stats())
@@ -917,13 +1046,14 @@ def check_ready():
 @app.route('/ambassador/v0/diag/', methods=[ 'GET' ])
 @standard_handler
 def show_overview(reqid=None):
-    # If we don't have an IR yet, do nothing.
+    # If we don't have a configuration yet, do nothing.
     #
-    # We don't bother grabbing the config_lock here because we're not changing
-    # anything, and an overview request hitting at exactly the same moment as
-    # the first configure is a race anyway. If it fails, that's not a big deal,
-    # they can try again.
-    if not app.ir:
+    # No locking here: published snapshots never change, so we just work with
+    # whichever one is current right now, even if a reconfigure publishes a new
+    # one while we're at it.
+    snapshot = app.diag_snapshot
+
+    if not snapshot:
           app.logger.debug("OV %s - can't do overview before configuration" % reqid)
           return "Can't do overview before configuration", 503
 
@@ -932,49 +1062,58 @@ def show_overview(reqid=None):
 
     app.logger.debug("OV %s - showing overview" % reqid)
 
-    # Remember that app.diag is a property that can involve some real expense
-    # to compute -- we don't want to call it more than once here, so we cache
-    # its value.
-    diag = app.diag
+    # Generating the Diagnostics can involve some real expense, but the snapshot
+    # only does it once.
+    diag = snapshot.diagnostics()
+    estats = app.estatsmgr.get_stats()
 
-    if app.verbose:
-        app.logger.debug("OV %s: DIAG" % reqid)
-        app.logger.debug("%s" % dump_json(diag.as_dict(), pretty=True))
+    def build_tvars() -> Dict[str, Any]:
+        if app.verbose:
+            app.logger.debug("OV %s: DIAG" % reqid)
+            app.logger.debug("%s" % dump_json(diag.as_dict(), pretty=True))
 
-    estats = app.estatsmgr.get_stats()
-    ov = diag.overview(request, estats)
+        ov = diag.overview(request, estats)
 
-    if app.verbose:
-        app.logger.debug("OV %s: OV" % reqid)
-        app.logger.debug("%s" % dump_json(ov, pretty=True))
-        app.logger.debug("OV %s: collecting errors" % reqid)
+        if app.verbose:
+            app.logger.debug("OV %s: OV" % reqid)
+            app.logger.debug("%s" % dump_json(ov, pretty=True))
+            app.logger.debug("OV %s: collecting errors" % reqid)
 
-    ddict = collect_errors_and_notices(request, reqid, "overview", diag)
+        ddict = collect_errors_and_notices(request, reqid, "overview", diag)
 
-    banner_content = None
-    if app.banner_endpoint and app.ir and app.ir.edge_stack_allowed:
-        try:
-            response = requests.get(app.banner_endpoint)
-            if response.status_code == 200:
-                banner_content = response.text
-        except Exception as e:
-            app.logger.error("could not get banner_content: %s" % e)
+        banner_content = None
+        if app.banner_endpoint and snapshot.config.edge_stack_allowed:
+            try:
+                response = requests.get(app.banner_endpoint, timeout=BANNER_TIMEOUT)
+                if response.status_code == 200:
+                    banner_content = response.text
+            except Exception as e:
+                app.logger.error("could not get banner_content: %s" % e)
 
-    tvars = dict(system=system_info(app),
-                 envoy_status=envoy_status(estats),
-                 loginfo=app.estatsmgr.loginfo,
-                 notices=app.notices.notices,
-                 banner_content=banner_content,
-                 **ov, **ddict)
+        return dict(system=system_info(app),
+                    envoy_status=envoy_status(estats),
+                    loginfo=app.estatsmgr.loginfo,
+                    notices=app.notices.notices,
+                    banner_content=banner_content,
+                    **ov, **ddict)
 
     patch_client = request.args.get('patch_client', None)
     if request.args.get('json', None):
         filter_key = request.args.get('filter', None)
 
-        if filter_key == 'webui':
-            filter_webui(tvars)
-        elif filter_key:
-            return jsonify(tvars.get(filter_key, None))
+        if filter_key and (filter_key != 'webui'):
+            # Most of what's in the Diagnostics can't change without a new snapshot,
+            # so serve the JSON the snapshot already has for it, rather than building
+            # the whole overview to serialize one piece. Errors and notices need
+            # processing, and a loglevel request has side effects, so those still go
+            # the long way around.
+            if (filter_key not in ( 'errors', 'notices' )) and not request.args.get('loglevel', None):
+                blob = snapshot.json(filter_key)
+
+                if blob is not None:
+                    return Response(blob, mimetype="application/json")
+
+            return jsonify(build_tvars().get(filter_key, None))
 
         if patch_client:
             # Assume this is the Admin UI. Recursively drop all "serialization"
@@ -984,23 +1123,39 @@ def show_overview(reqid=None):
             # parameter of the json.loads(...) call. We have to use python's
             # json library instead of orjson, because orjson does not support
             # the object_hook feature.
+            def build_content() -> Any:
+                tvars = build_tvars()
+
+                if filter_key == 'webui':
+                    filter_webui(tvars)
+
+                # Serialize the tvars into a json-string using the same jsonify Flask serializer, then load the json object
+                return json.loads(flask_json.dumps(tvars), object_hook=drop_serializer_key)
+
+            # The overview only changes when the configuration or the Envoy stats do
+            # (or as time passes, which tvars_cache takes care of), so every client
+            # shares the same versions of it, and the diffs between them
+            # (http://jsonpatch.com/). Note that a loglevel request has side effects,
+            # so it always gets a version of its own.
+            version_key: Tuple[Any, ...] = (diag.generation, estats.last_update, filter_key)
+
+            if request.args.get('loglevel', None):
+                version_key += (reqid,)
 
-            # Get the previous full representation
-            cached_tvars_json = tvars_cache.get(patch_client, dict())
-            # Serialize the tvars into a json-string using the same jsonify Flask serializer, then load the json object
-            response_content = json.loads(flask_json.dumps(tvars), object_hook=drop_serializer_key)
-            # Diff between the previous representation and the current full representation  (http://jsonpatch.com/)
-            patch = jsonpatch.make_patch(cached_tvars_json, response_content)
-            # Save the current full representation in memory
-            tvars_cache[patch_client] = response_content
+            patch = tvars_cache.patch(patch_client, version_key, build_content)
 
             # Return only the diff
-            return Response(patch.to_string(), mimetype="application/json")
-        else:
-            return jsonify(tvars)
+            return Response(patch, mimetype="application/json")
+
+        tvars = build_tvars()
+
+        if filter_key == 'webui':
+            filter_webui(tvars)
+
+        return jsonify(tvars)
     else:
         app.check_scout("overview")
-        return Response(render_template("overview.html", **tvars))
+        return Response(render_template("overview.html", **build_tvars()))
 
 
 def collect_errors_and_notices(request, reqid, what: str, diag: Diagnostics) -> Dict:
@@ -1052,13 +1207,13 @@ def collect_errors_and_notices(request, reqid, what: str, diag: Diagnostics) ->
 @app.route('/ambassador/v0/diag/<path:source>', methods=[ 'GET' ])
 @standard_handler
 def show_intermediate(source=None, reqid=None):
-    # If we don't have an IR yet, do nothing.
+    # If we don't have a configuration yet, do nothing.
     #
-    # We don't bother grabbing the config_lock here because we're not changing
-    # anything, and an overview request hitting at exactly the same moment as
-    # the first configure is a race anyway. If it fails, that's not a big deal,
-    # they can try again.
-    if not app.ir:
+    # No locking here: published snapshots never change, so we just work with
+    # whichever one is current right now.
+    snapshot = app.diag_snapshot
+
+    if not snapshot:
           app.logger.debug("SRC %s - can't do intermediate for %s before configuration" % (reqid, source))
           return "Can't do overview before configuration", 503
 
@@ -1067,10 +1222,9 @@ def show_intermediate(source=None, reqid=None):
 
     app.logger.debug("SRC %s - getting intermediate for '%s'" % (reqid, source))
 
-    # Remember that app.diag is a property that can involve some real expense
-    # to compute -- we don't want to call it more than once here, so we cache
-    # its value.
-    diag = app.diag
+    # Generating the Diagnostics can involve some real expense, but the snapshot
+    # only does it once.
+    diag = snapshot.diagnostics()
 
     method = request.args.get('method', None)
     resource = request.args.get('resource', None)
@@ -1148,7 +1302,9 @@ def get_prometheus_metrics(*args, **kwargs):
 
     # Extra metrics endpoint
     extra_metrics_content = ''
-    if app.metrics_endpoint and app.ir and app.ir.edge_stack_allowed:
+    snapshot = app.diag_snapshot
+
+    if app.metrics_endpoint and snapshot and snapshot.config.edge_stack_allowed:
         try:
             response = requests.get(app.metrics_endpoint)
             if response.status_code == 200:
@@ -1202,15 +1358,68 @@ class SystemStatus:
         return { key: info.to_dict() for key, info in self.status.items() }
 
 
+class StatsCounter:
+    """
+    Export a running total that something else keeps (like StatusWriter.stats())
+    as a Prometheus counter, read whenever the registry is scraped.
+    """
+
+    def __init__(self, registry: CollectorRegistry, name: str, documentation: str,
+                 value: Callable[[], float]) -> None:
+        self.name = f'ambassador_{name}'
+        self.documentation = documentation
+        self.value = value
+
+        registry.register(self)
+
+    def collect(self) -> List[CounterMetricFamily]:
+        return [ CounterMetricFamily(self.name, self.documentation, value=self.value()) ]
+
+
 class KubeStatus:
-    pool: concurrent.futures.ProcessPoolExecutor
+    writer: StatusWriter
 
-    def __init__(self, app) -> None:
+    def __init__(self, app, command: Optional[List[str]]=None) -> None:
         self.app = app
         self.logger = app.logger
         self.live: Dict[str,  bool] = {}
+
+        # What we've most recently posted for each object. Anything that turns out not
+        # to have been written gets forgotten again (see forget), so that posting it
+        # again will actually retry it.
         self.current_status: Dict[str, str] = {}
-        self.pool = concurrent.futures.ProcessPoolExecutor(max_workers=5)
+
+        # Status updates go through a single long-lived `kubestatus --stream`, in
+        # batches, coalesced per object, and rate-limited (in updates per second;
+        # zero means no limit).
+        self.writer = StatusWriter(
+            self.logger,
+            command or [ 'kubestatus', '--cache-dir', '/tmp/client-go-http-cache', '--stream' ],
+            max_pending=int(os.environ.get("AMBASSADOR_KUBESTATUS_MAX_PENDING", "10000")),
+            max_batch=int(os.environ.get("AMBASSADOR_KUBESTATUS_BATCH_SIZE", "100")),
+            rate=float(os.environ.get("AMBASSADOR_KUBESTATUS_RATE", "100")),
+            on_failed=self.forget
+        )
+
+        queue_depth = Gauge('kubestatus_queue_depth', 'Number of Kubernetes status updates waiting to be written',
+                            namespace='ambassador', registry=app.metrics_registry)
+        queue_depth.set_function(lambda: self.writer.queue_depth)
+
+        for stat, name, description in [ ('coalesced', 'coalesced', 'Number of Kubernetes status updates superseded before being written'),
+                                         ('dropped', 'dropped', 'Number of Kubernetes status updates dropped'),
+                                         ('sent', 'written', 'Number of Kubernetes status updates written'),
+                                         ('errors', 'errors', 'Number of Kubernetes status updates that failed') ]:
+            StatsCounter(app.metrics_registry, f'kubestatus_{name}', description,
+                         functools.partial(lambda stat: self.writer.stats()[stat], stat))
+
+    def forget(self, update: StatusUpdate) -> None:
+        """
+        The writer gave up on an update, so make sure the next post() for that object
+        sends it again -- unless something newer has been posted since.
+        """
+
+        if self.current_status.get(update.key, None) == update.text:
+            self.current_status.pop(update.key, None)
 
     def mark_live(self, kind: str, name: str, namespace: str) -> None:
         key = f"{kind}/{name}.{namespace}"
@@ -1241,10 +1450,9 @@ class KubeStatus:
         else:
             # self.logger.info(f"KubeStatus MASTER {os.getpid()}: {key} needs {text}")
 
-            # For now we're going to assume that this works.
+            # Assume this works: if it doesn't, the writer will tell us (see forget).
             self.current_status[key] = text
-            f = self.pool.submit(kubestatus_update, kind, name, namespace, text)
-            f.add_done_callback(kubestatus_update_done)
+            self.writer.post(kind, name, namespace, text)
 
 
 # The KubeStatusNoMappings class clobbers the mark_live() method of the
@@ -1265,23 +1473,20 @@ class KubeStatusNoMappings (KubeStatus):
 
         super().post(kind, name, namespace, text)
 
-def kubestatus_update(kind: str, name: str, namespace: str, text: str) -> str:
-    cmd = [ 'kubestatus', '--cache-dir', '/tmp/client-go-http-cache', kind, name, '-n', namespace, '-u', '/dev/fd/0' ]
-    # print(f"KubeStatus UPDATE {os.getpid()}: running command: {cmd}")
+def envoy_validate(command: List[str], timeout: int) -> Tuple[int, bytes, bool]:
+    """
+    Run a single Envoy validation. This is a module-level function so that it
+    can run in the validation worker process, if there is one.
+
+    :return: exit status, output, and whether the validation timed out
+    """
 
     try:
-        rc = subprocess.run(cmd, input=text.encode('utf-8'), stdout=subprocess.PIPE, stderr=subprocess.STDOUT, timeout=5)
-        if rc.returncode == 0:
-            return f"{name}.{namespace}: update OK"
-        else:
-            return f"{name}.{namespace}: error {rc.returncode}"
-
+        return 0, subprocess.check_output(command, stderr=subprocess.STDOUT, timeout=timeout), False
+    except subprocess.CalledProcessError as e:
+        return e.returncode, e.output, False
     except subprocess.TimeoutExpired as e:
-        return f"{name}.{namespace}: timed out\n\n{e.output}"
-
-def kubestatus_update_done(f: concurrent.futures.Future) -> None:
-    # print(f"KubeStatus DONE {os.getpid()}: result {f.result()}")
-    pass
+        return 1, e.output or ''.encode('utf-8'), True
 
 class AmbassadorEventWatcher(threading.Thread):
     # The key for 'Actions' is chimed - chimed_ok - env_good. This will make more sense
@@ -1306,6 +1511,25 @@ class AmbassadorEventWatcher(threading.Thread):
         self.logger = self.app.logger
         self.events: queue.Queue = queue.Queue()
 
+        # Events we've already pulled off self.events but haven't handled yet: we look
+        # at everything that's queued up before handling a CONFIG, so that we only build
+        # the newest snapshot (see run()).
+        self.pending: Deque[Tuple[str, Any, queue.Queue, float]] = collections.deque()
+
+        # When the oldest of the CONFIG events we've skipped in favor of a newer one
+        # since the last build was posted.
+        self.superseded_since: Optional[float] = None
+
+        # When the snapshot we're currently building was posted (for the
+        # snapshot-to-ambex latency metric).
+        self.snapshot_posted: Optional[float] = None
+
+        self.invalidator = DeltaInvalidator(self.logger)
+        self.last_provenance: Dict[ResourceIdentity, List[ResourceIdentity]] = {}
+
+        # The hash of the last ADS config we handed to ambex.
+        self.last_ads_hash: Optional[str] = None
+
         self.chimed = False         # Have we ever sent a chime about the environment?
         self.last_chime = False     # What was the status of our last chime? (starts as False)
         self.env_good = False       # Is our environment currently believed to be OK?
@@ -1314,10 +1538,56 @@ class AmbassadorEventWatcher(threading.Thread):
     def post(self, cmd: str, arg: Optional[Union[str, Tuple[str, Optional[IR]]]]) -> Tuple[int, str]:
         rqueue: queue.Queue = queue.Queue()
 
-        self.events.put((cmd, arg, rqueue))
+        self.events.put((cmd, arg, rqueue, time.monotonic()))
+        self.update_queue_depth()
 
         return rqueue.get()
 
+    def post_nowait(self, cmd: str, arg: Any) -> None:
+        """
+        Post an event without waiting for it to be handled. This is for posting
+        from threads that mustn't block on the watcher, like a Future's callbacks.
+        """
+
+        self.events.put((cmd, arg, queue.Queue(), time.monotonic()))
+        self.update_queue_depth()
+
+    def update_queue_depth(self) -> None:
+        """
+        Update the event_queue_depth metric: everything that's been posted but not
+        yet picked up for handling, whether or not it's made it to self.pending.
+        """
+
+        self.app.event_queue_depth.set(self.events.qsize() + len(self.pending))
+
+    def next_event(self) -> Tuple[str, Any, queue.Queue, float]:
+        """
+        Return the next event to handle, waiting for one if need be. Everything else
+        that's already queued gets moved to self.pending, so that the caller can see
+        what's coming up behind the event it's handling.
+        """
+
+        if not self.pending:
+            self.pending.append(self.events.get())
+
+        while True:
+            try:
+                self.pending.append(self.events.get_nowait())
+            except queue.Empty:
+                break
+
+        event = self.pending.popleft()
+        self.update_queue_depth()
+
+        return event
+
+    def superseded(self) -> bool:
+        """
+        Is there a newer CONFIG event waiting behind the one we're about to handle?
+        """
+
+        return any(pending[0] == 'CONFIG' for pending in self.pending)
+
     def update_estats(self) -> None:
         self.app.estatsmgr.update()
 
@@ -1329,7 +1599,7 @@ class AmbassadorEventWatcher(threading.Thread):
         self.logger.info("starting event watcher")
 
         while True:
-            cmd, arg, rqueue = self.events.get()
+            cmd, arg, rqueue, posted = self.next_event()
             # self.logger.info("EVENT: %s" % cmd)
 
             if cmd == 'CONFIG_FS':
@@ -1342,9 +1612,32 @@ class AmbassadorEventWatcher(threading.Thread):
             elif cmd == 'CONFIG':
                 version, url = arg
 
+                if self.superseded():
+                    # There's a newer snapshot already queued, so there's no point in
+                    # building this one. Note that watt always hands us the URL of its
+                    # latest snapshot, and the deltas in each snapshot are relative to
+                    # the one before it, so skipping this one means that the newer one
+                    # will have to be a complete reconfigure (see _load_ir).
+                    self.app.config_coalesced.inc()
+
+                    if (self.superseded_since is None) or (posted < self.superseded_since):
+                        self.superseded_since = posted
+
+                    self.logger.debug("skipping snapshot %s: superseded by a newer one" % url)
+                    self._respond(rqueue, 200, 'superseded by a newer snapshot')
+                    continue
+
+                # Measure latency from the oldest snapshot that this build stands in for.
+                self.snapshot_posted = posted
+                coalesced = self.superseded_since is not None
+
+                if coalesced:
+                    self.snapshot_posted = min(posted, typecast(float, self.superseded_since))
+                    self.superseded_since = None
+
                 try:
                     if version == 'watt':
-                        self.load_config_watt(rqueue, url)
+                        self.load_config_watt(rqueue, url, force_reset=coalesced)
                     else:
                         raise RuntimeError("config from %s not supported" % version)
                 except Exception as e:
@@ -1359,6 +1652,13 @@ class AmbassadorEventWatcher(threading.Thread):
                     self.logger.error("could not reconfigure: %s" % e)
                     self.logger.exception(e)
                     self._respond(rqueue, 500, 'scout check failed')
+            elif cmd == 'CACHE_CHECKED':
+                try:
+                    self._respond(rqueue, 200, 'done')
+                    self.app.finish_cache_check(*arg)
+                except Exception as e:
+                    self.logger.error("could not finish cache check? %s" % e)
+                    self.logger.exception(e)
             elif cmd == 'TIMER':
                 try:
                     self._respond(rqueue, 200, 'done')
@@ -1443,7 +1743,7 @@ class AmbassadorEventWatcher(threading.Thread):
         self.app.config_timer.start()
 
         snapshot = re.sub(r'[^A-Za-z0-9_-]', '_', path)
-        scc = FSSecretHandler(app.logger, path, app.snapshot_path, "0")
+        scc = FSSecretHandler(app.logger, path, app.snapshot_path, "0", store=app.secret_store)
 
         with self.app.fetcher_timer:
             aconf = Config()
@@ -1463,7 +1763,7 @@ class AmbassadorEventWatcher(threading.Thread):
     # reconfiguring these days.
     #
     # BE CAREFUL ABOUT STOPPING THE RECONFIGURATION TIMER ONCE IT IS STARTED.
-    def load_config_watt(self, rqueue: queue.Queue, url: str):
+    def load_config_watt(self, rqueue: queue.Queue, url: str, force_reset: bool=False):
         snapshot = url.split('/')[-1]
         ss_path = os.path.join(app.snapshot_path, "snapshot-tmp.yaml")
 
@@ -1484,7 +1784,7 @@ class AmbassadorEventWatcher(threading.Thread):
 
         # Weirdly, we don't need a special WattSecretHandler: parse_watt knows how to handle
         # the secrets that watt sends.
-        scc = SecretHandler(app.logger, url, app.snapshot_path, snapshot)
+        scc = SecretHandler(app.logger, url, app.snapshot_path, snapshot, store=app.secret_store)
 
         # OK. Time the various configuration sections separately.
 
@@ -1503,68 +1803,49 @@ class AmbassadorEventWatcher(threading.Thread):
             #
             # IF YOU CHANGE THIS, BE CAREFUL TO STOP THE RECONFIGURATION TIMER.
 
-        self._load_ir(rqueue, aconf, fetcher, scc, snapshot)
+        self._load_ir(rqueue, aconf, fetcher, scc, snapshot, force_reset=force_reset)
 
     # _load_ir is where the heavy lifting of a reconfigure happens.
     #
     # AT THE POINT OF ENTRY, THE RECONFIGURATION TIMER IS RUNNING. DO NOT LEAVE
     # THIS METHOD WITHOUT STOPPING THE RECONFIGURATION TIMER.
     def _load_ir(self, rqueue: queue.Queue, aconf: Config, fetcher: ResourceFetcher,
-                 secret_handler: SecretHandler, snapshot: str) -> None:
+                 secret_handler: SecretHandler, snapshot: str, force_reset: bool=False) -> None:
         with self.app.aconf_timer:
             aconf.load_all(fetcher.sorted())
 
-        aconf_path = os.path.join(app.snapshot_path, "aconf-tmp.json")
-        open(aconf_path, "w").write(aconf.as_json())
-
         # Assume that this should be marked as a complete reconfigure.
         config_type = "complete"
+        delta_kinds: Set[str] = set()
 
         # OK. If we have a cache...
         if self.app.cache is not None:
             # ...then we'll start by assuming that we'll need to reset it.
             reset_cache = True
 
-            # Next up: are there any deltas?
-            if fetcher.deltas:
-                # Yes. We're going to walk over them all and assemble a list
-                # of things to delete and a count of errors while processing our
-                # list.
-
-                delta_errors = 0
-                to_invalidate: List[str] = []
-
-                for delta in fetcher.deltas:
-                    self.logger.debug(f"Delta: {delta}")
-
-                    # The "kind" of a Delta must be a string; assert that to make
-                    # mypy happy.
-
-                    delta_kind = delta['kind']
-                    assert(isinstance(delta_kind, str))
-
-                    # Only worry about Mappings and TCPMappings right now.
-                    if (delta_kind == 'Mapping') or (delta_kind == 'TCPMapping'):
-                        # XXX C'mon, mypy, is this cast really necessary?
-                        metadata = typecast(Dict[str, str], delta.get("metadata", {}))
-                        name = metadata.get("name", "")
-                        namespace = metadata.get("namespace", "")
-
-                        if not name or not namespace:
-                            # This is an error.
-                            delta_errors += 1
-
-                            self.logger.error(f"Delta object needs name and namespace: {delta}")
-                        else:
-                            key = IRBaseMapping.make_cache_key(delta_kind, name, namespace)
-                            to_invalidate.append(key)
-
-                # OK. If we have things to invalidate, and we have NO ERRORS...
-                if to_invalidate and not delta_errors:
+            # Next up: are there any deltas? (If we skipped any snapshots on the way here,
+            # their deltas are gone, so we can't trust the ones we have.)
+            if force_reset:
+                self.logger.debug("Delta: must reset cache: skipped superseded snapshots")
+            elif fetcher.deltas:
+                # Yes. Figure out what they mean for the cache: the DeltaInvalidator
+                # uses the provenance of the previous snapshot and this one to map
+                # each changed object to the resources it emitted, and from there to
+                # cache keys and dependency keys.
+                plan = self.invalidator.plan(fetcher.deltas, self.last_provenance, fetcher.provenance)
+                delta_kinds = plan.kinds
+
+                for reason in plan.reset_reasons:
+                    self.logger.debug(f"Delta: must reset cache: {reason}")
+
+                # OK. If we have NO ERRORS and nothing that forces a reset...
+                if not plan.reset:
                     # ...then we can invalidate all those things instead of clearing the cache.
+                    # Note that it's OK to have nothing at all to invalidate: that just means
+                    # that all the changes were to things that don't get cached.
                     reset_cache = False
 
-                    for key in to_invalidate:
+                    for key in plan.keys:
                         self.logger.debug(f"Delta: invalidating {key}")
                         self.app.cache.invalidate(key)
 
@@ -1572,30 +1853,63 @@ class AmbassadorEventWatcher(threading.Thread):
             if reset_cache:
                 # This is _not_ an incremental reconfigure. Reset the cache...
                 self.logger.debug("RESETTING CACHE")
-                self.app.cache = Cache(self.logger)
+                self.app.cache.reset()
             else:
                 # OK, we're doing an incremental reconfigure.
                 config_type = "incremental"
 
         with self.app.ir_timer:
-            ir = IR(aconf, secret_handler=secret_handler, cache=self.app.cache)
-
-        ir_path = os.path.join(app.snapshot_path, "ir-tmp.json")
-        open(ir_path, "w").write(ir.as_json())
+            ir = IR(aconf, secret_handler=secret_handler, cache=self.app.cache,
+                    cluster_names=self.app.cluster_names)
+
+        # Remember what each object emitted, so that the next set of deltas can be
+        # mapped onto the right resources.
+        self.last_provenance = fetcher.provenance
+
+        # Serialize what goes into the snapshot archive now, while it's consistent with
+        # this reconfigure: the IR shares cached objects with the next reconfigure, which
+        # will update them while the archiver is still working in the background. Only
+        # compressing and writing the files happens there. Leave the serializations out
+        # of the aconf: they're expensive to generate, and the Diagnostics will generate
+        # them if anyone actually wants them.
+        aconf_json = archive_json(aconf.as_dict(serializations=False))
+        ir_json = archive_json(ir.as_dict())
 
         with self.app.econf_timer:
             self.logger.debug("generating envoy configuration with api version %s" % Config.envoy_api_version)
             econf = EnvoyConfig.generate(ir, Config.envoy_api_version, cache=self.app.cache)
 
+        # Everything this reconfigure needed from the cache has been used, so this is
+        # when to drop whatever's gone stale or won't fit.
+        if self.app.cache is not None:
+            self.app.cache.advance_generation()
+            self.app.update_cache_metrics()
+
         # DON'T generate the Diagnostics here, because that turns out to be expensive.
-        # Instead, we'll just reset app.diag to None, then generate it on-demand when
-        # we need it.
+        # Instead, publish_config will hand the diag service a new snapshot below, and
+        # it'll generate them on-demand when we need them.
 
         bootstrap_config, ads_config, clustermap = econf.split_config()
 
-        if not self.validate_envoy_config(ir, config=ads_config, retries=self.app.validation_retries):
+        # In RDS mode, the listeners in the ADS config only name their route configurations,
+        # so put the routes back before hashing or validating anything.
+        full_config = econf.inline_routes(ads_config) if isinstance(econf, V3Config) else ads_config
+
+        # Hash the ADS config: if we've seen it before, we needn't validate it again, and
+        # if it's what Envoy already has, we needn't poke ambex either.
+        ads_hash = ValidationCache.config_hash(full_config, ir.ambassador_nodename)
+
+        if not self.validate_envoy_config(ir, config=full_config, retries=self.app.validation_retries,
+                                          config_hash=ads_hash):
             self.logger.info("no updates were performed due to invalid envoy configuration, continuing with current configuration...")
 
+            # Leave aconf-tmp.json and ir-tmp.json next to snapshot-tmp.yaml and econf-tmp.json
+            # for debugging, without touching the archive of good configurations.
+            app.snapshot_archiver.submit({
+                "aconf.json": lambda: aconf_json,
+                "ir.json": lambda: ir_json,
+            }, rotate=False)
+
             # Don't use app.check_scout; it will deadlock.
             self.check_scout("attempted bad update")
 
@@ -1604,42 +1918,24 @@ class AmbassadorEventWatcher(threading.Thread):
             self._respond(rqueue, 500, 'ignoring: invalid Envoy configuration in snapshot %s' % snapshot)
             return
 
-        snapcount = int(os.environ.get('AMBASSADOR_SNAPSHOT_COUNT', "4"))
-        snaplist: List[Tuple[str, str]] = []
-
-        if snapcount > 0:
-            self.logger.debug("rotating snapshots for snapshot %s" % snapshot)
-
-            # If snapcount is 4, this range statement becomes range(-4, -1)
-            # which gives [ -4, -3, -2 ], which the list comprehension turns
-            # into [ ( "-3", "-4" ), ( "-2", "-3" ), ( "-1", "-2" ) ]...
-            # which is the list of suffixes to rename to rotate the snapshots.
-
-            snaplist += [ (str(x+1), str(x)) for x in range(-1 * snapcount, -1) ]
-
-            # After dealing with that, we need to rotate the current file into -1.
-            snaplist.append(( '', '-1' ))
-
-        # Whether or not we do any rotation, we need to cycle in the '-tmp' file.
-        snaplist.append(( '-tmp', '' ))
+        # Hand the snapshot over to the archiver. The watt snapshot is already on disk,
+        # but the next reconfigure will overwrite it, so move it out of the way first.
+        archived_snapshot = os.path.join(app.snapshot_path, f".snapshot-{uuid.uuid4().hex}.yaml")
 
-        for from_suffix, to_suffix in snaplist:
-            for fmt in [ "aconf{}.json", "econf{}.json", "ir{}.json", "snapshot{}.yaml" ]:
-                from_path = os.path.join(app.snapshot_path, fmt.format(from_suffix))
-                to_path = os.path.join(app.snapshot_path, fmt.format(to_suffix))
-
-                # Make sure we don't leave this method on error! The reconfiguration
-                # timer is still running, but also, the snapshots are a debugging aid:
-                # if we can't rotate them, meh, whatever.
-
-                try:
-                    self.logger.debug("rotate: %s -> %s" % (from_path, to_path))
-                    os.rename(from_path, to_path)
-                except IOError as e:
-                    self.logger.debug("skip %s -> %s: %s" % (from_path, to_path, e))
-                    pass
-                except Exception as e:
-                    self.logger.debug("could not rename %s -> %s: %s" % (from_path, to_path, e))
+        try:
+            os.replace(os.path.join(app.snapshot_path, "snapshot-tmp.yaml"), archived_snapshot)
+        except OSError as e:
+            self.logger.debug("could not stage snapshot-tmp.yaml for archiving: %s" % e)
+
+        # The Envoy config shares cached objects too.
+        econf_json = archive_json({ k: v for k, v in full_config.items() if k != '@type' })
+
+        app.snapshot_archiver.submit({
+            "aconf.json": lambda: aconf_json,
+            "econf.json": lambda: econf_json,
+            "ir.json": lambda: ir_json,
+            "snapshot.yaml": ArchiveFile(archived_snapshot),
+        })
 
         app.latest_snapshot = snapshot
         self.logger.debug("saving Envoy configuration for snapshot %s" % snapshot)
@@ -1647,32 +1943,51 @@ class AmbassadorEventWatcher(threading.Thread):
         with open(app.bootstrap_path, "w") as output:
             output.write(dump_json(bootstrap_config, pretty=True))
 
-        with open(app.ads_path, "w") as output:
-            output.write(dump_json(ads_config, pretty=True))
+        if app.ads_shards and isinstance(econf, V3Config):
+            if app.ads_sharded:
+                manifest = app.ads_shards.write(*econf.split_resources())
+            else:
+                # RDS mode, without sharding: only the route configurations get files
+                # of their own.
+                manifest = app.ads_shards.write(ads_config, econf.route_config_resources())
+
+            self.logger.debug("wrote %d ADS shards (%d bytes) for snapshot %s" %
+                              (manifest['files_written'], manifest['bytes_written'], snapshot))
+        else:
+            with open(app.ads_path, "w") as output:
+                output.write(dump_json(ads_config, pretty=True))
 
         with open(app.clustermap_path, "w") as output:
             output.write(dump_json(clustermap, pretty=True))
 
         with app.config_lock:
-            app.aconf = aconf
-            app.ir = ir
-            app.econf = econf
+            app.publish_config(aconf, ir, econf)
 
-            # Force app.diag to None so that it'll be regenerated on-demand.
-            app.diag = None
+        # This configuration is live now, so any secret files that it doesn't use can go.
+        app.secret_store.advance_generation()
 
         # We're finally done with the whole configuration process.
         self.app.config_timer.stop()
 
-        if app.kick:
+        if ads_hash == self.last_ads_hash:
+            # The ADS config is byte-for-byte what we last handed to ambex, so there's
+            # nothing for it to do.
+            self.logger.debug("ADS config unchanged for snapshot %s, not notifying ambex" % snapshot)
+        elif app.kick:
             self.logger.debug("running '%s'" % app.kick)
             os.system(app.kick)
         elif app.ambex_pid != 0:
             self.logger.debug("notifying PID %d ambex" % app.ambex_pid)
             os.kill(app.ambex_pid, signal.SIGHUP)
 
+        self.last_ads_hash = ads_hash
+
+        if self.snapshot_posted is not None:
+            self.app.snapshot_latency.set(time.monotonic() - self.snapshot_posted)
+            self.snapshot_posted = None
+
         # don't worry about TCPMappings yet
-        mappings = app.aconf.get_config('mappings')
+        mappings = aconf.get_config('mappings')
 
         if mappings:
             for mapping_name, mapping in mappings.items():
@@ -1680,14 +1995,14 @@ class AmbassadorEventWatcher(threading.Thread):
 
         app.kubestatus.prune()
 
-        if app.ir.k8s_status_updates:
+        if ir.k8s_status_updates:
             update_count = 0
 
-            for name in app.ir.k8s_status_updates.keys():
+            for name in ir.k8s_status_updates.keys():
                 update_count += 1
                 # Strip off any namespace in the name.
                 resource_name = name.split('.', 1)[0]
-                kind, namespace, update = app.ir.k8s_status_updates[name]
+                kind, namespace, update = ir.k8s_status_updates[name]
                 text = dump_json(update)
 
                 # self.logger.debug(f"K8s status update: {kind} {resource_name}.{namespace}, {text}...")
@@ -1695,10 +2010,10 @@ class AmbassadorEventWatcher(threading.Thread):
                 app.kubestatus.post(kind, resource_name, namespace, text)
 
 
-        group_count = len(app.ir.groups)
-        cluster_count = len(app.ir.clusters)
-        listener_count = len(app.ir.listeners)
-        service_count = len(app.ir.services)
+        group_count = len(ir.groups)
+        cluster_count = len(ir.clusters)
+        listener_count = len(ir.listeners)
+        service_count = len(ir.services)
 
         self._respond(rqueue, 200,
                       'configuration updated (%s) from snapshot %s' % (config_type, snapshot))
@@ -1707,7 +2022,7 @@ class AmbassadorEventWatcher(threading.Thread):
                          (config_type, snapshot, service_count, listener_count, group_count, cluster_count))
 
         # Remember that we've reconfigured.
-        self.app.reconf_stats.mark(config_type)
+        self.app.reconf_stats.mark(config_type, kinds=delta_kinds)
 
         if app.health_checks and not app.stats_updater:
             app.logger.debug("starting Envoy status updater")
@@ -1879,6 +2194,7 @@ class AmbassadorEventWatcher(threading.Thread):
                     feat['frc_cache_misses'] = self.app.cache.misses
                     feat['frc_inv_calls'] = self.app.cache.invalidate_calls
                     feat['frc_inv_objects'] = self.app.cache.invalidated_objects
+                    feat['frc_evicted_objects'] = self.app.cache.evicted_objects
                 else:
                     # Fast reconfigure is off.
                     feat['frc_enabled'] = False
@@ -1933,11 +2249,24 @@ class AmbassadorEventWatcher(threading.Thread):
         self.app.logger.debug("Scout notices: %s" % dump_json(scout_notices))
         self.app.logger.debug("App notices after scout: %s" % dump_json(app.notices.notices))
 
-    def validate_envoy_config(self, ir: IR, config, retries) -> bool:
+    def validate_envoy_config(self, ir: IR, config, retries, config_hash: Optional[str]=None) -> bool:
         if self.app.no_envoy:
             self.app.logger.debug("Skipping validation")
             return True
 
+        # If this exact config has already been validated, we're done.
+        if config_hash is None:
+            config_hash = ValidationCache.config_hash(config, ir.ambassador_nodename)
+
+        saved = self.app.validation_cache.check(config_hash)
+
+        if saved is not None:
+            self.logger.debug("envoy configuration already validated, continuing...")
+            self.app.reconf_stats.mark_validation(True, saved)
+            self.app.validation_cache_hits.inc()
+            self.app.validation_time_saved.inc(saved)
+            return True
+
         # We want to keep the original config untouched
         validation_config = copy.deepcopy(config)
 
@@ -2028,27 +2357,31 @@ class AmbassadorEventWatcher(threading.Thread):
 
         self.logger.debug(f"validating Envoy configuration with timeout {timeout}")
 
+        v_start = time.perf_counter()
+
         for retry in range(retries):
-            try:
-                v_encoded = subprocess.check_output(command, stderr=subprocess.STDOUT, timeout=timeout)
-                v_exit = 0
-                break
-            except subprocess.CalledProcessError as e:
-                v_exit = e.returncode
-                v_encoded = e.output
+            if self.app.validation_pool:
+                v_exit, v_encoded, v_timed_out = self.app.validation_pool.submit(envoy_validate, command, timeout).result()
+            else:
+                v_exit, v_encoded, v_timed_out = envoy_validate(command, timeout)
+
+            if not v_timed_out:
                 break
-            except subprocess.TimeoutExpired as e:
-                v_exit = 1
-                v_encoded = e.output or ''.encode('utf-8')
 
-                self.logger.warn("envoy configuration validation timed out after {} seconds{}\n{}".format(
-                    timeout,', retrying...' if retry < retries - 1 else '', v_encoded.decode('utf-8'))
-                )
+            self.logger.warn("envoy configuration validation timed out after {} seconds{}\n{}".format(
+                timeout,', retrying...' if retry < retries - 1 else '', v_encoded.decode('utf-8'))
+            )
+
+            # Don't break here; continue on to the next iteration of the loop.
+
+        v_duration = time.perf_counter() - v_start
 
-                # Don't break here; continue on to the next iteration of the loop.
+        self.app.reconf_stats.mark_validation(False, v_duration)
+        self.app.validation_cache_misses.inc()
 
         if v_exit == 0:
             self.logger.debug("successfully validated the resulting envoy configuration, continuing...")
+            self.app.validation_cache.store(config_hash, v_duration)
             return True
 
         v_str = typecast(str, v_encoded)
@@ -0,0 +1,113 @@
+#!python
+
+# Copyright 2021 Datawire. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License
+
+"""
+Benchmark writing the ADS config as a single file (what diagd does by default)
+against writing it as a directory of content-hashed shards (V3ShardWriter, with
+AMBASSADOR_SHARDED_ADS), replaying a sequence of synthetic snapshots with
+Endpoints churn through the cached reconfigure pipeline. Reports the bytes
+written and the wall-clock time spent writing for each mode.
+
+Usage: python benchmarks/bench_ads_output.py [--mappings N] [--services N] [--churn N] [--steps N]
+"""
+
+from typing import List
+
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+logging.basicConfig(
+    level=logging.WARNING,
+    format="%(asctime)s bench %(levelname)s: %(message)s",
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+logger = logging.getLogger("ambassador")
+
+from ambassador.envoy.v3 import V3Config, V3ShardWriter
+from ambassador.utils import dump_json
+
+from ambassador_cli.bench import Run, SyntheticSnapshots
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark single-file against sharded ADS output")
+    parser.add_argument("--mappings", type=int, default=1000, help="number of Mappings")
+    parser.add_argument("--hosts", type=int, default=10, help="number of Hosts")
+    parser.add_argument("--services", type=int, default=1000, help="number of Services (with Endpoints)")
+    parser.add_argument("--churn", type=int, default=10, help="number of Endpoints that change in each snapshot")
+    parser.add_argument("--steps", type=int, default=10, help="number of snapshots")
+    args = parser.parse_args()
+
+    synthetic = SyntheticSnapshots(args.mappings, args.hosts, 0, args.services, args.churn, args.steps)
+    run = Run(logger, cached=True, trace_memory=False)
+
+    single_bytes = 0
+    single_times: List[float] = []
+    sharded_bytes = 0
+    sharded_times: List[float] = []
+    serialized = 0
+
+    with tempfile.TemporaryDirectory(prefix="bench-ads-") as tmpdir:
+        single_path = os.path.join(tmpdir, "single", "envoy.json")
+        sharded_path = os.path.join(tmpdir, "sharded", "envoy.json")
+
+        os.mkdir(os.path.dirname(single_path))
+        os.mkdir(os.path.dirname(sharded_path))
+
+        writer = V3ShardWriter(logger, sharded_path)
+
+        for _, serialization in synthetic:
+            econf = run.reconfigure(serialization)
+            assert isinstance(econf, V3Config), "this benchmark needs AMBASSADOR_ENVOY_API_VERSION=V3"
+
+            # This is what diagd does by default...
+            start = time.perf_counter()
+            _, ads_config, _ = econf.split_config()
+            content = dump_json(ads_config, pretty=True)
+
+            with open(single_path, "w") as output:
+                output.write(content)
+
+            single_times.append(time.perf_counter() - start)
+            single_bytes += len(content.encode("utf-8"))
+
+            # ...and this is what it does with AMBASSADOR_SHARDED_ADS.
+            start = time.perf_counter()
+            manifest = writer.write(*econf.split_resources())
+            sharded_times.append(time.perf_counter() - start)
+
+            sharded_bytes += manifest['bytes_written']
+            serialized += manifest['serialized']
+
+        resources = sum(len(files) for files in manifest['files'].values())
+
+    print(f"{args.steps} snapshots, {resources} ADS resources, {args.churn} Endpoints changing per snapshot")
+    print(f"{'mode':>8} {'total (s)':>10} {'first (s)':>10} {'rest (ms)':>10} {'MB written':>11}")
+
+    for mode, times, written in [ ("single", single_times, single_bytes), ("sharded", sharded_times, sharded_bytes) ]:
+        rest = (sum(times[1:]) / len(times[1:]) * 1000) if len(times) > 1 else 0
+
+        print(f"{mode:>8} {sum(times):>10.3f} {times[0]:>10.3f} {rest:>10.1f} {written / 1e6:>11.2f}")
+
+    print(f"sharded mode serialized {serialized} resources in all")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,227 @@
+#!python
+
+# Copyright 2021 Datawire. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License
+
+"""
+Benchmark reconfigure latency while diag UI threads are busy serving the
+overview's JSON, comparing the way diagd used to share diagnostics with its
+request threads (app.diag regenerated under config_lock and diag_lock, and
+every request serializing what it serves) with DiagSnapshots (a DiagConfig
+copied and one reference swapped per reconfigure, and JSON serialized once
+per snapshot).
+
+Usage: python benchmarks/bench_diag_contention.py [--mappings N] [--readers N]
+"""
+
+from typing import Any, Callable, List, Optional, Tuple
+
+import argparse
+import logging
+import statistics
+import threading
+import time
+
+logging.basicConfig(
+    level=logging.WARNING,
+    format="%(asctime)s bench %(levelname)s: %(message)s",
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+logger = logging.getLogger("ambassador")
+
+from ambassador import Cache, Config, IR, EnvoyConfig
+from ambassador.diagnostics import Diagnostics, DiagConfig, DiagSnapshot
+from ambassador.fetch import ResourceFetcher
+from ambassador.utils import NullSecretHandler, dump_json
+
+from bench_host_index import synthetic_yaml
+
+# The parts of the overview that readers ask for, round robin.
+Keys = [ 'ambassador_elements', 'envoy_elements', 'groups', 'source_map' ]
+
+
+class LockedDiag:
+    """
+    How diagd used to do it: readers take config_lock to look for the current
+    Diagnostics, and diag_lock to build them; reconfigures take config_lock to
+    install a new configuration and reset them.
+    """
+
+    def __init__(self) -> None:
+        self.config_lock = threading.Lock()
+        self.diag_lock = threading.Lock()
+        self.ir: Optional[IR] = None
+        self.econf: Optional[EnvoyConfig] = None
+        self._diag: Optional[Diagnostics] = None
+        self._last_diag: Optional[Diagnostics] = None
+        self.generation = 0
+
+    def publish(self, aconf: Config, ir: IR, econf: EnvoyConfig) -> None:
+        with self.config_lock:
+            self.ir = ir
+            self.econf = econf
+
+            if self._diag:
+                self._last_diag = self._diag
+
+            self._diag = None
+            self.generation += 1
+
+    def diag(self) -> Diagnostics:
+        with self.config_lock:
+            if self._diag:
+                return self._diag
+
+        with self.diag_lock:
+            if self._diag:
+                return self._diag
+
+            assert self.ir and self.econf
+            _diag = Diagnostics(self.ir, self.econf, previous=self._last_diag, generation=self.generation)
+            self._last_diag = None
+
+            with self.config_lock:
+                self._diag = _diag
+
+            return _diag
+
+    def serve(self, key: str) -> bytes:
+        return dump_json(self.diag().as_dict()[key]).encode('utf-8')
+
+
+class Snapshots:
+    def __init__(self) -> None:
+        self.config_lock = threading.Lock()
+        self.snapshot: Optional[DiagSnapshot] = None
+        self.generation = 0
+
+    def publish(self, aconf: Config, ir: IR, econf: EnvoyConfig) -> None:
+        with self.config_lock:
+            self.generation += 1
+            self.snapshot = DiagSnapshot(self.generation, DiagConfig(ir, econf), previous=self.snapshot)
+
+    def serve(self, key: str) -> bytes:
+        snapshot = self.snapshot
+        assert snapshot
+
+        blob = snapshot.json(key)
+        assert blob is not None
+
+        return blob
+
+
+def reconfigure(yaml: str, cache: Cache, publish: Callable[[Config, IR, EnvoyConfig], None]) -> Tuple[float, float]:
+    """
+    Run one reconfigure, returning how long the whole thing took and how long
+    just publishing the result took.
+    """
+
+    start = time.perf_counter()
+
+    aconf = Config()
+    fetcher = ResourceFetcher(logger, aconf)
+    fetcher.parse_yaml(yaml, k8s=True)
+    aconf.load_all(fetcher.sorted())
+
+    secret_handler = NullSecretHandler(logger, None, None, "0")
+    ir = IR(aconf, file_checker=lambda path: True, secret_handler=secret_handler, cache=cache)
+    econf = EnvoyConfig.generate(ir, "V3", cache=cache)
+    cache.advance_generation()
+
+    publish_start = time.perf_counter()
+    publish(aconf, ir, econf)
+    end = time.perf_counter()
+
+    return end - start, end - publish_start
+
+
+def run(strategy: Any, yamls: List[str], readers: int, think: float, interval: float) -> Tuple[List[float], List[float], List[float]]:
+    cache = Cache(logger)
+
+    # The first configuration is just to get going.
+    reconfigure(yamls[0], cache, strategy.publish)
+
+    stop = threading.Event()
+    latencies: List[List[float]] = [ [] for _ in range(readers) ]
+
+    def reader(n: int) -> None:
+        i = n
+
+        while not stop.is_set():
+            start = time.perf_counter()
+            strategy.serve(Keys[i % len(Keys)])
+            latencies[n].append(time.perf_counter() - start)
+            i += 1
+            time.sleep(think)
+
+    threads = [ threading.Thread(target=reader, args=(n,), daemon=True) for n in range(readers) ]
+
+    for thread in threads:
+        thread.start()
+
+    totals: List[float] = []
+    publishes: List[float] = []
+
+    for yaml in yamls[1:]:
+        total, publish = reconfigure(yaml, cache, strategy.publish)
+        totals.append(total)
+        publishes.append(publish)
+        time.sleep(interval)
+
+    stop.set()
+
+    for thread in threads:
+        thread.join()
+
+    return totals, publishes, [ latency for per_reader in latencies for latency in per_reader ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark reconfigures under diag UI load")
+    parser.add_argument("--mappings", type=int, default=1000, help="number of Mappings")
+    parser.add_argument("--hosts", type=int, default=20, help="number of Hosts")
+    parser.add_argument("--reconfigures", type=int, default=10, help="number of reconfigures to time")
+    parser.add_argument("--readers", type=int, default=8, help="number of diag UI threads")
+    parser.add_argument("--think", type=float, default=0.01, help="seconds each reader waits between requests")
+    parser.add_argument("--interval", type=float, default=0.2, help="seconds between reconfigures")
+    args = parser.parse_args()
+
+    # Each reconfigure changes one Mapping, like a typical incremental update.
+    base = synthetic_yaml(args.hosts, args.mappings)
+    yamls = [ base.replace("prefix: /0/", f"prefix: /0-{i}/", 1) for i in range(args.reconfigures + 1) ]
+
+    print(f"{args.mappings} Mappings, {args.hosts} Hosts, {args.reconfigures} reconfigures, "
+          f"{args.readers} readers polling every {args.think}s")
+    print()
+    print(f"{'strategy':<12} {'readers':>8} {'reconfig p50':>14} {'reconfig max':>14} "
+          f"{'publish max':>12} {'served':>8} {'request p50':>12} {'request p99':>12}")
+
+    for name, factory in [ ( "locked", LockedDiag ), ( "snapshot", Snapshots ) ]:
+        for readers in [ 0, args.readers ]:
+            totals, publishes, requests = run(factory(), yamls, readers, args.think, args.interval)
+
+            print(f"{name:<12} {readers:>8} {statistics.median(totals) * 1000:>12.1f}ms "
+                  f"{max(totals) * 1000:>12.1f}ms {max(publishes) * 1000:>10.3f}ms {len(requests):>8}", end="")
+
+            if requests:
+                requests.sort()
+                print(f" {requests[len(requests) // 2] * 1000:>10.3f}ms "
+                      f"{requests[(len(requests) * 99) // 100] * 1000:>10.3f}ms")
+            else:
+                print(f" {'-':>12} {'-':>12}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+#!python
+
+# Copyright 2021 Datawire. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License
+
+"""
+Benchmark the Fetcher phase on large synthetic watt snapshots, with the lazy
+resource serialization we use now, against forcing every serialization (which
+is what ResourceManager._emit used to do up front).
+
+Usage: python benchmarks/bench_fetcher.py [--objects N,N,...] [--rounds N]
+"""
+
+from typing import Any, Dict, List
+
+import argparse
+import json
+import logging
+import time
+
+logging.basicConfig(
+    level=logging.WARNING,
+    format="%(asctime)s bench %(levelname)s: %(message)s",
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+logger = logging.getLogger("ambassador")
+
+from ambassador import Config
+from ambassador.fetch import ResourceFetcher
+
+
+def synthetic_watt(count: int) -> str:
+    """
+    Generate a watt snapshot with count objects: half Mappings, half Services.
+    """
+
+    mappings: List[Dict[str, Any]] = []
+    services: List[Dict[str, Any]] = []
+
+    for i in range(count // 2):
+        mappings.append({
+            "apiVersion": "getambassador.io/v2",
+            "kind": "Mapping",
+            "metadata": {
+                "name": f"mapping-{i}",
+                "namespace": "default",
+                "labels": { "app": f"app-{i % 50}", "tier": "backend" },
+            },
+            "spec": {
+                "prefix": f"/svc-{i}/",
+                "service": f"svc-{i}.default:8080",
+                "timeout_ms": 3000,
+                "add_request_headers": { "x-svc": f"svc-{i}" },
+            },
+        })
+
+        services.append({
+            "apiVersion": "v1",
+            "kind": "Service",
+            "metadata": {
+                "name": f"svc-{i}",
+                "namespace": "default",
+                "labels": { "app": f"app-{i % 50}" },
+            },
+            "spec": {
+                "type": "ClusterIP",
+                "clusterIP": f"10.0.{(i // 250) % 256}.{i % 250}",
+                "ports": [ { "name": "http", "port": 8080, "protocol": "TCP", "targetPort": 8080 } ],
+                "selector": { "app": f"app-{i % 50}" },
+            },
+        })
+
+    return json.dumps({
+        "Kubernetes": {
+            "Mapping": mappings,
+            "service": services,
+        }
+    })
+
+
+def fetch(watt: str, force_serialization: bool) -> float:
+    start = time.perf_counter()
+
+    aconf = Config()
+    fetcher = ResourceFetcher(logger, aconf)
+    fetcher.parse_watt(watt)
+
+    if force_serialization:
+        for element in fetcher.elements:
+            element.serialization
+
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the Fetcher phase")
+    parser.add_argument("--objects", type=str, default="1000,5000,10000",
+                        help="comma-separated list of object counts")
+    parser.add_argument("--rounds", type=int, default=3, help="rounds per measurement (best is reported)")
+    args = parser.parse_args()
+
+    print(f"{'objects':>8} {'eager (s)':>10} {'lazy (s)':>10} {'saved':>7}")
+
+    for count in [ int(x) for x in args.objects.split(",") ]:
+        watt = synthetic_watt(count)
+
+        eager = min(fetch(watt, True) for _ in range(args.rounds))
+        lazy = min(fetch(watt, False) for _ in range(args.rounds))
+
+        print(f"{count:>8} {eager:>10.3f} {lazy:>10.3f} {(eager - lazy) / eager:>6.0%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+#!python
+
+# Copyright 2021 Datawire. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License
+
+"""
+Benchmark HostMatchIndex against checking every Host with IRHost.matches_httpgroup,
+which is what V2Chain.matching_hosts and V3Chain.matching_hosts used to do.
+
+Usage: python benchmarks/bench_host_index.py [--mappings N] [--hosts N,N,...]
+"""
+
+from typing import List
+
+import argparse
+import logging
+import time
+
+logging.basicConfig(
+    level=logging.WARNING,
+    format="%(asctime)s bench %(levelname)s: %(message)s",
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+logger = logging.getLogger("ambassador")
+
+from ambassador import Config, IR
+from ambassador.fetch import ResourceFetcher
+from ambassador.ir.irhostindex import HostMatchIndex
+from ambassador.ir.irhttpmappinggroup import IRHTTPMappingGroup
+from ambassador.utils import NullSecretHandler
+
+
+def synthetic_yaml(host_count: int, mapping_count: int) -> str:
+    yaml = ""
+
+    for i in range(host_count):
+        # A mix of exact hostnames, suffix globs, and selectors.
+        hostname = f"*.zone-{i}.example.com" if (i % 4 == 0) else f"host-{i}.example.com"
+        selector = f"  selector:\n    matchLabels:\n      team: team-{i % 10}\n" if (i % 3 == 0) else ""
+
+        yaml += f'''
+---
+apiVersion: getambassador.io/v2
+kind: Host
+metadata:
+  name: host-{i}
+  namespace: default
+spec:
+  hostname: "{hostname}"
+  acmeProvider:
+    authority: none
+{selector}
+'''
+
+    for i in range(mapping_count):
+        hostname = f"host-{i % host_count}.example.com" if (i % 2) else f"svc.zone-{i % host_count}.example.com"
+
+        yaml += f'''
+---
+apiVersion: getambassador.io/v2
+kind: Mapping
+metadata:
+  name: mapping-{i}
+  namespace: default
+  labels:
+    team: team-{i % 13}
+spec:
+  prefix: /mapping-{i}/
+  service: svc-{i}
+  hostname: "{hostname}"
+'''
+
+    return yaml
+
+
+def build_ir(host_count: int, mapping_count: int) -> IR:
+    aconf = Config()
+
+    fetcher = ResourceFetcher(logger, aconf)
+    fetcher.parse_yaml(synthetic_yaml(host_count, mapping_count), k8s=True)
+
+    aconf.load_all(fetcher.sorted())
+
+    secret_handler = NullSecretHandler(logger, None, None, "0")
+
+    return IR(aconf, file_checker=lambda path: True, secret_handler=secret_handler)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark route-to-host matching")
+    parser.add_argument("--mappings", type=int, default=1000, help="number of Mappings")
+    parser.add_argument("--hosts", type=str, default="10,50,100,200,400",
+                        help="comma-separated list of Host counts")
+    args = parser.parse_args()
+
+    print(f"{'hosts':>6} {'groups':>7} {'scan (s)':>10} {'index (s)':>10} {'speedup':>8}")
+
+    for host_count in [ int(x) for x in args.hosts.split(",") ]:
+        ir = build_ir(host_count, args.mappings)
+
+        hosts = ir.get_hosts()
+        groups = [ g for g in ir.groups.values() if isinstance(g, IRHTTPMappingGroup) ]
+
+        start = time.perf_counter()
+
+        scanned: List[int] = []
+
+        for group in groups:
+            scanned.append(len([ h for h in hosts if h.matches_httpgroup(group) ]))
+
+        scan_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+
+        index = HostMatchIndex(logger, hosts)
+        indexed: List[int] = [ len(index.matching_hosts(group)) for group in groups ]
+
+        index_time = time.perf_counter() - start
+
+        assert scanned == indexed, "index and scan disagree"
+
+        speedup = scan_time / index_time if index_time else float('inf')
+
+        print(f"{len(hosts):>6} {len(groups):>7} {scan_time:>10.4f} {index_time:>10.4f} {speedup:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
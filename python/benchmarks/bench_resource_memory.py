@@ -0,0 +1,230 @@
+#!python
+
+# Copyright 2021 Datawire. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License
+
+"""
+Benchmark the memory and attribute-access cost of the IR and Envoy resources
+on a synthetic large configuration, against the dict-backed layout they used
+to have: IRResources carrying their IR, logger, as_dict helpers, and an empty
+_referenced_by as dictionary elements, and V3Routes and V3Clusters carrying
+a per-instance __dict__.
+
+Usage: python benchmarks/bench_resource_memory.py [--mappings N] [--hosts N]
+"""
+
+from typing import Any, Dict, Iterable, List, Tuple
+from typing import cast as typecast
+
+import argparse
+import gc
+import logging
+import sys
+import time
+import tracemalloc
+
+logging.basicConfig(
+    level=logging.WARNING,
+    format="%(asctime)s bench %(levelname)s: %(message)s",
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+logger = logging.getLogger("ambassador")
+
+from ambassador import Config, IR, EnvoyConfig
+from ambassador.envoy import V3Config
+from ambassador.fetch import ResourceFetcher
+from ambassador.ir.irresource import IRResource
+from ambassador.utils import NullSecretHandler
+
+from bench_host_index import synthetic_yaml
+
+
+class DictBackedResource(dict):
+    """
+    The old layout of an IRResource: everything, including the IR and the
+    logger, is a dictionary element, and attributes go through __getattr__.
+    """
+
+    def __getattr__(self, key: str) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            raise AttributeError(key)
+
+    def __setattr__(self, key: str, value: Any) -> None:
+        self[key] = value
+
+
+class DictBackedCacheable(dict):
+    """
+    The old layout of a V3Route or V3Cluster: a dict with a per-instance __dict__.
+    """
+    pass
+
+
+def dict_backed_ir(resources: Iterable[IRResource]) -> List[DictBackedResource]:
+    legacy = []
+
+    for res in resources:
+        old = DictBackedResource(res)
+        old['ir'] = res.ir
+        old['logger'] = res.logger
+        old['_IRResource__as_dict_helpers'] = {}
+        old.setdefault('_referenced_by', {})
+        legacy.append(old)
+
+    return legacy
+
+
+def dict_backed_econf(resources: Iterable[dict]) -> List[DictBackedCacheable]:
+    legacy = []
+
+    for res in resources:
+        old = DictBackedCacheable(res)
+
+        for slot in [ 'logger', '_group', '_cache_key' ]:
+            if hasattr(res, slot):
+                setattr(old, slot, getattr(res, slot))
+
+        legacy.append(old)
+
+    return legacy
+
+
+def overhead(objects: Iterable[Any]) -> int:
+    """
+    Bytes used by the objects themselves (and their __dict__s, if any), but
+    not by anything they refer to.
+    """
+
+    total = 0
+
+    for obj in objects:
+        total += sys.getsizeof(obj)
+
+        if hasattr(obj, '__dict__'):
+            total += sys.getsizeof(obj.__dict__)
+
+        # An empty _referenced_by is all overhead.
+        refs = obj.get('_referenced_by', None)
+
+        if refs == {}:
+            total += sys.getsizeof(refs)
+
+    return total
+
+
+def access_time(objects: List[Any], attrs: List[str], rounds: int) -> float:
+    start = time.perf_counter()
+
+    for _ in range(rounds):
+        for obj in objects:
+            for attr in attrs:
+                getattr(obj, attr)
+
+    return time.perf_counter() - start
+
+
+def build(host_count: int, mapping_count: int) -> Tuple[IR, V3Config, float, int]:
+    yaml = synthetic_yaml(host_count, mapping_count)
+
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+
+    aconf = Config()
+    fetcher = ResourceFetcher(logger, aconf)
+    fetcher.parse_yaml(yaml, k8s=True)
+    aconf.load_all(fetcher.sorted())
+
+    secret_handler = NullSecretHandler(logger, None, None, "0")
+    ir = IR(aconf, file_checker=lambda path: True, secret_handler=secret_handler)
+    econf = typecast(V3Config, EnvoyConfig.generate(ir, "V3"))
+
+    elapsed = time.perf_counter() - start
+
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return ir, econf, elapsed, retained
+
+
+def ir_resources(ir: IR) -> List[IRResource]:
+    resources: Dict[int, IRResource] = {}
+
+    for group in ir.groups.values():
+        resources[id(group)] = group
+
+        for mapping in group.get('mappings', []):
+            resources[id(mapping)] = mapping
+
+    for cluster in ir.clusters.values():
+        resources[id(cluster)] = cluster
+
+    for host in ir.get_hosts():
+        resources[id(host)] = host
+
+    return list(resources.values())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark IR and Envoy resource representations")
+    parser.add_argument("--mappings", type=int, default=5000, help="number of Mappings")
+    parser.add_argument("--hosts", type=int, default=50, help="number of Hosts")
+    parser.add_argument("--rounds", type=int, default=20, help="attribute access rounds")
+    args = parser.parse_args()
+
+    ir, econf, elapsed, retained = build(args.hosts, args.mappings)
+
+    print(f"{args.mappings} Mappings, {args.hosts} Hosts: built in {elapsed:.2f}s, "
+          f"{retained / (1024 * 1024):.1f} MiB retained")
+    print()
+
+    routes = econf.routes
+    resources = ir_resources(ir)
+
+    print(f"{'objects':<12} {'count':>8} {'dict-backed':>14} {'current':>14} {'saved':>8}")
+
+    # Dict sizes depend on how they were built, so compare the IR resources with
+    # copies built the same way as the dict-backed ones, plus their two slots.
+    compact = [ DictBackedResource(res) for res in resources ]
+    slot_bytes = len(IRResource.__slots__) * 8 * len(resources)
+
+    comparisons: List[Tuple[str, List[Any], List[Any]]] = [
+        ( "IR", compact, dict_backed_ir(resources) ),
+        ( "V3Route", routes, dict_backed_econf(routes) ),
+        ( "V3Cluster", econf.clusters, dict_backed_econf(econf.clusters) ),
+    ]
+
+    for what, current, legacy in comparisons:
+        old_bytes = overhead(legacy)
+        new_bytes = overhead(current) + (slot_bytes if what == "IR" else 0)
+        saved = 1 - (new_bytes / old_bytes) if old_bytes else 0.0
+
+        print(f"{what:<12} {len(current):>8} {old_bytes:>14,} {new_bytes:>14,} {saved:>7.0%}")
+
+    print()
+
+    legacy_resources = dict_backed_ir(resources)
+    old_time = access_time(legacy_resources, [ 'ir', 'logger' ], args.rounds)
+    new_time = access_time(resources, [ 'ir', 'logger' ], args.rounds)
+
+    print(f"IR .ir/.logger access x{args.rounds}: dict-backed {old_time:.4f}s, "
+          f"current {new_time:.4f}s ({old_time / new_time:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
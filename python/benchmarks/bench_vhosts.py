@@ -0,0 +1,132 @@
+#!python
+
+# Copyright 2021 Datawire. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License
+
+"""
+Benchmark the virtual hosts generated for many Hosts sharing the same Mappings:
+how many virtual hosts and route entries end up in the Envoy config, how big
+the ADS config is, and how long it takes to generate.
+
+Usage: python benchmarks/bench_vhosts.py [--mappings N] [--hosts N]
+"""
+
+from typing import Any, Dict, Iterator
+
+import argparse
+import gc
+import logging
+import time
+
+logging.basicConfig(
+    level=logging.WARNING,
+    format="%(asctime)s bench %(levelname)s: %(message)s",
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+logger = logging.getLogger("ambassador")
+
+from ambassador import Config, IR, EnvoyConfig
+from ambassador.fetch import ResourceFetcher
+from ambassador.utils import NullSecretHandler, dump_json
+
+
+def shared_routes_yaml(host_count: int, mapping_count: int) -> str:
+    yaml = ""
+
+    for i in range(host_count):
+        yaml += f'''
+---
+apiVersion: getambassador.io/v2
+kind: Host
+metadata:
+  name: host-{i}
+  namespace: default
+spec:
+  hostname: "host-{i}.example.com"
+  acmeProvider:
+    authority: none
+  requestPolicy:
+    insecure:
+      action: Route
+'''
+
+    for i in range(mapping_count):
+        yaml += f'''
+---
+apiVersion: getambassador.io/v2
+kind: Mapping
+metadata:
+  name: mapping-{i}
+  namespace: default
+spec:
+  hostname: "*"
+  prefix: /mapping-{i}/
+  service: svc-{i}
+'''
+
+    return yaml
+
+
+def virtual_hosts(econf: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    for listener in econf['static_resources']['listeners']:
+        for chain in listener['filter_chains']:
+            for f in chain['filters']:
+                route_config = f.get('typed_config', {}).get('route_config')
+
+                if route_config:
+                    yield from route_config['virtual_hosts']
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark virtual host generation")
+    parser.add_argument("--mappings", type=int, default=2000, help="number of Mappings")
+    parser.add_argument("--hosts", type=int, default=300, help="number of Hosts")
+    parser.add_argument("--rounds", type=int, default=3, help="econf generation rounds")
+    args = parser.parse_args()
+
+    aconf = Config()
+    fetcher = ResourceFetcher(logger, aconf)
+    fetcher.parse_yaml(shared_routes_yaml(args.hosts, args.mappings), k8s=True)
+    aconf.load_all(fetcher.sorted())
+
+    ir = IR(aconf, file_checker=lambda path: True, secret_handler=NullSecretHandler(logger, None, None, "0"))
+
+    timings = []
+
+    for _ in range(args.rounds):
+        gc.collect()
+        start = time.perf_counter()
+        econf = EnvoyConfig.generate(ir, "V3")
+        timings.append(time.perf_counter() - start)
+
+    _, ads_config, _ = econf.split_config()
+
+    start = time.perf_counter()
+    ads_json = dump_json(ads_config)
+    dump_time = time.perf_counter() - start
+
+    vhosts = list(virtual_hosts(ads_config))
+    domains = sum(len(vhost['domains']) for vhost in vhosts)
+    routes = sum(len(vhost['routes']) for vhost in vhosts)
+
+    print(f"{args.mappings} Mappings, {args.hosts} Hosts")
+    print(f"virtual hosts:    {len(vhosts)} ({domains} domains)")
+    print(f"route entries:    {routes}")
+    print(f"ADS config:       {len(ads_json) / (1024 * 1024):.1f} MiB, serialized in {dump_time:.2f}s")
+    print(f"econf generation: {min(timings):.2f}s (best of {args.rounds})")
+
+
+if __name__ == '__main__':
+    main()
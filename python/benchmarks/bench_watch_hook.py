@@ -0,0 +1,146 @@
+#!python
+
+# Copyright 2021 Datawire. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License
+
+"""
+Benchmark how long watt waits for a watchset on a large synthetic snapshot:
+running watch_hook.py as a fresh process per snapshot, against handing the
+snapshot to a running watch_hook.py --serve through watch_hook_client.py.
+
+Usage: python benchmarks/bench_watch_hook.py [--mappings N] [--rounds N]
+"""
+
+from typing import Any, Dict, List
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+PythonDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WatchHook = os.path.join(PythonDir, "watch_hook.py")
+WatchHookClient = os.path.join(PythonDir, "watch_hook_client.py")
+
+
+def synthetic_snapshot(mapping_count: int, endpoint_version: int, mapping_version: int=0) -> bytes:
+    mappings: List[Dict[str, Any]] = []
+    services: List[Dict[str, Any]] = []
+    endpoints: List[Dict[str, Any]] = []
+
+    for i in range(mapping_count):
+        mappings.append({
+            "apiVersion": "getambassador.io/v2",
+            "kind": "Mapping",
+            "metadata": { "name": f"mapping-{i}", "namespace": "default",
+                          "resourceVersion": f"m{i}-{mapping_version if i == 0 else 0}" },
+            "spec": { "prefix": f"/{i}-{mapping_version if i == 0 else 0}/", "service": f"service-{i}",
+                      "resolver": "endpoint", "hostname": "*" }
+        })
+
+        services.append({
+            "apiVersion": "v1",
+            "kind": "Service",
+            "metadata": { "name": f"service-{i}", "namespace": "default", "resourceVersion": f"s{i}" },
+            "spec": { "ports": [ { "port": 80, "targetPort": 8080 } ] }
+        })
+
+        endpoints.append({
+            "apiVersion": "v1",
+            "kind": "Endpoints",
+            "metadata": { "name": f"service-{i}", "namespace": "default",
+                          "resourceVersion": f"e{i}-{endpoint_version}" },
+            "subsets": [ { "addresses": [ { "ip": f"10.{endpoint_version % 256}.{i // 256}.{i % 256}" } ],
+                           "ports": [ { "port": 8080 } ] } ]
+        })
+
+    return json.dumps({
+        "Kubernetes": {
+            "KubernetesEndpointResolver": [ {
+                "apiVersion": "getambassador.io/v2",
+                "kind": "KubernetesEndpointResolver",
+                "metadata": { "name": "endpoint", "namespace": "default", "resourceVersion": "r1" },
+                "spec": {}
+            } ],
+            "Mapping": mappings,
+            "service": services,
+            "Endpoints": endpoints,
+        }
+    }).encode('utf-8')
+
+
+def run_hook(command: List[str], snapshot: bytes, env: Dict[str, str]) -> float:
+    start = time.perf_counter()
+    subprocess.run(command, input=snapshot, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                   check=True)
+
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the watch hook, cold and as a service")
+    parser.add_argument("--mappings", type=int, default=2000, help="number of Mappings")
+    parser.add_argument("--rounds", type=int, default=3, help="snapshots to time for each case")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        socket_path = os.path.join(tmpdir, "watch-hook.sock")
+        env = dict(os.environ, AMBASSADOR_WATCH_DIR=tmpdir, AMBASSADOR_WATCH_HOOK_SOCKET=socket_path,
+                   PYTHONPATH=PythonDir)
+
+        snapshots = [ synthetic_snapshot(args.mappings, version) for version in range(args.rounds + 1) ]
+        print(f"{args.mappings} Mappings, {len(snapshots[0]) / (1024 * 1024):.1f} MiB snapshots")
+        print()
+
+        cold = [ run_hook([ sys.executable, WatchHook ], snapshot, env) for snapshot in snapshots[1:] ]
+
+        service = subprocess.Popen([ sys.executable, WatchHook, "--serve", socket_path ], env=env,
+                                   stderr=subprocess.DEVNULL)
+
+        try:
+            while not os.path.exists(socket_path):
+                time.sleep(0.05)
+
+            client = [ sys.executable, WatchHookClient ]
+
+            # The first snapshot the service sees has to be built from scratch.
+            first = run_hook(client, snapshots[0], env)
+
+            # Endpoints churn: nothing the watchset depends on changes.
+            churn = [ run_hook(client, snapshot, env) for snapshot in snapshots[1:] ]
+
+            # A Mapping changes, so the watchset has to be rebuilt.
+            changed = [ run_hook(client, synthetic_snapshot(args.mappings, 0, version), env)
+                        for version in range(1, args.rounds + 1) ]
+        finally:
+            service.terminate()
+            service.wait()
+
+        print(f"{'case':<36} {'median':>10} {'max':>10}")
+
+        for what, times in [
+            ( "cold process per snapshot", cold ),
+            ( "service: first snapshot", [ first ] ),
+            ( "service: Endpoints changed", churn ),
+            ( "service: Mapping changed", changed ),
+        ]:
+            print(f"{what:<36} {statistics.median(times) * 1000:>8.0f}ms {max(times) * 1000:>8.0f}ms")
+
+
+if __name__ == '__main__':
+    main()
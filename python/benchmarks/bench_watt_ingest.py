@@ -0,0 +1,85 @@
+#!python
+
+# Copyright 2021 Datawire. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License
+
+"""
+Benchmark ResourceFetcher.parse_watt on synthetic watt snapshots of increasing
+size, reporting the wall-clock time of the Fetcher phase and its peak Python
+memory use (as seen by tracemalloc).
+
+Usage: python benchmarks/bench_watt_ingest.py [--objects N,N,...] [--rounds N]
+"""
+
+import argparse
+import logging
+import time
+import tracemalloc
+
+logging.basicConfig(
+    level=logging.WARNING,
+    format="%(asctime)s bench %(levelname)s: %(message)s",
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+logger = logging.getLogger("ambassador")
+
+from ambassador import Config
+from ambassador.fetch import ResourceFetcher
+
+from bench_fetcher import synthetic_watt
+
+
+def ingest(watt: str) -> float:
+    start = time.perf_counter()
+
+    aconf = Config()
+    fetcher = ResourceFetcher(logger, aconf)
+    fetcher.parse_watt(watt)
+
+    return time.perf_counter() - start
+
+
+def peak_memory(watt: str) -> int:
+    tracemalloc.start()
+
+    try:
+        ingest(watt)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark watt snapshot ingestion")
+    parser.add_argument("--objects", type=str, default="1000,10000,50000,100000",
+                        help="comma-separated list of object counts")
+    parser.add_argument("--rounds", type=int, default=3, help="rounds per measurement (best is reported)")
+    args = parser.parse_args()
+
+    print(f"{'objects':>8} {'snapshot (MB)':>14} {'time (s)':>9} {'objects/s':>10} {'peak (MB)':>10}")
+
+    for count in [ int(x) for x in args.objects.split(",") ]:
+        watt = synthetic_watt(count)
+
+        elapsed = min(ingest(watt) for _ in range(args.rounds))
+        peak = peak_memory(watt)
+
+        print(f"{count:>8} {len(watt) / 1e6:>14.1f} {elapsed:>9.3f} {count / elapsed:>10.0f} {peak / 1e6:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -482,10 +482,23 @@ if [[ -z "${AMBASSADOR_NO_KUBEWATCH}" ]]; then
         watt_query_flags+=(--namespace "${AMBASSADOR_NAMESPACE}")
     fi
 
+    # watt runs the watch hook for every snapshot. Unless told otherwise, keep the
+    # watch hook running as a service, so that all each snapshot costs is a tiny
+    # client that hands it over.
+    watch_hook="python /ambassador/watch_hook.py"
+
+    if [[ -z "${AMBASSADOR_NO_WATCH_HOOK_SERVICE}" ]]; then
+        export AMBASSADOR_WATCH_HOOK_SOCKET="${AMBASSADOR_WATCH_HOOK_SOCKET:-/tmp/ambassador-watch-hook.sock}"
+
+        launch "watch-hook" python /ambassador/watch_hook.py --serve "${AMBASSADOR_WATCH_HOOK_SOCKET}"
+
+        watch_hook="python /ambassador/watch_hook_client.py"
+    fi
+
     launch "watt" watt \
            --listen-address="127.0.0.1:8002" \
            --notify 'python /ambassador/post_update.py --watt ' \
-           --watch "python /ambassador/watch_hook.py" \
+           --watch "${watch_hook}" \
            "${watt_query_flags[@]}"
 fi
 
@@ -58,7 +58,8 @@ setup(
             'diagd=ambassador_diag.diagd:main',
             'mockery=ambassador_cli.mockery:main',
             'grab-snapshots=ambassador_cli.grab_snapshots:main',
-            'ert=ambassador_cli.ert:main'
+            'ert=ambassador_cli.ert:main',
+            'bench=ambassador_cli.bench:main'
         ]
     },
 
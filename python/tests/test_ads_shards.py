@@ -0,0 +1,153 @@
+from typing import Any, Dict
+
+import json
+import logging
+import os
+import sys
+
+import pytest
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s test %(levelname)s: %(message)s",
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+logger = logging.getLogger("ambassador")
+
+from ambassador import Cache
+from ambassador.compile import Compile
+from ambassador.envoy.v3 import V3ShardWriter
+from ambassador.utils import NullSecretHandler
+
+
+def mappings(prefix: str) -> str:
+    return f"""
+---
+apiVersion: getambassador.io/v2
+kind: Mapping
+metadata:
+  name: mapping-1
+  namespace: default
+spec:
+  prefix: {prefix}
+  service: service-1
+  hostname: "*"
+---
+apiVersion: getambassador.io/v2
+kind: Mapping
+metadata:
+  name: mapping-2
+  namespace: default
+spec:
+  prefix: /two/
+  service: service-2
+  hostname: "*"
+"""
+
+
+def read_dir(path: str) -> Dict[str, Any]:
+    return { name: json.load(open(os.path.join(path, name), "r"))
+             for name in os.listdir(path) if V3ShardWriter.ShardPattern.match(name) }
+
+
+def test_shards(tmp_path):
+    cache = Cache(logger)
+    secret_handler = NullSecretHandler(logger, str(tmp_path / "src"), str(tmp_path / "cache"), "0")
+    ads_dir = str(tmp_path / "ads")
+    ads_path = os.path.join(ads_dir, "envoy.json")
+    os.mkdir(ads_dir)
+
+    writer = V3ShardWriter(logger, ads_path)
+
+    # Something stale from an earlier run.
+    open(os.path.join(ads_dir, f"cluster-{'0' * 24}.json"), "w").write("{}")
+
+    econf = Compile(logger, mappings("/one/"), k8s=True, cache=cache,
+                    secret_handler=secret_handler, envoy_version="V3")["v3"]
+    _, ads_config, _ = econf.split_config()
+
+    manifest = writer.write(*econf.split_resources())
+    shards = read_dir(ads_dir)
+
+    assert manifest['generation'] == 1
+    assert f"cluster-{'0' * 24}.json" not in shards
+
+    # Every cluster is there, as is...
+    clusters = { s['name']: s for s in shards.values() if s['@type'] == '/envoy.config.cluster.v3.Cluster' }
+    assert set(clusters.keys()) == set(c['name'] for c in ads_config['static_resources']['clusters'])
+    assert set(clusters.keys()) == set(manifest['files']['cluster'].keys())
+
+    # ...every listener, using RDS for its routes...
+    listeners = [ s for s in shards.values() if s['@type'] == '/envoy.config.listener.v3.Listener' ]
+    assert len(listeners) == len(ads_config['static_resources']['listeners'])
+
+    route_config_names = set()
+
+    for listener in listeners:
+        for chain in listener['filter_chains']:
+            for f in chain['filters']:
+                if f['name'] == 'envoy.filters.network.http_connection_manager':
+                    assert 'route_config' not in f['typed_config']
+                    route_config_names.add(f['typed_config']['rds']['route_config_name'])
+
+    # ...and every route config they use.
+    route_configs = { s['name']: s for s in shards.values() if s['@type'] == '/envoy.config.route.v3.RouteConfiguration' }
+    assert route_configs
+    assert set(route_configs.keys()) == route_config_names
+
+    # The ADS file itself has nothing but the base config.
+    base = json.load(open(ads_path, "r"))
+    assert base['static_resources'] == {}
+    assert base['layered_runtime'] == ads_config['layered_runtime']
+
+    # Splitting out RDS mustn't have touched the ADS config.
+    for listener in ads_config['static_resources']['listeners']:
+        for chain in listener['filter_chains']:
+            for f in chain['filters']:
+                if f['name'] == 'envoy.filters.network.http_connection_manager':
+                    assert 'route_config' in f['typed_config']
+
+    # Rewriting the same config writes nothing but the manifest.
+    manifest = writer.write(*econf.split_resources())
+
+    assert manifest['files_written'] == 0
+    assert manifest['added'] == manifest['changed'] == manifest['removed'] == {}
+    assert read_dir(ads_dir) == shards
+
+    # Change a Mapping, using the same cache: only the route configs change. The
+    # Mapping's cluster gets rebuilt (which means serializing it again, though not
+    # writing it), but the others come from the cache, so they needn't even be
+    # serialized.
+    cache.invalidate('Mapping-v2-mapping-1-default')
+
+    econf = Compile(logger, mappings("/uno/"), k8s=True, cache=cache,
+                    secret_handler=secret_handler, envoy_version="V3")["v3"]
+    manifest = writer.write(*econf.split_resources())
+
+    assert 'cluster' not in manifest['changed']
+    assert set(manifest['changed'].keys()) == { 'route_config' }
+    assert manifest['serialized'] == 1 + len(route_configs) + len(listeners)
+    assert manifest['files_written'] == len(manifest['changed']['route_config'])
+
+    # Old files are gone, and the manifest is up to date.
+    new_shards = read_dir(ads_dir)
+    assert len(new_shards) == len(shards)
+    assert set(new_shards.keys()) == set(filename for files in manifest['files'].values() for filename in files.values())
+
+    on_disk = json.load(open(os.path.join(ads_dir, V3ShardWriter.ManifestName), "r"))
+    assert on_disk['generation'] == 3
+    assert on_disk['files'] == manifest['files']
+
+
+def test_remove_shards(tmp_path):
+    (tmp_path / f"listener-{'a' * 24}.json").write_text("{}")
+    (tmp_path / V3ShardWriter.ManifestName).write_text("{}")
+    (tmp_path / "envoy.json").write_text("{}")
+
+    assert V3ShardWriter.remove_shards(str(tmp_path)) == 2
+    assert os.listdir(str(tmp_path)) == [ "envoy.json" ]
+
+
+if __name__ == '__main__':
+    pytest.main(sys.argv)
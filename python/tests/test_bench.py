@@ -0,0 +1,67 @@
+import logging
+import sys
+
+import pytest
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s test %(levelname)s: %(message)s",
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+logger = logging.getLogger("ambassador")
+
+from ambassador_cli.bench import Run, Stages, SyntheticSnapshots, percentile
+
+
+def test_percentile():
+    values = [ float(x) for x in range(1, 101) ]
+
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 90) == 90.0
+    assert percentile(values, 99) == 99.0
+    assert percentile(values, 100) == 100.0
+    assert percentile([ 3.0 ], 99) == 3.0
+    assert percentile([], 50) == 0.0
+
+
+def test_synthetic_churn():
+    synthetic = SyntheticSnapshots(mappings=10, hosts=2, tlscontexts=2, services=5, churn=2, steps=4)
+
+    def addresses(step):
+        return [ e["subsets"][0]["addresses"][0]["ip"] for e in synthetic.snapshot(step)["Kubernetes"]["Endpoints"] ]
+
+    assert "Deltas" not in synthetic.snapshot(0)
+
+    # Exactly the Endpoints named in the Deltas change from one step to the next.
+    for step in range(1, 4):
+        before = addresses(step - 1)
+        after = addresses(step)
+
+        changed = set(i for i in range(5) if before[i] != after[i])
+        deltas = set(int(d["metadata"]["name"].split("-")[1]) for d in synthetic.snapshot(step)["Deltas"])
+
+        assert changed == deltas
+        assert len(changed) == 2
+
+
+def test_run():
+    synthetic = SyntheticSnapshots(mappings=20, hosts=2, tlscontexts=2, services=5, churn=1, steps=3)
+
+    run = Run(logger, cached=True, trace_memory=False)
+
+    for _, serialization in synthetic:
+        run.reconfigure(serialization)
+
+    results = run.results()
+
+    assert results["snapshots"] == 3
+    assert results["incremental"] == 2
+    assert results["cache"]["hits"] > 0
+
+    for stage in Stages:
+        assert results["stages"][stage]["count"] == 3
+
+
+if __name__ == '__main__':
+    pytest.main(sys.argv)
@@ -19,6 +19,7 @@ logging.basicConfig(
 logger = logging.getLogger("ambassador")
 
 from ambassador import Cache, Config, IR, EnvoyConfig
+from ambassador.cache import Cacheable
 from ambassador.ir.ir import IRFileChecker
 from ambassador.fetch import ResourceFetcher
 from ambassador.utils import SecretHandler, NullSecretHandler, Timer
@@ -378,5 +379,201 @@ def test_long_cluster_1():
 
     print("test_long_cluster_1 done")
 
+def test_dependency_chain():
+    cache = Cache(logger)
+
+    # Dependencies don't need to be cached, and can depend on each other.
+    secret_key = Cache.dependency_key('Secret', 'tls-cert', 'default')
+    ctx_key = Cache.dependency_key('TLSContext', 'ctx')
+
+    assert secret_key == "Dep-Secret-tls-cert.default"
+    assert ctx_key == "Dep-TLSContext-ctx"
+    assert Cache.dependency_key('RateLimitService') == "Dep-RateLimitService"
+
+    cache.depend(secret_key, ctx_key)
+    cache.depend(ctx_key, "Cluster-foo")
+    cache.depend(ctx_key, "Cluster-bar")
+
+    cache.invalidate(secret_key)
+
+    # Both dependency keys should be gone.
+    assert secret_key not in cache.links
+    assert ctx_key not in cache.links
+
+
+def test_dependency_invalidation():
+    builder1 = Builder(logger, "cache_test_1.yaml")
+    builder2 = Builder(logger, "cache_test_1.yaml", enable_cache=False)
+
+    b1 = builder1.build()
+    b2 = builder2.build()
+
+    builder1.check("baseline", b1, b2, strip_cache_keys=True)
+
+    # Every cluster here depends on the default resolver, so invalidating the
+    # resolver's dependency key has to clear them out...
+    resolver_key = Cache.dependency_key('Resolver', 'kubernetes-service')
+    assert resolver_key in builder1.cache.links, f"no dependencies registered on {resolver_key}"
+
+    clusters = [ key for key in builder1.cache.links[resolver_key] ]
+    assert clusters
+
+    builder1.cache.invalidate(resolver_key)
+
+    for key in clusters:
+        assert builder1.cache[key] is None, f"{key} survived invalidation of {resolver_key}"
+
+    # ...and the rebuild must still match an uncached build.
+    b1 = builder1.build()
+    b2 = builder2.build()
+
+    builder1.check("after resolver invalidation", b1, b2, strip_cache_keys=True)
+
+    # The rebuild must have registered the dependencies again, too.
+    assert resolver_key in builder1.cache.links
+
+    # Same for the Secret behind the default Host.
+    builder1.cache.invalidate(Cache.dependency_key('Secret', 'fallback-self-signed-cert', 'default'))
+
+    b1 = builder1.build()
+
+    builder1.check("after secret invalidation", b1, b2, strip_cache_keys=True)
+
+
+def cacheable(key: str) -> Cacheable:
+    rsrc = Cacheable(key=key)
+    rsrc.cache_key = key
+
+    return rsrc
+
+
+def test_bidirectional_links():
+    cache = Cache(logger)
+
+    for key in [ "IRHTTPMappingGroup-a", "Route-a-1", "Route-a-2", "V3-Cluster-a" ]:
+        cache.add(cacheable(key))
+
+    cache.link(cache["IRHTTPMappingGroup-a"], cache["Route-a-1"])
+    cache.link(cache["IRHTTPMappingGroup-a"], cache["Route-a-2"])
+    cache.link(cache["Route-a-1"], cache["V3-Cluster-a"])
+
+    # Deleting something in the middle of the tree takes out what it owns, and
+    # doesn't leave it in its owner's links.
+    cache.invalidate("Route-a-1")
+
+    assert cache["Route-a-1"] is None
+    assert cache["V3-Cluster-a"] is None
+    assert cache.links == { "IRHTTPMappingGroup-a": { "Route-a-2" } }
+    assert cache.backlinks == { "Route-a-2": { "IRHTTPMappingGroup-a" } }
+
+    # Dependencies get cleaned up when the last thing depending on them goes.
+    dep_key = Cache.dependency_key('Secret', 'tls-cert', 'default')
+    cache.depend(dep_key, "Route-a-2")
+    cache.invalidate("IRHTTPMappingGroup-a")
+
+    assert len(cache.cache) == 0
+    assert cache.links == {}
+    assert cache.backlinks == {}
+
+
+def test_generational_eviction():
+    builder = Builder(logger, "cache_test_1.yaml")
+    builder.cache.max_age = 2
+
+    builder.build()
+    builder.cache.advance_generation()
+
+    entries = len(builder.cache.cache)
+    assert entries > 0
+
+    # A rebuild uses everything in the cache, so nothing gets evicted, no
+    # matter how many times we do it.
+    for i in range(4):
+        builder.build()
+        builder.check_last(f"rebuild {i}")
+
+        assert builder.cache.advance_generation() == 0
+        assert len(builder.cache.cache) == entries
+
+    # Drop a Mapping without telling the cache...
+    del(builder.resources["Mapping-v2-foo-4-default"])
+
+    # ...and its entries stop being used, so after max_age more generations,
+    # they get evicted.
+    builder.build()
+    assert builder.cache.advance_generation() == 0
+    builder.build()
+    assert builder.cache.advance_generation() > 0
+
+    assert builder.cache["Mapping-v2-foo-4-default"] is None
+    assert len(builder.cache.cache) < entries
+    assert builder.cache.evicted_objects > 0
+
+
+def test_budget_eviction():
+    cache = Cache(logger, max_entries=3)
+
+    for i in range(3):
+        cache.add(cacheable(f"Route-{i}"))
+        cache.advance_generation()
+
+    # Use Route-0 again, so it's the most recently used...
+    assert cache["Route-0"] is not None
+
+    # ...then add two more, so we're over budget.
+    cache.add(cacheable("Route-3"))
+    cache.add(cacheable("Route-4"))
+
+    assert cache.advance_generation() == 2
+
+    assert sorted(cache.cache.keys()) == [ "Route-0", "Route-3", "Route-4" ]
+
+    # Same thing, but with a memory budget.
+    cache = Cache(logger, max_bytes=1)
+    cache.add(cacheable("Route-0"))
+
+    # Sizes are only worked out when something asks for them, once per entry.
+    assert "Route-0" in cache.unmeasured
+    assert cache.total_bytes > 1
+    assert not cache.unmeasured
+    assert cache.total_bytes == cache.sizes["Route-0"]
+
+    cache.advance_generation()
+
+    assert len(cache.cache) == 0
+    assert cache.total_bytes == 0
+
+
+def test_prefix_stats():
+    builder = Builder(logger, "cache_test_1.yaml")
+
+    builder.build()
+    builder.build()
+
+    cache = builder.cache
+    cache.measure()
+    stats = cache.prefix_stats
+
+    assert set(stats.keys()) >= { "Route", "V2", "group", "cluster", "mapping" }
+
+    for prefix, pstats in stats.items():
+        assert pstats.entries == len([ k for k in cache.cache.keys() if Cache.key_prefix(k) == prefix ])
+        assert pstats.bytes == sum(cache.sizes[k] for k in cache.cache.keys() if Cache.key_prefix(k) == prefix)
+
+    # The second build should have hit in the cache for everything.
+    assert stats["Route"].hits > 0
+    assert stats["group"].hits > 0
+
+    assert sum(s.hits for s in stats.values()) == cache.hits
+    assert sum(s.misses for s in stats.values()) == cache.misses
+
+    # Invalidations get counted for everything that goes.
+    before = len(cache.cache)
+    builder.invalidate("Mapping-v2-foo-4-default")
+
+    assert sum(s.invalidations for s in stats.values()) == before - len(cache.cache)
+    assert sum(s.entries for s in stats.values()) == len(cache.cache)
+
+
 if __name__ == '__main__':
     pytest.main(sys.argv)
@@ -0,0 +1,96 @@
+import concurrent.futures
+import logging
+import multiprocessing
+import pickle
+import sys
+
+import orjson
+import pytest
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s test %(levelname)s: %(message)s",
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+logger = logging.getLogger("ambassador")
+
+from ambassador import Cache
+from ambassador.cache_check import Missing, check_config, structural_diff
+from ambassador.compile import Compile
+from ambassador.utils import NullSecretHandler, dump_json
+
+
+def mappings(count: int) -> str:
+    yaml = ""
+
+    for i in range(count):
+        yaml += f"""
+---
+apiVersion: getambassador.io/v2
+kind: Mapping
+metadata:
+  name: mapping-{i}
+  namespace: default
+spec:
+  prefix: /{i}/
+  service: service-{i}
+  hostname: "*"
+"""
+
+    return yaml
+
+
+def test_structural_diff():
+    a = { 'x': 1, 'y': [ 1, 2, 3 ], 'z': { 'a/b': "q" } }
+    b = { 'x': 1, 'y': [ 1, 4 ], 'z': { 'a/b': "r" }, 'w': True }
+
+    assert list(structural_diff(a, a)) == []
+    assert list(structural_diff(a, b)) == [
+        ( "/w", Missing, True ),
+        ( "/y/1", 2, 4 ),
+        ( "/y/2", 3, Missing ),
+        ( "/z/a~1b", "q", "r" ),
+    ]
+
+    # 1 and True compare equal in Python, but they're different JSON.
+    assert list(structural_diff([ 1 ], [ True ])) == [ ( "/0", 1, True ) ]
+
+
+def test_check_config():
+    cache = Cache(logger)
+    secret_handler = NullSecretHandler(logger, None, None, "0")
+
+    # Build incrementally, with the same cache...
+    Compile(logger, mappings(2), k8s=True, cache=cache, secret_handler=secret_handler, envoy_version="V3")
+    r = Compile(logger, mappings(3), k8s=True, cache=cache, secret_handler=secret_handler, envoy_version="V3")
+
+    ir_json = dump_json(r['ir'].as_dict())
+    econf_json = dump_json(r['v3'].as_dict())
+    aconf_pickle = pickle.dumps(r['ir'].aconf)
+
+    # ...then check it from scratch, in a worker process that comes from a
+    # forkserver, like diagd's.
+    with concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("forkserver")) as pool:
+        result, errors = pool.submit(check_config, aconf_pickle, ir_json, econf_json, "V3",
+                                     secret_handler).result()
+
+    assert result
+    assert errors == ""
+
+    # Mess with the incremental econf: the difference is reported by path, not as
+    # a line diff of the whole thing.
+    econf = orjson.loads(econf_json)
+    econf['static_resources']['clusters'][0]['connect_timeout'] = "99s"
+
+    result, errors = check_config(aconf_pickle, ir_json, dump_json(econf), "V3", secret_handler)
+
+    assert not result
+    assert "econf: 1 difference" in errors
+    assert "/static_resources/clusters/0/connect_timeout:" in errors
+    assert '"99s"' in errors
+    assert "IR:" not in errors
+
+
+if __name__ == '__main__':
+    pytest.main(sys.argv)
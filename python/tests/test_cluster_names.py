@@ -0,0 +1,117 @@
+import logging
+import sys
+
+import pytest
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s test %(levelname)s: %(message)s",
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+logger = logging.getLogger("ambassador")
+
+from ambassador import Cache
+from ambassador.compile import Compile
+from ambassador.ir.irclusternames import ClusterNameMap
+from ambassador.utils import NullSecretHandler
+
+
+LongService = "a-service-with-a-really-quite-extraordinarily-long-name"
+
+
+def mappings(count: int) -> str:
+    yaml = ""
+
+    for i in range(count):
+        yaml += f"""
+---
+apiVersion: getambassador.io/v2
+kind: Mapping
+metadata:
+  name: mapping-{i}
+  namespace: default
+spec:
+  prefix: /{i}/
+  service: {LongService}-{i}
+  hostname: "*"
+"""
+
+    return yaml
+
+
+def test_collision_probability():
+    # 200,000 long names, all with the same prefix: with a 64-bit digest, the odds
+    # of any collision are about 200000^2 / 2^65, or around one in a billion.
+    prefix = "x" * ClusterNameMap.PrefixLength
+    names = [ f"{prefix}-cluster-{i}" for i in range(200000) ]
+
+    envoy_names = ClusterNameMap(logger).assign(names)
+
+    assert len(set(envoy_names.values())) == len(names)
+    assert all(len(n) <= ClusterNameMap.MaxLength for n in envoy_names.values())
+
+    # Mangling depends only on the name itself.
+    assert envoy_names[names[7]] == ClusterNameMap.mangle(names[7])
+
+
+class TinyDigestMap(ClusterNameMap):
+    # One hex digit of digest, so collisions are easy.
+    DigestLength = 1
+
+
+def test_collisions(tmp_path):
+    path = str(tmp_path / "cluster-names.json")
+    prefix = "y" * ClusterNameMap.PrefixLength
+    names = [ f"{prefix}-a-long-enough-suffix-{i}" for i in range(40) ]
+
+    cnm = TinyDigestMap(logger, path)
+    envoy_names = cnm.assign(names)
+
+    # Forty names, sixteen digests: collisions, but the names are still unique and
+    # short enough.
+    assert len(set(envoy_names.values())) == len(names)
+    assert all(len(n) <= ClusterNameMap.MaxLength for n in envoy_names.values())
+    assert cnm.overrides
+
+    # A new map loaded from disk makes the same choices, even when some of the
+    # names that won the collisions are gone.
+    winners = [ name for name in names if name not in cnm.overrides ]
+    remaining = [ name for name in names if name not in winners[0:3] ]
+
+    envoy_names2 = TinyDigestMap(logger, path).assign(remaining)
+
+    assert all(envoy_names2[name] == envoy_names[name] for name in remaining)
+
+
+@pytest.mark.parametrize("envoy_version", [ "V2", "V3" ])
+def test_stable_names(envoy_version):
+    cache = Cache(logger)
+    secret_handler = NullSecretHandler(logger, None, None, "0")
+
+    r1 = Compile(logger, mappings(3), k8s=True, cache=cache, secret_handler=secret_handler,
+                 envoy_version=envoy_version)
+    names1 = { name: c.envoy_name for name, c in r1['ir'].clusters.items() }
+    long_names = [ name for name in names1 if len(name) > ClusterNameMap.MaxLength ]
+
+    assert len(long_names) == 3
+
+    cached = { key for key in cache.cache.keys() if key.startswith(f"{envoy_version}-Cluster") }
+    assert cached
+
+    # Add another cluster with the same long prefix: nobody else gets renamed, and
+    # the Envoy clusters we already built are still in the cache.
+    r2 = Compile(logger, mappings(4), k8s=True, cache=cache, secret_handler=secret_handler,
+                 envoy_version=envoy_version)
+    names2 = { name: c.envoy_name for name, c in r2['ir'].clusters.items() }
+
+    assert all(names2[name] == names1[name] for name in names1)
+    assert len(set(names2.values())) == len(names2)
+    assert cached.issubset(cache.cache.keys())
+
+    econf_names = { c['name'] for c in r2[envoy_version.lower()].as_dict()['static_resources']['clusters'] }
+    assert set(names2[name] for name in long_names).issubset(econf_names)
+
+
+if __name__ == '__main__':
+    pytest.main(sys.argv)
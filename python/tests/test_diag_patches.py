@@ -0,0 +1,264 @@
+from typing import Any, Dict, List
+
+import json
+import logging
+import sys
+import threading
+
+import jsonpatch
+import pytest
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s test %(levelname)s: %(message)s",
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+logger = logging.getLogger("ambassador")
+
+from ambassador.compile import Compile
+from ambassador.diagnostics import Diagnostics, DiagConfig, DiagPatches, DiagSnapshot
+from ambassador.utils import NullSecretHandler
+
+
+def mappings(prefix: str) -> str:
+    return f"""
+---
+apiVersion: getambassador.io/v2
+kind: Mapping
+metadata:
+  name: mapping-1
+  namespace: default
+spec:
+  prefix: {prefix}
+  service: service-1
+  hostname: "*"
+---
+apiVersion: getambassador.io/v2
+kind: Mapping
+metadata:
+  name: mapping-2
+  namespace: default
+spec:
+  prefix: /two/
+  service: service-2
+  hostname: "*"
+"""
+
+
+def test_patches():
+    patches = DiagPatches(max_versions=3, max_age=3600)
+    builds: List[Dict[str, Any]] = []
+
+    def build(content: Dict[str, Any]):
+        def _build() -> Dict[str, Any]:
+            builds.append(content)
+            return content
+
+        return _build
+
+    # A new client gets everything.
+    patch = patches.patch("a", 1, build({ 'x': 1 }))
+    assert jsonpatch.apply_patch({}, json.loads(patch)) == { 'x': 1 }
+
+    # A second client with the same key shares the same version and the same patch.
+    assert patches.patch("b", 1, build({ 'x': 2 })) == patch
+    assert len(builds) == 1
+    assert patches.patches_shared == 1
+
+    # Nothing changed, so nothing to patch.
+    assert json.loads(patches.patch("a", 1, build({ 'x': 3 }))) == []
+
+    # A new key makes a new version, and both clients share the diff.
+    patch = patches.patch("a", 2, build({ 'x': 1, 'y': 2 }))
+    assert json.loads(patch) == [ { 'op': 'add', 'path': '/y', 'value': 2 } ]
+    assert patches.patch("b", 2, build({ 'x': 3 })) == patch
+    assert len(builds) == 2
+
+    # Once a client's version falls out of the history, it gets everything again.
+    patches.patch("a", 3, build({ 'x': 3 }))
+    patches.patch("a", 4, build({ 'x': 4 }))
+    patches.patch("a", 5, build({ 'x': 5 }))
+
+    assert list(patches.versions.keys()) == [ 3, 4, 5 ]
+    assert all((2 not in pkey) for pkey in patches.patches.keys())
+    assert jsonpatch.apply_patch({}, json.loads(patches.patch("b", 5, build({})))) == { 'x': 5 }
+
+
+def test_versions_expire():
+    patches = DiagPatches(max_age=0)
+
+    patches.patch("a", 1, lambda: { 'x': 1 })
+    patches.patch("a", 1, lambda: { 'x': 2 })
+
+    # Too old to reuse, even with the same key.
+    assert patches.built == 2
+
+
+def test_builds_outside_lock():
+    patches = DiagPatches(max_age=3600)
+    started = threading.Event()
+    release = threading.Event()
+    builds: List[int] = []
+
+    def slow_build() -> Dict[str, Any]:
+        builds.append(1)
+        started.set()
+        assert release.wait(10)
+        return { 'x': 1 }
+
+    results: Dict[str, str] = {}
+
+    def client(name: str) -> None:
+        results[name] = patches.patch(name, 1, slow_build)
+
+    first = threading.Thread(target=client, args=("a",))
+    first.start()
+    assert started.wait(10)
+
+    # While key 1 is building, another key doesn't have to wait for it...
+    assert json.loads(patches.patch("c", 2, lambda: { 'y': 2 })) == [ { 'op': 'add', 'path': '/y', 'value': 2 } ]
+
+    # ...and another client asking for key 1 waits for the same build.
+    second = threading.Thread(target=client, args=("b",))
+    second.start()
+
+    release.set()
+    first.join(10)
+    second.join(10)
+
+    assert len(builds) == 1
+    assert results["a"] == results["b"]
+    assert jsonpatch.apply_patch({}, json.loads(results["a"])) == { 'x': 1 }
+    assert not patches.building
+
+
+def test_build_failure():
+    patches = DiagPatches()
+
+    def broken() -> Dict[str, Any]:
+        raise ValueError("no overview")
+
+    with pytest.raises(ValueError):
+        patches.patch("a", 1, broken)
+
+    # The failed build doesn't stick around.
+    assert not patches.building
+    assert json.loads(patches.patch("a", 1, lambda: { 'x': 1 })) == [ { 'op': 'add', 'path': '/x', 'value': 1 } ]
+
+
+def test_diagnostics_generations():
+    secret_handler = NullSecretHandler(logger, None, None, "0")
+
+    r1 = Compile(logger, mappings("/one/"), k8s=True, secret_handler=secret_handler, envoy_version="V3")
+    diag1 = Diagnostics(r1['ir'], r1['v3'], generation=1)
+
+    assert diag1.reused_serializations == 0
+
+    # as_dict() is built once, but callers can't mess it up for each other.
+    d1 = diag1.as_dict()
+    d1.pop('errors')
+    assert 'errors' in diag1.as_dict()
+
+    r2 = Compile(logger, mappings("/uno/"), k8s=True, secret_handler=secret_handler, envoy_version="V3")
+    diag2 = Diagnostics(r2['ir'], r2['v3'], previous=diag1, generation=2)
+
+    # mapping-2 didn't change, so its serialization came from the last generation;
+    # mapping-1 did, so it got a new one.
+    assert diag2.generation == 2
+    assert diag2.reused_serializations >= 1
+
+    elements1 = diag1.as_dict()['ambassador_elements']
+    elements2 = diag2.as_dict()['ambassador_elements']
+
+    assert elements1.keys() == elements2.keys()
+
+    for key, element in elements2.items():
+        if 'mapping-1' in key:
+            assert '/uno/' in element['serialization']
+        elif 'mapping-2' in key:
+            assert element['serialization'] == elements1[key]['serialization']
+
+
+
+def test_diag_config_detached():
+    secret_handler = NullSecretHandler(logger, None, None, "0")
+
+    r = Compile(logger, mappings("/one/"), k8s=True, secret_handler=secret_handler, envoy_version="V3")
+    sources = { key: dict(rsrc) for key, rsrc in r['ir'].aconf.sources.items() }
+    expected = json.dumps(Diagnostics(r['ir'], r['v3']).as_dict(), sort_keys=True)
+
+    # Building Diagnostics doesn't touch the Config...
+    assert { key: dict(rsrc) for key, rsrc in r['ir'].aconf.sources.items() } == sources
+
+    config = DiagConfig(r['ir'], r['v3'])
+
+    # ...and a later reconfigure can update the cached IR objects however it likes...
+    for group in r['ir'].groups.values():
+        group['mappings'].clear()
+        group['_referenced_by'].clear()
+
+    for cluster in r['ir'].clusters.values():
+        cluster['service'] = 'changed'
+
+    for elements in r['v3'].elements.values():
+        elements.clear()
+
+    # ...without changing the Diagnostics for the DiagConfig.
+    assert json.dumps(Diagnostics(config).as_dict(), sort_keys=True) == expected
+
+
+def test_snapshots():
+    secret_handler = NullSecretHandler(logger, None, None, "0")
+    builds: List[int] = []
+
+    def builder(config, previous, generation) -> Diagnostics:
+        builds.append(generation)
+        return Diagnostics(config, previous=previous, generation=generation)
+
+    r1 = Compile(logger, mappings("/one/"), k8s=True, secret_handler=secret_handler, envoy_version="V3")
+    snap1 = DiagSnapshot(1, DiagConfig(r1['ir'], r1['v3']), builder=builder)
+
+    # Lots of readers at once still build the Diagnostics only once.
+    seen: List[Diagnostics] = []
+    readers = [ threading.Thread(target=lambda: seen.append(snap1.diagnostics())) for _ in range(8) ]
+
+    for reader in readers:
+        reader.start()
+
+    for reader in readers:
+        reader.join()
+
+    assert builds == [ 1 ]
+    assert all(diag is seen[0] for diag in seen)
+
+    # Pre-serialized pieces are serialized once, and match the Diagnostics.
+    blob = snap1.json('ambassador_elements')
+    assert blob is snap1.json('ambassador_elements')
+    assert json.loads(blob) == json.loads(json.dumps(seen[0].as_dict()['ambassador_elements']))
+    assert snap1.json('no-such-key') is None
+
+    # Nobody looks at the second snapshot, so the third reuses the first one's work.
+    r2 = Compile(logger, mappings("/two/"), k8s=True, secret_handler=secret_handler, envoy_version="V3")
+    snap2 = DiagSnapshot(2, DiagConfig(r2['ir'], r2['v3']), previous=snap1, builder=builder)
+
+    r3 = Compile(logger, mappings("/uno/"), k8s=True, secret_handler=secret_handler, envoy_version="V3")
+    snap3 = DiagSnapshot(3, DiagConfig(r3['ir'], r3['v3']), previous=snap2, builder=builder)
+
+    diag3 = snap3.diagnostics()
+
+    assert builds == [ 1, 3 ]
+    assert diag3.generation == 3
+    assert diag3.reused_serializations >= 1
+
+    # ...and once they're built, the new snapshot lets go of the old Diagnostics.
+    assert snap3.latest_diagnostics() is diag3
+    assert snap3._previous is None
+
+    # The old snapshots are unchanged.
+    assert snap1.diagnostics() is seen[0]
+    assert b'/one/' in snap1.json('ambassador_elements')
+
+
+if __name__ == '__main__':
+    pytest.main(sys.argv)
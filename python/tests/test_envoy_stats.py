@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import List, Optional
 
 import sys
 
@@ -17,7 +17,7 @@ logging.basicConfig(
 
 logger = logging.getLogger("ambassador")
 
-from ambassador.diagnostics import EnvoyStatsMgr, EnvoyStats
+from ambassador.diagnostics import EnvoyCounters, EnvoyStatsMgr, EnvoyStats
 
 
 class EnvoyStatsMocker:
@@ -178,6 +178,103 @@ def test_stats():
     assert id(stats) != id(stats2)
 
 
+def synthetic_stats(total: int, completed: int) -> List[str]:
+    return [
+        f"http.ingress_http.downstream_rq_total: {total}",
+        f"http.ingress_http.downstream_rq_4xx: 1",
+        f"http.ingress_http.downstream_rq_5xx: 0",
+        f"http.ingress_http.downstream_rq_time: P0(nan,1.0) P25(nan,1.025)",
+        f"cluster.cluster_foo.membership_healthy: 1",
+        f"cluster.cluster_foo.membership_total: 2",
+        f"cluster.cluster_foo.upstream_rq_completed: {completed}",
+        f"cluster.cluster_foo.upstream_rq_5xx: 1",
+        f"cluster.cluster_foo.upstream_cx_total: 12",
+        f"cluster_manager.active_clusters: 1",
+    ]
+
+
+def test_counters():
+    snapshots = [ synthetic_stats(10, 4), synthetic_stats(30, 14), synthetic_stats(5, 2) ]
+
+    # Hand the stats over as lines, the way a streamed response does.
+    esm = EnvoyStatsMgr(logger,
+                        fetch_log_levels=lambda level: "active loggers:\n  admin: info\n",
+                        fetch_envoy_stats=lambda: iter(snapshots.pop(0)) if snapshots else None)
+
+    esm.update()
+    stats = esm.get_stats()
+
+    assert stats.requests == { 'total': 10, '4xx': 1, '5xx': 0, 'bad': 1, 'ok': 9 }
+    assert list(stats.clusters) == [ 'cluster_foo' ]
+    assert stats.clusters['cluster_foo']['healthy_percent'] == 75
+    assert stats.clusters['cluster_foo']['upstream_ok'] == 3
+    assert 'cluster_bar' not in stats.clusters
+
+    # Only one update, so no deltas yet.
+    assert stats.delta('downstream_rq_total') is None
+
+    esm.update()
+    stats = esm.get_stats()
+
+    assert stats.delta('downstream_rq_total') == 20
+    assert stats.delta('upstream_rq_completed', cluster='cluster_foo') == 10
+    assert stats.delta('upstream_rq_completed', cluster='cluster_bar') is None
+    assert stats.rate('downstream_rq_total') > 0
+
+    # Counters going backward means Envoy restarted.
+    esm.update()
+    stats = esm.get_stats()
+
+    assert stats.delta('downstream_rq_total') == 5
+
+    # A failed update keeps the old counters around.
+    esm.update()
+    stats = esm.get_stats()
+
+    assert stats.update_errors == 1
+    assert stats.delta('downstream_rq_total') == 5
+
+
+def test_counter_lines():
+    counters, count = EnvoyCounters.from_lines([
+        "http.ingress_http.downstream_rq_total: 0",
+        "http.ingress_http.downstream_rq_4xx: 0",
+        "http.ingress_http.downstream_rq_5xx: 0",
+        "cluster.cluster_foo.example.com.membership_total: 3",
+        "cluster.cluster_foo.example.com.upstream_rq_completed: 7",
+        "cluster.cluster_foo.example.com.internal.upstream_rq_completed: 5",
+        "cluster.cluster_foo.example.com.zone.us-east-1a.us-east-1b.upstream_rq_5xx: 2",
+        "cluster.cluster_bar.upstream_rq_5xx: 1",
+    ])
+
+    assert count == 8
+
+    # An idle Envoy still has request stats: they're just all zero.
+    assert counters.requests_info() == { 'total': 0, '4xx': 0, '5xx': 0, 'bad': 0, 'ok': 0 }
+    assert EnvoyCounters.from_lines([ "cluster.cluster_bar.upstream_rq_5xx: 1" ])[0].requests_info() == {}
+
+    # Dotted cluster names are fine, and sub-scopes don't count as clusters.
+    assert sorted(counters.cluster_index.keys()) == [ 'cluster_bar', 'cluster_foo.example.com' ]
+    assert counters.get('membership_total', cluster='cluster_foo.example.com') == 3
+    assert counters.get('upstream_rq_completed', cluster='cluster_foo.example.com') == 7
+    assert counters.get('upstream_rq_5xx', cluster='cluster_foo.example.com') == 0
+
+
+def test_envoy_tree():
+    esm = EnvoyStatsMgr(logger,
+                        fetch_log_levels=lambda level: None,
+                        fetch_envoy_stats=lambda: "\n".join(synthetic_stats(10, 4)))
+
+    esm.update()
+    stats = esm.get_stats()
+
+    # The whole tree is only built when asked for, and then only once.
+    assert '_envoy' not in stats.__dict__
+    assert stats.envoy['cluster_manager'] == { 'active_clusters': 1 }
+    assert stats.envoy['cluster']['cluster_foo']['upstream_cx_total'] == 12
+    assert stats.envoy is stats.envoy
+
+
 def test_locks():
     mocker = EnvoyStatsMocker()
 
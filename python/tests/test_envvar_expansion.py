@@ -1,5 +1,6 @@
 from typing import Optional
 
+import json
 import logging
 import os
 import sys
@@ -16,6 +17,7 @@ logger = logging.getLogger("ambassador")
 
 from ambassador import Config, IR
 from ambassador.fetch import ResourceFetcher
+from ambassador.fetch.fetcher import expandvars_in_place
 from ambassador.utils import NullSecretHandler
 from ambassador.ir import IRResource
 from ambassador.ir.irbuffer import IRBuffer
@@ -47,5 +49,66 @@ def test_envvar_expansion():
     assert test_mapping.service == "foo:9999"
 
 
+def test_envvar_expansion_watt():
+    os.environ["TEST_SERVICE"] = "foo"
+
+    watt = json.dumps({
+        "Kubernetes": {
+            "Mapping": [
+                {
+                    "apiVersion": "getambassador.io/v2",
+                    "kind": "Mapping",
+                    "metadata": {
+                        "name": "test-mapping",
+                        "namespace": "default",
+                        "labels": { "$TEST_SERVICE": "${TEST_SERVICE}" },
+                    },
+                    "spec": {
+                        "hostname": "*",
+                        "prefix": "/test/",
+                        "service": "${TEST_SERVICE}:9999",
+                        "timeout_ms": 3000,
+                    },
+                },
+            ],
+        },
+    })
+
+    aconf = Config()
+
+    fetcher = ResourceFetcher(logger, aconf)
+    fetcher.parse_watt(watt)
+
+    aconf.load_all(fetcher.sorted())
+
+    test_mapping = aconf.config["mappings"]["test-mapping"]
+
+    assert test_mapping.service == "foo:9999"
+    assert test_mapping.timeout_ms == 3000
+
+    # Only string values get expanded, never keys.
+    assert test_mapping.metadata_labels["$TEST_SERVICE"] == "foo"
+
+
+def test_expandvars_in_place():
+    os.environ["TEST_SERVICE"] = "foo"
+
+    obj = {
+        "a": "$TEST_SERVICE",
+        "b": [ "x-${TEST_SERVICE}", 1, None, True, { "c": "$TEST_SERVICE" } ],
+        "d": "no dollars here",
+        "e": "$NOT_A_REAL_VARIABLE_AT_ALL",
+    }
+
+    expandvars_in_place(obj)
+
+    assert obj == {
+        "a": "foo",
+        "b": [ "x-foo", 1, None, True, { "c": "foo" } ],
+        "d": "no dollars here",
+        "e": "$NOT_A_REAL_VARIABLE_AT_ALL",
+    }
+
+
 if __name__ == '__main__':
     pytest.main(sys.argv)
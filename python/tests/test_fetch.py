@@ -12,6 +12,7 @@ logging.basicConfig(
 logger = logging.getLogger("ambassador")
 
 from ambassador import Config
+from ambassador.config import ACResource
 from ambassador.fetch import ResourceFetcher
 from ambassador.fetch.dependency import DependencyManager, ServiceDependency, SecretDependency, IngressClassesDependency
 from ambassador.fetch.location import LocationManager
@@ -262,6 +263,44 @@ class TestAmbassadorProcessor:
         assert mapping.prefix == valid_mapping_v1.spec['prefix']
         assert mapping.service == valid_mapping_v1.spec['service']
 
+    def test_lazy_serialization(self):
+        aconf = Config()
+        mgr = ResourceManager(logger, aconf, DependencyManager([]))
+
+        assert AmbassadorProcessor(mgr).try_process(valid_mapping)
+        assert len(mgr.elements) == 1
+
+        element = mgr.elements[0]
+
+        # Nothing should be serialized until someone asks...
+        assert element.has_serialization()
+        assert element.get('serialization', None) is None
+
+        # ...and then it should be the YAML of the original object, remembered.
+        serialization = element.serialization
+        assert serialization
+
+        parsed = parse_yaml(serialization)[0]
+        assert parsed['kind'] == 'Mapping'
+        assert parsed['name'] == valid_mapping.name
+        assert parsed['prefix'] == valid_mapping.spec['prefix']
+
+        assert element.get('serialization', None) == serialization
+        assert 'serialization' not in element.as_dict()
+
+        # Config.as_dict includes the serialization unless told not to.
+        aconf.load_all(mgr.elements)
+        assert aconf.as_dict()['_sources'][element.rkey]['serialization'] == serialization
+        assert 'serialization' not in aconf.as_dict(serializations=False)['_sources'][element.rkey]
+
+        # Resources copied from one with a deferred serialization defer it too.
+        mgr = ResourceManager(logger, Config(), DependencyManager([]))
+        assert AmbassadorProcessor(mgr).try_process(valid_mapping)
+
+        copied = ACResource.from_resource(mgr.elements[0], kind="Mapping")
+        assert copied.get('serialization', None) is None
+        assert copied.serialization == serialization
+
 
 class TestAggregateKubernetesProcessor:
 
@@ -0,0 +1,157 @@
+from typing import List
+
+import logging
+import sys
+
+import pytest
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s test %(levelname)s: %(message)s",
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+logger = logging.getLogger("ambassador")
+
+from ambassador import Config, IR
+from ambassador.fetch import ResourceFetcher
+from ambassador.ir.irhostindex import HostGlobTrie, HostMatchIndex
+from ambassador.utils import NullSecretHandler
+
+hostnames = [
+    "*", "foo.example.com", "bar.example.com", "*.example.com", "foo.*",
+    "*.com", "foo*bar", "example.org", "a.b.c.example.com",
+]
+
+group_hosts = [
+    None, "*", "foo.example.com", "baz.example.com", "*.example.com", "foo.*",
+    "*.org", "f*", "foo*bar", "example.org", "nothing.net", "*.c.example.com",
+]
+
+
+def host_yaml(idx: int, hostname: str, selector: str) -> str:
+    return f'''
+---
+apiVersion: getambassador.io/v2
+kind: Host
+metadata:
+  name: host-{idx}
+  namespace: default
+spec:
+  hostname: "{hostname}"
+  acmeProvider:
+    authority: none
+  requestPolicy:
+    insecure:
+      action: Route
+{selector}
+'''
+
+
+def mapping_yaml(idx: int, host: str, labels: str) -> str:
+    host_line = f'  hostname: "{host}"\n' if host else ''
+
+    return f'''
+---
+apiVersion: getambassador.io/v2
+kind: Mapping
+metadata:
+  name: mapping-{idx}
+  namespace: default
+{labels}spec:
+  prefix: /mapping-{idx}/
+  service: svc-{idx}
+{host_line}
+'''
+
+
+def build_ir() -> IR:
+    selectors = [
+        "",
+        "  selector:\n    matchLabels:\n      tier: front\n",
+        "  selector:\n    matchLabels:\n      tier: back\n      team: blue\n",
+    ]
+
+    labels = [
+        "",
+        "  labels:\n    tier: front\n",
+        "  labels:\n    team: blue\n",
+        "  labels:\n    team: red\n",
+    ]
+
+    yaml = ""
+
+    for idx, hostname in enumerate(hostnames):
+        yaml += host_yaml(idx, hostname, selectors[idx % len(selectors)])
+
+    idx = 0
+
+    for host in group_hosts:
+        for label in labels:
+            # A group host of None means "no hostname at all".
+            yaml += mapping_yaml(idx, host or "", label)
+            idx += 1
+
+    aconf = Config()
+
+    fetcher = ResourceFetcher(logger, aconf)
+    fetcher.parse_yaml(yaml, k8s=True)
+
+    aconf.load_all(fetcher.sorted())
+
+    secret_handler = NullSecretHandler(logger, None, None, "0")
+
+    ir = IR(aconf, file_checker=lambda path: True, secret_handler=secret_handler)
+
+    assert ir
+
+    return ir
+
+
+def test_trie():
+    trie = HostGlobTrie()
+
+    for idx, key in enumerate([ "", "foo", "foo.bar", "fob" ]):
+        trie.add(key, idx)
+
+    assert sorted(trie.prefixes_of("foo.bar.baz")) == [ 0, 1, 2 ]
+    assert sorted(trie.prefixes_of("fo")) == [ 0 ]
+    assert sorted(trie.extensions_of("fo")) == [ 1, 2, 3 ]
+    assert sorted(trie.extensions_of("")) == [ 0, 1, 2, 3 ]
+    assert trie.extensions_of("x") == []
+
+
+def test_index_matches_hosts():
+    ir = build_ir()
+
+    hosts = ir.get_hosts()
+    assert len(hosts) == len(hostnames)
+
+    groups = list(ir.groups.values())
+    assert groups
+
+    index = HostMatchIndex(logger, hosts)
+
+    for group in groups:
+        if group.kind != 'IRHTTPMappingGroup':
+            continue
+
+        wanted: List[str] = [ host.name for host in hosts if host.matches_httpgroup(group) ]
+        got: List[str] = [ host.name for host in index.matching_hosts(group) ]
+
+        assert got == wanted, f"group host {group.get('host')} labels {group.get('metadata_labels')}"
+
+
+def test_host_regex():
+    ir = build_ir()
+    hosts = ir.get_hosts()
+    index = HostMatchIndex(logger, hosts)
+
+    group = next(g for g in ir.groups.values() if g.kind == 'IRHTTPMappingGroup')
+    group['host_regex'] = True
+
+    assert index.matching_hosts(group) == hosts
+
+
+if __name__ == '__main__':
+    pytest.main(sys.argv)
@@ -0,0 +1,115 @@
+import logging
+
+import pytest
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s test %(levelname)s: %(message)s",
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+logger = logging.getLogger("ambassador")
+
+from ambassador import Cache
+from ambassador.invalidation import DeltaInvalidator
+
+
+def delta(kind, name, namespace="default", deltaType="update"):
+    return {
+        "kind": kind,
+        "apiVersion": "getambassador.io/v2",
+        "metadata": {
+            "name": name,
+            "namespace": namespace,
+        },
+        "deltaType": deltaType,
+    }
+
+
+def test_crd_kinds():
+    invalidator = DeltaInvalidator(logger)
+
+    plan = invalidator.plan([
+        delta("Mapping", "foo"),
+        delta("TCPMapping", "bar"),
+        delta("Host", "host"),
+        delta("TLSContext", "ctx"),
+        delta("KubernetesEndpointResolver", "endpoint"),
+        delta("RateLimitService", "ratelimit"),
+        delta("AuthService", "auth"),
+    ], {}, {})
+
+    assert not plan.reset, plan.reset_reasons
+    assert plan.keys == [
+        "Mapping-v2-foo-default",
+        "TCPMapping-v2-bar-default",
+        Cache.dependency_key("Host", "host"),
+        Cache.dependency_key("TLSContext", "ctx"),
+        Cache.dependency_key("Resolver", "endpoint"),
+        Cache.dependency_key("RateLimitService"),
+    ]
+    assert plan.kinds == { "Mapping", "TCPMapping", "Host", "TLSContext",
+                           "KubernetesEndpointResolver", "RateLimitService", "AuthService" }
+
+
+def test_k8s_kinds():
+    invalidator = DeltaInvalidator(logger)
+
+    plan = invalidator.plan([
+        delta("Service", "svc", "ns"),
+        delta("Endpoints", "svc", "ns"),
+        delta("Secret", "cert", "ns"),
+    ], {}, {})
+
+    assert not plan.reset, plan.reset_reasons
+    assert plan.keys == [
+        Cache.dependency_key("Service", "svc", "ns"),
+        Cache.dependency_key("Secret", "cert", "ns"),
+    ]
+
+
+def test_provenance():
+    invalidator = DeltaInvalidator(logger)
+
+    # An annotated Service emitted one Mapping before and another one after.
+    previous = {
+        ( "Service", "svc", "ns" ): [ ( "Mapping", "old-mapping", "ns" ) ],
+    }
+    current = {
+        ( "Service", "svc", "ns" ): [ ( "Mapping", "new-mapping", "ns" ),
+                                      ( "AuthService", "auth", "ns" ) ],
+        ( "Ingress", "ing", "ns" ): [ ( "Mapping", "ing-0-0", "ns" ) ],
+    }
+
+    plan = invalidator.plan([ delta("Service", "svc", "ns"), delta("Ingress", "ing", "ns") ],
+                            previous, current)
+
+    assert not plan.reset, plan.reset_reasons
+    assert plan.keys == [
+        Cache.dependency_key("Service", "svc", "ns"),
+        "Mapping-v2-old-mapping-ns",
+        "Mapping-v2-new-mapping-ns",
+        "Mapping-v2-ing-0-0-ns",
+    ]
+
+
+@pytest.mark.parametrize("kind", [ "Module", "IngressClass", "SomethingElse" ])
+def test_reset(kind):
+    invalidator = DeltaInvalidator(logger)
+
+    plan = invalidator.plan([ delta("Mapping", "foo"), delta(kind, "thing") ], {}, {})
+
+    assert plan.reset
+    assert plan.reset_reasons
+
+
+def test_errors():
+    invalidator = DeltaInvalidator(logger)
+
+    plan = invalidator.plan([ { "kind": "Mapping", "metadata": {} } ], {}, {})
+    assert plan.reset
+    assert plan.errors == 1
+
+    plan = invalidator.plan([ delta("Mapping", "foo", "") ], {}, {})
+    assert plan.reset
+    assert plan.errors == 1
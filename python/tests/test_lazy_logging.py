@@ -0,0 +1,47 @@
+import logging
+import sys
+
+import pytest
+
+from ambassador.utils import Lazy, dump_json, lazy_json
+
+
+class Counter:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def __call__(self, value: str) -> str:
+        self.calls += 1
+        return value
+
+
+def test_Lazy(caplog):
+    logger = logging.getLogger("ambassador.test_lazy")
+    counter = Counter()
+
+    # Below the logger's level, the Lazy never gets evaluated...
+    with caplog.at_level(logging.INFO, logger="ambassador.test_lazy"):
+        logger.debug("value %s", Lazy(counter, "skipped"))
+
+    assert counter.calls == 0, f"Lazy must not be evaluated at INFO, got {counter.calls} calls"
+    assert not caplog.records
+
+    # ...but once it's enabled, it gets evaluated whenever a handler formats the record,
+    # with %s or %r.
+    with caplog.at_level(logging.DEBUG, logger="ambassador.test_lazy"):
+        logger.debug("value %s", Lazy(counter, "logged"))
+        logger.debug("value %r", Lazy(counter, "logged"))
+
+    assert counter.calls > 0, "Lazy must be evaluated at DEBUG"
+    assert [ r.getMessage() for r in caplog.records ] == [ "value logged", "value 'logged'" ]
+
+
+def test_lazy_json():
+    obj = { "b": [ 1, 2 ], "a": { "c": None } }
+
+    assert str(lazy_json(obj)) == dump_json(obj)
+    assert str(lazy_json(obj, pretty=True)) == dump_json(obj, pretty=True)
+
+
+if __name__ == '__main__':
+    pytest.main(sys.argv)
@@ -307,3 +307,45 @@ spec:
     assert found == 1, "Expected 1 /wanted_group/ prefix, got %d" % found
 
     # print(json.dumps(ir.as_dict(), sort_keys=True, indent=4))
+
+@pytest.mark.compilertest
+def test_ordered_groups():
+    test_yaml = ""
+
+    for name, prefix, precedence in [ ( "short", "/a/", 0 ), ( "long", "/a/b/c/", 0 ),
+                                      ( "precedence", "/p/", 10 ), ( "same-a", "/same/", 0 ),
+                                      ( "same-b", "/same/", 0 ), ( "tie", "/tie/", 0 ) ]:
+        test_yaml += f"""
+---
+apiVersion: getambassador.io/v2
+kind: Mapping
+metadata:
+  name: {name}
+  namespace: default
+spec:
+  hostname: "*"
+  prefix: {prefix}
+  service: {name}
+  precedence: {precedence}
+"""
+
+    r = compile_with_cachecheck(test_yaml, envoy_version="v3")
+    ir = r["ir"]
+
+    # Kept in order as groups arrive, it must match sorting everything, ties included.
+    def resorted():
+        return list(reversed(sorted(ir.groups.values(), key=lambda g: g['group_weight'])))
+
+    ordered = list(ir.ordered_groups())
+
+    assert ordered == resorted()
+    assert ordered[0].prefix == "/p/"
+    assert len([ g for g in ordered if g.prefix == "/same/" ]) == 1
+
+    # A group whose weight changes moves.
+    tie = [ g for g in ordered if g.prefix == "/tie/" ][0]
+    tie.group_weight = [ 100 ] + tie.group_weight[1:]
+    ir._order_group(tie)
+
+    assert list(ir.ordered_groups()) == resorted()
+    assert list(ir.ordered_groups())[0] is tie
@@ -0,0 +1,164 @@
+from typing import Any, Dict, List
+
+import logging
+import sys
+
+import pytest
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s test %(levelname)s: %(message)s",
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+logger = logging.getLogger("ambassador")
+
+from ambassador import Cache
+from ambassador.compile import Compile
+from ambassador.utils import NullSecretHandler, dump_json
+
+hosts = """
+---
+apiVersion: getambassador.io/v2
+kind: Host
+metadata:
+  name: host-a
+  namespace: default
+spec:
+  hostname: "a.example.com"
+  acmeProvider:
+    authority: none
+  requestPolicy:
+    insecure:
+      action: Route
+---
+apiVersion: getambassador.io/v2
+kind: Host
+metadata:
+  name: host-b
+  namespace: default
+spec:
+  hostname: "b.example.com"
+  acmeProvider:
+    authority: none
+  requestPolicy:
+    insecure:
+      action: Redirect
+"""
+
+
+def mappings(*prefixes: str) -> str:
+    yaml = hosts
+
+    for idx, prefix in enumerate(prefixes):
+        yaml += f"""
+---
+apiVersion: getambassador.io/v2
+kind: Mapping
+metadata:
+  name: mapping-{idx}
+  namespace: default
+spec:
+  prefix: {prefix}
+  service: service-{idx}
+  hostname: "{'a.example.com' if idx % 2 else '*'}"
+"""
+
+    return yaml
+
+
+def compile(yaml: str, tmp_path, cache=None):
+    secret_handler = NullSecretHandler(logger, str(tmp_path / "src"), str(tmp_path / "cache"), "0")
+
+    return Compile(logger, yaml, k8s=True, cache=cache, secret_handler=secret_handler, envoy_version="V3")["v3"]
+
+
+def hcm_configs(ads_config: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [ f['typed_config']
+             for listener in ads_config['static_resources']['listeners']
+             for chain in listener['filter_chains']
+             for f in chain['filters']
+             if f['name'] == 'envoy.filters.network.http_connection_manager' ]
+
+
+@pytest.mark.compilertest
+def test_rds_listeners_stable(tmp_path, monkeypatch):
+    monkeypatch.setenv("AMBASSADOR_RDS", "true")
+    cache = Cache(logger)
+
+    econf = compile(mappings("/one/", "/two/"), tmp_path, cache=cache)
+    _, ads_config, _ = econf.split_config()
+
+    # Every HttpConnectionManager names a route configuration that we have, rather than
+    # including it.
+    route_configs = { route_config['name']: route_config for route_config in econf.route_configs }
+    assert route_configs
+
+    for typed_config in hcm_configs(ads_config):
+        assert 'route_config' not in typed_config
+        assert typed_config['rds']['route_config_name'] in route_configs
+
+    assert econf.as_dict()['route_configs'] == econf.route_configs
+
+    listeners = dump_json(ads_config['static_resources']['listeners'])
+
+    # Change a Mapping, add a Mapping, then remove one: the routes change every time, but
+    # the listeners stay byte-for-byte the same.
+    previous = dump_json(econf.route_configs)
+
+    for prefixes in [ ( "/uno/", "/two/" ), ( "/uno/", "/two/", "/three/" ), ( "/uno/", ) ]:
+        cache.invalidate('Mapping-v2-mapping-0-default')
+        cache.invalidate('Mapping-v2-mapping-1-default')
+        cache.invalidate('Mapping-v2-mapping-2-default')
+
+        econf = compile(mappings(*prefixes), tmp_path, cache=cache)
+        _, ads_config, _ = econf.split_config()
+
+        assert dump_json(ads_config['static_resources']['listeners']) == listeners
+
+        current = dump_json(econf.route_configs)
+        assert current != previous
+        previous = current
+
+    # Sharding hands back each route configuration just once, and the listeners as they are.
+    _, resources = econf.split_resources()
+
+    assert [ name for kind, name, _ in resources if kind == 'route_config' ] == [ rc['name'] for rc in econf.route_configs ]
+    assert dump_json([ r for kind, _, r in resources if kind == 'listener' ]) == listeners
+
+
+@pytest.mark.compilertest
+def test_rds_inline_routes(tmp_path, monkeypatch):
+    yaml = mappings("/one/", "/two/", "/three/")
+
+    _, inline_config, _ = compile(yaml, tmp_path).split_config()
+    assert inline_routes_equal(inline_config, compile(yaml, tmp_path).inline_routes(inline_config))
+
+    monkeypatch.setenv("AMBASSADOR_RDS", "true")
+
+    econf = compile(yaml, tmp_path)
+    _, ads_config, _ = econf.split_config()
+    listeners = dump_json(ads_config['static_resources']['listeners'])
+
+    # Putting the routes back gives us what we'd have had without RDS mode (apart from
+    # the names of the route configurations)...
+    assert inline_routes_equal(inline_config, econf.inline_routes(ads_config))
+
+    # ...without touching the ADS config itself.
+    assert dump_json(ads_config['static_resources']['listeners']) == listeners
+
+
+def inline_routes_equal(expected: Dict[str, Any], got: Dict[str, Any]) -> bool:
+    got_configs = []
+
+    for typed_config in hcm_configs(got):
+        assert 'rds' not in typed_config
+
+        route_config = { k: v for k, v in typed_config['route_config'].items() if k != 'name' }
+        got_configs.append(dict(typed_config, route_config=route_config))
+
+    return dump_json(hcm_configs(expected)) == dump_json(got_configs)
+
+
+if __name__ == '__main__':
+    pytest.main(sys.argv)
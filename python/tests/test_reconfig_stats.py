@@ -95,6 +95,55 @@ def test_reconfig_stats():
     assert r.errors == 1
 
 
+def test_reconfig_stats_kinds():
+    logger = logging.getLogger("ffs")
+
+    r = ReconfigStats(logger)
+
+    assert r.incremental_ratio() is None
+    assert r.incremental_ratio("Mapping") is None
+
+    # The first reconfigure is always complete, even if it's marked incremental.
+    r.mark("incremental", 10, kinds=[ "Mapping" ])
+    r.mark("incremental", 11, kinds=[ "Mapping", "Secret" ])
+    r.mark("incremental", 12, kinds=[ "Mapping" ])
+    r.mark("complete", 13, kinds=[ "Module" ])
+
+    assert r.kind_counts["Mapping"] == { "incremental": 2, "complete": 1 }
+    assert r.incremental_ratio("Mapping") == pytest.approx(2 / 3)
+    assert r.incremental_ratio("Secret") == 1.0
+    assert r.incremental_ratio("Module") == 0.0
+    assert r.incremental_ratio("Host") is None
+    assert r.incremental_ratio() == 0.5
+
+    r.dump()
+
+
+
+def test_background_check():
+    logger = logging.getLogger("ffs")
+    r = ReconfigStats(logger, max_incr_between_checks=3)
+
+    r.mark("complete", 10)
+    r.mark("incremental", 11)
+    r.mark("incremental", 12)
+    r.mark("incremental", 13)
+    assert r.needs_check(14)
+
+    # A check starts, covering three incrementals; two more land before it finishes,
+    # and they still need checking.
+    covered = r.incrementals_outstanding
+    r.mark("incremental", 15)
+    r.mark("incremental", 16)
+    r.mark_checked(True, 17, covered=covered)
+
+    assert r.incrementals_outstanding == 2
+    assert r.checks == 1
+    assert not r.needs_check(18)
+    r.mark("incremental", 19)
+    assert r.needs_check(20)
+
+
 if __name__ == '__main__':
     import sys
     pytest.main(sys.argv)
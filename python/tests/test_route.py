@@ -56,3 +56,65 @@ def test_timeout_ms_both():
     # If we set a default on the Module, it should override the usual default of 3000ms.
     yaml = module_and_mapping_manifests(["cluster_request_timeout_ms: 9000"], ["timeout_ms: 5001"])
     _test_route(yaml, expectations={'timeout':'5.001s'})
+
+@pytest.mark.compilertest
+def test_shared_virtual_hosts():
+    # Hosts with exactly the same routes should share one virtual host, with a domain
+    # for each of them; a Host with different routes gets a virtual host of its own.
+    yaml = ""
+
+    for name in [ "a", "b", "c" ]:
+        yaml += f'''
+---
+apiVersion: getambassador.io/v2
+kind: Host
+metadata:
+  name: host-{name}
+  namespace: default
+spec:
+  hostname: "{name}.example.com"
+  acmeProvider:
+    authority: none
+  requestPolicy:
+    insecure:
+      action: Route
+'''
+
+    for name, hostname in [ ( "everywhere", "*" ), ( "only-c", "c.example.com" ) ]:
+        yaml += f'''
+---
+apiVersion: getambassador.io/v2
+kind: Mapping
+metadata:
+  name: {name}
+  namespace: default
+spec:
+  hostname: "{hostname}"
+  prefix: /{name}/
+  service: {name}
+'''
+
+    for v in SUPPORTED_ENVOY_VERSIONS:
+        econf = econf_compile(yaml, envoy_version=v)
+        found = 0
+
+        for listener in econf['static_resources']['listeners']:
+            for chain in listener['filter_chains']:
+                for f in chain['filters']:
+                    route_config = f['typed_config'].get('route_config')
+
+                    if not route_config:
+                        continue
+
+                    vhosts = { tuple(vhost['domains']): vhost for vhost in route_config['virtual_hosts'] }
+                    assert sorted(vhosts.keys()) == [ ( "a.example.com", "b.example.com" ), ( "c.example.com", ) ]
+
+                    def prefixes(domains):
+                        return [ r['match'].get('prefix') for r in vhosts[domains]['routes'] ]
+
+                    assert "/everywhere/" in prefixes(( "a.example.com", "b.example.com" ))
+                    assert "/only-c/" not in prefixes(( "a.example.com", "b.example.com" ))
+                    assert "/only-c/" in prefixes(( "c.example.com", ))
+                    found += 1
+
+        assert found > 0
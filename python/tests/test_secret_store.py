@@ -0,0 +1,86 @@
+import logging
+import os
+import sys
+
+import pytest
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s test %(levelname)s: %(message)s",
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+logger = logging.getLogger("ambassador")
+
+from ambassador.utils import SecretHandler, SecretStore
+
+
+def files(path) -> set:
+    return { os.path.relpath(os.path.join(d, f), path) for d, _, fs in os.walk(path) for f in fs }
+
+
+def test_saves_once(tmp_path):
+    store = SecretStore(logger, str(tmp_path))
+
+    paths = store.save("tls", "default", "crt-1", "key-1", None, None)
+    assert store.writes == 2
+    assert paths[2] is None and paths[3] is None
+    assert open(paths[0]).read() == "crt-1"
+    assert open(paths[1]).read() == "key-1"
+
+    # Saving it again does no I/O at all, even from a new SecretHandler...
+    os.unlink(paths[0])
+
+    handler = SecretHandler(logger, "test", str(tmp_path), "1", store=store)
+    ss = handler.cache_internal("tls", "default", "crt-1", "key-1", None, None)
+
+    assert (ss.cert_path, ss.key_path) == paths[0:2]
+    assert store.writes == 2
+    assert store.hits == 1
+    assert not os.path.exists(paths[0])
+
+    # ...and a new store only writes what isn't already there.
+    store2 = SecretStore(logger, str(tmp_path))
+    assert store2.save("tls", "default", "crt-1", "key-1", None, None) == paths
+    assert store2.writes == 1
+
+    # New contents, new paths.
+    paths2 = store.save("tls", "default", "crt-2", "key-2", None, "root-2")
+    assert paths2[0] != paths[0]
+    assert paths2[3].endswith(".root.crt")
+
+
+def test_collects_unused(tmp_path):
+    # Leftovers from an earlier run.
+    stale_dir = tmp_path / "default" / "secrets-decoded" / "gone"
+    stale_dir.mkdir(parents=True)
+    (stale_dir / f"{'0' * 40}.crt").write_text("old")
+    (tmp_path / "snapshot.yaml").write_text("not a secret")
+
+    store = SecretStore(logger, str(tmp_path))
+
+    # Generation 0: the first version of two secrets.
+    old = store.save("tls", "default", "crt-1", "key-1", None, None)
+    other = store.save("other", "ns", None, None, "user-1", None)
+    store.advance_generation()
+
+    assert not stale_dir.exists()
+    assert files(tmp_path) == { "snapshot.yaml" } | { os.path.relpath(p, tmp_path) for p in old + other if p }
+
+    # Generation 1: the TLS secret rotates, and nobody uses the other one.
+    new = store.save("tls", "default", "crt-2", "key-2", None, None)
+    store.advance_generation()
+
+    assert files(tmp_path) == { "snapshot.yaml" } | { os.path.relpath(p, tmp_path) for p in new if p }
+    assert not (tmp_path / "ns" / "secrets-decoded" / "other").exists()
+    assert store.stats()['secrets'] == 1
+
+    # Generation 2: still in use, so still there.
+    assert store.save("tls", "default", "crt-2", "key-2", None, None) == new
+    store.advance_generation()
+
+    assert all(os.path.exists(p) for p in new if p)
+
+
+if __name__ == '__main__':
+    pytest.main(sys.argv)
@@ -0,0 +1,149 @@
+import json
+import logging
+import os
+import sys
+
+import pytest
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s test %(levelname)s: %(message)s",
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+logger = logging.getLogger("ambassador")
+
+from ambassador.snapshot_archive import ArchiveFile, SnapshotArchiver, archive_json, open_snapshot
+
+
+def read(path) -> str:
+    with open_snapshot(str(path)) as f:
+        return f.read()
+
+
+def test_rotation(tmp_path):
+    archiver = SnapshotArchiver(logger, str(tmp_path), 2)
+
+    for generation in range(4):
+        archiver.submit({ "ir.json": lambda g=generation: { 'generation': g, 'b': 1, 'a': 2 } })
+        assert archiver.flush(timeout=10)
+
+    # The current generation is plain, compact, sorted JSON...
+    assert (tmp_path / "ir.json").read_text() == '{"a":2,"b":1,"generation":3}'
+
+    # ...and the older ones are compressed, only as many as we asked for.
+    assert json.loads(read(tmp_path / "ir-1.json.gz"))['generation'] == 2
+    assert json.loads(read(tmp_path / "ir-2.json.gz"))['generation'] == 1
+    assert not (tmp_path / "ir-3.json.gz").exists()
+
+    # Identical content doesn't rotate anything.
+    archiver.submit({ "ir.json": lambda: { 'generation': 3, 'b': 1, 'a': 2 } })
+    assert archiver.flush(timeout=10)
+
+    assert archiver.skipped == 1
+    assert json.loads(read(tmp_path / "ir-1.json.gz"))['generation'] == 2
+
+    # Nothing's left lying around.
+    assert sorted(os.listdir(str(tmp_path))) == [ "ir-1.json.gz", "ir-2.json.gz", "ir.json" ]
+
+
+def test_generations_rotate_together(tmp_path):
+    archiver = SnapshotArchiver(logger, str(tmp_path), 2)
+
+    def generation(mappings: str, snapshot: str) -> None:
+        archiver.submit({
+            "snapshot.yaml": lambda: snapshot,
+            "ir.json": lambda: { 'mappings': mappings },
+            "econf.json": lambda: { 'static': True },
+        })
+        assert archiver.flush(timeout=10)
+
+    generation("one", "s1")
+    generation("two", "s2")
+
+    # Only the IR changes here, but every file rotates, so that each numbered set
+    # still comes from a single generation.
+    generation("three", "s2")
+
+    assert json.loads(read(tmp_path / "ir.json"))['mappings'] == "three"
+    assert read(tmp_path / "snapshot.yaml") == "s2"
+    assert json.loads(read(tmp_path / "ir-1.json.gz"))['mappings'] == "two"
+    assert read(tmp_path / "snapshot-1.yaml.gz") == "s2"
+    assert json.loads(read(tmp_path / "econf-1.json.gz")) == { 'static': True }
+    assert json.loads(read(tmp_path / "ir-2.json.gz"))['mappings'] == "one"
+    assert read(tmp_path / "snapshot-2.yaml.gz") == "s1"
+    assert (tmp_path / "econf-2.json.gz").exists()
+
+    # A generation where nothing at all changed is skipped entirely.
+    generation("three", "s2")
+
+    assert archiver.skipped == 1
+    assert json.loads(read(tmp_path / "ir-1.json.gz"))['mappings'] == "two"
+
+
+def test_serialized(tmp_path):
+    archiver = SnapshotArchiver(logger, str(tmp_path), 2)
+
+    # Things that might change get serialized before they're submitted, and are
+    # archived as they were then.
+    ir = { 'mappings': [ 'one' ], 'b': 1, 'a': 2 }
+    ir_json = archive_json(ir)
+
+    archiver.submit({ "ir.json": lambda: ir_json })
+    ir['mappings'].append('two')
+    assert archiver.flush(timeout=10)
+
+    assert (tmp_path / "ir.json").read_bytes() == b'{"a":2,"b":1,"mappings":["one"]}'
+
+
+def test_files(tmp_path):
+    archiver = SnapshotArchiver(logger, str(tmp_path), 4)
+
+    staged = tmp_path / ".snapshot-staged.yaml"
+    staged.write_text('{"Kubernetes": {}}')
+
+    archiver.submit({ "snapshot.yaml": ArchiveFile(str(staged)) })
+    assert archiver.flush(timeout=10)
+
+    # The archiver owns staged files, so it cleans them up.
+    assert read(tmp_path / "snapshot.yaml") == '{"Kubernetes": {}}'
+    assert not staged.exists()
+
+    # Rejected configs get -tmp files, and leave the archive alone.
+    archiver.submit({ "snapshot.yaml": lambda: "bad" }, rotate=False)
+    assert archiver.flush(timeout=10)
+
+    assert read(tmp_path / "snapshot-tmp.yaml") == "bad"
+    assert read(tmp_path / "snapshot.yaml") == '{"Kubernetes": {}}'
+    assert not (tmp_path / "snapshot-1.yaml.gz").exists()
+
+
+def test_bounded(tmp_path):
+    archiver = SnapshotArchiver(logger, str(tmp_path), 4, max_pending=2)
+
+    # Don't start the thread, so that everything piles up.
+    archiver.thread = object()  # type: ignore
+
+    staged = []
+
+    for i in range(5):
+        path = tmp_path / f".snapshot-{i}.yaml"
+        path.write_text(str(i))
+        staged.append(path)
+
+        archiver.submit({ "snapshot.yaml": ArchiveFile(str(path)) })
+
+    # Only the newest two are still queued, and the dropped ones are cleaned up.
+    assert archiver.dropped == 3
+    assert len(archiver.pending) == 2
+    assert [ p.exists() for p in staged ] == [ False, False, False, True, True ]
+
+    while archiver.pending:
+        archiver.archive(archiver.pending.popleft())
+
+    assert read(tmp_path / "snapshot.yaml") == "4"
+    assert read(tmp_path / "snapshot-1.yaml.gz") == "3"
+
+
+if __name__ == '__main__':
+    pytest.main(sys.argv)
@@ -0,0 +1,201 @@
+import json
+import logging
+import sys
+import types
+
+import pytest
+
+from prometheus_client import CollectorRegistry
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s test %(levelname)s: %(message)s",
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+logger = logging.getLogger("ambassador")
+
+from ambassador.status_writer import StatusWriter
+from ambassador_diag.diagd import KubeStatus
+
+
+# A stand-in for `kubestatus --stream`: it logs every update it gets, one per
+# line, and answers ok -- except for objects named "bad", which fail, and the
+# first object named "crash" it sees, which makes it exit.
+StubHelper = """
+import json, os, sys
+
+log_path, crash_marker = sys.argv[1], sys.argv[2]
+
+with open(log_path, "a") as log:
+    log.write("START\\n")
+
+for line in sys.stdin:
+    update = json.loads(line)
+
+    if update["name"] == "crash" and not os.path.exists(crash_marker):
+        open(crash_marker, "w").close()
+        sys.exit(1)
+
+    with open(log_path, "a") as log:
+        log.write(json.dumps(update) + "\\n")
+
+    result = { "kind": update["kind"], "name": update["name"], "namespace": update["namespace"],
+               "ok": update["name"] != "bad" }
+
+    if not result["ok"]:
+        result["error"] = "no such object"
+
+    sys.stdout.write(json.dumps(result) + "\\n")
+    sys.stdout.flush()
+"""
+
+
+def stub_command(tmp_path):
+    stub = tmp_path / "stub.py"
+    stub.write_text(StubHelper)
+
+    return [ sys.executable, str(stub), str(tmp_path / "log"), str(tmp_path / "crashed") ]
+
+
+def make_writer(tmp_path, **kwargs) -> StatusWriter:
+    return StatusWriter(logger, stub_command(tmp_path), **kwargs)
+
+
+def make_kube_status(tmp_path) -> KubeStatus:
+    app = types.SimpleNamespace(logger=logger, metrics_registry=CollectorRegistry())
+
+    return KubeStatus(app, command=stub_command(tmp_path))
+
+
+def read_log(tmp_path):
+    starts = 0
+    updates = []
+
+    for line in (tmp_path / "log").read_text().splitlines():
+        if line == "START":
+            starts += 1
+        else:
+            updates.append(json.loads(line))
+
+    return starts, updates
+
+
+def test_coalesce_and_batch(tmp_path):
+    writer = make_writer(tmp_path, max_batch=50)
+
+    # Hold the writer thread off while we queue things up.
+    writer.thread = object()  # type: ignore
+
+    for i in range(100):
+        for generation in range(3):
+            writer.post("Mapping", f"mapping-{i}", "default", json.dumps({ 'generation': generation }))
+
+    assert writer.stats()['queue_depth'] == 100
+    assert writer.stats()['coalesced'] == 200
+
+    writer.thread = None
+    writer.start()
+    assert writer.flush(timeout=30)
+    writer.stop()
+
+    # One helper process, two batches, and only the latest status for each object.
+    starts, updates = read_log(tmp_path)
+
+    assert starts == 1
+    assert writer.batches == 2
+    assert len(updates) == 100
+    assert all(update['status'] == { 'generation': 2 } for update in updates)
+    assert writer.stats()['sent'] == 100
+
+
+def test_errors_and_restarts(tmp_path):
+    writer = make_writer(tmp_path)
+    writer.thread = object()  # type: ignore
+
+    writer.post("Mapping", "bad", "default", "{}")
+    writer.post("Mapping", "crash", "default", "{}")
+    writer.post("Mapping", "good", "default", "{}")
+
+    writer.thread = None
+    writer.start()
+    assert writer.flush(timeout=30)
+    writer.stop()
+
+    # The failed update is reported, and the helper is restarted after the crash
+    # to retry what it didn't get to.
+    stats = writer.stats()
+    starts, updates = read_log(tmp_path)
+
+    assert stats['errors'] == 1
+    assert stats['sent'] == 2
+    assert stats['restarts'] == 1
+    assert starts == 2
+    assert [ u['name'] for u in updates ] == [ "bad", "crash", "good" ]
+
+
+def test_bounded(tmp_path):
+    writer = make_writer(tmp_path, max_pending=10)
+    writer.thread = object()  # type: ignore
+
+    for i in range(25):
+        writer.post("Ingress", f"ingress-{i}", "default", "{}")
+
+    stats = writer.stats()
+
+    # The oldest were dropped.
+    assert stats['queue_depth'] == 10
+    assert stats['dropped'] == 15
+    assert list(writer.pending.keys())[0] == "Ingress/ingress-15.default"
+
+
+def test_kube_status_retries_failed_updates(tmp_path):
+    kube_status = make_kube_status(tmp_path)
+    writer = kube_status.writer
+
+    kube_status.post("Mapping", "bad", "default", '{"state": "Running"}')
+    kube_status.post("Mapping", "good", "default", '{"state": "Running"}')
+    assert writer.flush(timeout=30)
+
+    # The failed update is forgotten, so posting the same status again retries it; the
+    # one that was written isn't sent again.
+    assert list(kube_status.current_status.keys()) == [ "Mapping/good.default" ]
+
+    kube_status.post("Mapping", "bad", "default", '{"state": "Running"}')
+    kube_status.post("Mapping", "good", "default", '{"state": "Running"}')
+    assert writer.flush(timeout=30)
+    writer.stop()
+
+    _, updates = read_log(tmp_path)
+    assert [ u['name'] for u in updates ] == [ "bad", "good", "bad" ]
+
+    registry = kube_status.app.metrics_registry
+    assert registry.get_sample_value('ambassador_kubestatus_written_total') == 1
+    assert registry.get_sample_value('ambassador_kubestatus_errors_total') == 2
+
+
+def test_kube_status_retries_dropped_updates(tmp_path, monkeypatch):
+    monkeypatch.setenv("AMBASSADOR_KUBESTATUS_MAX_PENDING", "1")
+
+    kube_status = make_kube_status(tmp_path)
+    writer = kube_status.writer
+    writer.thread = object()  # type: ignore
+
+    # The queue only holds one update, so the first is dropped...
+    kube_status.post("Ingress", "first", "default", "{}")
+    kube_status.post("Ingress", "second", "default", "{}")
+
+    assert list(writer.pending.keys()) == [ "Ingress/second.default" ]
+    assert kube_status.app.metrics_registry.get_sample_value('ambassador_kubestatus_dropped_total') == 1
+
+    # ...and forgotten, so that posting it again queues it again.
+    assert "Ingress/first.default" not in kube_status.current_status
+
+    kube_status.post("Ingress", "first", "default", "{}")
+
+    assert list(writer.pending.keys()) == [ "Ingress/first.default" ]
+    assert writer.stats()['posted'] == 3
+
+
+if __name__ == '__main__':
+    pytest.main(sys.argv)
@@ -0,0 +1,75 @@
+import logging
+import sys
+
+import pytest
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s test %(levelname)s: %(message)s",
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+logger = logging.getLogger("ambassador")
+
+from ambassador.reconfig_stats import ReconfigStats
+from ambassador.validation_cache import ValidationCache
+
+
+def test_config_hash():
+    c1 = { "static_resources": { "clusters": [ { "name": "a", "type": "STRICT_DNS" } ], "listeners": [] } }
+    c2 = { "static_resources": { "listeners": [], "clusters": [ { "type": "STRICT_DNS", "name": "a" } ] } }
+    c3 = { "static_resources": { "listeners": [], "clusters": [ { "type": "STRICT_DNS", "name": "b" } ] } }
+
+    # Key order doesn't matter...
+    assert ValidationCache.config_hash(c1) == ValidationCache.config_hash(c2)
+
+    # ...but content does...
+    assert ValidationCache.config_hash(c1) != ValidationCache.config_hash(c3)
+
+    # ...and so does anything extra.
+    assert ValidationCache.config_hash(c1, "node-1") != ValidationCache.config_hash(c1, "node-2")
+    assert ValidationCache.config_hash(c1, "node-1") == ValidationCache.config_hash(c2, "node-1")
+
+
+def test_lru():
+    cache = ValidationCache(logger, max_entries=2)
+
+    assert cache.check("a") is None
+
+    cache.store("a", 1.0)
+    cache.store("b", 2.0)
+
+    assert cache.check("a") == 1.0
+
+    # "b" is now the least recently used, so it goes first.
+    cache.store("c", 3.0)
+
+    assert len(cache) == 2
+    assert cache.check("b") is None
+    assert cache.check("a") == 1.0
+    assert cache.check("c") == 3.0
+
+    cache.reset()
+    assert len(cache) == 0
+
+
+def test_reconfig_stats_validation():
+    r = ReconfigStats(logger)
+
+    assert r.validation_hit_rate() is None
+
+    r.mark_validation(False, 2.0)
+    r.mark_validation(True, 2.0)
+    r.mark_validation(True, 1.5)
+    r.mark_validation(False, 1.0)
+
+    assert r.validation_hits == 2
+    assert r.validation_misses == 2
+    assert r.validation_hit_rate() == 0.5
+    assert r.validation_time_saved == pytest.approx(3.5)
+
+    r.dump()
+
+
+if __name__ == '__main__':
+    pytest.main(sys.argv)
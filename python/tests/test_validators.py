@@ -0,0 +1,113 @@
+from typing import Any, Dict
+
+import logging
+import os
+import sys
+
+import pytest
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s test %(levelname)s: %(message)s",
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+logger = logging.getLogger("ambassador")
+
+from ambassador import Config
+from ambassador.config import ACResource
+from ambassador.config.validators import ValidatorRegistry
+from ambassador.utils import RichStatus
+
+schema_dir_path = os.path.join(os.path.dirname(__file__), "..", "schemas")
+
+
+def mapping(generation: int=1, **kwargs) -> ACResource:
+    attrs: Dict[str, Any] = {
+        'apiVersion': 'getambassador.io/v2',
+        'kind': 'Mapping',
+        'name': 'test-mapping',
+        'namespace': 'default',
+        'generation': generation,
+        'prefix': '/test/',
+        'service': 'test-service',
+    }
+
+    attrs.update(kwargs)
+
+    return ACResource.from_dict('test-mapping.default.1', 'test-mapping.default.1', 'serialization', attrs)
+
+
+@pytest.fixture
+def legacy_mode(monkeypatch):
+    monkeypatch.setattr(Config, 'legacy_mode', True)
+    monkeypatch.setattr(Config, 'validator_registry', ValidatorRegistry())
+
+
+def test_registry_shared(legacy_mode):
+    registry = Config.validator_registry
+
+    aconf1 = Config(schema_dir_path=schema_dir_path)
+    aconf1.validate_object(mapping())
+
+    schema_validator = registry.schema_validator(schema_dir_path, 'v2', 'Mapping')
+    assert schema_validator is not None
+
+    # A new Config uses the same compiled validator.
+    aconf2 = Config(schema_dir_path=schema_dir_path)
+    aconf2.validate_object(mapping(generation=2))
+
+    assert registry.schema_validator(schema_dir_path, 'v2', 'Mapping') is schema_validator
+    assert len(registry.schema_validators) == 1
+
+    # Missing schemas are remembered too.
+    assert registry.schema_validator(schema_dir_path, 'v2', 'NoSuchKind') is None
+    assert (schema_dir_path, 'v2', 'NoSuchKind') in registry.schema_validators
+
+
+def test_validation(legacy_mode):
+    aconf = Config(schema_dir_path=schema_dir_path)
+
+    rc = aconf.validate_object(mapping())
+    assert rc, f"good Mapping failed validation: {rc}"
+
+    rc = aconf.validate_object(mapping(timeout_ms="not a number"))
+    assert not rc, "bad Mapping passed validation"
+    assert rc.error.startswith("not a valid Mapping: ")
+
+
+def test_result_memoized(legacy_mode):
+    registry = Config.validator_registry
+
+    rc = Config(schema_dir_path=schema_dir_path).validate_object(mapping(timeout_ms="not a number"))
+    assert not rc
+    assert (registry.result_hits, registry.result_misses) == (0, 1)
+
+    # Same resource, new Config: no need to validate again, and we get the
+    # same answer.
+    rc2 = Config(schema_dir_path=schema_dir_path).validate_object(mapping(timeout_ms="not a number"))
+    assert not rc2
+    assert rc2.error == rc.error
+    assert (registry.result_hits, registry.result_misses) == (1, 1)
+
+    # A new generation, or different contents, gets validated again.
+    assert not Config(schema_dir_path=schema_dir_path).validate_object(mapping(generation=2, timeout_ms="not a number"))
+    assert Config(schema_dir_path=schema_dir_path).validate_object(mapping())
+    assert (registry.result_hits, registry.result_misses) == (1, 3)
+
+
+def test_result_eviction():
+    registry = ValidatorRegistry(max_results=2)
+
+    keys = [ registry.result_key(schema_dir_path, 'v2', 'Mapping', mapping(generation=i).as_dict()) for i in range(3) ]
+
+    for key in keys:
+        registry.store_result(key, RichStatus.OK())
+
+    assert registry.check_result(keys[0]) is None
+    assert registry.check_result(keys[1]) is not None
+    assert registry.check_result(keys[2]) is not None
+
+
+if __name__ == '__main__':
+    pytest.main(sys.argv)
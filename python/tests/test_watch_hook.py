@@ -0,0 +1,109 @@
+import json
+import logging
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s test %(levelname)s: %(message)s",
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+logger = logging.getLogger("ambassador")
+
+from watch_hook import WatchHook, WatchHookService
+
+
+def snapshot(mapping_service: str, endpoint_ip: str) -> bytes:
+    return json.dumps({
+        "Kubernetes": {
+            "KubernetesEndpointResolver": [ {
+                "apiVersion": "getambassador.io/v2",
+                "kind": "KubernetesEndpointResolver",
+                "metadata": { "name": "endpoint", "namespace": "default" },
+                "spec": {}
+            } ],
+            "Mapping": [ {
+                "apiVersion": "getambassador.io/v2",
+                "kind": "Mapping",
+                "metadata": { "name": "mapping-1", "namespace": "default" },
+                "spec": { "prefix": "/one/", "service": mapping_service, "resolver": "endpoint",
+                          "hostname": "*" }
+            } ],
+            "Endpoints": [ {
+                "apiVersion": "v1",
+                "kind": "Endpoints",
+                "metadata": { "name": mapping_service, "namespace": "default", "resourceVersion": endpoint_ip },
+                "subsets": [ { "addresses": [ { "ip": endpoint_ip } ], "ports": [ { "port": 80 } ] } ]
+            } ]
+        }
+    }).encode('utf-8')
+
+
+def endpoint_watches(watchset: dict) -> list:
+    return [ w['field-selector'] for w in watchset['kubernetes-watches'] if w['kind'] == 'endpoints' ]
+
+
+@pytest.fixture
+def watch_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv('AMBASSADOR_WATCH_DIR', str(tmp_path))
+    return tmp_path
+
+
+def test_service_rebuilds_only_on_change(watch_dir):
+    service = WatchHookService(logger)
+
+    first = service.handle_snapshot(snapshot("service-1", "10.0.0.1"))
+
+    # Same answer as the standalone watch hook.
+    standalone = WatchHook(logger, None, serialization=snapshot("service-1", "10.0.0.1").decode('utf-8'))
+    assert json.loads(first) == standalone.watchset
+    assert endpoint_watches(json.loads(first)) == [ "metadata.name=service-1" ]
+
+    # Endpoints churn doesn't change the watchset, so nothing gets rebuilt...
+    assert service.handle_snapshot(snapshot("service-1", "10.0.0.2")) == first
+    assert service.rebuilds == 1
+
+    # ...but a changed Mapping does.
+    changed = service.handle_snapshot(snapshot("service-2", "10.0.0.2"))
+    assert service.rebuilds == 2
+    assert endpoint_watches(json.loads(changed)) == [ "metadata.name=service-2" ]
+    assert json.loads((watch_dir / "watch.json").read_text()) == json.loads(changed)
+
+
+def test_client(watch_dir):
+    socket_path = str(watch_dir / "watch-hook.sock")
+    service = WatchHookService(logger)
+
+    server = threading.Thread(target=service.serve, args=(socket_path,), daemon=True)
+    server.start()
+
+    while not os.path.exists(socket_path):
+        server.join(0.01)
+
+    client = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "watch_hook_client.py")
+    env = dict(os.environ, AMBASSADOR_WATCH_HOOK_SOCKET=socket_path)
+
+    result = subprocess.run([ sys.executable, client ], input=snapshot("service-1", "10.0.0.1"),
+                            env=env, capture_output=True, check=True)
+
+    assert endpoint_watches(json.loads(result.stdout)) == [ "metadata.name=service-1" ]
+    assert service.snapshots == 1
+
+    # With no service to talk to, the client runs the standalone watch hook instead.
+    env[ 'AMBASSADOR_WATCH_HOOK_SOCKET' ] = str(watch_dir / "nobody-home.sock")
+
+    result = subprocess.run([ sys.executable, client ], input=snapshot("service-3", "10.0.0.1"),
+                            env=env, capture_output=True, check=True)
+
+    assert endpoint_watches(json.loads(result.stdout)) == [ "metadata.name=service-3" ]
+    assert b"running watch_hook.py" in result.stderr
+    assert service.snapshots == 1
+
+
+if __name__ == '__main__':
+    pytest.main(sys.argv)
@@ -2,17 +2,21 @@
 
 from ambassador.utils import ParsedService as Service
 
-from typing import Dict, List, Optional, Tuple, TYPE_CHECKING
+from typing import Any, Dict, List, Optional, Tuple, TYPE_CHECKING
 
 import sys
 
+import hashlib
 import json
 import logging
 import os
+import socketserver
+
+import orjson
 
 from ambassador import Config, IR
 from ambassador.fetch import ResourceFetcher
-from ambassador.utils import SecretInfo, SavedSecret, SecretHandler, dump_json
+from ambassador.utils import Lazy, SecretInfo, SavedSecret, SecretHandler, dump_json, parse_json
 
 if TYPE_CHECKING:
     from ambassador.ir.irresource import IRResource # pragma: no cover
@@ -26,6 +30,11 @@ DEFAULT_AES_SECRET_NAME = "ambassador-edge-stack"
 ENV_AES_SECRET_NAME = "AMBASSADOR_AES_SECRET_NAME"
 ENV_AES_SECRET_NAMESPACE = "AMBASSADOR_AES_SECRET_NAMESPACE"
 
+# Where the watch_hook service listens (see --serve, below, and watch_hook_client.py,
+# which has its own copy of this default).
+ENV_WATCH_HOOK_SOCKET = "AMBASSADOR_WATCH_HOOK_SOCKET"
+DEFAULT_WATCH_HOOK_SOCKET = "/tmp/ambassador-watch-hook.sock"
+
 
 # Fake SecretHandler for our fake IR, below.
 
@@ -93,7 +102,7 @@ class FakeIR(IR):
 
 
 class WatchHook:
-    def __init__(self, logger, yaml_stream) -> None:
+    def __init__(self, logger, yaml_stream, serialization: Optional[str]=None) -> None:
         # Watch management
 
         self.logger = logger
@@ -101,7 +110,10 @@ class WatchHook:
         self.consul_watches: List[Dict[str, str]] = []
         self.kube_watches: List[Dict[str, str]] = []
 
-        self.load_yaml(yaml_stream)
+        if serialization is not None:
+            self.load_watt(serialization)
+        else:
+            self.load_yaml(yaml_stream)
 
     def add_kube_watch(self, what: str, kind: str, namespace: Optional[str],
                        field_selector: Optional[str]=None, label_selector: Optional[str]=None) -> None:
@@ -120,10 +132,13 @@ class WatchHook:
         self.kube_watches.append(watch)
 
     def load_yaml(self, yaml_stream):
+        self.load_watt(yaml_stream.read())
+
+    def load_watt(self, serialization: str) -> None:
         self.aconf = Config()
 
         fetcher = ResourceFetcher(self.logger, self.aconf, watch_only=True)
-        fetcher.parse_watt(yaml_stream.read())
+        fetcher.parse_watt(serialization)
 
         self.aconf.load_all(fetcher.sorted())
 
@@ -133,7 +148,8 @@ class WatchHook:
         # ...but we need the fake IR to deal with resolvers and TLS contexts.
         self.fake = FakeIR(self.aconf, logger=self.logger)
 
-        self.logger.debug("IR: %s" % self.fake.as_json())
+        # Serializing the whole IR isn't cheap, so don't do it just to throw it away.
+        self.logger.debug("IR: %s", Lazy(self.fake.as_json))
 
         resolvers = self.fake.resolvers
         contexts = self.fake.tls_contexts
@@ -192,7 +208,13 @@ class WatchHook:
                 self.logger.debug(f'-> resolver {resolver}')
 
                 if resolver:
-                    svc = Service(logger, mapping.service, ctx_name)
+                    svc = Service(self.logger, mapping.service, ctx_name)
+                    svc_hostname: Optional[str] = svc.hostname
+
+                    if not svc_hostname:
+                        # This is really kind of impossible.
+                        self.logger.error(f"Mapping {mname} service {mapping.service} has no hostname")
+                        continue
 
                     if resolver.kind == 'ConsulResolver':
                         self.logger.debug(f'Mapping {mname} uses Consul resolver {res_name}')
@@ -205,26 +227,21 @@ class WatchHook:
                                 "id": resolver.datacenter,
                                 "consul-address": resolver.address,
                                 "datacenter": resolver.datacenter,
-                                "service-name": svc.hostname
+                                "service-name": svc_hostname
                             }
                         )
                     elif resolver.kind == 'KubernetesEndpointResolver':
-                        host = svc.hostname
+                        svc_name = svc_hostname
                         namespace = Config.ambassador_namespace
 
-                        if not host:
-                            # This is really kind of impossible.
-                            self.logger.error(f"KubernetesEndpointResolver {res_name} has no 'hostname'")
-                            continue
-
-                        if "." in host:
-                            (host, namespace) = host.split(".", 2)[0:2]
+                        if "." in svc_name:
+                            (svc_name, namespace) = svc_name.split(".", 2)[0:2]
 
-                        self.logger.debug(f'...kube endpoints: svc {svc.hostname} -> host {host} namespace {namespace}')
+                        self.logger.debug(f'...kube endpoints: svc {svc_hostname} -> host {svc_name} namespace {namespace}')
 
                         self.add_kube_watch(f"endpoint", "endpoints", namespace,
                                             label_selector=global_label_selector,
-                                            field_selector=f"metadata.name={host}")
+                                            field_selector=f"metadata.name={svc_name}")
 
         for secret_key, secret_info in self.fake.secret_recorder.needed.items():
             self.logger.debug(f'need secret {secret_info.name}.{secret_info.namespace}')
@@ -265,12 +282,126 @@ class WatchHook:
             "consul-watches": self.consul_watches
         }
 
-        save_dir = os.environ.get('AMBASSADOR_WATCH_DIR', '/tmp')
+        save_watchset(self.watchset)
+
+
+def save_watchset(watchset: Dict[str, Any]) -> None:
+    save_dir = os.environ.get('AMBASSADOR_WATCH_DIR', '/tmp')
+
+    if save_dir:
+        with open(os.path.join(save_dir, 'watch.json'), "w") as output:
+            output.write(dump_json(watchset))
+
+
+class WatchHookService:
+    """
+    The watch hook as a long-running service: watt hands us snapshots (via
+    watch_hook_client.py) over a Unix socket, rather than starting a new Python
+    for each one, so we only pay for importing everything once.
+
+    Most snapshots don't change anything that the watchset depends on -- the
+    usual churn is in Endpoints and Secrets, and all the watch hook cares about
+    those is which ones to watch, not what's in them. So we reduce every
+    snapshot to a digest of the objects that could matter (using their
+    resourceVersions where we can), and only build a new WatchHook when that
+    changes. Otherwise, we just hand back the last watchset.
+    """
+
+    # Kinds whose contents never change the watchset.
+    IgnoredKinds = frozenset([ 'Endpoints', 'Secret' ])
+
+    # Files that WatchHook (or the IR) looks at, relative to AMBASSADOR_CONFIG_BASE_DIR,
+    # plus some absolute paths. Whether they exist is part of the digest.
+    MarkerFiles = [ '.ambassadorinstallations_ok', '.knative_clusteringress_ok', '.knative_ingress_ok',
+                    '.ambassador_ignore_crds', '.ambassador_ignore_crds_2', '.ambassador_ignore_crds_3',
+                    '.ambassador_ignore_crds_4', '.ambassador_ignore_crds_5', '.ambassador_ignore_ingress',
+                    '/ambassador/.edge_stack', '/tmp/ambassador-pod-info/labels' ]
+
+    def __init__(self, logger: logging.Logger) -> None:
+        self.logger = logger
+
+        self.digest: Optional[str] = None
+        self.watchset: Optional[bytes] = None
+
+        self.snapshots = 0
+        self.rebuilds = 0
+
+    def snapshot_digest(self, watt_dict: Dict[str, Any]) -> str:
+        h = hashlib.new('sha1')
+
+        basedir = os.environ.get('AMBASSADOR_CONFIG_BASE_DIR', '/ambassador')
+
+        for marker in WatchHookService.MarkerFiles:
+            h.update(b'+' if os.path.exists(os.path.join(basedir, marker)) else b'-')
 
-        if save_dir:
-            watchset = dump_json(self.watchset)
-            with open(os.path.join(save_dir, 'watch.json'), "w") as output:
-                output.write(watchset)
+        watt_k8s = watt_dict.get('Kubernetes') or {}
+        objects = [ obj for objs in watt_k8s.values() for obj in (objs or []) ]
+        objects += watt_dict.get('Invalid') or []
+
+        for obj in objects:
+            if not isinstance(obj, dict) or (obj.get('kind') in WatchHookService.IgnoredKinds):
+                continue
+
+            metadata = obj.get('metadata') or {}
+            version = metadata.get('resourceVersion')
+
+            if version:
+                # Kubernetes changes the resourceVersion whenever anything about the object
+                # changes, so this is all we need.
+                h.update(f"{obj.get('kind')}/{metadata.get('namespace')}/{metadata.get('name')}@{version}\n".encode('utf-8'))
+            else:
+                h.update(orjson.dumps(obj, option=orjson.OPT_SORT_KEYS))
+                h.update(b'\n')
+
+        return h.hexdigest()
+
+    def handle_snapshot(self, serialization: bytes) -> bytes:
+        """
+        Work out the watchset for a snapshot, serialized as JSON.
+        """
+
+        self.snapshots += 1
+
+        decoded = serialization.decode('utf-8')
+        digest = self.snapshot_digest(parse_json(decoded))
+
+        if (digest != self.digest) or (self.watchset is None):
+            wh = WatchHook(self.logger, None, serialization=decoded)
+
+            self.watchset = dump_json(wh.watchset).encode('utf-8')
+            self.digest = digest
+            self.rebuilds += 1
+
+            self.logger.debug(f"snapshot {self.snapshots}: new watchset {digest}")
+        else:
+            self.logger.debug(f"snapshot {self.snapshots}: watchset unchanged")
+
+        return self.watchset
+
+    def serve(self, socket_path: str) -> None:
+        service = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self) -> None:
+                # The client shuts down its side once it's sent the whole snapshot.
+                serialization = self.rfile.read()
+
+                try:
+                    watchset = service.handle_snapshot(serialization)
+                except Exception as e:
+                    # Send nothing back: the client will fall back to a standalone
+                    # watch_hook.py, which will say what's wrong with this snapshot.
+                    service.logger.exception(f"could not handle snapshot: {e}")
+                    return
+
+                self.wfile.write(watchset)
+
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+        with socketserver.UnixStreamServer(socket_path, Handler) as server:
+            self.logger.info(f"serving watch hook on {socket_path}")
+            server.serve_forever()
 
 #### Mainline.
 
@@ -278,13 +409,18 @@ if __name__ == "__main__":
     loglevel = logging.INFO
 
     args = sys.argv[1:]
+    serve = False
 
-    if args:
+    while args and args[0].startswith('--'):
         if args[0] == '--debug':
             loglevel = logging.DEBUG
             args.pop(0)
-        elif args[0].startswith('--'):
-            raise Exception(f'Usage: {os.path.basename(sys.argv[0])} [--debug] [path]')
+        elif args[0] == '--serve':
+            serve = True
+            args.pop(0)
+        else:
+            raise Exception(f'Usage: {os.path.basename(sys.argv[0])} [--debug] [path]\n'
+                            f'       {os.path.basename(sys.argv[0])} [--debug] --serve [socket-path]')
 
     logging.basicConfig(
         level=loglevel,
@@ -298,6 +434,12 @@ if __name__ == "__main__":
     logger = logging.getLogger('watch_hook')
     logger.setLevel(loglevel)
 
+    if serve:
+        socket_path = args[0] if args else os.environ.get(ENV_WATCH_HOOK_SOCKET, DEFAULT_WATCH_HOOK_SOCKET)
+
+        WatchHookService(logger).serve(socket_path)
+        sys.exit(0)
+
     yaml_stream = sys.stdin
 
     if args:
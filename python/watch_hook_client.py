@@ -0,0 +1,69 @@
+#!/usr/bin/python
+
+# The watch hook that watt runs for every snapshot when the watch_hook service
+# (watch_hook.py --serve) is running: pass the snapshot on stdin to the service,
+# and its watchset back out on stdout.
+#
+# This is run once per snapshot, so it deliberately imports nothing from
+# ambassador. If the service isn't there (or can't handle the snapshot), we
+# fall back to running watch_hook.py the old-fashioned way.
+
+import os
+import socket
+import subprocess
+import sys
+
+# Keep this in sync with watch_hook.py.
+ENV_WATCH_HOOK_SOCKET = "AMBASSADOR_WATCH_HOOK_SOCKET"
+DEFAULT_WATCH_HOOK_SOCKET = "/tmp/ambassador-watch-hook.sock"
+
+# How long to wait for the service. Building a watchset for a really big
+# snapshot can take a while.
+ENV_WATCH_HOOK_TIMEOUT = "AMBASSADOR_WATCH_HOOK_TIMEOUT"
+DEFAULT_WATCH_HOOK_TIMEOUT = 120.0
+
+
+def ask_service(socket_path: str, snapshot: bytes, timeout: float) -> bytes:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+        sock.sendall(snapshot)
+        sock.shutdown(socket.SHUT_WR)
+
+        chunks = []
+
+        while True:
+            chunk = sock.recv(65536)
+
+            if not chunk:
+                break
+
+            chunks.append(chunk)
+
+    return b"".join(chunks)
+
+
+def main() -> int:
+    snapshot = sys.stdin.buffer.read()
+
+    socket_path = os.environ.get(ENV_WATCH_HOOK_SOCKET, DEFAULT_WATCH_HOOK_SOCKET)
+    timeout = float(os.environ.get(ENV_WATCH_HOOK_TIMEOUT, DEFAULT_WATCH_HOOK_TIMEOUT))
+
+    try:
+        watchset = ask_service(socket_path, snapshot, timeout)
+
+        if watchset:
+            sys.stdout.buffer.write(watchset)
+            return 0
+
+        sys.stderr.write(f"watch_hook_client: no watchset from {socket_path}, running watch_hook.py\n")
+    except OSError as e:
+        sys.stderr.write(f"watch_hook_client: could not use {socket_path} ({e}), running watch_hook.py\n")
+
+    watch_hook = os.path.join(os.path.dirname(os.path.realpath(__file__)), "watch_hook.py")
+
+    return subprocess.run([ sys.executable, watch_hook ], input=snapshot).returncode
+
+
+if __name__ == "__main__":
+    sys.exit(main())